@@ -0,0 +1,30 @@
+"""
+Add lunar_yearly recurrence type
+
+Revision ID: add_lunar_yearly_recurrence
+Revises: add_reminder_occurrences
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_lunar_yearly_recurrence'
+down_revision = 'add_reminder_occurrences'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """周期类型枚举添加每年农历"""
+    # ALTER TYPE ... ADD VALUE 不能在使用新值的同一事务内执行
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE recurrencetype ADD VALUE IF NOT EXISTS 'LUNAR_YEARLY'")
+
+
+def downgrade():
+    """PostgreSQL 不支持删除枚举值；农历提醒改为按公历每年（沿用当前提醒日期）"""
+    op.execute(
+        "UPDATE reminders SET recurrence_type = 'YEARLY', recurrence_config = '{}' "
+        "WHERE recurrence_type = 'LUNAR_YEARLY'"
+    )
@@ -0,0 +1,31 @@
+"""
+Add keyset index for pending push tasks
+
+Revision ID: add_push_task_keyset_index
+Revises: add_push_task_lease
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_push_task_keyset_index'
+down_revision = 'add_push_task_lease'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """添加待推送任务的键集分页索引 (priority DESC, scheduled_time, id)，只覆盖 PENDING 状态"""
+    op.create_index(
+        'ix_push_tasks_pending_keyset',
+        'push_tasks',
+        [sa.text('priority DESC'), 'scheduled_time', 'id'],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade():
+    """移除待推送任务的键集分页索引"""
+    op.drop_index('ix_push_tasks_pending_keyset', 'push_tasks')
@@ -0,0 +1,32 @@
+"""
+Add lease columns to push_tasks table
+
+Revision ID: add_push_task_lease
+Revises: add_user_role
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_push_task_lease'
+down_revision = 'add_user_role'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """添加推送任务租约字段（多个调度器实例安全认领任务）"""
+    op.add_column('push_tasks', sa.Column('lease_owner', sa.String(100), nullable=True, comment='租约持有者(调度器实例ID)'))
+    op.add_column('push_tasks', sa.Column('lease_expires_at', sa.DateTime(), nullable=True, comment='租约过期时间'))
+    
+    op.create_index('ix_push_tasks_lease_expires_at', 'push_tasks', ['lease_expires_at'])
+
+
+def downgrade():
+    """移除推送任务租约字段"""
+    op.drop_index('ix_push_tasks_lease_expires_at', 'push_tasks')
+    
+    op.drop_column('push_tasks', 'lease_expires_at')
+    op.drop_column('push_tasks', 'lease_owner')
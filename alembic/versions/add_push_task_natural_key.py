@@ -0,0 +1,52 @@
+"""
+Unique natural key for pending push tasks
+
+Revision ID: add_push_task_natural_key
+Revises: add_push_task_notify_trigger
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_push_task_natural_key'
+down_revision = 'add_push_task_notify_trigger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    同一提醒同一计划时间最多一条待推送任务，幂等创建以此为 ON CONFLICT 目标
+
+    建索引前先取消已有的重复待推送任务（每组保留 id 最小的一条）；已发送、失败等历史任务不受约束
+    """
+    op.execute("""
+        UPDATE push_tasks AS dup
+        SET status = 'CANCELLED', error_message = 'Duplicate of pending push task ' || keep.id
+        FROM push_tasks AS keep
+        WHERE dup.status = 'PENDING' AND keep.status = 'PENDING'
+          AND keep.reminder_id = dup.reminder_id
+          AND keep.scheduled_time = dup.scheduled_time
+          AND keep.id < dup.id
+          AND NOT EXISTS (
+              SELECT 1 FROM push_tasks AS earlier
+              WHERE earlier.status = 'PENDING'
+                AND earlier.reminder_id = keep.reminder_id
+                AND earlier.scheduled_time = keep.scheduled_time
+                AND earlier.id < keep.id
+          )
+    """)
+    op.create_index(
+        'uq_push_tasks_pending_natural_key',
+        'push_tasks',
+        ['reminder_id', 'scheduled_time'],
+        unique=True,
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade():
+    """删除自然键唯一索引（已取消的重复任务不恢复）"""
+    op.drop_index('uq_push_tasks_pending_natural_key', table_name='push_tasks')
@@ -0,0 +1,66 @@
+"""
+Notify schedulers of committed push task changes
+
+Revision ID: add_push_task_notify_trigger
+Revises: add_timezone_and_due_epoch
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_push_task_notify_trigger'
+down_revision = 'add_timezone_and_due_epoch'
+branch_labels = None
+depends_on = None
+
+# 与 app.services.push_wakeup.PG_NOTIFY_CHANNEL 一致
+CHANNEL = 'push_task_scheduled'
+
+
+def upgrade():
+    """
+    push_tasks 新增或改期的 PENDING 任务随事务提交发出 NOTIFY（事务回滚则不发出）
+
+    按语句触发：批量插入/更新只发一条通知，内容为其中最早到期的任务，调度器醒来后整批扫描认领
+    """
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_push_task_scheduled() RETURNS trigger AS $$
+        DECLARE
+            earliest RECORD;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT n.id, n.due_at INTO earliest FROM new_rows n
+                WHERE n.status = 'PENDING'
+                ORDER BY n.due_at LIMIT 1;
+            ELSE
+                SELECT n.id, n.due_at INTO earliest FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.status = 'PENDING' AND (o.status <> n.status OR o.due_at <> n.due_at)
+                ORDER BY n.due_at LIMIT 1;
+            END IF;
+            IF FOUND THEN
+                PERFORM pg_notify('{CHANNEL}', json_build_object('task_id', earliest.id, 'due_at', earliest.due_at)::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER push_tasks_notify_insert
+        AFTER INSERT ON push_tasks
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_push_task_scheduled()
+    """)
+    op.execute("""
+        CREATE TRIGGER push_tasks_notify_update
+        AFTER UPDATE ON push_tasks
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_push_task_scheduled()
+    """)
+
+
+def downgrade():
+    """删除通知触发器"""
+    op.execute("DROP TRIGGER IF EXISTS push_tasks_notify_update ON push_tasks")
+    op.execute("DROP TRIGGER IF EXISTS push_tasks_notify_insert ON push_tasks")
+    op.execute("DROP FUNCTION IF EXISTS notify_push_task_scheduled()")
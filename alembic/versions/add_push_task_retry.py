@@ -0,0 +1,49 @@
+"""
+Add retry scheduling column and dead-letter status to push_tasks
+
+Revision ID: add_push_task_retry
+Revises: add_push_task_keyset_index
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_push_task_retry'
+down_revision = 'add_push_task_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """添加下次尝试时间字段和死信状态，认领索引改为按下次尝试时间排序"""
+    # ALTER TYPE ... ADD VALUE 不能在使用新值的同一事务内执行
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE pushstatus ADD VALUE IF NOT EXISTS 'DEAD_LETTER'")
+    
+    op.add_column('push_tasks', sa.Column('next_attempt_at', sa.DateTime(), nullable=True, comment='下次尝试时间(重试退避后推迟)'))
+    op.execute("UPDATE push_tasks SET next_attempt_at = scheduled_time")
+    op.alter_column('push_tasks', 'next_attempt_at', nullable=False)
+    
+    op.drop_index('ix_push_tasks_pending_keyset', 'push_tasks')
+    op.create_index(
+        'ix_push_tasks_pending_keyset',
+        'push_tasks',
+        [sa.text('priority DESC'), 'next_attempt_at', 'id'],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade():
+    """移除下次尝试时间字段；PostgreSQL 不支持删除枚举值，死信任务改回 FAILED"""
+    op.drop_index('ix_push_tasks_pending_keyset', 'push_tasks')
+    op.create_index(
+        'ix_push_tasks_pending_keyset',
+        'push_tasks',
+        [sa.text('priority DESC'), 'scheduled_time', 'id'],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+    
+    op.drop_column('push_tasks', 'next_attempt_at')
+    op.execute("UPDATE push_tasks SET status = 'FAILED' WHERE status = 'DEAD_LETTER'")
@@ -0,0 +1,36 @@
+"""
+Add push_tasks.scheduled_at (UTC epoch of the planned push time, never rewritten)
+
+Revision ID: add_push_task_scheduled_at
+Revises: add_reminder_push_tasks_until
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+# revision identifiers, used by Alembic.
+revision = 'add_push_task_scheduled_at'
+down_revision = 'add_reminder_push_tasks_until'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """添加计划推送时间的 UTC 时间戳，due_at 在重试和延后时会被改写，触发延迟按此统计"""
+    op.add_column('push_tasks', sa.Column('scheduled_at', sa.BigInteger(), nullable=True, comment='计划推送时间的 UTC 时间戳(秒)，重试和延后不改写，用于统计触发延迟'))
+    # scheduled_time 是用户时区的墙上时间，按用户时区（未设置时为默认时区）换算
+    op.execute(sa.text(
+        "UPDATE push_tasks SET scheduled_at = EXTRACT(EPOCH FROM push_tasks.scheduled_time "
+        "AT TIME ZONE COALESCE(users.timezone, :default_zone))::bigint "
+        "FROM users WHERE users.id = push_tasks.user_id"
+    ).bindparams(default_zone=settings.DEFAULT_TIMEZONE))
+    op.execute("UPDATE push_tasks SET scheduled_at = due_at WHERE scheduled_at IS NULL")
+    op.alter_column('push_tasks', 'scheduled_at', nullable=False)
+
+
+def downgrade():
+    """移除计划推送时间的 UTC 时间戳"""
+    op.drop_column('push_tasks', 'scheduled_at')
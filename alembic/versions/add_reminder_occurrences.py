@@ -0,0 +1,44 @@
+"""
+Add reminder_occurrences table and materialization watermark on reminders
+
+Revision ID: add_reminder_occurrences
+Revises: add_push_task_retry
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_reminder_occurrences'
+down_revision = 'add_push_task_retry'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """添加提醒触发时间物化表；reminders.occurrences_until 记录每个提醒已物化到的时间"""
+    op.create_table(
+        'reminder_occurrences',
+        sa.Column('id', sa.Integer(), nullable=False, comment='触发记录ID'),
+        sa.Column('reminder_id', sa.Integer(), nullable=False, comment='提醒ID'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+        sa.Column('occurs_at', sa.DateTime(), nullable=False, comment='触发时间'),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.ForeignKeyConstraint(['reminder_id'], ['reminders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('reminder_id', 'occurs_at', name='uq_reminder_occurrences_reminder_time'),
+    )
+    op.create_index('ix_reminder_occurrences_user_time', 'reminder_occurrences', ['user_id', 'occurs_at'])
+    op.create_index('ix_reminder_occurrences_occurs_at', 'reminder_occurrences', ['occurs_at'])
+    # 为空表示尚未物化，后台任务下一轮会展开
+    op.add_column('reminders', sa.Column('occurrences_until', sa.DateTime(), nullable=True, comment='触发时间已物化到(不包含)'))
+
+
+def downgrade():
+    """删除提醒触发时间物化表"""
+    op.drop_column('reminders', 'occurrences_until')
+    op.drop_index('ix_reminder_occurrences_occurs_at', 'reminder_occurrences')
+    op.drop_index('ix_reminder_occurrences_user_time', 'reminder_occurrences')
+    op.drop_table('reminder_occurrences')
@@ -0,0 +1,27 @@
+"""
+Add push task generation watermark on reminders
+
+Revision ID: add_reminder_push_tasks_until
+Revises: add_push_task_natural_key
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_reminder_push_tasks_until'
+down_revision = 'add_push_task_natural_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """reminders.push_tasks_until 记录每个提醒的推送任务已预先生成到的时间"""
+    # 为空表示尚未生成，后台任务下一轮从当前时间开始生成
+    op.add_column('reminders', sa.Column('push_tasks_until', sa.DateTime(), nullable=True, comment='推送任务已生成到(不包含，按计划推送时间)'))
+
+
+def downgrade():
+    """删除推送任务生成截止时间"""
+    op.drop_column('reminders', 'push_tasks_until')
@@ -0,0 +1,48 @@
+"""
+Add user time zone and UTC epoch due column to push_tasks
+
+Revision ID: add_timezone_and_due_epoch
+Revises: add_lunar_yearly_recurrence
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_timezone_and_due_epoch'
+down_revision = 'add_lunar_yearly_recurrence'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """添加用户时区和推送任务的 UTC 时间戳，认领索引改为按时间戳排序"""
+    op.add_column('users', sa.Column('timezone', sa.String(64), nullable=True, comment='时区(IANA 名称，为空时使用默认时区)'))
+    
+    op.add_column('push_tasks', sa.Column('due_at', sa.BigInteger(), nullable=True, comment='下次尝试的 UTC 时间戳(秒)，调度器按此扫描'))
+    # 已有任务的 next_attempt_at 是服务器本地时间，按数据库会话时区（与部署时服务器时区一致）换算
+    op.execute("UPDATE push_tasks SET due_at = EXTRACT(EPOCH FROM next_attempt_at::timestamptz)::bigint")
+    op.alter_column('push_tasks', 'due_at', nullable=False)
+    
+    op.drop_index('ix_push_tasks_pending_keyset', 'push_tasks')
+    op.create_index(
+        'ix_push_tasks_pending_keyset',
+        'push_tasks',
+        [sa.text('priority DESC'), 'due_at', 'id'],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade():
+    """移除 UTC 时间戳和用户时区，认领索引改回按下次尝试时间排序"""
+    op.drop_index('ix_push_tasks_pending_keyset', 'push_tasks')
+    op.create_index(
+        'ix_push_tasks_pending_keyset',
+        'push_tasks',
+        [sa.text('priority DESC'), 'next_attempt_at', 'id'],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+    
+    op.drop_column('push_tasks', 'due_at')
+    op.drop_column('users', 'timezone')
@@ -10,7 +10,9 @@ import structlog
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.timezones import get_zone, local_now
 from app.models.user import User
+from app.models.reminder import RecurrenceType
 from app.schemas.response import ApiResponse
 
 logger = structlog.get_logger(__name__)
@@ -93,22 +95,26 @@ async def complete_reminder(
             detail="该提醒已经被标记为完成"
         )
     
-    # 创建完成记录
+    # 创建完成记录（按用户时区）
+    zone = get_zone(current_user.timezone)
     completion = await completion_repo.create(
         reminder_id=data.reminder_id,
         user_id=user_id,
         scheduled_time=data.scheduled_time,
-        status=data.status.value if hasattr(data.status, 'value') else str(data.status)
+        status=data.status.value if hasattr(data.status, 'value') else str(data.status),
+        zone=zone
     )
     
-    # 如果是周期性提醒，计算下次提醒时间
-    recurrence_type_val = str(reminder.recurrence_type) if reminder.recurrence_type else None  
-    if recurrence_type_val and recurrence_type_val != 'once':
+    # 如果是周期性提醒，计算下次提醒时间（过期很久才完成时直接跳到当前时间之后）
+    recurrence_type_val = reminder.recurrence_type
+    if recurrence_type_val and recurrence_type_val != RecurrenceType.ONCE:
         recurrence_config_val = reminder.recurrence_config or {}
-        next_time = recurrence_service.calculate_next_time(
+        now = datetime.now(zone) if data.scheduled_time.tzinfo else local_now(zone)
+        next_time = recurrence_service.calculate_next_time_after(
             recurrence_type=recurrence_type_val,
             recurrence_config=recurrence_config_val,
-            current_time=data.scheduled_time
+            anchor_time=data.scheduled_time,
+            after_time=max(data.scheduled_time, now)
         )
         
         if next_time:
@@ -118,11 +124,9 @@ async def complete_reminder(
                 next_remind_time=next_time
             )
             
-            # 创建新的推送任务
-            from app.services.push_scheduler import create_push_task_for_reminder
-            reminder_id = int(reminder.id)  
-            reminder_user_id = int(reminder.user_id)  
-            await create_push_task_for_reminder(db, reminder_id, reminder_user_id, next_time)
+            # 创建新的推送任务（幂等：重复提交不会产生重复的待推送任务）
+            from app.services.push_task_service import create_push_task_for_reminder
+            await create_push_task_for_reminder(db, reminder)
     
     # 如果是家庭共享提醒，通知其他家庭成员
     family_group_id_val = int(reminder.family_group_id) if reminder.family_group_id else None  
@@ -11,12 +11,16 @@ import time
 from datetime import datetime, timedelta, UTC
 
 from app.core.database import get_db
+from app.core.permissions import get_current_admin_user
 from app.schemas.response import ApiResponse
 from app.models.user import User
 from app.models.reminder import Reminder
 from app.models.reminder_completion import ReminderCompletion, CompletionStatus
 from app.models.family_group import FamilyGroup
 from app.models.template_share import TemplateShare
+from app.services.provider_guard import provider_guard_snapshots
+from app.services.push_metrics import get_push_metrics
+from app.services.push_scheduler import get_scheduler
 
 logger = structlog.get_logger(__name__)
 
@@ -347,3 +351,66 @@ async def get_growth_metrics(db: AsyncSession = Depends(get_db)) -> ApiResponse[
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取增长指标失败: {str(e)}"
         )
+
+
+def _check_fire_delay_slo(snapshot: Dict[str, Any]) -> None:
+    """触发延迟未达到 SLO 的标签组合记录告警日志"""
+    missed = [entry["labels"] for entry in snapshot["fire_delay_ms"] if not entry["slo"]["met"]]
+    if missed:
+        logger.warning("push_fire_delay_slo_missed", labels=missed)
+
+
+@router.get("/metrics/push", response_model=ApiResponse[Dict[str, Any]])
+async def get_push_metrics_snapshot() -> ApiResponse[Dict[str, Any]]:
+    """
+    推送链路指标（本进程内累计，多个 worker 时每个进程各自统计；只读，清空见 POST /metrics/push/reset）
+
+    包括:
+    - 触发延迟（推送完成时间 - 计划推送时间）按优先级和渠道的分布，以及 SLO 达成情况
+    - 各优先级分道和各渠道的队列深度分布
+    - 每块分发耗时按优先级的分布
+    - 推送服务请求延迟按渠道的分布
+    """
+    snapshot = get_push_metrics().snapshot()
+    _check_fire_delay_slo(snapshot)
+    return ApiResponse[Dict[str, Any]].success(data=snapshot)
+
+
+@router.post("/metrics/push/reset", response_model=ApiResponse[Dict[str, Any]])
+async def reset_push_metrics(
+    current_user: User = Depends(get_current_admin_user)
+) -> ApiResponse[Dict[str, Any]]:
+    """
+    读取并清空推送链路指标（需要管理员权限）
+
+    按固定间隔采集时由唯一的采集方调用，得到每个间隔的分布；返回内容与 GET /metrics/push 相同。
+    """
+    snapshot = get_push_metrics().snapshot(reset=True)
+    _check_fire_delay_slo(snapshot)
+    logger.info("push_metrics_reset", admin_id=current_user.id, since=snapshot["since"])
+    return ApiResponse[Dict[str, Any]].success(data=snapshot)
+
+
+@router.get("/providers", response_model=ApiResponse[Dict[str, Any]])
+async def get_provider_metrics() -> ApiResponse[Dict[str, Any]]:
+    """
+    外部服务调用保护指标
+
+    包括:
+    - 极光推送 / 阿里云短信的熔断状态、剩余冷却时间、连续失败次数
+    - 当前自适应速率、成功/限流/失败/本地拒绝计数
+    - 推送调度器最近一块的分发统计
+    - 推送调度器各优先级分道的队列深度、累计推送数和最近一块的触发延迟
+    - 多渠道推送各渠道的队列深度、成功/失败/丢弃数和推送日志写入数
+    """
+    providers = provider_guard_snapshots()
+    logger.info(
+        "provider_metrics",
+        open_circuits=[p["provider"] for p in providers if p["state"] != "closed"]
+    )
+    return ApiResponse[Dict[str, Any]].success(data={
+        "providers": providers,
+        "push_scheduler": get_scheduler().last_tick_stats,
+        "push_channels": get_scheduler().channels.snapshot(),
+        "push_lanes": {str(lane): stats for lane, stats in sorted(get_scheduler().lane_stats.items(), reverse=True)},
+    })
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.security import get_current_active_user
+from app.core.timezones import get_zone, push_schedule
 from app.models.user import User
 from app.models.push_task import PushStatus
 from app.schemas.response import ApiResponse
@@ -18,7 +19,9 @@ from app.schemas.push_task import (
     PushTaskList
 )
 from app.repositories.push_task_repository import PushTaskRepository
-from app.services.push_scheduler import create_push_task_for_reminder
+from app.repositories.reminder_repository import ReminderRepository
+from app.services.push_task_service import create_push_task_at
+from app.services.push_wakeup import notify_push_task_scheduled
 
 router = APIRouter(prefix="/push-tasks", tags=["Push"])
 
@@ -85,22 +88,18 @@ async def create_push_task(
     db: AsyncSession = Depends(get_db)
 ) -> ApiResponse[PushTaskResponse]:
     """
-    创建推送任务
+    创建推送任务（幂等：该提醒在该时间已有待推送任务时返回已有任务）
     """
     user_id = int(current_user.id)  
-    try:
-        task = await create_push_task_for_reminder(
-            db=db,
-            reminder_id=task_data.reminder_id,
-            user_id=user_id,
-            scheduled_time=task_data.scheduled_time
-        )
-        return ApiResponse[PushTaskResponse].success(data=task)
-    except ValueError as e:
+    reminder = await ReminderRepository(db).get_by_id(task_data.reminder_id, user_id)
+    if not reminder:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
+            detail=f"Reminder {task_data.reminder_id} not found"
         )
+    try:
+        task = await create_push_task_at(db, reminder, task_data.scheduled_time)
+        return ApiResponse[PushTaskResponse].success(data=task)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -132,8 +131,7 @@ async def update_push_task(
         )
     
     # 只允许更新PENDING状态的任务
-    task_status = str(task.status)  
-    if task_status != PushStatus.PENDING.value:
+    if task.status != PushStatus.PENDING:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Can only update pending tasks"
@@ -142,13 +140,21 @@ async def update_push_task(
     # 更新字段
     update_data: Dict[str, Any] = {}
     if task_data.scheduled_time is not None:
-        update_data["scheduled_time"] = task_data.scheduled_time
+        update_data.update(push_schedule(task_data.scheduled_time, get_zone(current_user.timezone)))
+        duplicate = await repo.get_pending_by_key(task.reminder_id, update_data["scheduled_time"])
+        if duplicate is not None and duplicate.id != task.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A pending push task already exists for this reminder at that time"
+            )
     if task_data.title is not None:
         update_data["title"] = task_data.title
     if task_data.content is not None:
         update_data["content"] = task_data.content
     
-    task = await PushTaskRepository.update(db=db, task=task, **update_data)
+    task = await repo.update(task=task, **update_data)
+    if "scheduled_time" in update_data:
+        await notify_push_task_scheduled(task.id, task.next_attempt_at)
     
     return ApiResponse[PushTaskResponse].success(data=task)
 
@@ -176,8 +182,7 @@ async def cancel_push_task(
         )
     
     # 只允许取消PENDING状态的任务
-    task_status = str(task.status)  
-    if task_status != PushStatus.PENDING.value:
+    if task.status != PushStatus.PENDING:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Can only cancel pending tasks"
@@ -208,9 +213,8 @@ async def retry_push_task(
             detail="Push task not found"
         )
     
-    # 只允许重试FAILED状态的任务
-    task_status = str(task.status)  
-    if task_status != PushStatus.FAILED.value:
+    # 只允许重试FAILED和DEAD_LETTER状态的任务
+    if task.status not in (PushStatus.FAILED, PushStatus.DEAD_LETTER):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Can only retry failed tasks"
@@ -218,6 +222,7 @@ async def retry_push_task(
     
     # 重置状态以便重试
     task = await PushTaskRepository.reset_for_retry(db=db, task=task)
+    await notify_push_task_scheduled(task.id, task.next_attempt_at)
     
     return ApiResponse[PushTaskResponse].success(data=task)
 
@@ -5,6 +5,7 @@ Reminder API Endpoints
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
 from typing import List, Dict, Any
+from datetime import datetime, timedelta
 import structlog
 
 from app.core.security import get_current_active_user
@@ -14,6 +15,7 @@ from app.schemas.reminder import (
     ReminderCreate, 
     ReminderUpdate, 
     ReminderResponse,
+    ReminderOccurrenceResponse,
     QuickReminderCreate
 )
 from app.schemas.reminder_completion import (
@@ -24,10 +26,14 @@ from app.repositories import get_reminder_repository, get_reminder_completion_re
 from app.repositories.reminder_repository import ReminderRepository
 from app.repositories.reminder_completion_repository import ReminderCompletionRepository
 from app.services.push_task_service import create_push_task_for_reminder
+from app.services.push_task_generator import regenerate_push_tasks
+from app.services.occurrence_materializer import get_user_occurrences
 from app.services.asr_service import get_asr_service, ASRError
 from app.services.nlu_service import get_nlu_service, NLUError
 from app.core.database import get_db
-from app.core.recurrence import calculate_next_occurrence
+from app.core.recurrence import compile_rule, next_after
+from app.core.timezones import get_zone, local_now
+from app.core.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = structlog.get_logger(__name__)
@@ -108,6 +114,33 @@ async def get_reminders(
     return ApiResponse[List[ReminderResponse]].success(data=reminders)
 
 
+@router.get("/occurrences", response_model=ApiResponse[List[ReminderOccurrenceResponse]])
+async def get_reminder_occurrences(
+    start: datetime | None = Query(None, description="开始时间（包含），默认当前时间"),
+    end: datetime | None = Query(None, description="结束时间（不包含），默认开始后7天"),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> ApiResponse[List[ReminderOccurrenceResponse]]:
+    """
+    Get reminder occurrences in a time range
+    获取时间范围内全部提醒的触发时间（日历/预览）
+    
+    Returns:
+        ApiResponse[List[ReminderOccurrenceResponse]]: 统一响应格式，data 为按时间排序的触发列表
+    """
+    start = start or local_now(get_zone(current_user.timezone))
+    end = end or start + timedelta(days=7)
+    if end <= start or end - start > timedelta(days=settings.REMINDER_OCCURRENCE_HORIZON_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"时间范围需大于0且不超过{settings.REMINDER_OCCURRENCE_HORIZON_DAYS}天"
+        )
+    
+    occurrences = await get_user_occurrences(db, current_user.id, start, end, limit)
+    return ApiResponse[List[ReminderOccurrenceResponse]].success(data=occurrences)
+
+
 @router.get("/{reminder_id}", response_model=ApiResponse[ReminderResponse])
 async def get_reminder(
     reminder_id: int,
@@ -137,11 +170,14 @@ async def update_reminder(
     reminder_id: int,
     reminder_data: ReminderUpdate,
     current_user: User = Depends(get_current_active_user),
-    reminder_repo: ReminderRepository = Depends(get_reminder_repository)
+    reminder_repo: ReminderRepository = Depends(get_reminder_repository),
+    db: AsyncSession = Depends(get_db)
 ) -> ApiResponse[ReminderResponse]:
     """
     Update reminder
     更新提醒
+
+    周期配置、提前量或启用状态变化时，预先生成的推送任务已被取消，这里立即按新配置重新生成。
     
     Returns:
         ApiResponse[ReminderResponse]: 统一响应格式，data 为更新后的提醒
@@ -169,6 +205,8 @@ async def update_reminder(
     )
     
     updated_reminder = await reminder_repo.update(reminder, **update_data)
+    if updated_reminder.push_tasks_until is None:
+        await regenerate_push_tasks(db, updated_reminder)
     
     logger.info(
         "reminder_updated",
@@ -256,23 +294,23 @@ async def complete_reminder(
     # 2. 标记完成
     reminder = await reminder_repo.mark_completed(reminder, current_user.id) 
     
-    # 3. 记录完成记录
+    # 3. 记录完成记录（按用户时区）
+    zone = get_zone(current_user.timezone)
     note = completion_data.note if completion_data else None
     await completion_repo.create(
         reminder_id=reminder.id, 
         user_id=current_user.id, 
         scheduled_time=reminder.next_remind_time, 
         note=note,
-        status="completed"
+        status="completed",
+        zone=zone
     )
     
-    # 4. 如果是周期性提醒，计算下次提醒时间
+    # 4. 如果是周期性提醒，计算下次提醒时间（过期很久才完成时直接跳到当前时间之后）
     if reminder.recurrence_type != "once": 
-        next_time = calculate_next_occurrence(
-            reminder.next_remind_time, 
-            reminder.recurrence_type, 
-            reminder.recurrence_config 
-        )
+        anchor = reminder.next_remind_time
+        rule = compile_rule(reminder.recurrence_type, reminder.recurrence_config)
+        next_time = next_after(rule, anchor, max(anchor, local_now(zone))) or anchor
         
         # 更新下次提醒时间，并重置完成状态
         reminder = await reminder_repo.reset_completion_and_update_next_time(
@@ -414,7 +452,7 @@ async def create_voice_reminder(
         try:
             nlu_service = get_nlu_service()
             user_context: Dict[str, Any] = {
-                "user_timezone": "Asia/Shanghai",  # 可从用户配置读取
+                "user_timezone": current_user.timezone or settings.DEFAULT_TIMEZONE,
                 "user_id": current_user.id
             }
             parsed_intent = await nlu_service.parse_reminder(text, user_context)
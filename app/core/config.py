@@ -27,6 +27,7 @@ class Settings(BaseSettings):
     ALIYUN_ACCESS_KEY_SECRET: str | None = None
     SMS_SIGN_NAME: str | None = None
     SMS_TEMPLATE_CODE: str | None = None
+    SMS_REMINDER_TEMPLATE_CODE: str | None = None  # 提醒通知短信模板（短信渠道推送使用），未配置时短信渠道不发送
     SMS_REGION: str | None = "cn-hangzhou"
     SMS_CODE_EXPIRE_SECONDS: int = 300  # 验证码过期时间（秒）
     SMS_RATE_LIMIT_SECONDS: int = 60  # 相同手机同用途最小发送间隔
@@ -53,6 +54,86 @@ class Settings(BaseSettings):
     JPUSH_APP_KEY: str | None = None
     JPUSH_MASTER_SECRET: str | None = None
     JPUSH_ENABLED: bool = False
+    JPUSH_BASE_URL: str = "https://api.jpush.cn/v3"
+    JPUSH_HTTP2: bool = False  # 需要安装 h2（httpx[http2]）
+    JPUSH_CONNECT_TIMEOUT: float = 3.0  # 建立连接超时（秒）
+    JPUSH_READ_TIMEOUT: float = 10.0  # 读取响应超时（秒）
+    JPUSH_MAX_CONNECTIONS: int = 50  # 连接池最大连接数
+    JPUSH_MAX_KEEPALIVE_CONNECTIONS: int = 20  # 连接池保持的空闲长连接数
+    
+    # 推送调度器
+    PUSH_SCAN_INTERVAL: int = 300  # 兜底扫描间隔（秒），平时按下一个到期时间唤醒
+    PUSH_DISPATCH_CONCURRENCY: int = 20  # 单轮最大并发推送数
+    PUSH_BATCH_ENABLED: bool = True  # 相同标题和内容的任务合并为多别名推送
+    PUSH_BATCH_MAX_ALIASES: int = 1000  # 每次合并推送的别名上限（JPush 限制 1000）
+    PUSH_DIGEST_WINDOW_SECONDS: int = 300  # 同一用户到期时间相差不超过该秒数的任务合并为一条摘要通知，0 表示不合并
+    PUSH_DIGEST_MIN_TASKS: int = 2  # 至少几条任务才合并为摘要
+    PUSH_DIGEST_MAX_LINES: int = 5  # 摘要内容最多列出的提醒条数
+    PUSH_WORKER_ID: str | None = None  # 调度器实例ID，默认 主机名:进程号
+    PUSH_CLAIM_BATCH_SIZE: int = 500  # 每次认领的任务数
+    PUSH_LEASE_SECONDS: int = 300  # 任务租约时长（秒），实例崩溃后租约过期即可被其他实例重新认领
+    PUSH_SHARD_COUNT: int = 1  # 按 user_id 取模分片的分片数，1 表示不分片
+    PUSH_SHARD_INDEX: int = 0  # 本实例负责的分片序号（0 ~ PUSH_SHARD_COUNT-1）
+    PUSH_WAKEUP_HORIZON_SECONDS: int = 600  # 预加载未来多少秒内的到期时间
+    PUSH_WAKEUP_SEED_LIMIT: int = 1000  # 每次预加载的到期时间条数上限
+    PUSH_WAKEUP_BACKEND: str = "postgres"  # 跨进程唤醒: postgres（触发器 NOTIFY）/ redis（Redis 流）/ 空表示不转发
+    PUSH_WAKEUP_CHANNEL: str = "timekeeper:push_wakeup"  # redis 后端使用的 Redis 流
+    PUSH_WAKEUP_STREAM_MAXLEN: int = 10000  # Redis 流保留的通知条数（近似裁剪）
+
+    # 多渠道推送（app 以外的渠道，每个渠道独立的工作协程池）
+    PUSH_CHANNEL_PROVIDER: str = "live"  # live（真实服务，目前接入短信）/ stub（本地模拟全部渠道，用于离线压测）
+    PUSH_CHANNEL_LIMITS: str = "sms:4:5,wechat:8:20,call:2:1"  # 渠道:并发数:速率(次/秒)，逗号分隔
+    PUSH_CHANNEL_QUEUE_SIZE: int = 10000  # 每个渠道排队的推送上限，超出直接记为失败
+    PUSH_CHANNEL_STUB_LATENCY_MS: int = 50  # stub 渠道模拟的单次请求耗时（毫秒）
+    PUSH_CHANNEL_STUB_FAILURE_RATE: float = 0.0  # stub 渠道模拟的失败比例
+    PUSH_LOG_FLUSH_SIZE: int = 200  # 推送日志攒够多少条批量写入一次
+    PUSH_LOG_FLUSH_INTERVAL: float = 1.0  # 推送日志最长多久写入一次（秒）
+
+    # 推送链路指标（进程内直方图，/monitoring/metrics/push 读取）
+    PUSH_METRICS_ENABLED: bool = True  # 是否记录触发延迟、队列深度、批次耗时和推送服务延迟分布
+    PUSH_FIRE_DELAY_SLO_MS: int = 60000  # 触发延迟目标（毫秒）：实际推送时间晚于计划推送时间不超过该值
+    PUSH_FIRE_DELAY_SLO_TARGET: float = 0.99  # 触发延迟不超过目标的推送比例要求
+
+    @property
+    def push_channel_limits(self) -> dict[str, tuple[int, float]]:
+        """解析 PUSH_CHANNEL_LIMITS 为 {渠道: (并发数, 速率)}"""
+        limits = {}
+        for item in self.PUSH_CHANNEL_LIMITS.split(","):
+            if item.strip():
+                channel, concurrency, rate = (part.strip() for part in item.split(":"))
+                limits[channel] = (int(concurrency), float(rate))
+        return limits
+
+    # 外部服务调用保护（自适应限流 + 熔断）
+    JPUSH_GUARD_RATE: float = 20.0  # 极光推送初始请求速率（次/秒），遇 429/5xx 减半
+    JPUSH_GUARD_MAX_RATE: float = 50.0  # 极光推送请求速率上限（次/秒）
+    SMS_GUARD_RATE: float = 5.0  # 阿里云短信初始请求速率（次/秒）
+    SMS_GUARD_MAX_RATE: float = 20.0  # 阿里云短信请求速率上限（次/秒）
+    PROVIDER_BREAKER_FAILURE_THRESHOLD: int = 5  # 连续失败多少次熔断
+    PROVIDER_BREAKER_RECOVERY_SECONDS: int = 30  # 熔断冷却时间（秒），之后放行探测请求
+    PROVIDER_GUARD_MAX_WAIT: float = 5.0  # 等待令牌的最长时间（秒），超过则本地拒绝
+
+    # ===== 过期周期提醒追赶配置 =====
+    REMINDER_CATCHUP_GRACE_SECONDS: int = 86400  # 下次提醒时间早于当前多少秒视为过期，直接推进到当前之后
+    REMINDER_CATCHUP_INTERVAL: int = 3600  # 追赶任务执行间隔（秒），0 表示不启动
+    REMINDER_CATCHUP_BATCH_SIZE: int = 1000  # 每块读取和批量更新的提醒数
+
+    # ===== 提醒触发时间物化配置 =====
+    REMINDER_OCCURRENCE_HORIZON_DAYS: int = 30  # 预先展开未来多少天的触发时间
+    REMINDER_OCCURRENCE_INTERVAL: int = 3600  # 物化任务执行间隔（秒），0 表示不启动
+    REMINDER_OCCURRENCE_BATCH_SIZE: int = 1000  # 每块读取和批量写入的提醒数
+    REMINDER_OCCURRENCE_RETENTION_DAYS: int = 7  # 已过去的触发记录保留天数
+
+    # ===== 推送任务预先生成配置 =====
+    PUSH_TASK_HORIZON_HOURS: int = 24  # 预先生成未来多少小时内的推送任务
+    PUSH_TASK_GENERATE_INTERVAL: int = 600  # 生成任务执行间隔（秒），0 表示不启动
+    PUSH_TASK_GENERATE_BATCH_SIZE: int = 1000  # 每块读取的提醒数
+
+    # ===== 时区配置 =====
+    DEFAULT_TIMEZONE: str = "Asia/Shanghai"  # 用户未设置时区时使用的时区（IANA 名称）
+
+    # ===== 工作日历配置 =====
+    WORKDAY_CALENDAR_FILE: str = ""  # 法定节假日与调休日历文件（JSON），留空使用内置的中国大陆日历
     
     # ===== 语音识别服务配置 (ASR) =====
     # 科大讯飞（主力）
@@ -94,6 +175,37 @@ class Settings(BaseSettings):
         "ASR_MAX_AUDIO_SIZE",
         "DEEPSEEK_TIMEOUT",
         "DEEPSEEK_MAX_TOKENS",
+        "PUSH_SCAN_INTERVAL",
+        "PUSH_DISPATCH_CONCURRENCY",
+        "PUSH_BATCH_MAX_ALIASES",
+        "PUSH_DIGEST_WINDOW_SECONDS",
+        "PUSH_DIGEST_MIN_TASKS",
+        "PUSH_DIGEST_MAX_LINES",
+        "PUSH_CLAIM_BATCH_SIZE",
+        "PUSH_LEASE_SECONDS",
+        "PUSH_SHARD_COUNT",
+        "PUSH_SHARD_INDEX",
+        "PUSH_WAKEUP_HORIZON_SECONDS",
+        "PUSH_WAKEUP_SEED_LIMIT",
+        "PUSH_WAKEUP_STREAM_MAXLEN",
+        "PUSH_CHANNEL_QUEUE_SIZE",
+        "PUSH_CHANNEL_STUB_LATENCY_MS",
+        "PUSH_LOG_FLUSH_SIZE",
+        "PUSH_FIRE_DELAY_SLO_MS",
+        "JPUSH_MAX_CONNECTIONS",
+        "JPUSH_MAX_KEEPALIVE_CONNECTIONS",
+        "PROVIDER_BREAKER_FAILURE_THRESHOLD",
+        "PROVIDER_BREAKER_RECOVERY_SECONDS",
+        "REMINDER_CATCHUP_GRACE_SECONDS",
+        "REMINDER_CATCHUP_INTERVAL",
+        "REMINDER_CATCHUP_BATCH_SIZE",
+        "REMINDER_OCCURRENCE_HORIZON_DAYS",
+        "REMINDER_OCCURRENCE_INTERVAL",
+        "REMINDER_OCCURRENCE_BATCH_SIZE",
+        "REMINDER_OCCURRENCE_RETENTION_DAYS",
+        "PUSH_TASK_HORIZON_HOURS",
+        "PUSH_TASK_GENERATE_INTERVAL",
+        "PUSH_TASK_GENERATE_BATCH_SIZE",
         mode="before",
     )
     def _parse_int_fields(cls, v):
@@ -108,7 +220,20 @@ class Settings(BaseSettings):
         except Exception:
             return v
 
-    @field_validator("NLU_CONFIDENCE_THRESHOLD", mode="before")
+    @field_validator(
+        "NLU_CONFIDENCE_THRESHOLD",
+        "JPUSH_CONNECT_TIMEOUT",
+        "JPUSH_READ_TIMEOUT",
+        "JPUSH_GUARD_RATE",
+        "JPUSH_GUARD_MAX_RATE",
+        "SMS_GUARD_RATE",
+        "SMS_GUARD_MAX_RATE",
+        "PROVIDER_GUARD_MAX_WAIT",
+        "PUSH_CHANNEL_STUB_FAILURE_RATE",
+        "PUSH_LOG_FLUSH_INTERVAL",
+        "PUSH_FIRE_DELAY_SLO_TARGET",
+        mode="before",
+    )
     def _parse_float_fields(cls, v):
         """Strip inline comments and parse floats from strings."""
         if isinstance(v, str):
@@ -0,0 +1,152 @@
+"""
+Lunar Calendar Module
+农历换算模块 - 农历/公历互相换算，供农历周期提醒使用
+
+换算表由 scripts/build_lunar_table.py 生成，覆盖农历 1900-2100 年，每年一条定长记录:
+春节的公历日序号、各月大小位图（第 i 位对应当年第 i 个月，闰月按顺序排在对应月份之后）和闰月。
+表文件首次使用时以只读方式内存映射，多个进程共享同一份页缓存；
+换算只读取一条记录并做位运算，不逐月累加。
+"""
+
+import mmap
+import struct
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Tuple
+
+TABLE_PATH = Path(__file__).parent / "data" / "lunar_1900_2100.bin"
+
+# 文件头: 魔数、起始年份、年数
+MAGIC = b"TKLUNAR1"
+HEADER = struct.Struct("<8sHH")
+# 每年: 春节日序号、各月大小位图、闰月（0=无闰月）、保留
+RECORD = struct.Struct("<IHBB")
+FIRST_YEAR = 1900
+
+
+class LunarDate(NamedTuple):
+    """农历日期"""
+    year: int
+    month: int
+    day: int
+    leap: bool = False
+
+
+class _LunarTable:
+    """内存映射的农历换算表"""
+
+    __slots__ = ("_buffer", "first_year", "last_year")
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.first_year, count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or len(self._buffer) != HEADER.size + count * RECORD.size:
+            raise RuntimeError(f"Corrupted lunar table {path}, rebuild it with scripts/build_lunar_table.py")
+        self.last_year = self.first_year + count - 1
+
+    def record(self, year: int) -> Tuple[int, int, int]:
+        """
+        读取一年的记录
+
+        Returns:
+            (春节日序号, 各月大小位图, 闰月)
+
+        Raises:
+            ValueError: 年份超出换算表范围
+        """
+        if not self.first_year <= year <= self.last_year:
+            raise ValueError(f"lunar year must be {self.first_year}-{self.last_year}, got {year}")
+        offset = HEADER.size + (year - self.first_year) * RECORD.size
+        new_year, bits, leap_month, _ = RECORD.unpack_from(self._buffer, offset)
+        return new_year, bits, leap_month
+
+
+@lru_cache(maxsize=1)
+def _table() -> _LunarTable:
+    return _LunarTable(TABLE_PATH)
+
+
+def _offset(bits: int, index: int) -> int:
+    """当年前 index 个月的总天数"""
+    return 29 * index + (bits & ((1 << index) - 1)).bit_count()
+
+
+def _month_index(year: int, month: int, leap: bool) -> Tuple[int, int, int]:
+    """
+    农历月份在当年的序号
+
+    Returns:
+        (春节日序号, 各月大小位图, 月份序号)
+
+    Raises:
+        ValueError: 年份超出范围、月份非法或当年没有该闰月
+    """
+    new_year, bits, leap_month = _table().record(year)
+    if not 1 <= month <= 12:
+        raise ValueError(f"lunar month must be 1-12, got {month}")
+    if leap and month != leap_month:
+        raise ValueError(f"lunar year {year} has no leap month {month}")
+    index = month - 1 + (leap_month != 0 and (month > leap_month or leap))
+    return new_year, bits, index
+
+
+def leap_month(year: int) -> int:
+    """当年闰几月，0 表示没有闰月"""
+    return _table().record(year)[2]
+
+
+def month_days(year: int, month: int, leap: bool = False) -> int:
+    """农历某月的天数（29 或 30）"""
+    _, bits, index = _month_index(year, month, leap)
+    return 30 if bits >> index & 1 else 29
+
+
+def lunar_to_solar(year: int, month: int, day: int, leap: bool = False) -> date:
+    """
+    农历转公历
+
+    Args:
+        year: 农历年
+        month: 农历月（1-12）
+        day: 农历日（1-30）
+        leap: 是否闰月
+
+    Raises:
+        ValueError: 日期超出换算表范围或不存在
+    """
+    new_year, bits, index = _month_index(year, month, leap)
+    if not 1 <= day <= (30 if bits >> index & 1 else 29):
+        raise ValueError(f"lunar {year}-{'leap ' if leap else ''}{month} has no day {day}")
+    return date.fromordinal(new_year + _offset(bits, index) + day - 1)
+
+
+def solar_to_lunar(day: date) -> LunarDate:
+    """
+    公历转农历
+
+    Raises:
+        ValueError: 日期超出换算表范围
+    """
+    table = _table()
+    ordinal = day.toordinal()
+    year = min(day.year, table.last_year)
+    new_year, bits, leap = table.record(year)
+    if ordinal < new_year:
+        year -= 1
+        new_year, bits, leap = table.record(year)
+
+    elapsed = ordinal - new_year
+    months = 13 if leap else 12
+    if elapsed >= _offset(bits, months):
+        raise ValueError(f"{day} is beyond lunar year {table.last_year}")
+    # 每月不超过 30 天，elapsed // 30 不会超过实际序号，最多再前进一两个月
+    index = elapsed // 30
+    while index + 1 < months and _offset(bits, index + 1) <= elapsed:
+        index += 1
+
+    day_of_month = elapsed - _offset(bits, index) + 1
+    if leap and index == leap:
+        return LunarDate(year, leap, day_of_month, True)
+    return LunarDate(year, index + (0 if leap and index > leap else 1), day_of_month)
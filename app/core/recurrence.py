@@ -1,56 +1,704 @@
 """
 Recurrence Calculation Module
 周期计算模块 - 计算下一次提醒时间
+
+recurrence_config 只解析一次，编译为不可变的 RecurrenceRule，并按 (recurrence_type, config) 缓存。
+RecurrenceEngine、RecurrenceService 和 API 层都通过 compile_rule 共用同一套规则。
+
+支持的配置:
+- daily: {"interval": 1}（兼容 "interval_days"）
+- weekly: {"weekdays": [0, 2, 4], "interval": 1}（0=周一；未指定时沿用上次的星期几）
+- monthly: {"day_of_month": 25}（兼容 "day" / "monthday"；-1 表示月末）, "interval", "skip_weekend"
+- yearly: {"month": 3, "day": 15, "interval": 1}（日期超出当月天数时取月末，含闰年2月29日）
+- custom: {"days": 45} / {"weeks": 2} / {"months": 3} / {"years": 1}（兼容 {"interval": 3, "unit": "weeks"}）
+- custom: {"rrule": "FREQ=MONTHLY;BYDAY=2TU"}（RFC 5545 RRULE，由 dateutil.rrule 计算，按字符串缓存）
+- lunar_yearly: {"lunar_month": 8, "lunar_day": 15, "leap": false, "interval": 1}
+  （农历，换算见 app.core.lunar；当年没有该闰月时取同名平月，三十日在小月取二十九日，超出 2100 年不再触发）
+- 所有类型可选 {"time": "HH:MM"} 固定提醒时刻
+- 所有周期类型可选 {"workdays_only": true} 只在工作日触发（跳过法定节假日和周末，调休上班日照常触发）
+- monthly 的 "skip_weekend" 顺延到下一个工作日（按工作日历，含法定节假日和调休）
 """
 
-from datetime import datetime, timedelta
+import calendar
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from dateutil.rrule import rrule, rrulestr
+
+from app.core.lunar import lunar_to_solar, month_days, leap_month, solar_to_lunar
+from app.core.workday import get_workday_calendar
+from app.models.reminder import RecurrenceType
+
+# 编译结果缓存条目数（不同配置的数量远小于提醒数量）
+RULE_CACHE_SIZE = 4096
+# 只在工作日触发的规则连续这么多次都落在休息日时，认为之后不会再有工作日触发（如只在周六的规则）
+MAX_DAYS_OFF_SKIPPED = 366
+
+
+def _freeze(value: Any) -> Any:
+    """把配置转换为可哈希的形式（dict -> 排序后的键值元组，list -> 元组）"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _last_day(year: int, month: int) -> int:
+    if month == 2 and calendar.isleap(year):
+        return 29
+    return _DAYS_IN_MONTH[month]
+
+
+def _shift_months(moment: datetime, months: int, day: int) -> datetime:
+    """移动若干个月并设置日期（-1 或超出当月天数时取月末）"""
+    year, month0 = divmod(moment.year * 12 + moment.month - 1 + months, 12)
+    last_day = _last_day(year, month0 + 1)
+    return moment.replace(year=year, month=month0 + 1, day=last_day if day == -1 else min(day, last_day))
+
+
+def _normalize_rrule(text: str) -> str:
+    """去掉 "RRULE:" 前缀并统一为大写，相同规则的不同写法共用一个缓存条目"""
+    text = str(text).strip().upper()
+    return text[len("RRULE:"):] if text.startswith("RRULE:") else text
+
+
+@lru_cache(maxsize=RULE_CACHE_SIZE)
+def _parse_rrule(text: str) -> rrule:
+    """
+    解析 RRULE 字符串（按字符串缓存，不含起点）
+
+    Raises:
+        ValueError: 语法错误、含 DTSTART/RDATE/EXDATE 等多行内容，或使用了 COUNT
+    """
+    parsed = rrulestr(text, dtstart=datetime(2000, 1, 1), ignoretz=True, cache=False)
+    if not isinstance(parsed, rrule):
+        raise ValueError(f"only a single RRULE is supported, got {text!r}")
+    if parsed._count is not None:
+        # 起点会随 next_remind_time 推进，无法记住已经触发过几次
+        raise ValueError(f"RRULE COUNT is not supported, use UNTIL instead: {text!r}")
+    return parsed
+
+
+@lru_cache(maxsize=RULE_CACHE_SIZE)
+def _anchored_rrule(text: str, anchor: datetime) -> rrule:
+    """以 anchor 为起点的 RRULE（未指定 BYHOUR/BYMINUTE 时沿用起点的时刻）"""
+    return _parse_rrule(text).replace(dtstart=anchor)
+
+
+def _next_workday(moment: datetime) -> datetime:
+    """moment 当天及之后的第一个工作日，时刻不变"""
+    day = moment.date()
+    return moment + (get_workday_calendar().next_workday(day) - day)
+
+
+def _positive_int(config: Dict[str, Any], *keys: str, default: int = 1) -> int:
+    for key in keys:
+        value = config.get(key)
+        if value:
+            value = int(value)
+            if value < 1:
+                raise ValueError(f"{key} must be positive, got {value}")
+            return value
+    return default
+
+
+class RecurrenceRule:
+    """
+    编译后的周期规则（不可变、可哈希）
+
+    Attributes:
+        recurrence_type: 周期类型
+        interval: 间隔（每 N 天/周/月/年）
+        weekdays: 每周的星期几（0=周一），None 表示沿用上次的星期几
+        day: 每月/每年的日期（-1 表示月末），None 表示沿用上次的日期
+        month: 每年的月份（农历周期为农历月份），None 表示沿用上次的月份
+        skip_weekend: 每月日期落在休息日（周末、法定节假日）时顺延到下一个工作日
+        step_days: 自定义周期的天数
+        step_months: 自定义周期的月数
+        at_time: 固定提醒时刻
+        rrule: 自定义周期的 RRULE（规范化后的字符串）
+        leap: 农历周期是否为闰月
+        workdays_only: 只在工作日触发，落在休息日的触发跳过
+    """
+
+    __slots__ = (
+        "recurrence_type", "interval", "weekdays", "day", "month",
+        "skip_weekend", "step_days", "step_months", "at_time", "rrule", "leap", "workdays_only", "_key",
+    )
+
+    def __init__(
+        self,
+        recurrence_type: RecurrenceType,
+        interval: int = 1,
+        weekdays: Tuple[int, ...] | None = None,
+        day: int | None = None,
+        month: int | None = None,
+        skip_weekend: bool = False,
+        step_days: int = 0,
+        step_months: int = 0,
+        at_time: time | None = None,
+        rrule: str | None = None,
+        leap: bool = False,
+        workdays_only: bool = False
+    ):
+        values = (
+            recurrence_type, interval, weekdays, day, month, skip_weekend, step_days, step_months, at_time, rrule,
+            leap, workdays_only
+        )
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_key", values)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("RecurrenceRule is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RecurrenceRule) and self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__[1:-1])
+        return f"RecurrenceRule({self.recurrence_type.value}, {fields})"
+
+    def _replace(self, **changes: Any) -> "RecurrenceRule":
+        fields = dict(zip(self.__slots__[1:-1], self._key[1:]))
+        fields.update(changes)
+        return RecurrenceRule(self.recurrence_type, **fields)
+
+    @classmethod
+    def from_config(cls, recurrence_type: RecurrenceType, config: Dict[str, Any]) -> "RecurrenceRule":
+        """
+        解析周期配置（不经过缓存，调用方应使用 compile_rule）
+
+        Raises:
+            ValueError: 配置值非法
+        """
+        rule = cls._parse_config(recurrence_type, config)
+        if config.get("workdays_only") and rule.recurrence_type is not RecurrenceType.ONCE:
+            return rule._replace(workdays_only=True)
+        return rule
+
+    @classmethod
+    def _parse_config(cls, recurrence_type: RecurrenceType, config: Dict[str, Any]) -> "RecurrenceRule":
+        at_time = None
+        if config.get("time"):
+            hour, minute = map(int, str(config["time"]).split(":"))
+            at_time = time(hour, minute)
+
+        if recurrence_type == RecurrenceType.DAILY:
+            return cls(recurrence_type, interval=_positive_int(config, "interval", "interval_days"), at_time=at_time)
+
+        if recurrence_type == RecurrenceType.WEEKLY:
+            weekdays = None
+            if config.get("weekdays"):
+                weekdays = tuple(sorted({int(weekday) for weekday in config["weekdays"]}))
+                if not all(0 <= weekday <= 6 for weekday in weekdays):
+                    raise ValueError(f"weekdays must be 0-6, got {config['weekdays']}")
+            return cls(recurrence_type, interval=_positive_int(config, "interval"), weekdays=weekdays, at_time=at_time)
+
+        if recurrence_type == RecurrenceType.MONTHLY:
+            day = config.get("day_of_month") or config.get("day") or config.get("monthday")
+            day = int(day) if day else None
+            if day is not None and day != -1 and day < 1:
+                raise ValueError(f"day_of_month must be -1 or positive, got {day}")
+            return cls(
+                recurrence_type,
+                interval=_positive_int(config, "interval"),
+                day=day,
+                skip_weekend=bool(config.get("skip_weekend", False)),
+                at_time=at_time
+            )
+
+        if recurrence_type == RecurrenceType.YEARLY:
+            month = int(config["month"]) if config.get("month") else None
+            if month is not None and not 1 <= month <= 12:
+                raise ValueError(f"month must be 1-12, got {month}")
+            day = int(config["day"]) if config.get("day") else None
+            if day is not None and day < 1:
+                raise ValueError(f"day must be positive, got {day}")
+            return cls(recurrence_type, interval=_positive_int(config, "interval"), day=day, month=month, at_time=at_time)
+
+        if recurrence_type == RecurrenceType.LUNAR_YEARLY:
+            month = int(config["lunar_month"]) if config.get("lunar_month") else None
+            if month is not None and not 1 <= month <= 12:
+                raise ValueError(f"lunar_month must be 1-12, got {month}")
+            day = int(config["lunar_day"]) if config.get("lunar_day") else None
+            if day is not None and not 1 <= day <= 30:
+                raise ValueError(f"lunar_day must be 1-30, got {day}")
+            return cls(
+                recurrence_type,
+                interval=_positive_int(config, "interval"),
+                day=day,
+                month=month,
+                at_time=at_time,
+                leap=bool(config.get("leap", False)) and month is not None
+            )
+
+        if recurrence_type == RecurrenceType.CUSTOM:
+            if config.get("rrule"):
+                text = _normalize_rrule(config["rrule"])
+                _parse_rrule(text)
+                return cls(recurrence_type, rrule=text)
+            if config.get("unit") in ("days", "weeks", "months", "years"):
+                config = {config["unit"]: config.get("interval") or 1}
+            # 优先级: days > weeks > months > years，都未配置时每天
+            if not (config.get("days") or config.get("weeks")) and (config.get("months") or config.get("years")):
+                months = _positive_int(config, "months", default=0) or 12 * _positive_int(config, "years")
+                return cls(recurrence_type, step_months=months, at_time=at_time)
+            if config.get("weeks") and not config.get("days"):
+                return cls(recurrence_type, step_days=7 * _positive_int(config, "weeks"), at_time=at_time)
+            return cls(recurrence_type, step_days=_positive_int(config, "days"), at_time=at_time)
+
+        return cls(RecurrenceType.ONCE)
+
+    def _at(self, moment: datetime) -> datetime:
+        if self.at_time is None:
+            return moment
+        return moment.replace(hour=self.at_time.hour, minute=self.at_time.minute, second=0, microsecond=0)
+
+    def next_time(self, last_time: datetime) -> datetime | None:
+        """
+        计算上一次触发之后的下一次触发时间
+
+        Args:
+            last_time: 上次提醒时间
+
+        Returns:
+            下次提醒时间，一次性提醒或序列结束返回 None
+        """
+        following = self._next_nominal(last_time)
+        if not self.workdays_only:
+            return following
+        for _ in range(MAX_DAYS_OFF_SKIPPED):
+            if following is None or get_workday_calendar().is_workday(following.date()):
+                return following
+            following = self._next_nominal(following)
+        return None
+
+    def _next_nominal(self, last_time: datetime) -> datetime | None:
+        """不考虑 workdays_only 的下一次触发时间"""
+        kind = self.recurrence_type
+        if kind is RecurrenceType.DAILY:
+            return self._at(last_time + timedelta(days=self.interval))
+
+        if kind is RecurrenceType.WEEKLY:
+            current = last_time.weekday()
+            weekdays = self.weekdays or (current,)
+            for weekday in weekdays:
+                if weekday > current:
+                    return self._at(last_time + timedelta(days=weekday - current))
+            # 本周没有了，跳到 interval 周后的第一个星期几
+            return self._at(last_time + timedelta(days=7 * self.interval - current + weekdays[0]))
+
+        if kind is RecurrenceType.MONTHLY:
+            next_time = _shift_months(last_time, self.interval, self.day or last_time.day)
+            if self.skip_weekend:
+                next_time = _next_workday(next_time)
+            return self._at(next_time)
+
+        if kind is RecurrenceType.YEARLY:
+            year = last_time.year + self.interval
+            month = self.month or last_time.month
+            day = min(self.day or last_time.day, _last_day(year, month))
+            return self._at(last_time.replace(year=year, month=month, day=day))
+
+        if kind is RecurrenceType.LUNAR_YEARLY:
+            lunar = solar_to_lunar(last_time.date())
+            month, leap = (self.month, self.leap) if self.month else (lunar.month, lunar.leap)
+            return self._lunar_occurrence(last_time, lunar.year + self.interval, month, leap, self.day or lunar.day)
+
+        if kind is RecurrenceType.CUSTOM:
+            if self.rrule:
+                return _anchored_rrule(self.rrule, last_time).after(last_time)
+            if self.step_months:
+                return self._at(_shift_months(last_time, self.step_months, last_time.day))
+            return self._at(last_time + timedelta(days=self.step_days))
+
+        return None
+
+    def _lunar_occurrence(self, moment: datetime, year: int, month: int, leap: bool, day: int) -> datetime | None:
+        """
+        农历 year 年 month 月 day 日、时刻沿用 moment 的时间
+
+        当年没有该闰月时取同名平月，三十日在小月取二十九日；超出换算表范围返回 None
+        """
+        try:
+            leap = leap and leap_month(year) == month
+            solar = lunar_to_solar(year, month, min(day, month_days(year, month, leap)), leap)
+        except ValueError:
+            return None
+        return self._at(moment.replace(year=solar.year, month=solar.month, day=solar.day))
+
+    def first_lunar_on_or_after(self, moment: datetime) -> datetime | None:
+        """
+        指定农历月日的每年农历规则在 moment 当天及之后的第一次触发，时刻沿用 moment
+
+        用于只知道农历日期（如 NLU 识别出的“每年农历八月十五”）时确定首次提醒的公历时间。
+
+        Raises:
+            ValueError: 不是指定了农历月日的每年农历规则，或 moment 超出换算表范围
+        """
+        if self.recurrence_type is not RecurrenceType.LUNAR_YEARLY or self.month is None or self.day is None:
+            raise ValueError("first_lunar_on_or_after requires lunar_yearly with lunar_month and lunar_day")
+        year = solar_to_lunar(moment.date()).year
+        for candidate_year in (year, year + 1):
+            occurrence = self._lunar_occurrence(moment, candidate_year, self.month, self.leap, self.day)
+            if occurrence is not None and occurrence.date() >= moment.date():
+                return occurrence
+        return None
+
+    def expand(
+        self,
+        anchor: datetime,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None = None
+    ) -> List[datetime]:
+        """
+        展开 [window_start, window_end) 内的全部触发时间，结果与从 anchor 起反复调用 next_time 一致
+
+        能写成闭式的规则直接按日序号或月序号计算并跳到窗口内；
+        未指定日期的按月/按年规则先逐次计算到日期不再被月末回退改变，再转为指定日期的闭式计算；
+        只有月末顺延周末（可能跨月）的规则全程逐次计算。
+
+        Args:
+            anchor: 起点（本身是一次触发）
+            window_start: 窗口开始（包含）
+            window_end: 窗口结束（不包含）
+            limit: 最多返回的次数
+        """
+        if anchor >= window_end:
+            return []
+        kind = self.recurrence_type
+        if kind == RecurrenceType.ONCE:
+            return [anchor] if anchor >= window_start else []
+        if self.rrule:
+            return self._expand_rrule(anchor, window_start, window_end, limit)
+        if kind == RecurrenceType.LUNAR_YEARLY:
+            return self._expand_lunar(anchor, window_start, window_end, limit)
+        if kind == RecurrenceType.DAILY:
+            return self._expand_days(anchor, self.interval, window_start, window_end, limit)
+        if kind == RecurrenceType.CUSTOM and not self.step_months:
+            return self._expand_days(anchor, self.step_days, window_start, window_end, limit)
+        if kind == RecurrenceType.WEEKLY:
+            return self._expand_weekly(anchor, window_start, window_end, limit)
+        # 顺延到工作日可能跨到下个月，之后的月份随之偏移；
+        # 加上最长连续休息天数仍不超过 28 日的日期（只有周末时为 26 日及以前）才能闭式计算
+        if kind == RecurrenceType.MONTHLY and self.day is not None \
+                and (not self.skip_weekend or 1 <= self.day <= 28 - get_workday_calendar().longest_break):
+            return self._expand_months(anchor, window_start, window_end, limit)
+        if kind == RecurrenceType.YEARLY and self.day is not None and self.month is not None:
+            return self._expand_months(anchor, window_start, window_end, limit)
+        if kind != RecurrenceType.MONTHLY or (self.day is None and not self.skip_weekend):
+            return self._expand_pinned(anchor, window_start, window_end, limit)
+        return self._expand_by_stepping(anchor, window_start, window_end, limit)
+
+    def next_after(self, anchor: datetime, moment: datetime) -> datetime | None:
+        """
+        从 anchor 起的触发序列中第一个晚于 moment 的时间
+
+        直接跳到 moment 附近，不从 anchor 逐期推进；长期未打开的提醒一次即可追上当前时间。
+
+        Args:
+            anchor: 起点（本身是一次触发）
+            moment: 参考时间
+
+        Returns:
+            第一个晚于 moment 的触发时间，一次性提醒已过期时返回 None
+        """
+        occurrences = self.expand(anchor, moment + timedelta(microseconds=1), datetime.max, limit=1)
+        return occurrences[0] if occurrences else None
+
+    def _pinned(self, current: datetime) -> "RecurrenceRule | None":
+        """
+        未指定日期的按月/按年/按月自定义规则：日期不会再被月末回退改变时，
+        返回从 current 起等价的指定日期规则，否则返回 None
+        """
+        kind = self.recurrence_type
+        if kind is RecurrenceType.YEARLY:
+            if self.month is not None and current.month != self.month:
+                return None
+            step, day = 12 * self.interval, self.day
+        else:
+            step, day = (self.interval if kind is RecurrenceType.MONTHLY else self.step_months), None
+        if day is None:
+            # 之后会经过的月份中最短的一个（2月按28天计）不短于当前日期时，日期不再变化
+            months = {(current.month - 1 + j * step) % 12 + 1 for j in range(1, 13)}
+            if current.day > min(_DAYS_IN_MONTH[month] for month in months):
+                return None
+            day = current.day
+        if kind is RecurrenceType.YEARLY:
+            return self._replace(day=day, month=current.month)
+        return RecurrenceRule(
+            RecurrenceType.MONTHLY, interval=step, day=day, at_time=self.at_time, workdays_only=self.workdays_only
+        )
+
+    def _expand_pinned(
+        self,
+        anchor: datetime,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """逐次计算直到日期固定，之后按指定日期的规则闭式计算"""
+        occurrences: List[datetime] = []
+        current = anchor
+        while not (limit and len(occurrences) >= limit):
+            pinned = self._pinned(current)
+            if pinned is not None:
+                remaining = limit - len(occurrences) if limit else None
+                return occurrences + pinned.expand(current, window_start, window_end, remaining)
+            if current >= window_end:
+                break
+            if current >= window_start:
+                occurrences.append(current)
+            current = self.next_time(current)
+        return occurrences
+
+    def _collect(
+        self,
+        anchor: datetime,
+        candidates,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """起点加上按时间递增的候选时间，截取窗口内的部分（workdays_only 时跳过休息日）"""
+        occurrences = [anchor] if anchor >= window_start else []
+        days_off_skipped = 0
+        for candidate in candidates:
+            if limit and len(occurrences) >= limit:
+                break
+            occurrence = self._at(candidate)
+            if occurrence >= window_end:
+                break
+            if self.workdays_only and not get_workday_calendar().is_workday(occurrence.date()):
+                days_off_skipped += 1
+                if days_off_skipped >= MAX_DAYS_OFF_SKIPPED:
+                    break
+                continue
+            days_off_skipped = 0
+            if occurrence >= window_start:
+                occurrences.append(occurrence)
+        return occurrences
+
+    def _expand_days(
+        self,
+        anchor: datetime,
+        step_days: int,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """固定天数间隔：anchor + k * step"""
+        step = timedelta(days=step_days)
+        # 固定时刻最多让候选时间提前不到一天，从估算位置往前多取一次
+        first = max(1, -((anchor - window_start) // step) - 1)
+
+        def candidates():
+            k = first
+            while True:
+                yield anchor + step * k
+                k += 1
+
+        return self._collect(anchor, candidates(), window_start, window_end, limit)
+
+    def _expand_weekly(
+        self,
+        anchor: datetime,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """每周：起点所在周之后每隔 interval 周，取 weekdays 中晚于起点的日期"""
+        weekdays = self.weekdays or (anchor.weekday(),)
+        time_of_day = anchor - datetime.combine(anchor.date(), time())
+        anchor_week = anchor.toordinal() - anchor.weekday()
+        period = 7 * self.interval
+        start_week = window_start.toordinal() - window_start.weekday() - 7
+        skip = max(0, -((anchor_week - start_week) // period))
+
+        def candidates():
+            week = anchor_week + skip * period
+            while True:
+                for weekday in weekdays:
+                    ordinal = week + weekday
+                    if ordinal > anchor.toordinal():
+                        yield datetime.fromordinal(ordinal) + time_of_day
+                week += period
+
+        return self._collect(anchor, candidates(), window_start, window_end, limit)
+
+    def _expand_months(
+        self,
+        anchor: datetime,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """每月/每年指定日期：第 k 次落在 起点月序号 + k * 间隔月数 的月份"""
+        step = self.interval * (12 if self.recurrence_type == RecurrenceType.YEARLY else 1)
+        anchor_index = anchor.year * 12 + anchor.month - 1
+        start_index = window_start.year * 12 + window_start.month - 1
+        first = max(1, -((anchor_index - start_index) // step) - 1)
+
+        def candidates():
+            k = first
+            while True:
+                index = anchor_index + k * step
+                year, month0 = divmod(index, 12)
+                if year > 9999:
+                    return
+                month = self.month or month0 + 1
+                if self.recurrence_type == RecurrenceType.YEARLY:
+                    year = anchor.year + k * self.interval
+                last_day = _last_day(year, month)
+                occurrence = anchor.replace(
+                    year=year, month=month, day=last_day if self.day == -1 else min(self.day, last_day)
+                )
+                if self.skip_weekend:
+                    occurrence = _next_workday(occurrence)
+                yield occurrence
+                k += 1
+
+        return self._collect(anchor, candidates(), window_start, window_end, limit)
+
+    def _expand_lunar(
+        self,
+        anchor: datetime,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """每年农历：第 k 次落在农历 起点年 + k * interval 年，直接跳到窗口所在年份"""
+        lunar = solar_to_lunar(anchor.date())
+        # 沿用起点的三十日或闰月时，第一次回退后日期随之改变，只能逐次计算
+        if (self.day is None and lunar.day == 30) or (self.month is None and lunar.leap):
+            return self._expand_by_stepping(anchor, window_start, window_end, limit)
+        month, leap = (self.month, self.leap) if self.month else (lunar.month, lunar.leap)
+        day = self.day or lunar.day
+        # 农历年的日期不早于同号公历年，早于 window_start.year - 1 的农历年都在窗口之前
+        first = max(1, (window_start.year - 1 - lunar.year) // self.interval)
+
+        def candidates():
+            k = first
+            while True:
+                occurrence = self._lunar_occurrence(anchor, lunar.year + k * self.interval, month, leap, day)
+                if occurrence is None:
+                    return
+                yield occurrence
+                k += 1
+
+        return self._collect(anchor, candidates(), window_start, window_end, limit)
+
+    def _expand_rrule(
+        self,
+        anchor: datetime,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """RRULE：有窗口时用 rrule.between 一次取出窗口内的时间，只取前几次时用 rrule.xafter 惰性生成"""
+        rule = _anchored_rrule(self.rrule, anchor)
+        start = max(window_start, anchor)
+        if limit:
+            candidates = rule.xafter(start, inc=True)
+        else:
+            candidates = rule.between(start, window_end, inc=True)
+        return self._collect(anchor, (t for t in candidates if t > anchor), window_start, window_end, limit)
+
+    def _expand_by_stepping(
+        self,
+        anchor: datetime,
+        window_start: datetime,
+        window_end: datetime,
+        limit: int | None
+    ) -> List[datetime]:
+        """逐次调用 next_time"""
+        def candidates():
+            current = anchor
+            while True:
+                following = self.next_time(current)
+                if following is None or following <= current:
+                    return
+                yield following
+                current = following
+
+        occurrences = [anchor] if anchor >= window_start else []
+        for occurrence in candidates():
+            if occurrence >= window_end or (limit and len(occurrences) >= limit):
+                break
+            if occurrence >= window_start:
+                occurrences.append(occurrence)
+        return occurrences
+
+
+@lru_cache(maxsize=RULE_CACHE_SIZE)
+def _compile_frozen(recurrence_type: RecurrenceType, frozen_config: tuple) -> RecurrenceRule:
+    return RecurrenceRule.from_config(recurrence_type, dict(frozen_config))
+
+
+def compile_rule(recurrence_type: RecurrenceType | str, recurrence_config: Dict[str, Any] | None) -> RecurrenceRule:
+    """
+    获取编译后的周期规则（按 (recurrence_type, config) 缓存）
+
+    Args:
+        recurrence_type: 周期类型（枚举或其值，如 "daily"）
+        recurrence_config: 周期配置
+
+    Returns:
+        共享的 RecurrenceRule 实例
+
+    Raises:
+        ValueError: 未知周期类型或配置值非法
+    """
+    if not isinstance(recurrence_type, RecurrenceType):
+        recurrence_type = RecurrenceType(recurrence_type)
+    if not recurrence_config:
+        return _compile_frozen(recurrence_type, ())
+    # 常见配置只有标量值和数字列表，直接转换；含嵌套字典等不可哈希值时再递归转换
+    key = tuple(sorted([
+        (name, tuple(value) if type(value) is list else value) for name, value in recurrence_config.items()
+    ]))
+    try:
+        return _compile_frozen(recurrence_type, key)
+    except TypeError:
+        return _compile_frozen(recurrence_type, _freeze(recurrence_config))
+
+
+def next_after(rule: RecurrenceRule, anchor: datetime, moment: datetime) -> datetime | None:
+    """
+    第一个晚于 moment 的触发时间（见 RecurrenceRule.next_after）
+
+    Args:
+        rule: 编译后的周期规则
+        anchor: 起点（本身是一次触发）
+        moment: 参考时间
+    """
+    return rule.next_after(anchor, moment)
 
 
 def calculate_next_occurrence(
     current_time: datetime,
-    recurrence_type: str,
+    recurrence_type: RecurrenceType | str,
     recurrence_config: dict
 ) -> datetime:
     """
     计算下一次提醒时间
-    
+
     Args:
         current_time: 当前时间
-        recurrence_type: 周期类型(字符串: "once", "daily", "weekly", "monthly", "yearly")
+        recurrence_type: 周期类型(枚举或字符串: "once", "daily", "weekly", "monthly", "yearly", "custom")
         recurrence_config: 周期配置
-    
+
     Returns:
-        下一次提醒时间
-    """
-    if recurrence_type == "once":
-        # 一次性提醒，返回原时间
-        return current_time
-    
-    elif recurrence_type == "daily":
-        # 每日提醒
-        interval = recurrence_config.get("interval", 1)
-        return current_time + timedelta(days=interval)
-    
-    elif recurrence_type == "weekly":
-        # 每周提醒
-        interval = recurrence_config.get("interval", 1)
-        return current_time + timedelta(weeks=interval)
-    
-    elif recurrence_type == "monthly":
-        # 每月提醒（简化版，直接加30天）
-        interval = recurrence_config.get("interval", 1)
-        return current_time + timedelta(days=30 * interval)
-    
-    elif recurrence_type == "yearly":
-        # 每年提醒（简化版，直接加365天）
-        interval = recurrence_config.get("interval", 1)
-        return current_time + timedelta(days=365 * interval)
-    
-    elif recurrence_type == "custom":
-        # 自定义周期
-        days = recurrence_config.get("days", 1)
-        return current_time + timedelta(days=days)
-    
-    else:
-        # 默认返回第二天
-        return current_time + timedelta(days=1)
+        下一次提醒时间，一次性提醒返回原时间
+    """
+    return compile_rule(recurrence_type, recurrence_config).next_time(current_time) or current_time
@@ -0,0 +1,102 @@
+"""
+Time Zone Module
+时区模块 - 用户时区解析与 UTC 时间戳换算
+
+提醒时间（first_remind_time、next_remind_time、推送任务的 scheduled_time）存储为提醒所属用户时区的墙上时间，
+周期规则直接在墙上时间上展开，夏令时切换前后仍在当地的同一时刻触发；
+生成推送任务时才按用户时区换算为 UTC 时间戳（push_tasks.due_at），调度器按整数时间戳扫描到期任务；
+due_at 在重试和延后时推迟，计划时间的时间戳另存为 push_tasks.scheduled_at，不再改写，触发延迟按它统计。
+调度器内部使用的 next_attempt_at、租约时间仍为服务器本地时间。
+后台任务扫描提醒时，"现在"按每个用户的时区取墙上时间（to_wall_time / wall_time_sql），不用服务器时间比较。
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import DateTime, func
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=512)
+def get_zone(name: str | None = None) -> ZoneInfo:
+    """
+    按 IANA 名称获取时区（进程内缓存，每个名称只解析一次）
+
+    Args:
+        name: 时区名称（如 "America/New_York"），为空时取 DEFAULT_TIMEZONE
+
+    Raises:
+        ValueError: 未知时区
+    """
+    try:
+        return ZoneInfo(name or settings.DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown time zone {name!r}") from e
+
+
+def local_now(zone: ZoneInfo) -> datetime:
+    """时区的当前墙上时间（不带时区信息）"""
+    return datetime.now(zone).replace(tzinfo=None)
+
+
+def to_wall_time(moment: datetime, zone: ZoneInfo) -> datetime:
+    """
+    时刻换算为 zone 的墙上时间（不带时区信息）
+
+    不带时区信息的 moment 按服务器本地时间解释，与 to_epoch 一致
+    """
+    return moment.astimezone(zone).replace(tzinfo=None)
+
+
+def wall_time_sql(zone_name: Any, epoch: int) -> Any:
+    """
+    SQL 表达式：UTC 时间戳 epoch 在 zone_name 时区的墙上时间（PostgreSQL timezone()）
+
+    Args:
+        zone_name: 时区名称列（如 User.timezone），为空时按 DEFAULT_TIMEZONE
+        epoch: UTC 时间戳（秒）
+    """
+    return func.timezone(
+        func.coalesce(zone_name, settings.DEFAULT_TIMEZONE), func.to_timestamp(epoch), type_=DateTime
+    )
+
+
+def to_epoch(moment: datetime, zone: ZoneInfo | None = None) -> int:
+    """
+    换算为 UTC 时间戳（秒）
+
+    不带时区信息的时间按 zone 的墙上时间解释，zone 为空时按服务器本地时间解释；
+    夏令时回拨重复的时刻取第一次，向前跳过的时刻按切换前的偏移换算。
+    """
+    if moment.tzinfo is None and zone is not None:
+        moment = moment.replace(tzinfo=zone)
+    return int(moment.timestamp())
+
+
+def from_epoch(epoch: int) -> datetime:
+    """UTC 时间戳换算为服务器本地时间（不带时区信息），供调度器内部比较"""
+    return datetime.fromtimestamp(epoch)
+
+
+def push_schedule(scheduled_time: datetime, zone: ZoneInfo) -> Dict[str, object]:
+    """
+    推送任务的调度字段
+
+    Args:
+        scheduled_time: 计划推送时间（用户时区的墙上时间）
+        zone: 用户时区
+
+    Returns:
+        {"scheduled_time", "scheduled_at": UTC 时间戳（之后不变）, "due_at": UTC 时间戳（重试时推迟）,
+         "next_attempt_at": 服务器本地时间}
+    """
+    due_at = to_epoch(scheduled_time, zone)
+    return {
+        "scheduled_time": scheduled_time,
+        "scheduled_at": due_at,
+        "due_at": due_at,
+        "next_attempt_at": from_epoch(due_at),
+    }
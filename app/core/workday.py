@@ -0,0 +1,134 @@
+"""
+Workday Calendar Module
+工作日历模块 - 法定节假日与调休，供周期提醒顺延或跳过休息日
+
+每年的工作日存为一个整数位图（第 i 位对应当年第 i 天，1 表示工作日）：
+先按周一到周五置位，再按日历文件清除法定节假日、置位调休上班的周末。
+“某天及之后的第一个工作日”只需右移后取最低位，不逐天判断。
+日历文件带版本号，按年份维护；未收录的年份只排除周末。
+"""
+
+import calendar
+import json
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+from app.core.config import settings
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_CALENDAR_PATH = Path(__file__).parent / "data" / "workday_calendar_cn.json"
+CALENDAR_FORMAT = 1
+
+
+@lru_cache(maxsize=512)
+def _weekday_bits(year: int) -> int:
+    """只排除周末的工作日位图"""
+    first_weekday = date(year, 1, 1).weekday()
+    week = sum(1 << i for i in range(7) if (first_weekday + i) % 7 < 5)
+    days = 366 if calendar.isleap(year) else 365
+    bits = 0
+    for start in range(0, days, 7):
+        bits |= week << start
+    return bits & ((1 << days) - 1)
+
+
+def _day_index(day: date) -> int:
+    return day.toordinal() - date(day.year, 1, 1).toordinal()
+
+
+def _expand_dates(items: Iterable[str]) -> Iterator[date]:
+    """展开日期列表，"2026-02-15/2026-02-23" 表示包含两端的日期区间"""
+    for item in items:
+        start, _, end = item.partition("/")
+        first, last = date.fromisoformat(start), date.fromisoformat(end or start)
+        for offset in range(last.toordinal() - first.toordinal() + 1):
+            yield first + timedelta(days=offset)
+
+
+class WorkdayCalendar:
+    """
+    工作日历（不可变）
+
+    Attributes:
+        version: 日历数据版本
+        longest_break: 最长连续休息天数（含周末，至少 2 天），即顺延到工作日最多移动的天数
+    """
+
+    __slots__ = ("version", "longest_break", "_years")
+
+    def __init__(self, version: str, years: Dict[int, int]):
+        self.version = version
+        self._years = years
+        self.longest_break = max([2] + [len(run) for run in self._rest_runs()])
+
+    @classmethod
+    def load(cls, path: Path) -> "WorkdayCalendar":
+        """
+        读取日历文件
+
+        文件格式: {"format": 1, "version": "...", "years": {"2026": {"holidays": [...], "workdays": [...]}}}，
+        holidays 为法定节假日，workdays 为调休上班日，日期或 "开始/结束" 区间
+
+        Raises:
+            RuntimeError: 文件不存在、格式版本不支持或日期不属于所在年份
+        """
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            if data.get("format") != CALENDAR_FORMAT:
+                raise ValueError(f"unsupported format {data.get('format')}, expected {CALENDAR_FORMAT}")
+            years = {}
+            for year_text, spec in data["years"].items():
+                year = int(year_text)
+                bits = _weekday_bits(year)
+                for day in _expand_dates(spec.get("holidays", [])):
+                    if day.year != year:
+                        raise ValueError(f"holiday {day} listed under {year}")
+                    bits &= ~(1 << _day_index(day))
+                for day in _expand_dates(spec.get("workdays", [])):
+                    if day.year != year:
+                        raise ValueError(f"workday {day} listed under {year}")
+                    bits |= 1 << _day_index(day)
+                years[year] = bits
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            raise RuntimeError(f"Invalid workday calendar {path}: {e}") from e
+        return cls(str(data["version"]), years)
+
+    def _bits(self, year: int) -> int:
+        bits = self._years.get(year)
+        return _weekday_bits(year) if bits is None else bits
+
+    def _rest_runs(self) -> Iterator[str]:
+        """收录年份（含前后各一年，覆盖跨年的假期）中的连续休息日"""
+        if not self._years:
+            return iter(())
+        flags = ""
+        for year in range(min(self._years) - 1, max(self._years) + 2):
+            days = 366 if calendar.isleap(year) else 365
+            flags += format(self._bits(year), f"0{days}b")[::-1]
+        return iter(flags.split("1"))
+
+    def is_workday(self, day: date) -> bool:
+        """是否工作日（含调休上班的周末，不含法定节假日）"""
+        return bool(self._bits(day.year) >> _day_index(day) & 1)
+
+    def next_workday(self, day: date) -> date:
+        """day 当天及之后的第一个工作日"""
+        while True:
+            bits = self._bits(day.year) >> _day_index(day)
+            if bits:
+                # 最低位的 1 即下一个工作日
+                return day + timedelta(days=(bits & -bits).bit_length() - 1)
+            day = date(day.year + 1, 1, 1)
+
+
+@lru_cache(maxsize=1)
+def get_workday_calendar() -> WorkdayCalendar:
+    """获取工作日历单例（首次使用时读取 WORKDAY_CALENDAR_FILE，未配置时使用内置日历）"""
+    path = Path(settings.WORKDAY_CALENDAR_FILE) if settings.WORKDAY_CALENDAR_FILE else DEFAULT_CALENDAR_PATH
+    workday_calendar = WorkdayCalendar.load(path)
+    logger.info(f"Loaded workday calendar {workday_calendar.version} from {path}")
+    return workday_calendar
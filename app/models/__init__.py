@@ -5,6 +5,7 @@ from app.models.user import User
 from app.models.reminder import Reminder
 from app.models.push_task import PushTask
 from app.models.reminder_completion import ReminderCompletion
+from app.models.reminder_occurrence import ReminderOccurrence
 
 # Family models
 from app.models.family_group import FamilyGroup
@@ -34,6 +35,7 @@ __all__ = [
     "Reminder",
     "PushTask",
     "ReminderCompletion",
+    "ReminderOccurrence",
     # Family
     "FamilyGroup",
     "FamilyMember",
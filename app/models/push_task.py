@@ -5,10 +5,11 @@ Push Task Model
 
 from typing import List, Dict, Any, TYPE_CHECKING
 from datetime import datetime
-from sqlalchemy import String, JSON, ForeignKey, Enum as SQLEnum, func
+from sqlalchemy import BigInteger, String, JSON, ForeignKey, Enum as SQLEnum, Index, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 from app.core.database import Base
+from app.core.timezones import get_zone, to_epoch
 
 if TYPE_CHECKING:
     from app.models.reminder import Reminder
@@ -16,12 +17,40 @@ if TYPE_CHECKING:
     from app.models.push_log import PushLog
 
 
+# 推送优先级，调度器按优先级分道认领（见 PushTaskRepository.iter_claimed_lanes）
+PRIORITY_NORMAL = 1
+PRIORITY_IMPORTANT = 2
+PRIORITY_URGENT = 3
+PRIORITY_LANES = (PRIORITY_URGENT, PRIORITY_IMPORTANT, PRIORITY_NORMAL)
+
+# 自然键：同一提醒同一计划时间最多一条待推送任务（部分唯一索引，只约束 PENDING 状态）
+PENDING_NATURAL_KEY = ("reminder_id", "scheduled_time")
+PENDING_ONLY = text("status = 'PENDING'")
+
+
 class PushStatus(str, enum.Enum):
     """推送状态枚举"""
     PENDING = "pending"    # 待推送
     SENT = "sent"          # 已发送
     FAILED = "failed"      # 发送失败
     CANCELLED = "cancelled"  # 已取消
+    DEAD_LETTER = "dead_letter"  # 重试次数用尽（死信），可人工重新入队
+
+
+def _default_next_attempt_at(context):
+    """新任务的下次尝试时间默认等于计划推送时间"""
+    return context.get_current_parameters()["scheduled_time"]
+
+
+def _default_due_at(context):
+    """未指定时按默认时区把计划推送时间换算为 UTC 时间戳（按用户时区创建见 app.core.timezones.push_schedule）"""
+    return to_epoch(context.get_current_parameters()["scheduled_time"], get_zone())
+
+
+def _default_scheduled_at(context):
+    """未指定时等于首次到期的 UTC 时间戳"""
+    params = context.get_current_parameters()
+    return params.get("due_at") or to_epoch(params["scheduled_time"], get_zone())
 
 
 class PushTask(Base):
@@ -40,6 +69,9 @@ class PushTask(Base):
     
     # Scheduling
     scheduled_time: Mapped[datetime] = mapped_column(index=True, comment="计划推送时间")
+    next_attempt_at: Mapped[datetime] = mapped_column(default=_default_next_attempt_at, comment="下次尝试时间(重试退避后推迟)")
+    due_at: Mapped[int] = mapped_column(BigInteger, default=_default_due_at, comment="下次尝试的 UTC 时间戳(秒)，调度器按此扫描")
+    scheduled_at: Mapped[int] = mapped_column(BigInteger, default=_default_scheduled_at, comment="计划推送时间的 UTC 时间戳(秒)，重试和延后不改写，用于统计触发延迟")
     sent_time: Mapped[datetime | None] = mapped_column(nullable=True, comment="实际发送时间")
     
     # Status
@@ -49,6 +81,10 @@ class PushTask(Base):
     max_retries: Mapped[int] = mapped_column(default=3, comment="最大重试次数")
     executed_at: Mapped[datetime | None] = mapped_column(nullable=True, comment="执行时间")
     
+    # Lease (多调度器实例认领任务)
+    lease_owner: Mapped[str | None] = mapped_column(String(100), nullable=True, comment="租约持有者(调度器实例ID)")
+    lease_expires_at: Mapped[datetime | None] = mapped_column(nullable=True, index=True, comment="租约过期时间")
+    
     # Response data
     push_response: Mapped[Dict[str, Any] | None] = mapped_column(type_=JSON, nullable=True, comment="推送服务响应(JSON)")
     
@@ -60,3 +96,21 @@ class PushTask(Base):
     reminder: Mapped["Reminder"] = relationship(back_populates="push_tasks")
     user: Mapped["User"] = relationship(back_populates="push_tasks")
     logs: Mapped[List["PushLog"]] = relationship(back_populates="task", cascade="all, delete-orphan")
+    
+    # 索引优化
+    __table_args__ = (
+        # 调度器按 (priority DESC, due_at, id) 键集分页认领待推送任务，到期判断是纯整数比较
+        Index(
+            'ix_push_tasks_pending_keyset',
+            text('priority DESC'), 'due_at', 'id',
+            postgresql_where=text("status = 'PENDING'")
+        ),
+        # 幂等创建：INSERT ... ON CONFLICT DO NOTHING 以此为冲突目标，重复提交不会产生重复的待推送任务
+        Index(
+            'uq_push_tasks_pending_natural_key',
+            *PENDING_NATURAL_KEY,
+            unique=True,
+            postgresql_where=PENDING_ONLY,
+            sqlite_where=PENDING_ONLY
+        ),
+    )
@@ -16,6 +16,7 @@ if TYPE_CHECKING:
     from app.models.reminder_template import ReminderTemplate
     from app.models.push_task import PushTask
     from app.models.reminder_completion import ReminderCompletion
+    from app.models.reminder_occurrence import ReminderOccurrence
 
 
 class RecurrenceType(str, enum.Enum):
@@ -26,6 +27,7 @@ class RecurrenceType(str, enum.Enum):
     MONTHLY = "monthly"    # 每月
     YEARLY = "yearly"      # 每年
     CUSTOM = "custom"      # 自定义
+    LUNAR_YEARLY = "lunar_yearly"  # 每年农历
 
 
 class ReminderCategory(str, enum.Enum):
@@ -62,6 +64,8 @@ class Reminder(Base):
     first_remind_time: Mapped[datetime] = mapped_column(comment="首次提醒时间")
     next_remind_time: Mapped[datetime] = mapped_column(index=True, comment="下次提醒时间")
     last_remind_time: Mapped[datetime | None] = mapped_column(nullable=True, comment="上次提醒时间")
+    occurrences_until: Mapped[datetime | None] = mapped_column(nullable=True, comment="触发时间已物化到(不包含)")
+    push_tasks_until: Mapped[datetime | None] = mapped_column(nullable=True, comment="推送任务已生成到(不包含，按计划推送时间)")
     
     # Reminder settings
     remind_channels: Mapped[List[str]] = mapped_column(type_=JSON, default=list, comment="提醒渠道(JSON): app, sms, wechat, call")
@@ -87,3 +91,4 @@ class Reminder(Base):
     template: Mapped["ReminderTemplate"] = relationship(back_populates="reminders")
     push_tasks: Mapped[List["PushTask"]] = relationship(back_populates="reminder", cascade="all, delete-orphan")
     completions: Mapped[List["ReminderCompletion"]] = relationship(back_populates="reminder", cascade="all, delete-orphan")
+    occurrences: Mapped[List["ReminderOccurrence"]] = relationship(back_populates="reminder", cascade="all, delete-orphan", passive_deletes=True)
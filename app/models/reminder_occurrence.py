@@ -0,0 +1,36 @@
+"""
+Reminder Occurrence Model
+提醒触发时间物化表 - 后台任务按滚动窗口预先展开周期提醒，读取时按时间范围走索引
+"""
+from typing import TYPE_CHECKING
+from datetime import datetime
+from sqlalchemy import ForeignKey, Index, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.core.database import Base
+
+if TYPE_CHECKING:
+    from app.models.reminder import Reminder
+
+
+class ReminderOccurrence(Base):
+    """Reminder occurrence table - 提醒触发时间表"""
+    __tablename__ = "reminder_occurrences"
+    __table_args__ = (
+        # 同一提醒的同一触发时间只物化一次，重复扩展时 ON CONFLICT DO NOTHING
+        UniqueConstraint('reminder_id', 'occurs_at', name='uq_reminder_occurrences_reminder_time'),
+        # 用户日历/预览按 (user_id, occurs_at) 范围扫描
+        Index('ix_reminder_occurrences_user_time', 'user_id', 'occurs_at'),
+        # 全局按时间范围扫描（推送生成、过期清理）
+        Index('ix_reminder_occurrences_occurs_at', 'occurs_at'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, comment="触发记录ID")
+    reminder_id: Mapped[int] = mapped_column(ForeignKey("reminders.id", ondelete="CASCADE"), comment="提醒ID")
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), comment="用户ID")
+    occurs_at: Mapped[datetime] = mapped_column(comment="触发时间")
+
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now(), comment="创建时间")
+
+    # Relationships
+    reminder: Mapped["Reminder"] = relationship(back_populates="occurrences")
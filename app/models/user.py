@@ -42,6 +42,7 @@ class User(Base):
     nickname: Mapped[str | None] = mapped_column(String(50), nullable=True, comment="昵称")
     avatar_url: Mapped[str | None] = mapped_column(String(255), nullable=True, comment="头像URL")
     settings: Mapped[Dict[str, Any]] = mapped_column(type_=JSON, default=dict, comment="用户设置(JSON)")
+    timezone: Mapped[str | None] = mapped_column(String(64), nullable=True, comment="时区(IANA 名称，为空时使用默认时区)")
     
     # 账号状态
     is_active: Mapped[bool] = mapped_column(default=True, comment="是否激活")
@@ -3,12 +3,17 @@ Push Log Repository
 推送日志数据访问层
 """
 from collections.abc import Sequence
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, func, case
 from sqlalchemy import and_, desc
 from app.models.push_log import PushLog
 
+# push_logs.status 取值
+LOG_STATUS_SUCCESS = "success"
+LOG_STATUS_FAILED = "failed"
+
 
 class PushLogRepository:
     """推送日志数据访问"""
@@ -18,30 +23,42 @@ class PushLogRepository:
     
     async def create(
         self,
-        push_task_id: int,
+        reminder_id: int,
+        user_id: int,
         channel: str,
         status: str,
-        request_data: dict | None = None,
-        response_data: dict | None = None,
-        error_message: str | None = None,
-        user_action: str | None = None,
-        response_time_seconds: int | None = None
+        task_id: int | None = None,
+        error_message: str | None = None
     ) -> PushLog:
         """创建推送日志"""
         log = PushLog(
-            push_task_id=push_task_id,
+            task_id=task_id,
+            reminder_id=reminder_id,
+            user_id=user_id,
             channel=channel,
             status=status,
-            request_data=request_data,
-            response_data=response_data,
-            error_message=error_message,
-            user_action=user_action,
-            response_time_seconds=response_time_seconds
+            error_message=error_message
         )
         self.db.add(log)
         await self.db.commit()
         await self.db.refresh(log)
         return log
+
+    async def bulk_create(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        批量写入推送日志（一条多行 INSERT，一次提交）
+
+        Args:
+            rows: 每项包含 task_id, reminder_id, user_id, channel, status, error_message
+
+        Returns:
+            写入条数
+        """
+        if not rows:
+            return 0
+        await self.db.execute(insert(PushLog), rows)
+        await self.db.commit()
+        return len(rows)
     
     async def get_by_id(self, log_id: int) -> PushLog | None:
         """根据ID查询日志"""
@@ -51,8 +68,8 @@ class PushLogRepository:
     async def get_by_task(self, push_task_id: int) -> Sequence[PushLog]:
         """查询推送任务的所有日志"""
         stmt = select(PushLog).where(
-            PushLog.push_task_id == push_task_id
-        ).order_by(PushLog.created_at)
+            PushLog.task_id == push_task_id
+        ).order_by(PushLog.push_time, PushLog.id)
         result = await self.db.execute(stmt)
         return result.scalars().all()
     
@@ -62,52 +79,30 @@ class PushLogRepository:
         limit: int = 100
     ) -> Sequence[PushLog]:
         """查询失败的推送日志"""
-        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        since = datetime.now() - timedelta(hours=hours)
         stmt = select(PushLog).where(
             and_(
-                PushLog.status == "failed",
-                PushLog.created_at >= since
+                PushLog.status == LOG_STATUS_FAILED,
+                PushLog.push_time >= since
             )
-        ).order_by(desc(PushLog.created_at)).limit(limit)
+        ).order_by(desc(PushLog.push_time)).limit(limit)
         result = await self.db.execute(stmt)
         return result.scalars().all()
     
     async def get_channel_stats(self, channel: str, days: int = 7) -> dict:
         """统计渠道推送效果"""
-        from sqlalchemy import func
-        since = datetime.now(timezone.utc) - timedelta(days=days)
-        
-        # 统计总数
-        stmt_total = select(func.count()).select_from(PushLog).where(
-            and_(
-                PushLog.channel == channel,
-                PushLog.created_at >= since
-            )
-        )
-        result_total = await self.db.execute(stmt_total)
-        total = result_total.scalar() or 0
-        
-        # 统计成功数
-        stmt_success = select(func.count()).select_from(PushLog).where(
-            and_(
-                PushLog.channel == channel,
-                PushLog.status == "success",
-                PushLog.created_at >= since
-            )
-        )
-        result_success = await self.db.execute(stmt_success)
-        success = result_success.scalar() or 0
-        
-        # 统计失败数
-        stmt_failed = select(func.count()).select_from(PushLog).where(
+        since = datetime.now() - timedelta(days=days)
+        stmt = select(
+            func.count(),
+            func.count(case((PushLog.status == LOG_STATUS_SUCCESS, 1))),
+            func.count(case((PushLog.status == LOG_STATUS_FAILED, 1)))
+        ).where(
             and_(
                 PushLog.channel == channel,
-                PushLog.status == "failed",
-                PushLog.created_at >= since
+                PushLog.push_time >= since
             )
         )
-        result_failed = await self.db.execute(stmt_failed)
-        failed = result_failed.scalar() or 0
+        total, success, failed = (await self.db.execute(stmt)).one()
         
         return {
             "channel": channel,
@@ -129,6 +124,7 @@ class PushLogRepository:
             return None
         
         log.user_action = user_action
+        log.user_action_time = datetime.now()
         log.response_time_seconds = response_time_seconds
         await self.db.commit()
         await self.db.refresh(log)
@@ -4,11 +4,16 @@ PushTask Repository
 """
 
 from typing import Any, List, Tuple, Dict
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, update
-from datetime import datetime
-from app.models.push_task import PushTask, PushStatus
+from sqlalchemy import select, func, and_, or_, update, values, column, exists, BigInteger, Integer, String, DateTime, JSON
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from app.core.timezones import from_epoch, get_zone, push_schedule, to_epoch
+from app.models.push_task import PENDING_NATURAL_KEY, PENDING_ONLY, PRIORITY_LANES, PushTask, PushStatus
 
 
 class PushTaskRepository:
@@ -36,7 +41,8 @@ class PushTaskRepository:
         content: str | None = None,
         channels: list[str] | None = None,
         priority: int = 1,
-        max_retries: int = 3
+        max_retries: int = 3,
+        zone: ZoneInfo | None = None
     ) -> PushTask:
         new_task = PushTask(
             reminder_id=reminder_id,
@@ -44,7 +50,8 @@ class PushTaskRepository:
             title=title,
             content=content,
             channels=channels or ["app"],
-            scheduled_time=scheduled_time,
+            # scheduled_time 为用户时区的墙上时间，按 zone（默认时区）换算调度时间戳
+            **push_schedule(scheduled_time, zone or get_zone()),
             status=PushStatus.PENDING,
             retry_count=0,
             max_retries=max_retries,
@@ -56,6 +63,88 @@ class PushTaskRepository:
         await self.db.refresh(new_task)
         return new_task
 
+    # 单条多行 INSERT 最多携带的任务数（每行约 12 个参数，asyncpg 单语句参数上限 32767）
+    INSERT_ROWS_PER_STATEMENT = 1000
+
+    def _insert_ignoring_duplicates(self, rows: List[Dict[str, Any]]):
+        """
+        多行 INSERT ... ON CONFLICT DO NOTHING RETURNING
+
+        冲突目标是自然键 (reminder_id, scheduled_time) 上的部分唯一索引（只约束 PENDING 任务），
+        同一提醒同一时间已有待推送任务的行被跳过，RETURNING 只返回新插入的任务
+        """
+        insert = sqlite_insert if self.db.get_bind().dialect.name == "sqlite" else pg_insert
+        return (
+            insert(PushTask)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=list(PENDING_NATURAL_KEY), index_where=PENDING_ONLY)
+            .returning(PushTask)
+        )
+
+    async def create_many(self, rows: List[Dict[str, Any]]) -> List[PushTask]:
+        """
+        幂等批量创建推送任务（每 INSERT_ROWS_PER_STATEMENT 行一条语句，整批一次提交）
+
+        重复提交（如连点两次"完成"）或并发创建同一提醒同一时间的任务时，只会有一条待推送任务。
+
+        Args:
+            rows: 完整的任务字段（每行字段相同），见 app.services.push_task_service.push_task_row
+
+        Returns:
+            新创建的任务（已存在的不返回）
+        """
+        created: List[PushTask] = []
+        for start in range(0, len(rows), self.INSERT_ROWS_PER_STATEMENT):
+            result = await self.db.scalars(self._insert_ignoring_duplicates(rows[start:start + self.INSERT_ROWS_PER_STATEMENT]))
+            created.extend(result.all())
+        await self.db.commit()
+        return created
+
+    async def get_pending_by_key(self, reminder_id: int, scheduled_time: datetime) -> PushTask | None:
+        """按自然键查询待推送任务"""
+        result = await self.db.execute(
+            select(PushTask).where(
+                and_(
+                    PushTask.reminder_id == reminder_id,
+                    PushTask.scheduled_time == scheduled_time,
+                    PushTask.status == PushStatus.PENDING
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def cancel_pending(
+        self,
+        reminder_id: int,
+        after: datetime | None = None,
+        before: datetime | None = None,
+        reason: str | None = None
+    ) -> int:
+        """
+        取消提醒在 [after, before) 内计划推送的待推送任务（不提交）
+
+        Args:
+            reminder_id: 提醒ID
+            after: 计划推送时间不早于该时间（为空不限）
+            before: 计划推送时间早于该时间（为空不限）
+            reason: 写入 error_message 的取消原因
+
+        Returns:
+            取消的任务数
+        """
+        conditions = [PushTask.reminder_id == reminder_id, PushTask.status == PushStatus.PENDING]
+        if after is not None:
+            conditions.append(PushTask.scheduled_time >= after)
+        if before is not None:
+            conditions.append(PushTask.scheduled_time < before)
+        result = await self.db.execute(
+            update(PushTask)
+            .where(and_(*conditions))
+            .values(status=PushStatus.CANCELLED, error_message=reason)
+            .execution_options(synchronize_session=False)
+        )
+        return getattr(result, 'rowcount', 0) or 0
+
     async def update(self, task: PushTask, **update_data: Any) -> PushTask:
         for k, v in update_data.items():
             setattr(task, k, v)
@@ -71,6 +160,8 @@ class PushTaskRepository:
         push_response: dict | None = None
     ) -> PushTask:
         task.status = status
+        task.lease_owner = None
+        task.lease_expires_at = None
         if status == PushStatus.SENT:
             task.sent_time = datetime.now()
             task.executed_at = datetime.now()
@@ -90,12 +181,532 @@ class PushTaskRepository:
         stmt = select(PushTask).where(
             and_(
                 PushTask.status == PushStatus.PENDING,
-                PushTask.scheduled_time <= before_time
+                PushTask.due_at <= to_epoch(before_time)
             )
-        ).order_by(PushTask.priority.desc(), PushTask.scheduled_time)
+        ).order_by(PushTask.priority.desc(), PushTask.due_at)
         result = await self.db.execute(stmt)
         return result.scalars().all()
 
+    @staticmethod
+    def _keyset_after(cursor: Tuple[int, int, int]):
+        """
+        键集分页条件：排在游标之后的任务
+
+        排序为 (priority DESC, due_at, id)，优先级降序，所以不能直接用行值比较
+        """
+        priority, due_at, task_id = cursor
+        return or_(
+            PushTask.priority < priority,
+            and_(
+                PushTask.priority == priority,
+                or_(
+                    PushTask.due_at > due_at,
+                    and_(PushTask.due_at == due_at, PushTask.id > task_id)
+                )
+            )
+        )
+
+    @staticmethod
+    def _keyset_cursor(task: PushTask) -> Tuple[int, int, int]:
+        return (task.priority, task.due_at, task.id)
+
+    async def iter_pending_tasks(
+        self,
+        before_time: datetime,
+        chunk_size: int = 500
+    ) -> AsyncIterator[List[PushTask]]:
+        """
+        按 (priority DESC, due_at, id) 键集分页逐块读取到期任务
+
+        每块读完即提交结束事务；调用方处理完一块再取下一块时，上一块对象会从会话中移除，
+        内存占用与块大小相关而与积压总量无关。
+
+        Args:
+            before_time: 下次尝试时间上限（服务器本地时间，换算为 UTC 时间戳比较）
+            chunk_size: 每块任务数
+
+        Yields:
+            每块任务列表
+        """
+        cursor: Tuple[int, int, int] | None = None
+        while True:
+            stmt = (
+                select(PushTask)
+                .where(
+                    and_(
+                        PushTask.status == PushStatus.PENDING,
+                        PushTask.due_at <= to_epoch(before_time)
+                    )
+                )
+                .order_by(PushTask.priority.desc(), PushTask.due_at, PushTask.id)
+                .limit(chunk_size)
+            )
+            if cursor is not None:
+                stmt = stmt.where(self._keyset_after(cursor))
+            result = await self.db.execute(stmt)
+            tasks = list(result.scalars().all())
+            await self.db.commit()
+            if not tasks:
+                return
+
+            cursor = self._keyset_cursor(tasks[-1])
+            yield tasks
+            self._release(tasks)
+            if len(tasks) < chunk_size:
+                return
+
+    def _release(self, tasks: List[PushTask]) -> None:
+        """把已处理的任务移出会话，释放内存"""
+        for task in tasks:
+            if task in self.db:
+                self.db.expunge(task)
+
+    def _claimable_tasks_stmt(
+        self,
+        before_time: datetime,
+        now: datetime,
+        limit: int,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        after: Tuple[int, int, int] | None = None,
+        priority: int | None = None
+    ):
+        """
+        构造可认领任务的查询：到期、待推送、未被租用或租约已过期（指定 priority 时只查该优先级）
+
+        FOR UPDATE SKIP LOCKED 跳过其他实例正在认领的行，多个实例并发认领时互不阻塞也不重复
+        """
+        stmt = (
+            select(PushTask)
+            .where(
+                and_(
+                    PushTask.status == PushStatus.PENDING,
+                    PushTask.due_at <= to_epoch(before_time),
+                    or_(PushTask.lease_expires_at.is_(None), PushTask.lease_expires_at < now)
+                )
+            )
+            .order_by(PushTask.priority.desc(), PushTask.due_at, PushTask.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if shard_count > 1:
+            stmt = stmt.where(PushTask.user_id % shard_count == shard_index)
+        if after is not None:
+            stmt = stmt.where(self._keyset_after(after))
+        if priority is not None:
+            stmt = stmt.where(PushTask.priority == priority)
+        return stmt
+
+    async def claim_pending_tasks(
+        self,
+        worker_id: str,
+        before_time: datetime,
+        limit: int = 500,
+        lease_seconds: int = 300,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        after: Tuple[int, int, int] | None = None,
+        priority: int | None = None
+    ) -> List[PushTask]:
+        """
+        认领一批到期任务并写入租约
+
+        查询和写租约在同一个事务内完成，提交后行锁即释放；
+        其他实例依靠租约字段判断任务已被认领，租约过期（实例崩溃）后任务可被重新认领。
+
+        Args:
+            worker_id: 调度器实例ID
+            before_time: 下次尝试时间上限（服务器本地时间，换算为 UTC 时间戳比较）
+            limit: 本批最多认领数量
+            lease_seconds: 租约时长（秒）
+            shard_index: 本实例负责的分片序号
+            shard_count: 分片总数（按 user_id 取模），1 表示不分片
+            after: 键集分页游标 (priority, due_at, id)，只认领排在其后的任务
+            priority: 只认领该优先级的任务，None 表示不限
+
+        Returns:
+            已认领的任务列表
+        """
+        now = datetime.now()
+        stmt = self._claimable_tasks_stmt(before_time, now, limit, shard_index, shard_count, after, priority)
+        result = await self.db.execute(stmt)
+        tasks = list(result.scalars().all())
+
+        if tasks:
+            await self.db.execute(
+                update(PushTask)
+                .where(PushTask.id.in_([task.id for task in tasks]))
+                .values(lease_owner=worker_id, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            )
+        await self.db.commit()
+        return tasks
+
+    async def iter_claimed_tasks(
+        self,
+        worker_id: str,
+        before_time: datetime,
+        chunk_size: int = 500,
+        lease_seconds: int = 300,
+        shard_index: int = 0,
+        shard_count: int = 1
+    ) -> AsyncIterator[List[PushTask]]:
+        """
+        逐块认领到期任务（键集分页 + 每块独立事务）
+
+        游标保证每块查询从上一块末尾继续，不会反复扫描积压头部已被租用的行；
+        调用方处理完一块再取下一块时，上一块对象会从会话中移除。
+
+        Args:
+            worker_id: 调度器实例ID
+            before_time: 下次尝试时间上限（服务器本地时间，换算为 UTC 时间戳比较）
+            chunk_size: 每块任务数
+            lease_seconds: 租约时长（秒）
+            shard_index: 本实例负责的分片序号
+            shard_count: 分片总数，1 表示不分片
+
+        Yields:
+            每块已认领的任务列表
+        """
+        cursor: Tuple[int, int, int] | None = None
+        while True:
+            tasks = await self.claim_pending_tasks(
+                worker_id=worker_id,
+                before_time=before_time,
+                limit=chunk_size,
+                lease_seconds=lease_seconds,
+                shard_index=shard_index,
+                shard_count=shard_count,
+                after=cursor
+            )
+            if not tasks:
+                return
+
+            cursor = self._keyset_cursor(tasks[-1])
+            yield tasks
+            self._release(tasks)
+            if len(tasks) < chunk_size:
+                return
+
+    async def iter_claimed_lanes(
+        self,
+        worker_id: str,
+        before_time: datetime | None = None,
+        chunk_size: int = 500,
+        lease_seconds: int = 300,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        lanes: Sequence[int] = PRIORITY_LANES
+    ) -> AsyncIterator[List[PushTask]]:
+        """
+        按优先级分道逐块认领到期任务（严格优先级 + 道内最早到期优先）
+
+        每认领一块前都从最高优先级的道重新查起，普通任务积压时新到期的紧急任务最多等待一块的推送时间，
+        不必等整轮积压推完；每块只含同一优先级，道内按 (due_at, id) 键集分页。
+        某道认领为空时重置其游标，之后新建的、到期时间早于游标的任务也能被认领。
+
+        Args:
+            worker_id: 调度器实例ID
+            before_time: 下次尝试时间上限（服务器本地时间），None 表示每次认领时取当前时间
+            chunk_size: 每块任务数
+            lease_seconds: 租约时长（秒）
+            shard_index: 本实例负责的分片序号
+            shard_count: 分片总数，1 表示不分片
+            lanes: 优先级从高到低的分道
+
+        Yields:
+            每块已认领的任务列表（同一优先级）
+        """
+        cursors: Dict[int, Tuple[int, int, int] | None] = {lane: None for lane in lanes}
+        while True:
+            for lane in lanes:
+                tasks = await self.claim_pending_tasks(
+                    worker_id=worker_id,
+                    before_time=before_time or datetime.now(),
+                    limit=chunk_size,
+                    lease_seconds=lease_seconds,
+                    shard_index=shard_index,
+                    shard_count=shard_count,
+                    after=cursors[lane],
+                    priority=lane
+                )
+                if tasks:
+                    break
+                cursors[lane] = None
+            else:
+                return
+
+            cursors[lane] = self._keyset_cursor(tasks[-1])
+            yield tasks
+            self._release(tasks)
+
+    async def count_due_by_priority(
+        self,
+        before_time: datetime,
+        shard_index: int = 0,
+        shard_count: int = 1
+    ) -> Dict[int, int]:
+        """
+        统计各优先级到期未推送的任务数（各分道的队列深度，含已被租用、正在推送的任务）
+
+        Args:
+            before_time: 下次尝试时间上限（服务器本地时间，换算为 UTC 时间戳比较）
+            shard_index: 本实例负责的分片序号
+            shard_count: 分片总数，1 表示不分片
+
+        Returns:
+            {优先级: 任务数}
+        """
+        stmt = (
+            select(PushTask.priority, func.count())
+            .where(
+                and_(
+                    PushTask.status == PushStatus.PENDING,
+                    PushTask.due_at <= to_epoch(before_time)
+                )
+            )
+            .group_by(PushTask.priority)
+        )
+        if shard_count > 1:
+            stmt = stmt.where(PushTask.user_id % shard_count == shard_index)
+        result = await self.db.execute(stmt)
+        return {priority: count for priority, count in result.all()}
+
+    # 单条 VALUES 语句最多携带的行数（asyncpg 单语句参数上限 32767）
+    OUTCOME_ROWS_PER_STATEMENT = 1000
+
+    def _outcome_statements(
+        self,
+        sent: List[Dict[str, Any]],
+        failed: List[Dict[str, Any]],
+        retry: List[Dict[str, Any]],
+        cancelled: List[Dict[str, Any]],
+        now: datetime,
+        dead_letter: List[Dict[str, Any]] | None = None,
+        deferred: List[Dict[str, Any]] | None = None
+    ) -> List[Any]:
+        """
+        按结果类型构造 UPDATE ... FROM (VALUES ...) 语句，每类每 OUTCOME_ROWS_PER_STATEMENT 行一条
+
+        推迟 next_attempt_at 的结果同时写入换算后的 UTC 时间戳 due_at
+
+        Args:
+            sent: [{"id", "push_response"}]
+            failed: [{"id", "error_message"}]
+            retry: [{"id", "next_attempt_at", "error_message", "push_response"}]
+            cancelled: [{"id", "error_message"}]
+            now: 本批写回时间
+            dead_letter: [{"id", "error_message"}]
+            deferred: [{"id", "next_attempt_at", "error_message"}]
+
+        Returns:
+            待执行的语句列表
+        """
+        specs = [
+            (
+                sent,
+                [column("id", Integer), column("push_response", JSON)],
+                lambda v: {
+                    "status": PushStatus.SENT,
+                    "sent_time": now,
+                    "executed_at": now,
+                    "push_response": v.c.push_response,
+                },
+            ),
+            (
+                failed,
+                [column("id", Integer), column("error_message", String)],
+                lambda v: {
+                    "status": PushStatus.FAILED,
+                    "retry_count": PushTask.retry_count + 1,
+                    "error_message": v.c.error_message,
+                },
+            ),
+            (
+                self._with_due_at(retry),
+                [
+                    column("id", Integer),
+                    column("next_attempt_at", DateTime),
+                    column("due_at", BigInteger),
+                    column("error_message", String),
+                    column("push_response", JSON),
+                ],
+                lambda v: {
+                    "retry_count": PushTask.retry_count + 1,
+                    "next_attempt_at": v.c.next_attempt_at,
+                    "due_at": v.c.due_at,
+                    "error_message": v.c.error_message,
+                    "push_response": v.c.push_response,
+                },
+            ),
+            (
+                self._with_due_at(deferred or []),
+                [
+                    column("id", Integer),
+                    column("next_attempt_at", DateTime),
+                    column("due_at", BigInteger),
+                    column("error_message", String),
+                ],
+                lambda v: {
+                    "next_attempt_at": v.c.next_attempt_at,
+                    "due_at": v.c.due_at,
+                    "error_message": v.c.error_message,
+                },
+            ),
+            (
+                dead_letter or [],
+                [column("id", Integer), column("error_message", String)],
+                lambda v: {
+                    "status": PushStatus.DEAD_LETTER,
+                    "retry_count": PushTask.retry_count + 1,
+                    "error_message": v.c.error_message,
+                },
+            ),
+            (
+                cancelled,
+                [column("id", Integer), column("error_message", String)],
+                lambda v: {
+                    "status": PushStatus.CANCELLED,
+                    "error_message": v.c.error_message,
+                },
+            ),
+        ]
+
+        statements = []
+        for rows, columns, assignments in specs:
+            names = [c.name for c in columns]
+            for start in range(0, len(rows), self.OUTCOME_ROWS_PER_STATEMENT):
+                chunk = rows[start:start + self.OUTCOME_ROWS_PER_STATEMENT]
+                v = values(*columns, name="outcome").data([tuple(row.get(n) for n in names) for row in chunk])
+                statements.append(
+                    update(PushTask)
+                    .where(PushTask.id == v.c.id)
+                    .values(lease_owner=None, lease_expires_at=None, **assignments(v))
+                    .execution_options(synchronize_session=False)
+                )
+        return statements
+
+    @staticmethod
+    def _with_due_at(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """为推迟的结果补上 next_attempt_at（服务器本地时间）对应的 UTC 时间戳"""
+        return [{**row, "due_at": to_epoch(row["next_attempt_at"])} for row in rows]
+
+    async def bulk_apply_outcomes(
+        self,
+        sent: List[Dict[str, Any]] | None = None,
+        failed: List[Dict[str, Any]] | None = None,
+        retry: List[Dict[str, Any]] | None = None,
+        cancelled: List[Dict[str, Any]] | None = None,
+        dead_letter: List[Dict[str, Any]] | None = None,
+        deferred: List[Dict[str, Any]] | None = None
+    ) -> int:
+        """
+        批量写回一批推送结果，所有语句在同一个事务中提交
+
+        与 update_status 语义一致：成功写发送时间，失败累加重试次数，
+        重试推迟 next_attempt_at 并保持 PENDING（scheduled_time 保留原计划时间），
+        延后（服务熔断/本地限流，请求未发出）只推迟 next_attempt_at、不计重试次数，
+        所有结果都释放租约。会话中的任务对象不会同步更新。
+
+        Args:
+            sent: 发送成功 [{"id", "push_response"}]
+            failed: 最终失败 [{"id", "error_message"}]
+            retry: 延迟重试 [{"id", "next_attempt_at", "error_message", "push_response"}]
+            cancelled: 取消 [{"id", "error_message"}]
+            dead_letter: 重试次数用尽 [{"id", "error_message"}]
+            deferred: 未发出的请求延后 [{"id", "next_attempt_at", "error_message"}]
+
+        Returns:
+            写回的任务数
+        """
+        sent, failed, retry, cancelled = sent or [], failed or [], retry or [], cancelled or []
+        dead_letter, deferred = dead_letter or [], deferred or []
+        statements = self._outcome_statements(sent, failed, retry, cancelled, datetime.now(), dead_letter, deferred)
+        for stmt in statements:
+            await self.db.execute(stmt)
+        await self.db.commit()
+        return len(sent) + len(failed) + len(retry) + len(cancelled) + len(dead_letter) + len(deferred)
+
+    async def requeue_dead_letters(self, limit: int = 1000, user_id: int | None = None) -> int:
+        """
+        把死信任务重新入队（PENDING、重试次数清零、立即可认领）
+
+        同一提醒同一时间已有待推送任务的死信不重新入队，多条同键死信只重新入队一条（自然键唯一索引）
+
+        Args:
+            limit: 本次最多重新入队数量
+            user_id: 只处理指定用户的任务
+
+        Returns:
+            重新入队的任务数
+        """
+        pending = aliased(PushTask)
+        ids = select(func.min(PushTask.id)).where(
+            and_(
+                PushTask.status == PushStatus.DEAD_LETTER,
+                ~exists().where(
+                    and_(
+                        pending.reminder_id == PushTask.reminder_id,
+                        pending.scheduled_time == PushTask.scheduled_time,
+                        pending.status == PushStatus.PENDING
+                    )
+                )
+            )
+        )
+        if user_id is not None:
+            ids = ids.where(PushTask.user_id == user_id)
+        ids = ids.group_by(PushTask.reminder_id, PushTask.scheduled_time).order_by(func.min(PushTask.id)).limit(limit)
+
+        now = datetime.now()
+        result = await self.db.execute(
+            update(PushTask)
+            .where(PushTask.id.in_(ids))
+            .values(status=PushStatus.PENDING, retry_count=0, next_attempt_at=now, due_at=to_epoch(now))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return getattr(result, 'rowcount', 0)
+
+    async def get_upcoming_due_times(
+        self,
+        until: datetime,
+        limit: int = 1000,
+        shard_index: int = 0,
+        shard_count: int = 1
+    ) -> List[Tuple[int, datetime]]:
+        """
+        查询即将到期的待推送任务及其可认领时间（用于调度器预加载唤醒时间）
+
+        被其他实例租用的任务在租约过期后才可认领，此时取租约过期时间。
+
+        Args:
+            until: 下次尝试时间上限（服务器本地时间，换算为 UTC 时间戳比较）
+            limit: 最多返回数量
+            shard_index: 本实例负责的分片序号
+            shard_count: 分片总数，1 表示不分片
+
+        Returns:
+            [(任务ID, 可认领时间), ...]
+        """
+        stmt = (
+            select(PushTask.id, PushTask.due_at, PushTask.lease_expires_at)
+            .where(
+                and_(
+                    PushTask.status == PushStatus.PENDING,
+                    PushTask.due_at <= to_epoch(until)
+                )
+            )
+            .order_by(PushTask.due_at)
+            .limit(limit)
+        )
+        if shard_count > 1:
+            stmt = stmt.where(PushTask.user_id % shard_count == shard_index)
+        result = await self.db.execute(stmt)
+        entries = []
+        for task_id, due_at, lease_expires_at in result.all():
+            due_time = from_epoch(due_at)
+            entries.append((task_id, max(due_time, lease_expires_at) if lease_expires_at else due_time))
+        return entries
+
     async def get_failed_tasks_for_retry(self, max_retries: int = 3) -> Sequence[PushTask]:
         stmt = select(PushTask).where(
             and_(
@@ -196,6 +807,10 @@ class PushTaskRepository:
         # 将任务重置为PENDING并清零重试计数
         task.status = PushStatus.PENDING
         task.retry_count = 0
+        task.next_attempt_at = datetime.now()
+        task.due_at = to_epoch(task.next_attempt_at)
+        task.lease_owner = None
+        task.lease_expires_at = None
         await db.commit()
         await db.refresh(task)
         return task
@@ -204,7 +819,7 @@ class PushTaskRepository:
     async def get_statistics(db: AsyncSession, user_id: int) -> Dict[str, Any]:
         # 返回简单统计数据：各状态计数
         stats: Dict[str, Any] = {}
-        for status in [PushStatus.PENDING, PushStatus.SENT, PushStatus.FAILED, PushStatus.CANCELLED]:
+        for status in PushStatus:
             stmt = select(func.count()).select_from(PushTask).where(
                 and_(PushTask.user_id == user_id, PushTask.status == status)
             )
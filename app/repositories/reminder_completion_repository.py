@@ -7,6 +7,8 @@ from collections.abc import Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
+from zoneinfo import ZoneInfo
+from app.core.timezones import get_zone, local_now
 from app.models.reminder_completion import ReminderCompletion
 
 
@@ -22,16 +24,23 @@ class ReminderCompletionRepository:
         user_id: int,
         scheduled_time: datetime | None = None,
         note: str | None = None,
-        status: str = "completed"
+        status: str = "completed",
+        zone: ZoneInfo | None = None
     ) -> ReminderCompletion:
-        """创建完成记录"""
-        from datetime import timezone
-        now = datetime.now(timezone.utc)
+        """
+        创建完成记录
+        
+        Args:
+            scheduled_time: 计划时间（用户时区的墙上时间）
+            zone: 用户时区，为空时取 DEFAULT_TIMEZONE；完成时间按该时区记录
+        """
+        zone = zone or get_zone()
+        now = local_now(zone)
         delay = 0
         if scheduled_time:
-            # 确保scheduled_time有时区信息
-            if scheduled_time.tzinfo is None:
-                scheduled_time = scheduled_time.replace(tzinfo=timezone.utc)
+            # 带时区信息的时间换算为用户时区的墙上时间，与 now 比较
+            if scheduled_time.tzinfo is not None:
+                scheduled_time = scheduled_time.astimezone(zone).replace(tzinfo=None)
             delay = int((now - scheduled_time).total_seconds() / 60)
         
         completion = ReminderCompletion(
@@ -0,0 +1,248 @@
+"""
+Reminder Occurrence Repository
+提醒触发时间物化表数据访问层
+"""
+
+from typing import Any, Dict, List
+from collections.abc import AsyncIterator, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, update, delete, values, column, Integer, DateTime, Row
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timedelta
+from app.core.timezones import wall_time_sql
+from app.models.reminder import Reminder
+from app.models.reminder_occurrence import ReminderOccurrence
+from app.models.user import User
+
+
+class ReminderOccurrenceRepository:
+    """提醒触发时间仓库"""
+
+    ROWS_PER_STATEMENT = 1000
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def iter_reminders_to_extend(
+        self,
+        now: int,
+        refill: timedelta,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        按 id 键集分页逐块读取需要扩展物化窗口的启用提醒
+
+        occurrences_until 为空（新建或配置变更后失效）或早于用户时区的当前时间加 refill 的提醒需要扩展
+        （occurrences_until 是用户时区的墙上时间）；只取展开所需的列，每块读完即提交结束事务。
+
+        Args:
+            now: 当前 UTC 时间戳
+            refill: 物化截止时间早于用户当前时间加该时长的提醒需要扩展
+            chunk_size: 每块提醒数
+
+        Yields:
+            每块提醒行列表
+        """
+        last_id = 0
+        while True:
+            result = await self.db.execute(
+                select(
+                    Reminder.id,
+                    Reminder.user_id,
+                    Reminder.recurrence_type,
+                    Reminder.recurrence_config,
+                    Reminder.next_remind_time,
+                    Reminder.occurrences_until
+                )
+                .join(User, User.id == Reminder.user_id)
+                .where(
+                    and_(
+                        Reminder.is_active == True,
+                        or_(
+                            Reminder.occurrences_until.is_(None),
+                            Reminder.occurrences_until < wall_time_sql(User.timezone, now) + refill
+                        ),
+                        Reminder.id > last_id
+                    )
+                )
+                .order_by(Reminder.id)
+                .limit(chunk_size)
+            )
+            rows = list(result.all())
+            await self.db.commit()
+            if not rows:
+                return
+
+            last_id = rows[-1].id
+            yield rows
+            if len(rows) < chunk_size:
+                return
+
+    def _insert_statements(self, occurrences: List[Dict[str, Any]]) -> list:
+        """
+        构造批量插入语句，每条最多 ROWS_PER_STATEMENT 行；已存在的 (reminder_id, occurs_at) 跳过
+
+        Args:
+            occurrences: [{"reminder_id", "user_id", "occurs_at"}]
+        """
+        statements = []
+        for start in range(0, len(occurrences), self.ROWS_PER_STATEMENT):
+            chunk = occurrences[start:start + self.ROWS_PER_STATEMENT]
+            statements.append(
+                insert(ReminderOccurrence)
+                .values(chunk)
+                .on_conflict_do_nothing(index_elements=["reminder_id", "occurs_at"])
+            )
+        return statements
+
+    def _watermark_statements(self, watermarks: List[Dict[str, Any]]) -> list:
+        """
+        构造批量推进 reminders.occurrences_until 的 UPDATE ... FROM (VALUES ...) 语句
+
+        Args:
+            watermarks: [{"id", "until"}]
+        """
+        statements = []
+        for start in range(0, len(watermarks), self.ROWS_PER_STATEMENT):
+            chunk = watermarks[start:start + self.ROWS_PER_STATEMENT]
+            v = values(column("id", Integer), column("until", DateTime), name="watermark").data(
+                [(row["id"], row["until"]) for row in chunk]
+            )
+            statements.append(
+                update(Reminder)
+                .where(Reminder.id == v.c.id)
+                .values(occurrences_until=v.c.until)
+                .execution_options(synchronize_session=False)
+            )
+        return statements
+
+    async def bulk_extend(
+        self,
+        occurrences: List[Dict[str, Any]],
+        watermarks: List[Dict[str, Any]]
+    ) -> int:
+        """
+        写入一批新展开的触发时间并推进对应提醒的物化截止时间，在同一个事务中提交
+
+        Args:
+            occurrences: [{"reminder_id", "user_id", "occurs_at"}]
+            watermarks: [{"id", "until"}]
+
+        Returns:
+            实际插入的触发记录数
+        """
+        inserted = 0
+        for statement in self._insert_statements(occurrences):
+            result = await self.db.execute(statement)
+            inserted += result.rowcount or 0
+        for statement in self._watermark_statements(watermarks):
+            await self.db.execute(statement)
+        await self.db.commit()
+        return inserted
+
+    async def invalidate(self, reminder: Reminder, after: datetime) -> None:
+        """
+        周期配置变更或停用后，删除该提醒 after 之后的物化记录并清空物化截止时间（不提交）
+
+        之前的记录保留；后台任务下一轮按新配置重新展开，读取方在此之前按需即时计算。
+
+        Args:
+            reminder: 提醒对象
+            after: 删除不早于该时间的记录
+        """
+        await self.db.execute(
+            delete(ReminderOccurrence).where(
+                and_(ReminderOccurrence.reminder_id == reminder.id, ReminderOccurrence.occurs_at >= after)
+            )
+        )
+        reminder.occurrences_until = None
+
+    async def prune(self, before: datetime) -> int:
+        """
+        删除早于 before 的物化记录
+
+        Returns:
+            删除的记录数
+        """
+        result = await self.db.execute(delete(ReminderOccurrence).where(ReminderOccurrence.occurs_at < before))
+        await self.db.commit()
+        return result.rowcount or 0
+
+    async def get_range(
+        self,
+        start: datetime,
+        end: datetime,
+        user_id: int | None = None,
+        limit: int = 1000
+    ) -> Sequence[Row]:
+        """
+        按时间范围读取启用提醒的物化触发时间（走 (user_id, occurs_at) 或 occurs_at 索引）
+
+        Args:
+            start: 开始时间（包含）
+            end: 结束时间（不包含）
+            user_id: 只读取该用户的提醒
+            limit: 最多返回条数
+
+        Returns:
+            (reminder_id, occurs_at, title, category) 行，按触发时间排序
+        """
+        stmt = (
+            select(ReminderOccurrence.reminder_id, ReminderOccurrence.occurs_at, Reminder.title, Reminder.category)
+            .join(Reminder, Reminder.id == ReminderOccurrence.reminder_id)
+            .where(
+                and_(
+                    ReminderOccurrence.occurs_at >= start,
+                    ReminderOccurrence.occurs_at < end,
+                    Reminder.is_active == True
+                )
+            )
+            .order_by(ReminderOccurrence.occurs_at, ReminderOccurrence.reminder_id)
+            .limit(limit)
+        )
+        if user_id is not None:
+            stmt = stmt.where(ReminderOccurrence.user_id == user_id)
+        result = await self.db.execute(stmt)
+        return result.all()
+
+    async def get_unmaterialized(self, user_id: int, end: datetime) -> Sequence[Reminder]:
+        """
+        读取用户物化窗口没有覆盖到 end 的启用提醒（新建、配置刚变更或窗口尚未扩展）
+
+        Args:
+            user_id: 用户ID
+            end: 需要覆盖到的时间
+
+        Returns:
+            提醒列表
+        """
+        result = await self.db.execute(
+            select(Reminder).where(
+                and_(
+                    Reminder.user_id == user_id,
+                    Reminder.is_active == True,
+                    or_(Reminder.occurrences_until.is_(None), Reminder.occurrences_until < end)
+                )
+            )
+        )
+        return result.scalars().all()
+
+    async def get_upcoming(self, reminder_id: int, after: datetime, limit: int) -> List[datetime]:
+        """
+        读取单个提醒不早于 after 的物化触发时间（走 (reminder_id, occurs_at) 唯一索引）
+
+        Args:
+            reminder_id: 提醒ID
+            after: 开始时间（包含）
+            limit: 最多返回条数
+
+        Returns:
+            按时间排序的触发时间列表
+        """
+        result = await self.db.execute(
+            select(ReminderOccurrence.occurs_at)
+            .where(and_(ReminderOccurrence.reminder_id == reminder_id, ReminderOccurrence.occurs_at >= after))
+            .order_by(ReminderOccurrence.occurs_at)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
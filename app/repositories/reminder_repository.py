@@ -3,12 +3,17 @@ Reminder Repository
 提醒数据访问层 - 异步版本
 """
 
-from typing import List, Any
-from collections.abc import Sequence
+from typing import List, Any, Dict
+from collections.abc import AsyncIterator, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, select
-from datetime import datetime
+from sqlalchemy import and_, or_, select, update, values, column, literal_column, Integer, DateTime, Row
+from datetime import datetime, timedelta
+from app.core.timezones import local_now, wall_time_sql
 from app.models.reminder import Reminder, ReminderCategory, RecurrenceType
+from app.models.user import User
+from app.repositories.push_task_repository import PushTaskRepository
+from app.repositories.reminder_occurrence_repository import ReminderOccurrenceRepository
+from app.repositories.user_repository import UserRepository
 
 
 class ReminderRepository:
@@ -97,11 +102,38 @@ class ReminderRepository:
         return new_reminder
 
 
+    # 这些字段变化后，已物化的触发时间失效
+    OCCURRENCE_FIELDS = ("recurrence_type", "recurrence_config", "is_active")
+    # 这些字段变化后，预先生成的推送任务失效（计划时间、推送内容、渠道和优先级都来自提醒）
+    PUSH_TASK_FIELDS = OCCURRENCE_FIELDS + (
+        "advance_minutes", "is_completed", "title", "description", "remind_channels", "priority", "category"
+    )
+
     async def update(self, reminder: Reminder, **kwargs: Any) -> Reminder:
-        """更新提醒"""
+        """
+        更新提醒
+
+        周期配置变更或停用时失效已物化的触发时间；影响推送时间或推送内容的字段变更时取消预先生成的
+        未来推送任务并清空生成截止时间，由调用方或后台任务重新生成；标记为已完成时取消全部待推送任务
+        """
+        changed = {
+            field for field in self.PUSH_TASK_FIELDS
+            if kwargs.get(field) is not None and kwargs[field] != getattr(reminder, field)
+        }
         for field, value in kwargs.items():
             if hasattr(reminder, field) and value is not None:
                 setattr(reminder, field, value)
+        if changed:
+            # 触发时间和计划推送时间都是用户时区的墙上时间
+            now = local_now(await UserRepository(self.db).get_timezone(reminder.user_id))
+        if changed & set(self.OCCURRENCE_FIELDS):
+            await ReminderOccurrenceRepository(self.db).invalidate(reminder, after=now)
+        if changed and reminder.is_completed:
+            await PushTaskRepository(self.db).cancel_pending(reminder.id, reason="Reminder completed")
+            reminder.push_tasks_until = None
+        elif changed:
+            await PushTaskRepository(self.db).cancel_pending(reminder.id, after=now, reason="Reminder changed")
+            reminder.push_tasks_until = None
         
         await self.db.commit()
         await self.db.refresh(reminder)
@@ -113,9 +145,11 @@ class ReminderRepository:
         await self.db.commit()
     
     async def mark_completed(self, reminder: Reminder, user_id: int) -> Reminder:
-        """标记提醒为已完成，并返回更新后的提醒"""
+        """标记提醒为已完成，并返回更新后的提醒（一次性提醒预先生成的待推送任务一并取消）"""
         reminder.is_completed = True
         reminder.completed_at = datetime.now()
+        if reminder.recurrence_type == RecurrenceType.ONCE:
+            await PushTaskRepository(self.db).cancel_pending(reminder.id, reason="Reminder completed")
         await self.db.commit()
         await self.db.refresh(reminder)
         return reminder
@@ -136,18 +170,103 @@ class ReminderRepository:
         await self.db.refresh(reminder)
         return reminder
     
-    async def get_pending_reminders(self, before_time: datetime) -> Sequence[Reminder]:
-        """获取待推送的提醒（下次提醒时间在指定时间之前且未完成）"""
-        result = await self.db.execute(
-            select(Reminder).filter(
-                and_(
-                    Reminder.is_active == True,
-                    Reminder.is_completed == False,
-                    Reminder.next_remind_time <= before_time
+    async def iter_pending_reminders(
+        self,
+        now: int,
+        horizon: timedelta,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        按 id 键集分页逐块读取即将推送、需要预先生成推送任务的提醒
+
+        启用且未完成、下次推送时间（下次提醒时间减去提前量）早于用户当前时间加 horizon，
+        且推送任务生成截止时间为空（新建或配置变更后失效）或早于用户当前时间加半个 horizon 的提醒；
+        下次提醒时间和截止时间都是用户时区的墙上时间，"用户当前时间"按用户时区换算 now。
+        只取生成任务所需的列，每块读完即提交结束事务。
+
+        Args:
+            now: 当前 UTC 时间戳
+            horizon: 生成窗口长度
+            chunk_size: 每块提醒数
+
+        Yields:
+            每块提醒行列表
+        """
+        next_push_time = Reminder.next_remind_time - Reminder.advance_minutes * literal_column("interval '1 minute'")
+        user_now = wall_time_sql(User.timezone, now)
+        last_id = 0
+        while True:
+            result = await self.db.execute(
+                select(
+                    Reminder.id,
+                    Reminder.user_id,
+                    Reminder.title,
+                    Reminder.description,
+                    Reminder.category,
+                    Reminder.priority,
+                    Reminder.remind_channels,
+                    Reminder.recurrence_type,
+                    Reminder.recurrence_config,
+                    Reminder.next_remind_time,
+                    Reminder.advance_minutes,
+                    Reminder.push_tasks_until
                 )
+                .join(User, User.id == Reminder.user_id)
+                .where(
+                    and_(
+                        Reminder.is_active == True,
+                        Reminder.is_completed == False,
+                        next_push_time < user_now + horizon,
+                        or_(Reminder.push_tasks_until.is_(None), Reminder.push_tasks_until < user_now + horizon / 2),
+                        Reminder.id > last_id
+                    )
+                )
+                .order_by(Reminder.id)
+                .limit(chunk_size)
             )
-        )
-        return result.scalars().all()
+            rows = list(result.all())
+            await self.db.commit()
+            if not rows:
+                return
+
+            last_id = rows[-1].id
+            yield rows
+            if len(rows) < chunk_size:
+                return
+
+    WATERMARK_ROWS_PER_STATEMENT = 1000
+
+    def _push_watermark_statements(self, watermarks: List[Dict[str, Any]]) -> list:
+        """
+        构造批量推进 reminders.push_tasks_until 的 UPDATE ... FROM (VALUES ...) 语句，
+        每条最多 WATERMARK_ROWS_PER_STATEMENT 行
+
+        Args:
+            watermarks: [{"id", "until"}]
+        """
+        statements = []
+        for start in range(0, len(watermarks), self.WATERMARK_ROWS_PER_STATEMENT):
+            chunk = watermarks[start:start + self.WATERMARK_ROWS_PER_STATEMENT]
+            v = values(column("id", Integer), column("until", DateTime), name="push_watermark").data(
+                [(row["id"], row["until"]) for row in chunk]
+            )
+            statements.append(
+                update(Reminder)
+                .where(Reminder.id == v.c.id)
+                .values(push_tasks_until=v.c.until)
+                .execution_options(synchronize_session=False)
+            )
+        return statements
+
+    async def advance_push_tasks_until(self, watermarks: List[Dict[str, Any]]) -> None:
+        """
+        批量推进提醒的推送任务生成截止时间（不提交，与同一块的任务写入一起提交）
+
+        Args:
+            watermarks: [{"id", "until"}]
+        """
+        for statement in self._push_watermark_statements(watermarks):
+            await self.db.execute(statement)
     
     async def count_user_reminders(self, user_id: int, is_active: bool | None = None) -> int | None:
         """统计用户提醒数量"""
@@ -185,3 +304,102 @@ class ReminderRepository:
         await self.db.commit()
         await self.db.refresh(reminder)
         return reminder
+
+    async def iter_stale_recurring(
+        self,
+        before: int,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        按 id 键集分页逐块读取过期未推进的周期提醒
+
+        next_remind_time 是用户时区的墙上时间，与 before 在该用户时区的墙上时间比较；
+        只取计算下次时间所需的列（id、user_id、recurrence_type、recurrence_config、next_remind_time），
+        不加载 ORM 对象；每块读完即提交结束事务。
+
+        Args:
+            before: UTC 时间戳，下次提醒时间早于该时刻（按用户时区）视为过期
+            chunk_size: 每块提醒数
+
+        Yields:
+            每块提醒行列表
+        """
+        last_id = 0
+        while True:
+            result = await self.db.execute(
+                select(
+                    Reminder.id,
+                    Reminder.user_id,
+                    Reminder.recurrence_type,
+                    Reminder.recurrence_config,
+                    Reminder.next_remind_time
+                )
+                .join(User, User.id == Reminder.user_id)
+                .where(
+                    and_(
+                        Reminder.is_active == True,
+                        Reminder.recurrence_type != RecurrenceType.ONCE,
+                        Reminder.next_remind_time < wall_time_sql(User.timezone, before),
+                        Reminder.id > last_id
+                    )
+                )
+                .order_by(Reminder.id)
+                .limit(chunk_size)
+            )
+            rows = list(result.all())
+            await self.db.commit()
+            if not rows:
+                return
+
+            last_id = rows[-1].id
+            yield rows
+            if len(rows) < chunk_size:
+                return
+
+    REALIGN_ROWS_PER_STATEMENT = 1000
+
+    def _realign_statements(self, rows: List[Dict[str, Any]]) -> list:
+        """
+        构造批量推进下次提醒时间的 UPDATE ... FROM (VALUES ...) 语句，每条最多 REALIGN_ROWS_PER_STATEMENT 行
+
+        只有 next_remind_time 仍等于读取时的值才更新，读取后被用户完成或修改过的提醒保持不变。
+
+        Args:
+            rows: [{"id", "previous", "next"}]
+
+        Returns:
+            UPDATE 语句列表
+        """
+        statements = []
+        for start in range(0, len(rows), self.REALIGN_ROWS_PER_STATEMENT):
+            chunk = rows[start:start + self.REALIGN_ROWS_PER_STATEMENT]
+            v = values(
+                column("id", Integer), column("previous", DateTime), column("next", DateTime),
+                name="realign"
+            ).data([(row["id"], row["previous"], row["next"]) for row in chunk])
+            statements.append(
+                update(Reminder)
+                .where(and_(Reminder.id == v.c.id, Reminder.next_remind_time == v.c.previous))
+                .values(next_remind_time=v.c.next)
+                .execution_options(synchronize_session=False)
+            )
+        return statements
+
+    async def bulk_realign_next_remind_time(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        批量推进过期周期提醒的下次提醒时间，所有语句在同一个事务中提交
+
+        Args:
+            rows: [{"id", "previous", "next"}]，previous 为读取时的 next_remind_time
+
+        Returns:
+            实际更新的提醒数
+        """
+        if not rows:
+            return 0
+        updated = 0
+        for statement in self._realign_statements(rows):
+            result = await self.db.execute(statement)
+            updated += result.rowcount or 0
+        await self.db.commit()
+        return updated
@@ -6,7 +6,9 @@ User Repository
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
+from zoneinfo import ZoneInfo
 from app.models.user import User
+from app.core.timezones import get_zone
 
 
 class UserRepository:
@@ -22,6 +24,31 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
     
+    async def get_timezone(self, user_id: int) -> ZoneInfo:
+        """获取用户时区，未设置时为 DEFAULT_TIMEZONE"""
+        result = await self.db.execute(
+            select(User.timezone).filter(User.id == user_id)
+        )
+        return get_zone(result.scalar_one_or_none())
+    
+    async def get_timezones(self, user_ids: list[int]) -> dict[int, ZoneInfo]:
+        """批量获取用户时区，未设置时为 DEFAULT_TIMEZONE"""
+        if not user_ids:
+            return {}
+        result = await self.db.execute(
+            select(User.id, User.timezone).filter(User.id.in_(set(user_ids)))
+        )
+        return {user_id: get_zone(timezone) for user_id, timezone in result.all()}
+    
+    async def get_phones(self, user_ids: list[int]) -> dict[int, str]:
+        """批量获取用户手机号（短信渠道推送用）"""
+        if not user_ids:
+            return {}
+        result = await self.db.execute(
+            select(User.id, User.phone).filter(User.id.in_(set(user_ids)))
+        )
+        return {user_id: phone for user_id, phone in result.all()}
+    
     async def get_by_phone(self, phone: str) -> User | None:
         """根据手机号获取用户"""
         result = await self.db.execute(
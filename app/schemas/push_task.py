@@ -40,6 +40,7 @@ class PushTaskResponse(BaseModel):
     channels: List[str]
     priority: int = 1
     scheduled_time: datetime
+    next_attempt_at: datetime | None = None
     sent_time: datetime | None = None
     status: PushStatus
     error_message: str | None = None
@@ -6,6 +6,7 @@ Reminder Schemas
 from pydantic import BaseModel, Field, field_validator
 from typing import List
 from datetime import datetime
+from app.core.recurrence import compile_rule
 from app.models.reminder import RecurrenceType, ReminderCategory
 
 
@@ -79,10 +80,27 @@ class ReminderBase(BaseModel):
             if not isinstance(day, int) or not 1 <= day <= 31:
                 raise ValueError("'day' 的值必须在 1-31 之间")
         
-        # CUSTOM 需要指定间隔
+        # LUNAR_YEARLY 需要指定农历月份和日期
+        elif recurrence_type == RecurrenceType.LUNAR_YEARLY:
+            if 'lunar_month' not in v or 'lunar_day' not in v:
+                raise ValueError("农历年周期提醒需要指定 'lunar_month' 和 'lunar_day' 字段（可选 'leap' 表示闰月）")
+            lunar_month = v['lunar_month']
+            lunar_day = v['lunar_day']
+            if not isinstance(lunar_month, int) or not 1 <= lunar_month <= 12:
+                raise ValueError("'lunar_month' 的值必须在 1-12 之间")
+            if not isinstance(lunar_day, int) or not 1 <= lunar_day <= 30:
+                raise ValueError("'lunar_day' 的值必须在 1-30 之间")
+        
+        # CUSTOM 需要指定 RRULE 或间隔
         elif recurrence_type == RecurrenceType.CUSTOM:
+            if 'rrule' in v:
+                try:
+                    compile_rule(RecurrenceType.CUSTOM, v)
+                except ValueError as e:
+                    raise ValueError(f"'rrule' 不是合法的 RFC 5545 RRULE: {e}")
+                return v
             if 'interval' not in v or 'unit' not in v:
-                raise ValueError("自定义周期提醒需要指定 'interval'（间隔数）和 'unit'（单位：days/weeks/months/years）")
+                raise ValueError("自定义周期提醒需要指定 'rrule'（如 FREQ=MONTHLY;BYDAY=2TU），或 'interval'（间隔数）和 'unit'（单位：days/weeks/months/years）")
             interval = v['interval']
             unit = v['unit']
             if not isinstance(interval, int) or interval <= 0:
@@ -132,6 +150,14 @@ class ReminderResponse(ReminderBase):
         from_attributes = True
 
 
+class ReminderOccurrenceResponse(BaseModel):
+    """Reminder occurrence response schema"""
+    reminder_id: int
+    occurs_at: datetime = Field(..., description="触发时间")
+    title: str
+    category: ReminderCategory
+
+
 class VoiceReminderCreate(BaseModel):
     """Voice input reminder creation schema"""
     audio_base64: str = Field(..., description="Base64编码的音频数据")
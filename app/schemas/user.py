@@ -7,6 +7,8 @@ from pydantic import BaseModel, Field, validator
 from datetime import datetime
 import re
 
+from app.core.timezones import get_zone
+
 
 def validate_password_strength(password: str) -> str:
     """
@@ -74,12 +76,20 @@ class UserUpdate(BaseModel):
     nickname: str | None = Field(None, max_length=50, description="昵称")
     avatar_url: str | None = Field(None, max_length=255, description="头像URL")
     settings: dict | None = Field(None, description="用户设置")
+    timezone: str | None = Field(None, max_length=64, description="时区（IANA 名称，如 Asia/Shanghai）")
     
     @validator('nickname')
     def validate_nickname(cls, v):
         if v is not None and len(v.strip()) == 0:
             raise ValueError('昵称不能为空')
         return v.strip() if v else v
+    
+    @validator('timezone')
+    def validate_timezone(cls, v):
+        """验证时区名称"""
+        if v is not None:
+            get_zone(v)
+        return v
 
 
 class ChangePasswordRequest(BaseModel):
@@ -123,6 +133,7 @@ class UserResponse(UserBase):
     id: int
     avatar_url: str | None = None
     settings: dict = {}
+    timezone: str | None = None
     is_active: bool = True
     created_at: datetime
     updated_at: datetime
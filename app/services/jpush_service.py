@@ -1,68 +1,113 @@
 """
 JPush Service - 极光推送服务封装
 官方文档: https://docs.jiguang.cn/jpush/server/push/rest_api_v3_push
+
+提供两种客户端，共享同一套负载构造与响应解析逻辑：
+- AsyncJPushClient: 基于共享连接池的 httpx.AsyncClient（keep-alive，可选 HTTP/2），供调度器使用
+- JPushClient: 同步版本，基于 httpx.Client 连接池，兼容现有同步调用方
+
+单例客户端通过 ProviderGuard 做自适应限流和熔断，极光服务降级时快速失败而不是逐个等待超时。
 """
 
-import requests
+import asyncio
 import json
 from typing import List, Dict, Any
 from datetime import datetime
+import httpx
 from app.core.config import settings
+from app.services.provider_guard import PROVIDER_JPUSH, ProviderGuard, get_provider_guard
 import structlog
 
 logger = structlog.get_logger(__name__)
 
 
-class JPushClient:
+def _http2_enabled() -> bool:
+    """是否启用 HTTP/2（需要安装 h2：pip install "httpx[http2]"）"""
+    if not settings.JPUSH_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("JPUSH_HTTP2 is enabled but h2 is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _http_client_options() -> Dict[str, Any]:
+    """连接池、超时和协议配置（同步/异步客户端共用）"""
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.JPUSH_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.JPUSH_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        "timeout": httpx.Timeout(
+            settings.JPUSH_READ_TIMEOUT,
+            connect=settings.JPUSH_CONNECT_TIMEOUT,
+            pool=settings.JPUSH_CONNECT_TIMEOUT,
+        ),
+        "http2": _http2_enabled(),
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+class _JPushBase:
     """
-    极光推送客户端
+    极光推送客户端公共部分：凭证、负载构造和响应解析
     """
-    
+
     BASE_URL = "https://api.jpush.cn/v3"
-    
-    def __init__(self, app_key: str | None = None, master_secret: str | None = None):
+
+    # 单次推送 audience.alias 最多 1000 个
+    MAX_ALIASES_PER_PUSH = 1000
+
+    VALIDATE_PAYLOAD = {
+        "platform": "all",
+        "audience": "all",
+        "notification": {
+            "alert": "test"
+        }
+    }
+
+    def __init__(
+        self,
+        app_key: str | None = None,
+        master_secret: str | None = None,
+        base_url: str | None = None,
+        guard: ProviderGuard | None = None
+    ):
         """
         初始化极光推送客户端
-        
+
         Args:
             app_key: 应用Key
             master_secret: 主密钥
+            base_url: API地址，默认读取 JPUSH_BASE_URL（压测时可指向本地桩服务）
+            guard: 限流熔断保护，None 表示不限流
         """
+        self.guard = guard
         self.app_key = app_key or settings.JPUSH_APP_KEY
         self.master_secret = master_secret or settings.JPUSH_MASTER_SECRET
-        
+        self.base_url = (base_url or settings.JPUSH_BASE_URL or self.BASE_URL).rstrip("/")
+
         if not self.app_key or not self.master_secret:
             logger.warning("JPush credentials not configured")
             self.auth = None  # 关键修复：无认证
         else:
             self.auth = (self.app_key, self.master_secret)
-    
-    def push_to_user(
-        self,
-        user_id: str,
+
+    @staticmethod
+    def _notification_payload(
+        platform: Any,
+        audience: Any,
         title: str,
         content: str,
-        extras: Dict[str, Any] | None = None,
-        badge: int = 1
+        extras: Dict[str, Any] | None,
+        badge: int
     ) -> Dict[str, Any]:
-        """
-        向指定用户推送消息
-        
-        Args:
-            user_id: 用户ID（别名）
-            title: 通知标题
-            content: 通知内容
-            extras: 额外数据
-            badge: iOS角标数
-            
-        Returns:
-            推送结果
-        """
-        payload = {
-            "platform": ["android", "ios"],
-            "audience": {
-                "alias": [str(user_id)]
-            },
+        """构造通知类推送负载"""
+        return {
+            "platform": platform,
+            "audience": audience,
             "notification": {
                 "alert": content,
                 "android": {
@@ -80,9 +125,184 @@ class JPushClient:
                 "apns_production": not settings.DEBUG  # 生产环境使用生产证书
             }
         }
-        
-        return self._send_push(payload)
-    
+
+    def _user_payload(
+        self,
+        user_id: str,
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None,
+        badge: int = 1
+    ) -> Dict[str, Any]:
+        """向指定用户（别名）推送的负载"""
+        return self._notification_payload(
+            ["android", "ios"], {"alias": [str(user_id)]}, title, content, extras, badge
+        )
+
+    def _aliases_payload(
+        self,
+        aliases: List[str],
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None,
+        badge: int = 1
+    ) -> Dict[str, Any]:
+        """向多个别名推送同一条通知的负载"""
+        if not aliases:
+            raise ValueError("aliases must not be empty")
+        if len(aliases) > self.MAX_ALIASES_PER_PUSH:
+            raise ValueError(f"At most {self.MAX_ALIASES_PER_PUSH} aliases per push, got {len(aliases)}")
+        return self._notification_payload(
+            ["android", "ios"], {"alias": [str(a) for a in aliases]}, title, content, extras, badge
+        )
+
+    def _all_payload(self, title: str, content: str, extras: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """广播负载"""
+        return self._notification_payload("all", "all", title, content, extras, 1)
+
+    def _tags_payload(
+        self,
+        tags: List[str],
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None
+    ) -> Dict[str, Any]:
+        """向指定标签推送的负载"""
+        return self._notification_payload(
+            ["android", "ios"], {"tag": tags}, title, content, extras, 1
+        )
+
+    @staticmethod
+    def _response_body(response: httpx.Response) -> Dict[str, Any]:
+        """解析响应体，网关错误等非JSON响应返回空字典"""
+        try:
+            body = response.json()
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    def _parse_push_response(self, response: httpx.Response) -> Dict[str, Any]:
+        """把推送接口响应转换为统一的结果字典"""
+        result = self._response_body(response)
+
+        if response.status_code == 200:
+            logger.info(f"Push sent successfully: {result}")
+            return {
+                "success": True,
+                "msg_id": result.get("msg_id"),
+                "sendno": result.get("sendno"),
+                "response": result
+            }
+
+        logger.error(f"Push failed: {response.status_code} - {result}")
+        return {
+            "success": False,
+            "error": result.get("error", {}).get("message", "Unknown error"),
+            "error_code": result.get("error", {}).get("code"),
+            "status_code": response.status_code,
+            "response": result
+        }
+
+    def _parse_alias_response(self, response: httpx.Response) -> Dict[str, Any]:
+        """解析设置别名接口响应"""
+        if response.status_code == 200:
+            return {"success": True}
+        result = self._response_body(response)
+        return {
+            "success": False,
+            "error": result.get("error", {}).get("message", "Unknown error")
+        }
+
+    @staticmethod
+    def _push_exception_result(e: Exception) -> Dict[str, Any]:
+        """推送请求异常转换为失败结果"""
+        if isinstance(e, httpx.HTTPError):
+            logger.error(f"Push request failed: {e}")
+            return {
+                "success": False,
+                "error": str(e) or e.__class__.__name__,
+                "error_code": "NETWORK_ERROR"
+            }
+        logger.error(f"Unexpected error during push: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "error_code": "UNKNOWN_ERROR"
+        }
+
+    def _record_guard(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """把推送结果反馈给限流熔断保护"""
+        if self.guard is not None:
+            self.guard.record(self.guard.classify_push_result(result))
+        return result
+
+    @staticmethod
+    def _log_payload(payload: Dict[str, Any]) -> None:
+        logger.debug(f"Sending push to JPush: {json.dumps(payload, ensure_ascii=False)}")
+
+
+class JPushClient(_JPushBase):
+    """
+    极光推送客户端（同步）
+    使用进程内共享的 httpx.Client 连接池，避免每次推送重新建立 TCP/TLS 连接
+    """
+
+    def __init__(
+        self,
+        app_key: str | None = None,
+        master_secret: str | None = None,
+        base_url: str | None = None,
+        guard: ProviderGuard | None = None
+    ):
+        super().__init__(app_key, master_secret, base_url, guard)
+        self._http = httpx.Client(auth=self.auth, **_http_client_options())
+
+    def push_to_user(
+        self,
+        user_id: str,
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None,
+        badge: int = 1
+    ) -> Dict[str, Any]:
+        """
+        向指定用户推送消息
+
+        Args:
+            user_id: 用户ID（别名）
+            title: 通知标题
+            content: 通知内容
+            extras: 额外数据
+            badge: iOS角标数
+
+        Returns:
+            推送结果
+        """
+        return self._send_push(self._user_payload(user_id, title, content, extras, badge))
+
+    def push_to_aliases(
+        self,
+        aliases: List[str],
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None,
+        badge: int = 1
+    ) -> Dict[str, Any]:
+        """
+        向多个用户（别名）推送同一条通知，一次请求最多 MAX_ALIASES_PER_PUSH 个别名
+
+        Args:
+            aliases: 用户ID（别名）列表
+            title: 通知标题
+            content: 通知内容
+            extras: 额外数据
+            badge: iOS角标数
+
+        Returns:
+            推送结果（整批共用一个 msg_id）
+        """
+        return self._send_push(self._aliases_payload(aliases, title, content, extras, badge))
+
     def push_to_all(
         self,
         title: str,
@@ -91,38 +311,17 @@ class JPushClient:
     ) -> Dict[str, Any]:
         """
         向所有用户推送消息（广播）
-        
+
         Args:
             title: 通知标题
             content: 通知内容
             extras: 额外数据
-            
+
         Returns:
             推送结果
         """
-        payload = {
-            "platform": "all",
-            "audience": "all",
-            "notification": {
-                "alert": content,
-                "android": {
-                    "alert": content,
-                    "title": title,
-                    "extras": extras or {}
-                },
-                "ios": {
-                    "alert": content,
-                    "badge": 1,
-                    "extras": extras or {}
-                }
-            },
-            "options": {
-                "apns_production": not settings.DEBUG
-            }
-        }
-        
-        return self._send_push(payload)
-    
+        return self._send_push(self._all_payload(title, content, extras))
+
     def push_to_tags(
         self,
         tags: List[str],
@@ -132,174 +331,190 @@ class JPushClient:
     ) -> Dict[str, Any]:
         """
         向指定标签的用户推送消息
-        
+
         Args:
             tags: 标签列表
             title: 通知标题
             content: 通知内容
             extras: 额外数据
-            
+
         Returns:
             推送结果
         """
-        payload = {
-            "platform": ["android", "ios"],
-            "audience": {
-                "tag": tags
-            },
-            "notification": {
-                "alert": content,
-                "android": {
-                    "alert": content,
-                    "title": title,
-                    "extras": extras or {}
-                },
-                "ios": {
-                    "alert": content,
-                    "badge": 1,
-                    "extras": extras or {}
-                }
-            },
-            "options": {
-                "apns_production": not settings.DEBUG
-            }
-        }
-        
-        return self._send_push(payload)
-    
+        return self._send_push(self._tags_payload(tags, title, content, extras))
+
     def _send_push(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         发送推送请求
-        
+
         Args:
             payload: 推送负载
-            
+
         Returns:
-            推送结果
+            推送结果，熔断或没有令牌时 error_code 为 CIRCUIT_OPEN / PROVIDER_THROTTLED
         """
-        url = f"{self.BASE_URL}/push"
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
+        if self.guard is not None:
+            rejection = self.guard.before_call_nowait()
+            if rejection is not None:
+                return rejection
         try:
-            logger.info(f"Sending push to JPush: {json.dumps(payload, ensure_ascii=False)}")
-            
-            response = requests.post(
-                url,
-                auth=self.auth,
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
-            
-            result = response.json()
-            
-            if response.status_code == 200:
-                logger.info(f"Push sent successfully: {result}")
-                return {
-                    "success": True,
-                    "msg_id": result.get("msg_id"),
-                    "sendno": result.get("sendno"),
-                    "response": result
-                }
-            else:
-                logger.error(f"Push failed: {response.status_code} - {result}")
-                return {
-                    "success": False,
-                    "error": result.get("error", {}).get("message", "Unknown error"),
-                    "error_code": result.get("error", {}).get("code"),
-                    "response": result
-                }
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Push request failed: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "error_code": "NETWORK_ERROR"
-            }
+            self._log_payload(payload)
+            response = self._http.post(f"{self.base_url}/push", json=payload)
+            return self._record_guard(self._parse_push_response(response))
         except Exception as e:
-            logger.error(f"Unexpected error during push: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "error_code": "UNKNOWN_ERROR"
-            }
-    
+            return self._record_guard(self._push_exception_result(e))
+
     def set_alias(self, registration_id: str, alias: str) -> Dict[str, Any]:
         """
         设置设备别名（用户ID）
-        
+
         Args:
             registration_id: 设备的注册ID
             alias: 别名（通常是用户ID）
-            
+
         Returns:
             设置结果
         """
-        url = f"{self.BASE_URL}/devices/{registration_id}"
-        payload = {
-            "alias": alias
-        }
-        
         try:
-            response = requests.post(
-                url,
-                auth=self.auth,
-                json=payload,
-                timeout=10
+            response = self._http.post(
+                f"{self.base_url}/devices/{registration_id}",
+                json={"alias": alias}
             )
-            
-            if response.status_code == 200:
-                return {"success": True}
-            else:
-                result = response.json()
-                return {
-                    "success": False,
-                    "error": result.get("error", {}).get("message", "Unknown error")
-                }
+            return self._parse_alias_response(response)
         except Exception as e:
             logger.error(f"Set alias failed: {e}")
             return {
                 "success": False,
                 "error": str(e)
             }
-    
+
     def validate_credentials(self) -> bool:
         """
         验证推送凭证是否有效
-        
+
         Returns:
             是否有效
         """
         if not self.app_key or not self.master_secret:
             return False
-        
-        # 尝试获取应用信息来验证凭证
-        url = f"{self.BASE_URL}/push/validate"
-        
+
         try:
-            response = requests.post(
-                url,
-                auth=self.auth,
-                json={
-                    "platform": "all",
-                    "audience": "all",
-                    "notification": {
-                        "alert": "test"
-                    }
-                },
-                timeout=10
+            response = self._http.post(f"{self.base_url}/push/validate", json=self.VALIDATE_PAYLOAD)
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        """关闭连接池"""
+        self._http.close()
+
+
+class AsyncJPushClient(_JPushBase):
+    """
+    极光推送客户端（异步）
+    所有请求复用同一个 httpx.AsyncClient 连接池（keep-alive，可选 HTTP/2），
+    连接/读取超时分别由 JPUSH_CONNECT_TIMEOUT / JPUSH_READ_TIMEOUT 控制
+    """
+
+    def __init__(
+        self,
+        app_key: str | None = None,
+        master_secret: str | None = None,
+        base_url: str | None = None,
+        guard: ProviderGuard | None = None
+    ):
+        super().__init__(app_key, master_secret, base_url, guard)
+        self._http = httpx.AsyncClient(auth=self.auth, **_http_client_options())
+
+    async def push_to_user(
+        self,
+        user_id: str,
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None,
+        badge: int = 1
+    ) -> Dict[str, Any]:
+        """向指定用户推送消息，参数同 JPushClient.push_to_user"""
+        return await self._send_push(self._user_payload(user_id, title, content, extras, badge))
+
+    async def push_to_aliases(
+        self,
+        aliases: List[str],
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None,
+        badge: int = 1
+    ) -> Dict[str, Any]:
+        """向多个用户（别名）推送同一条通知，参数同 JPushClient.push_to_aliases"""
+        return await self._send_push(self._aliases_payload(aliases, title, content, extras, badge))
+
+    async def push_to_all(
+        self,
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None
+    ) -> Dict[str, Any]:
+        """向所有用户推送消息（广播）"""
+        return await self._send_push(self._all_payload(title, content, extras))
+
+    async def push_to_tags(
+        self,
+        tags: List[str],
+        title: str,
+        content: str,
+        extras: Dict[str, Any] | None = None
+    ) -> Dict[str, Any]:
+        """向指定标签的用户推送消息"""
+        return await self._send_push(self._tags_payload(tags, title, content, extras))
+
+    async def _send_push(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """发送推送请求（没有令牌时最多等待 PROVIDER_GUARD_MAX_WAIT 秒，熔断时立即返回）"""
+        if self.guard is not None:
+            rejection = await self.guard.before_call()
+            if rejection is not None:
+                return rejection
+        try:
+            self._log_payload(payload)
+            response = await self._http.post(f"{self.base_url}/push", json=payload)
+            return self._record_guard(self._parse_push_response(response))
+        except Exception as e:
+            return self._record_guard(self._push_exception_result(e))
+
+    async def set_alias(self, registration_id: str, alias: str) -> Dict[str, Any]:
+        """设置设备别名（用户ID）"""
+        try:
+            response = await self._http.post(
+                f"{self.base_url}/devices/{registration_id}",
+                json={"alias": alias}
             )
-            
+            return self._parse_alias_response(response)
+        except Exception as e:
+            logger.error(f"Set alias failed: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def validate_credentials(self) -> bool:
+        """验证推送凭证是否有效"""
+        if not self.app_key or not self.master_secret:
+            return False
+
+        try:
+            response = await self._http.post(f"{self.base_url}/push/validate", json=self.VALIDATE_PAYLOAD)
             return response.status_code == 200
         except Exception:
             return False
 
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        await self._http.aclose()
+
 
 # 单例客户端
 _jpush_client: JPushClient | None = None
+# 异步客户端的连接池绑定在创建它的事件循环上，每个事件循环一个，关闭时逐个关闭
+_async_jpush_clients: Dict[asyncio.AbstractEventLoop, AsyncJPushClient] = {}
 
 
 def get_jpush_client() -> JPushClient:
@@ -308,10 +523,62 @@ def get_jpush_client() -> JPushClient:
     """
     global _jpush_client
     if _jpush_client is None:
-        _jpush_client = JPushClient()
+        _jpush_client = JPushClient(guard=get_provider_guard(PROVIDER_JPUSH))
     return _jpush_client
 
 
+def get_async_jpush_client() -> AsyncJPushClient:
+    """
+    获取当前事件循环的异步极光推送客户端
+    连接池绑定在创建它的事件循环上，每个事件循环各自缓存一个，close_jpush_clients 统一关闭
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_jpush_clients.get(loop)
+    if client is None:
+        client = _async_jpush_clients[loop] = AsyncJPushClient(guard=get_provider_guard(PROVIDER_JPUSH))
+    return client
+
+
+async def close_jpush_clients() -> None:
+    """
+    关闭推送客户端连接池（应用关闭时调用）
+
+    其他事件循环的客户端：循环仍在其他线程运行时在该循环中关闭，已停止的循环在当前循环中尽量关闭
+    """
+    global _jpush_client
+    current = asyncio.get_running_loop()
+    while _async_jpush_clients:
+        loop, client = _async_jpush_clients.popitem()
+        try:
+            if loop is not current and loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            else:
+                await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing JPush client of another event loop: {e}")
+    if _jpush_client is not None:
+        _jpush_client.close()
+        _jpush_client = None
+
+
+def _reminder_extras(reminder_id: int) -> Dict[str, Any]:
+    """提醒通知携带的额外数据"""
+    return {
+        "reminder_id": reminder_id,
+        "type": "reminder",
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def _disabled_result() -> Dict[str, Any]:
+    logger.info("JPush is disabled, skip push")
+    return {
+        "success": False,
+        "error": "JPush is disabled",
+        "error_code": "DISABLED"
+    }
+
+
 # 便捷函数
 def push_reminder_notification(
     user_id: int,
@@ -321,35 +588,112 @@ def push_reminder_notification(
 ) -> Dict[str, Any]:
     """
     推送提醒通知
-    
+
     Args:
         user_id: 用户ID
         reminder_id: 提醒ID
         title: 标题
         content: 内容
-        
+
     Returns:
         推送结果
     """
     if not settings.JPUSH_ENABLED:
-        logger.info("JPush is disabled, skip push")
-        return {
-            "success": False,
-            "error": "JPush is disabled",
-            "error_code": "DISABLED"
-        }
-    
-    client = get_jpush_client()
-    
+        return _disabled_result()
+
+    return get_jpush_client().push_to_user(
+        user_id=str(user_id),
+        title=title,
+        content=content,
+        extras=_reminder_extras(reminder_id)
+    )
+
+
+async def push_reminder_notification_async(
+    user_id: int,
+    reminder_id: int,
+    title: str,
+    content: str
+) -> Dict[str, Any]:
+    """
+    推送提醒通知（异步版本，参数与返回值同 push_reminder_notification）
+    """
+    if not settings.JPUSH_ENABLED:
+        return _disabled_result()
+
+    return await get_async_jpush_client().push_to_user(
+        user_id=str(user_id),
+        title=title,
+        content=content,
+        extras=_reminder_extras(reminder_id)
+    )
+
+
+async def push_digest_notification_async(
+    user_id: int,
+    reminder_ids: List[int],
+    title: str,
+    content: str
+) -> Dict[str, Any]:
+    """
+    向单个用户推送合并后的摘要通知（同一时间段内的多条提醒合为一条）
+
+    客户端收到 type=reminder_digest 时按 reminder_ids 展示提醒列表
+
+    Args:
+        user_id: 用户ID
+        reminder_ids: 摘要包含的提醒ID
+        title: 标题
+        content: 内容
+
+    Returns:
+        推送结果
+    """
+    if not settings.JPUSH_ENABLED:
+        return _disabled_result()
+
     extras = {
-        "reminder_id": reminder_id,
-        "type": "reminder",
+        "type": "reminder_digest",
+        "reminder_ids": reminder_ids,
         "timestamp": datetime.now().isoformat()
     }
-    
-    return client.push_to_user(
+    return await get_async_jpush_client().push_to_user(
         user_id=str(user_id),
         title=title,
         content=content,
         extras=extras
     )
+
+
+async def push_batch_notification_async(
+    user_ids: List[int],
+    title: str,
+    content: str
+) -> Dict[str, Any]:
+    """
+    向多个用户推送同一条提醒通知（多别名合并推送）
+
+    合并推送的通知对应多个提醒，额外数据不再携带单个 reminder_id，
+    客户端收到 type=reminder_batch 时打开提醒列表
+
+    Args:
+        user_ids: 用户ID列表（不超过 MAX_ALIASES_PER_PUSH 个）
+        title: 标题
+        content: 内容
+
+    Returns:
+        推送结果
+    """
+    if not settings.JPUSH_ENABLED:
+        return _disabled_result()
+
+    extras = {
+        "type": "reminder_batch",
+        "timestamp": datetime.now().isoformat()
+    }
+    return await get_async_jpush_client().push_to_aliases(
+        aliases=[str(user_id) for user_id in user_ids],
+        title=title,
+        content=content,
+        extras=extras
+    )
@@ -4,11 +4,14 @@ NLU (Natural Language Understanding) Service
 """
 import json
 from typing import Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 import httpx
 import structlog
 
 from app.core.config import settings
+from app.core.recurrence import compile_rule
+from app.core.timezones import get_zone, local_now
+from app.models.reminder import RecurrenceType
 
 logger = structlog.get_logger(__name__)
 
@@ -30,12 +33,15 @@ class DeepSeekNLU:
     "title": "提醒标题（简洁描述）",
     "description": "详细描述（可选）",
     "category": "分类（rent/health/pet/finance/document/memorial/other）",
-    "recurrence_type": "周期类型（once/daily/weekly/monthly/yearly）",
+    "recurrence_type": "周期类型（once/daily/weekly/monthly/yearly/lunar_yearly）",
     "recurrence_config": {
         "interval": 1,  // 间隔（每N天/周/月/年）
         "weekdays": [],  // 周几（weekly时使用，1-7）
         "monthday": null,  // 每月几号（monthly时使用）
-        "specific_date": null  // 具体日期（once/yearly时使用，YYYY-MM-DD）
+        "specific_date": null,  // 具体日期（once/yearly时使用，YYYY-MM-DD）
+        "lunar_month": null,  // 农历月份（lunar_yearly时使用，1-12）
+        "lunar_day": null,  // 农历日期（lunar_yearly时使用，1-30）
+        "leap": false  // 是否闰月（lunar_yearly时使用）
     },
     "first_remind_time": "首次提醒时间（YYYY-MM-DD HH:MM:SS）",
     "advance_minutes": 0,  // 提前提醒分钟数
@@ -58,6 +64,7 @@ class DeepSeekNLU:
 - weekly: 每周（需指定weekdays）
 - monthly: 每月（需指定monthday）
 - yearly: 每年（需指定specific_date）
+- lunar_yearly: 每年农历（需指定lunar_month和lunar_day，农历生日、忌日、传统节日等）
 
 时间解析规则：
 - "今天下午3点" -> 今天15:00
@@ -65,6 +72,8 @@ class DeepSeekNLU:
 - "每周一" -> weekly, weekdays=[1]
 - "每月5号" -> monthly, monthday=5
 - "每年3月8日" -> yearly, specific_date="YYYY-03-08"
+- "每年农历八月十五" -> lunar_yearly, lunar_month=8, lunar_day=15
+- "奶奶忌日闰四月初三" -> lunar_yearly, lunar_month=4, lunar_day=3, leap=true
 - "3天后" -> 3天后的当前时间
 
 注意：
@@ -77,13 +86,19 @@ class DeepSeekNLU:
         self.api_url = settings.DEEPSEEK_API_URL
         self.model = settings.DEEPSEEK_MODEL
     
-    async def parse_intent(self, user_input: str, context: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    async def parse_intent(
+        self,
+        user_input: str,
+        context: Dict[str, Any] | None = None,
+        now: datetime | None = None
+    ) -> Dict[str, Any]:
         """
         解析用户意图
         
         Args:
             user_input: 用户输入的自然语言
             context: 上下文信息（用户历史习惯等）
+            now: 用户时区的当前时间（默认服务器本地时间）
             
         Returns:
             解析后的结构化数据
@@ -94,7 +109,7 @@ class DeepSeekNLU:
         # 构建上下文提示
         context_prompt = ""
         if context:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            current_time = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
             context_prompt = f"\n当前时间：{current_time}"
             if context.get("user_timezone"):
                 context_prompt += f"\n用户时区：{context['user_timezone']}"
@@ -222,16 +237,22 @@ class NLUService:
             )
             text = text[:500]  # 截断过长文本
         
+        # 相对时间（"明天"、"下周一"）按用户时区的当前时间理解
+        try:
+            now = local_now(get_zone((user_context or {}).get("user_timezone")))
+        except ValueError as e:
+            raise NLUError(str(e))
+        
         # 调用 DeepSeek 解析
-        parsed_data = await self.deepseek.parse_intent(text, user_context)
+        parsed_data = await self.deepseek.parse_intent(text, user_context, now)
         
         # 后处理：验证和规范化
-        validated_data = self._validate_and_normalize(parsed_data)
+        validated_data = self._validate_and_normalize(parsed_data, now)
         
         return validated_data
     
-    def _validate_and_normalize(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """验证和规范化解析结果"""
+    def _validate_and_normalize(self, data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """验证和规范化解析结果（now 为用户时区的当前时间）"""
         # 必填字段检查
         if not data.get("title"):
             raise NLUError("无法提取提醒标题")
@@ -242,7 +263,7 @@ class NLUService:
             data["category"] = "other"
         
         # 周期类型验证
-        valid_recurrence = ["once", "daily", "weekly", "monthly", "yearly"]
+        valid_recurrence = ["once", "daily", "weekly", "monthly", "yearly", "lunar_yearly"]
         if data.get("recurrence_type") not in valid_recurrence:
             data["recurrence_type"] = "once"
         
@@ -254,7 +275,11 @@ class NLUService:
         # 时间验证
         if not data.get("first_remind_time"):
             # 默认为当前时间
-            data["first_remind_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            data["first_remind_time"] = now.strftime("%Y-%m-%d %H:%M:%S")
+        
+        # 农历周期的首次提醒时间按换算表计算，不依赖模型换算公历
+        if data["recurrence_type"] == "lunar_yearly":
+            data["first_remind_time"] = self._first_lunar_remind_time(data, now)
         
         # 提前提醒分钟数验证
         if not isinstance(data.get("advance_minutes"), int) or data["advance_minutes"] < 0:
@@ -262,6 +287,33 @@ class NLUService:
         
         return data
 
+    
+    def _first_lunar_remind_time(self, data: Dict[str, Any], now: datetime) -> str:
+        """
+        计算农历周期提醒的首次提醒时间：今天及之后第一次到达该农历日期，时刻沿用模型给出的时间
+        
+        Raises:
+            NLUError: 农历日期缺失或非法
+        """
+        config = data.get("recurrence_config") or {}
+        config = {key: config[key] for key in ("lunar_month", "lunar_day", "leap") if config.get(key) is not None}
+        data["recurrence_config"] = config
+        try:
+            moment = datetime.strptime(data["first_remind_time"], "%Y-%m-%d %H:%M:%S")
+            moment = now.replace(hour=moment.hour, minute=moment.minute, second=0, microsecond=0)
+        except (TypeError, ValueError):
+            moment = now.replace(second=0, microsecond=0)
+        if moment < now:
+            moment += timedelta(days=1)
+        
+        try:
+            first_time = compile_rule(RecurrenceType.LUNAR_YEARLY, config).first_lunar_on_or_after(moment)
+        except ValueError as e:
+            raise NLUError(f"无法识别农历日期: {e}")
+        if first_time is None:
+            raise NLUError("农历日期超出支持范围（1900-2100年）")
+        return first_time.strftime("%Y-%m-%d %H:%M:%S")
+
 
 # 全局实例
 _nlu_service: NLUService | None = None
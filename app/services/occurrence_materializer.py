@@ -0,0 +1,166 @@
+"""
+Occurrence Materializer - 提醒触发时间物化
+后台任务把启用的提醒在未来 REMINDER_OCCURRENCE_HORIZON_DAYS 天内的触发时间写入 reminder_occurrences，
+日历、预览和推送任务生成按时间范围走索引读取，不再逐个提醒做周期计算。
+触发时间是用户时区的墙上时间，窗口按每个用户时区的当前时间计算。
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.recurrence import compile_rule
+from app.core.timezones import from_epoch, get_zone, to_epoch, to_wall_time
+from app.repositories.reminder_occurrence_repository import ReminderOccurrenceRepository
+from app.repositories.user_repository import UserRepository
+from app.services.periodic_job import PeriodicJob
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def plan_extension(
+    rows: Iterable[Any],
+    zones: Dict[int, ZoneInfo],
+    now: datetime,
+    horizon: timedelta
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    计算一批提醒需要新增的触发时间
+
+    每个提醒从已物化的截止时间（未物化时从用户时区的当前时间）展开到用户当前时间加 horizon，
+    只计算新增的部分；配置错误的提醒记录日志后跳过，不推进截止时间。
+
+    Args:
+        rows: 提醒行（需要 id、user_id、recurrence_type、recurrence_config、next_remind_time、occurrences_until）
+        zones: {user_id: 用户时区}，缺失时按默认时区
+        now: 当前时刻（不带时区信息时按服务器本地时间解释）
+        horizon: 物化窗口长度
+
+    Returns:
+        (新增触发 [{"reminder_id", "user_id", "occurs_at"}], 截止时间 [{"id", "until"}])
+    """
+    occurrences: List[Dict[str, Any]] = []
+    watermarks: List[Dict[str, Any]] = []
+    for row in rows:
+        local_now = to_wall_time(now, zones.get(row.user_id) or get_zone())
+        horizon_end = local_now + horizon
+        window_start = row.occurrences_until or local_now
+        try:
+            rule = compile_rule(row.recurrence_type, row.recurrence_config or {})
+            times = rule.expand(row.next_remind_time, window_start, horizon_end)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skip materializing reminder {row.id} with config {row.recurrence_config}: {e}")
+            continue
+        occurrences.extend({"reminder_id": row.id, "user_id": row.user_id, "occurs_at": t} for t in times)
+        watermarks.append({"id": row.id, "until": horizon_end})
+    return occurrences, watermarks
+
+
+async def extend_occurrences(
+    now: datetime | None = None,
+    horizon_days: int | None = None,
+    batch_size: int | None = None
+) -> Dict[str, int]:
+    """
+    把所有启用提醒的物化窗口扩展到 now + horizon_days，并清理过期记录
+
+    物化截止时间不足半个窗口的提醒才扩展，每个提醒大约每半个窗口写一次，而不是每轮都写；
+    按 id 键集分页逐块读取，每块一条 INSERT ... ON CONFLICT DO NOTHING 加一条
+    UPDATE ... FROM (VALUES ...) 推进截止时间，多个实例同时执行也不会重复写入。
+
+    Args:
+        now: 当前时刻（默认现在；不带时区信息时按服务器本地时间解释）
+        horizon_days: 物化窗口天数（默认取配置）
+        batch_size: 每块提醒数（默认取配置）
+
+    Returns:
+        {"reminders": 扩展的提醒数, "inserted": 新增触发数, "pruned": 清理的过期记录数}
+    """
+    now = now or datetime.now().astimezone()
+    horizon = timedelta(days=horizon_days or settings.REMINDER_OCCURRENCE_HORIZON_DAYS)
+    stats = {"reminders": 0, "inserted": 0, "pruned": 0}
+
+    async with async_session_maker() as db:
+        repo = ReminderOccurrenceRepository(db)
+        user_repo = UserRepository(db)
+        chunk_size = batch_size or settings.REMINDER_OCCURRENCE_BATCH_SIZE
+        async for rows in repo.iter_reminders_to_extend(
+            now=to_epoch(now), refill=horizon / 2, chunk_size=chunk_size
+        ):
+            zones = await user_repo.get_timezones([row.user_id for row in rows])
+            occurrences, watermarks = plan_extension(rows, zones, now, horizon)
+            stats["reminders"] += len(watermarks)
+            stats["inserted"] += await repo.bulk_extend(occurrences, watermarks)
+        # 保留期按天计，与用户时区相差的几个小时不影响清理
+        retention = timedelta(days=settings.REMINDER_OCCURRENCE_RETENTION_DAYS)
+        stats["pruned"] = await repo.prune(from_epoch(to_epoch(now)) - retention)
+
+    if stats["reminders"] or stats["pruned"]:
+        logger.info(
+            f"Extended reminder occurrences: {stats['reminders']} reminders, "
+            f"{stats['inserted']} inserted, {stats['pruned']} pruned"
+        )
+    return stats
+
+
+async def get_user_occurrences(
+    db: AsyncSession,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    limit: int = 1000
+) -> List[Dict[str, Any]]:
+    """
+    读取用户在 [start, end) 内的全部触发时间
+
+    物化表按索引范围读取；新建、配置刚变更或窗口尚未覆盖到 end 的提醒，
+    未覆盖的部分即时展开补齐，结果与全部即时计算一致。
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        start: 开始时间（包含）
+        end: 结束时间（不包含）
+        limit: 最多返回条数
+
+    Returns:
+        [{"reminder_id", "occurs_at", "title", "category"}]，按触发时间排序
+    """
+    repo = ReminderOccurrenceRepository(db)
+    result = {
+        (row.reminder_id, row.occurs_at): {
+            "reminder_id": row.reminder_id, "occurs_at": row.occurs_at, "title": row.title, "category": row.category
+        }
+        for row in await repo.get_range(start, end, user_id=user_id, limit=limit)
+    }
+    for reminder in await repo.get_unmaterialized(user_id, end):
+        window_start = max(start, reminder.occurrences_until) if reminder.occurrences_until else start
+        try:
+            rule = compile_rule(reminder.recurrence_type, reminder.recurrence_config or {})
+            times = rule.expand(reminder.next_remind_time, window_start, end, limit)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Failed to expand reminder {reminder.id} with config {reminder.recurrence_config}: {e}")
+            continue
+        for t in times:
+            result.setdefault((reminder.id, t), {
+                "reminder_id": reminder.id, "occurs_at": t, "title": reminder.title, "category": reminder.category
+            })
+    return sorted(result.values(), key=lambda item: (item["occurs_at"], item["reminder_id"]))[:limit]
+
+
+# 全局物化任务实例
+_occurrence_job: PeriodicJob | None = None
+
+
+def get_occurrence_job() -> PeriodicJob:
+    """获取物化任务单例"""
+    global _occurrence_job
+    if _occurrence_job is None:
+        _occurrence_job = PeriodicJob(
+            "Occurrence materializer", settings.REMINDER_OCCURRENCE_INTERVAL, extend_occurrences
+        )
+    return _occurrence_job
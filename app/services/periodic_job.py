@@ -0,0 +1,61 @@
+"""
+Periodic Job - 周期性后台任务
+按固定间隔在后台执行一个协程，供应用生命周期启动和停止
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class PeriodicJob:
+    """
+    周期性后台任务
+
+    启动后立即执行一次，之后每隔 interval 秒执行一次；单次执行出错只记录日志，不中断循环。
+    """
+
+    def __init__(self, name: str, interval: int, run: Callable[[], Awaitable[Dict[str, Any]]]):
+        """
+        Args:
+            name: 任务名（用于日志）
+            interval: 执行间隔（秒），0 表示不启动
+            run: 每次执行的协程函数，返回本次执行的统计
+        """
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.running = False
+        self.last_run_stats: Dict[str, Any] = {}
+        self._loop_task: asyncio.Task | None = None
+
+    async def start(self):
+        """启动后台循环（间隔为 0 时不启动）"""
+        if self.running or self.interval <= 0:
+            return
+        self.running = True
+        self._loop_task = asyncio.create_task(self._run_loop())
+        logger.info(f"{self.name} started, interval {self.interval}s")
+
+    async def _run_loop(self):
+        """执行循环"""
+        while self.running:
+            try:
+                self.last_run_stats = await self.run()
+            except Exception as e:
+                logger.error(f"Error in {self.name}: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        """停止后台循环"""
+        self.running = False
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        logger.info(f"{self.name} stopped")
@@ -0,0 +1,385 @@
+"""
+Provider Guard - 外部服务调用保护
+为极光推送、阿里云短信等外部服务提供自适应限流和熔断
+
+- AdaptiveTokenBucket: 令牌桶，遇到 429/5xx 时速率减半，成功时线性恢复（AIMD）
+- CircuitBreaker: 连续失败达到阈值后熔断，冷却后进入半开状态放行探测请求，探测成功即恢复
+- ProviderGuard: 组合两者，调用前取令牌/检查熔断，调用后按结果反馈，并输出监控指标
+
+服务降级时调用方快速失败，不再每次都耗满超时；调度器据此暂停认领任务。
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# 调用结果反馈类型
+OUTCOME_SUCCESS = "success"      # 服务正常（含业务错误，如目标用户不存在）
+OUTCOME_THROTTLED = "throttled"  # 被服务端限流（429 / 频率超限）
+OUTCOME_FAILURE = "failure"      # 服务故障（5xx / 网络错误 / 超时）
+
+# 本地拒绝的错误码
+ERROR_CIRCUIT_OPEN = "CIRCUIT_OPEN"
+ERROR_PROVIDER_THROTTLED = "PROVIDER_THROTTLED"
+
+
+class AdaptiveTokenBucket:
+    """
+    自适应令牌桶
+
+    桶容量为 1 秒的令牌量；被限流或服务故障时速率乘以 decrease_factor，
+    每次成功速率增加 max_rate * increase_ratio，直到 max_rate。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        max_rate: float,
+        min_rate: float = 1.0,
+        decrease_factor: float = 0.5,
+        increase_ratio: float = 0.02,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            rate: 初始速率（次/秒）
+            max_rate: 速率上限
+            min_rate: 速率下限
+            decrease_factor: 被限流或失败时的速率乘数
+            increase_ratio: 每次成功增加的速率（占上限的比例）
+            clock: 单调时钟（测试时可替换）
+        """
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max(self.min_rate, min(rate, max_rate))
+        self.decrease_factor = decrease_factor
+        self.increase_step = max_rate * increase_ratio
+        self._clock = clock
+        self.tokens = self.rate
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.rate, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        """取一个令牌，没有可用令牌时返回 False"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """距离下一个令牌可用的秒数"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self) -> None:
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.tokens = min(self.tokens, self.rate)
+
+
+class CircuitBreaker:
+    """
+    熔断器（closed -> open -> half_open -> closed）
+
+    - closed: 正常放行，连续失败达到 failure_threshold 次后熔断
+    - open: 拒绝所有请求，recovery_timeout 秒后进入半开
+    - half_open: 最多放行 half_open_max_calls 个探测请求，成功则恢复，失败则重新熔断
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.open_count = 0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态（熔断冷却结束时自动转为半开）"""
+        if self._state == self.OPEN and self.retry_after() <= 0:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """熔断剩余秒数，未熔断时为 0"""
+        if self._state != self.OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_timeout - self._clock())
+
+    def allow_request(self) -> bool:
+        """是否放行本次请求（半开状态下会占用一个探测名额）"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info("circuit_breaker_closed")
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probes_in_flight = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self.opened_at = self._clock()
+        self.open_count += 1
+        self._probes_in_flight = 0
+
+
+class ProviderGuard:
+    """
+    单个外部服务的调用保护
+
+    用法:
+        rejection = await guard.before_call()      # 同步调用方使用 before_call_nowait()
+        if rejection:
+            return rejection
+        result = await do_request()
+        guard.record(guard.classify_push_result(result))
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        max_rate: float,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        max_wait: float = 5.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            name: 服务名称（用于日志和监控）
+            rate: 初始速率（次/秒）
+            max_rate: 速率上限（次/秒）
+            failure_threshold: 连续失败多少次熔断
+            recovery_timeout: 熔断冷却时间（秒）
+            max_wait: 异步调用方等待令牌的最长时间（秒）
+            clock: 单调时钟（测试时可替换）
+        """
+        self.name = name
+        self.max_wait = max_wait
+        self.bucket = AdaptiveTokenBucket(rate=rate, max_rate=max_rate, clock=clock)
+        self.breaker = CircuitBreaker(
+            failure_threshold=failure_threshold,
+            recovery_timeout=recovery_timeout,
+            clock=clock
+        )
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0,
+            OUTCOME_SUCCESS: 0,
+            OUTCOME_THROTTLED: 0,
+            OUTCOME_FAILURE: 0,
+            "rejected_circuit_open": 0,
+            "rejected_throttled": 0,
+        }
+
+    @property
+    def available(self) -> bool:
+        """熔断器是否放行（open 状态返回 False）"""
+        with self._lock:
+            return self.breaker.state != CircuitBreaker.OPEN
+
+    def retry_after(self) -> float:
+        """熔断剩余秒数，未熔断时为 0"""
+        with self._lock:
+            return self.breaker.retry_after()
+
+    def _rejection(self, error_code: str, retry_after: float) -> Dict[str, Any]:
+        key = "rejected_circuit_open" if error_code == ERROR_CIRCUIT_OPEN else "rejected_throttled"
+        self.counters[key] += 1
+        return {
+            "success": False,
+            "error": f"{self.name} {'circuit open' if error_code == ERROR_CIRCUIT_OPEN else 'throttled locally'}",
+            "error_code": error_code,
+            "retry_after": round(retry_after, 3),
+        }
+
+    def _try_enter(self) -> tuple[Dict[str, Any] | None, float]:
+        """
+        尝试放行一次调用（需持有锁）
+
+        Returns:
+            (拒绝结果或 None, 需要等待令牌的秒数)
+        """
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return self._rejection(ERROR_CIRCUIT_OPEN, self.breaker.retry_after()), 0.0
+        wait = self.bucket.wait_time()
+        if wait > 0:
+            return None, wait
+        self.bucket.try_acquire()
+        if not self.breaker.allow_request():
+            # 半开状态下已有探测请求在途
+            return self._rejection(ERROR_CIRCUIT_OPEN, self.breaker.recovery_timeout), 0.0
+        self.counters["calls"] += 1
+        return None, 0.0
+
+    def before_call_nowait(self) -> Dict[str, Any] | None:
+        """
+        同步调用前检查：熔断或没有令牌时立即返回拒绝结果
+
+        Returns:
+            None 表示放行，否则为失败结果字典
+        """
+        with self._lock:
+            rejection, wait = self._try_enter()
+            if rejection is None and wait > 0:
+                rejection = self._rejection(ERROR_PROVIDER_THROTTLED, wait)
+            return rejection
+
+    async def before_call(self) -> Dict[str, Any] | None:
+        """
+        异步调用前检查：没有令牌时最多等待 max_wait 秒，熔断时立即拒绝
+
+        Returns:
+            None 表示放行，否则为失败结果字典
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                rejection, wait = self._try_enter()
+                if rejection is not None or wait == 0:
+                    return rejection
+                if waited + wait > self.max_wait:
+                    return self._rejection(ERROR_PROVIDER_THROTTLED, wait)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def record(self, outcome: str) -> None:
+        """
+        反馈一次调用结果
+
+        Args:
+            outcome: OUTCOME_SUCCESS / OUTCOME_THROTTLED / OUTCOME_FAILURE
+        """
+        with self._lock:
+            self.counters[outcome] += 1
+            previous = self.breaker.state
+            if outcome == OUTCOME_SUCCESS:
+                self.bucket.on_success()
+                self.breaker.record_success()
+            elif outcome == OUTCOME_THROTTLED:
+                # 被限流说明服务可用，只降低速率
+                self.bucket.on_throttle()
+                self.breaker.record_success()
+            else:
+                self.bucket.on_throttle()
+                self.breaker.record_failure()
+            state = self.breaker.state
+
+        if state != previous:
+            logger.warning("provider_circuit_state_changed", provider=self.name, previous=previous, state=state)
+
+    @staticmethod
+    def classify_push_result(result: Dict[str, Any]) -> str:
+        """把极光推送结果转换为反馈类型（业务错误不算服务故障）"""
+        if result.get("success"):
+            return OUTCOME_SUCCESS
+        error_code = result.get("error_code")
+        status_code = result.get("status_code")
+        if status_code == 429 or error_code == 2002:
+            return OUTCOME_THROTTLED
+        if error_code in ("NETWORK_ERROR", "UNKNOWN_ERROR", 1000, 1030):
+            return OUTCOME_FAILURE
+        if isinstance(status_code, int) and status_code >= 500:
+            return OUTCOME_FAILURE
+        return OUTCOME_SUCCESS
+
+    def snapshot(self) -> Dict[str, Any]:
+        """监控指标"""
+        with self._lock:
+            return {
+                "provider": self.name,
+                "state": self.breaker.state,
+                "retry_after_seconds": round(self.breaker.retry_after(), 3),
+                "consecutive_failures": self.breaker.consecutive_failures,
+                "circuit_open_count": self.breaker.open_count,
+                "rate_per_sec": round(self.bucket.rate, 3),
+                "max_rate_per_sec": self.bucket.max_rate,
+                "tokens": round(self.bucket.tokens, 3),
+                **self.counters,
+            }
+
+
+# 全局保护实例（每个外部服务一个）
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+PROVIDER_JPUSH = "jpush"
+PROVIDER_ALIYUN_SMS = "aliyun_sms"
+
+
+def _guard_settings(name: str) -> Dict[str, float]:
+    if name == PROVIDER_JPUSH:
+        return {"rate": settings.JPUSH_GUARD_RATE, "max_rate": settings.JPUSH_GUARD_MAX_RATE}
+    if name == PROVIDER_ALIYUN_SMS:
+        return {"rate": settings.SMS_GUARD_RATE, "max_rate": settings.SMS_GUARD_MAX_RATE}
+    raise ValueError(f"Unknown provider: {name}")
+
+
+def get_provider_guard(name: str) -> ProviderGuard:
+    """
+    获取外部服务的保护实例（按名称单例）
+
+    Args:
+        name: PROVIDER_JPUSH / PROVIDER_ALIYUN_SMS
+    """
+    with _guards_lock:
+        if name not in _guards:
+            _guards[name] = ProviderGuard(
+                name=name,
+                failure_threshold=settings.PROVIDER_BREAKER_FAILURE_THRESHOLD,
+                recovery_timeout=settings.PROVIDER_BREAKER_RECOVERY_SECONDS,
+                max_wait=settings.PROVIDER_GUARD_MAX_WAIT,
+                **_guard_settings(name)
+            )
+        return _guards[name]
+
+
+def provider_guard_snapshots() -> List[Dict[str, Any]]:
+    """所有已创建的保护实例的监控指标"""
+    with _guards_lock:
+        guards = list(_guards.values())
+    return [guard.snapshot() for guard in guards]
@@ -0,0 +1,463 @@
+"""
+Push Channels - 多渠道推送管道
+按提醒的 remind_channels 把推送扇出到 app 以外的渠道（短信、微信、电话）
+
+每个渠道一个独立的工作协程池（自己的队列、并发数和速率预算），短信服务变慢只会让短信排队，
+不会拖慢 app 推送和其他渠道；各渠道的推送结果（含 app 推送结果）攒批后批量写入 push_logs。
+"""
+
+import asyncio
+import json
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Collection, Dict, List, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.push_task import PushTask
+from app.repositories.push_log_repository import LOG_STATUS_FAILED, LOG_STATUS_SUCCESS, PushLogRepository
+from app.repositories.push_task_repository import PushTaskRepository
+from app.repositories.user_repository import UserRepository
+from app.services.provider_guard import AdaptiveTokenBucket
+from app.services.push_metrics import (
+    METRIC_FIRE_DELAY,
+    METRIC_PROVIDER_LATENCY,
+    METRIC_QUEUE_DEPTH,
+    PushMetrics,
+    get_push_metrics,
+)
+from app.services.sms_service import SmsService, get_sms_service
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+CHANNEL_APP = "app"
+CHANNEL_SMS = "sms"
+CHANNEL_WECHAT = "wechat"
+CHANNEL_CALL = "call"
+
+ERROR_QUEUE_FULL = "CHANNEL_QUEUE_FULL"
+ERROR_NO_RECIPIENT = "NO_RECIPIENT"
+ERROR_NOT_CONFIGURED = "CHANNEL_NOT_CONFIGURED"
+ERROR_NO_PROVIDER = "CHANNEL_NO_PROVIDER"
+
+
+def fanout_channels(task: PushTask) -> List[str]:
+    """任务需要经多渠道管道推送的渠道（app 以外，去重并保持顺序）"""
+    return [channel for channel in dict.fromkeys(task.channels or []) if channel != CHANNEL_APP]
+
+
+class ChannelProvider(ABC):
+    """渠道推送服务抽象：send 返回与极光推送一致的结果字典（success / error / error_code）"""
+
+    name: str = ""
+
+    @abstractmethod
+    async def send(self, delivery: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送一条渠道推送
+
+        Args:
+            delivery: task_id, reminder_id, user_id, channel, title, content, recipient
+
+        Returns:
+            推送结果
+        """
+
+
+class StubChannelProvider(ChannelProvider):
+    """本地模拟渠道：按设定耗时和失败比例返回结果，不调用外部服务（离线压测用）"""
+
+    def __init__(
+        self,
+        name: str,
+        latency_ms: float | None = None,
+        failure_rate: float | None = None,
+        rng: random.Random | None = None
+    ):
+        """
+        Args:
+            name: 渠道名
+            latency_ms: 单次请求耗时（毫秒），默认读取 PUSH_CHANNEL_STUB_LATENCY_MS
+            failure_rate: 失败比例，默认读取 PUSH_CHANNEL_STUB_FAILURE_RATE
+            rng: 随机数生成器（测试时可固定种子）
+        """
+        self.name = name
+        self.latency_ms = settings.PUSH_CHANNEL_STUB_LATENCY_MS if latency_ms is None else latency_ms
+        self.failure_rate = settings.PUSH_CHANNEL_STUB_FAILURE_RATE if failure_rate is None else failure_rate
+        self.rng = rng or random.Random()
+
+    async def send(self, delivery: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        if self.rng.random() < self.failure_rate:
+            return {"success": False, "error": f"stub {self.name} failure", "error_code": "STUB_FAILURE"}
+        return {"success": True, "msg_id": f"stub-{self.name}-{delivery['task_id']}"}
+
+
+class SmsChannelProvider(ChannelProvider):
+    """短信渠道：用提醒通知模板经 SmsService 发送（同步 SDK 放到线程池执行，不阻塞事件循环）"""
+
+    name = CHANNEL_SMS
+
+    def __init__(self, service: SmsService | None = None):
+        self._service = service
+
+    @property
+    def service(self) -> SmsService:
+        """首次发送时才创建短信服务（加载第三方 SDK）"""
+        if self._service is None:
+            self._service = get_sms_service()
+        return self._service
+
+    async def send(self, delivery: Dict[str, Any]) -> Dict[str, Any]:
+        if not settings.SMS_REMINDER_TEMPLATE_CODE or not settings.SMS_SIGN_NAME:
+            return {"success": False, "error": "SMS reminder template not configured", "error_code": ERROR_NOT_CONFIGURED}
+        if not delivery.get("recipient"):
+            return {"success": False, "error": "User has no phone number", "error_code": ERROR_NO_RECIPIENT}
+        ok = await asyncio.to_thread(
+            self.service.send_sms,
+            delivery["recipient"],
+            settings.SMS_SIGN_NAME,
+            settings.SMS_REMINDER_TEMPLATE_CODE,
+            json.dumps({"title": delivery["title"]}, ensure_ascii=False)
+        )
+        return {"success": True} if ok else {"success": False, "error": "SMS send failed"}
+
+
+class ChannelWorkerPool:
+    """
+    单个渠道的工作协程池
+
+    concurrency 个协程从有界队列取推送，每次发送前从令牌桶取令牌（速率预算）；
+    队列满时不阻塞提交方，直接记为失败。每次发送记录推送服务延迟，成功的推送记录触发延迟。
+    """
+
+    def __init__(
+        self,
+        provider: ChannelProvider,
+        concurrency: int,
+        rate: float,
+        on_result: Callable[[Dict[str, Any], Dict[str, Any]], None],
+        queue_size: int | None = None,
+        metrics: PushMetrics | None = None
+    ):
+        """
+        Args:
+            provider: 渠道推送服务
+            concurrency: 工作协程数
+            rate: 每秒最多发送次数
+            on_result: 每条推送完成后的回调 (delivery, result)
+            queue_size: 队列上限，默认读取 PUSH_CHANNEL_QUEUE_SIZE
+            metrics: 推送链路指标，默认使用全局实例
+        """
+        self.provider = provider
+        self.channel = provider.name
+        self.concurrency = max(1, concurrency)
+        self.bucket = AdaptiveTokenBucket(rate=rate, max_rate=rate, min_rate=rate)
+        self.on_result = on_result
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.PUSH_CHANNEL_QUEUE_SIZE)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.metrics = metrics or get_push_metrics()
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """等待队列中的推送发完（最长 timeout 秒），然后停止工作协程"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Channel {self.channel} stopped with {self.queue.qsize()} deliveries pending")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, delivery: Dict[str, Any]) -> bool:
+        """提交一条推送，队列满时记为失败并返回 False"""
+        try:
+            self.queue.put_nowait(delivery)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.on_result(delivery, {"success": False, "error": "Channel queue full", "error_code": ERROR_QUEUE_FULL})
+            return False
+
+    async def _work(self) -> None:
+        while True:
+            delivery = await self.queue.get()
+            try:
+                while not self.bucket.try_acquire():
+                    await asyncio.sleep(self.bucket.wait_time())
+                start = time.perf_counter()
+                try:
+                    result = await self.provider.send(delivery)
+                except Exception as e:
+                    logger.error(f"Error sending {self.channel} push for task {delivery['task_id']}: {e}", exc_info=True)
+                    result = {"success": False, "error": str(e), "error_code": "DISPATCH_ERROR"}
+                self.metrics.observe(METRIC_PROVIDER_LATENCY, (time.perf_counter() - start) * 1000, channel=self.channel)
+                if result.get("success"):
+                    self.sent += 1
+                    self.metrics.observe(
+                        METRIC_FIRE_DELAY, (time.time() - delivery["scheduled_at"]) * 1000,
+                        priority=delivery["priority"], channel=self.channel
+                    )
+                else:
+                    self.failed += 1
+                self.on_result(delivery, result)
+            finally:
+                self.queue.task_done()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """监控指标"""
+        return {
+            "channel": self.channel,
+            "provider": type(self.provider).__name__,
+            "concurrency": self.concurrency,
+            "rate_per_sec": self.bucket.max_rate,
+            "queue_depth": self.queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+def build_channel_providers(mode: str | None = None) -> Dict[str, ChannelProvider]:
+    """
+    按 PUSH_CHANNEL_PROVIDER 创建渠道推送服务
+
+    stub 模式下 PUSH_CHANNEL_LIMITS 中的每个渠道都用本地模拟服务；
+    live 模式下只有接入了真实服务的渠道（短信）会推送，其余渠道跳过
+
+    Args:
+        mode: live / stub，默认读取 PUSH_CHANNEL_PROVIDER
+    """
+    mode = mode or settings.PUSH_CHANNEL_PROVIDER
+    channels = [channel for channel in settings.push_channel_limits if channel != CHANNEL_APP]
+    if mode == "stub":
+        return {channel: StubChannelProvider(channel) for channel in channels}
+    return {channel: SmsChannelProvider() for channel in channels if channel == CHANNEL_SMS}
+
+
+class ChannelPipeline:
+    """
+    多渠道推送管道
+    app 推送仍由 PushDispatcher 完成（含 app 渠道的任务状态以其为准），这里负责：
+    - 任务首次认领时，把 PushTask.channels 中 app 以外的渠道提交到对应渠道的协程池（不等 app 推送结果）
+    - 不经 app 推送的任务保持租用，各渠道都有结果后按实际结果写回：任一渠道成功为已发送，否则为失败
+      （没有推送服务的渠道和队列满丢弃的推送都记为失败）
+    - 收集 app 和各渠道的推送结果，攒够 PUSH_LOG_FLUSH_SIZE 条或每 PUSH_LOG_FLUSH_INTERVAL 秒
+      批量写入 push_logs，同时写回已有结果的任务状态
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, ChannelProvider] | None = None,
+        limits: Dict[str, tuple[int, float]] | None = None,
+        session_maker: Callable[[], AsyncSession] | None = None,
+        flush_size: int | None = None,
+        flush_interval: float | None = None,
+        metrics: PushMetrics | None = None
+    ):
+        """
+        Args:
+            providers: {渠道: 推送服务}，默认按 PUSH_CHANNEL_PROVIDER 创建
+            limits: {渠道: (并发数, 速率)}，默认读取 PUSH_CHANNEL_LIMITS
+            session_maker: 写推送日志和任务结果使用的会话工厂
+            flush_size: 推送日志批量写入条数，默认读取 PUSH_LOG_FLUSH_SIZE
+            flush_interval: 推送日志最长写入间隔（秒），默认读取 PUSH_LOG_FLUSH_INTERVAL
+            metrics: 推送链路指标，默认使用全局实例
+        """
+        providers = build_channel_providers() if providers is None else providers
+        limits = settings.push_channel_limits if limits is None else limits
+        self.metrics = metrics or get_push_metrics()
+        self.pools: Dict[str, ChannelWorkerPool] = {
+            channel: ChannelWorkerPool(
+                provider, *limits.get(channel, (1, 1.0)), on_result=self._record_delivery, metrics=self.metrics
+            )
+            for channel, provider in providers.items()
+        }
+        self.session_maker = session_maker or async_session_maker
+        self.flush_size = max(1, flush_size or settings.PUSH_LOG_FLUSH_SIZE)
+        self.flush_interval = settings.PUSH_LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.logs_written = 0
+        self.tasks_settled = 0
+        self.skipped = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._settling: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._outcomes: Dict[str, List[Dict[str, Any]]] = {"sent": [], "failed": []}
+        self._flush_requested = asyncio.Event()
+        self._flush_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """启动各渠道的工作协程和推送日志写入协程"""
+        for pool in self.pools.values():
+            pool.start()
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """等各渠道排队的推送发完，写入剩余的推送日志后停止"""
+        for pool in self.pools.values():
+            await pool.stop()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+    def record(self, task: PushTask, channel: str, result: Dict[str, Any]) -> None:
+        """记录一条推送结果，等待批量写入 push_logs"""
+        self._append_log(task.id, task.reminder_id, task.user_id, channel, result)
+
+    def _record_delivery(self, delivery: Dict[str, Any], result: Dict[str, Any]) -> None:
+        self._append_log(delivery["task_id"], delivery["reminder_id"], delivery["user_id"], delivery["channel"], result)
+        self._settle(delivery["task_id"], delivery["channel"], result)
+
+    def _settle(self, task_id: int, channel: str, result: Dict[str, Any]) -> None:
+        """记录由管道写回状态的任务的一个渠道结果，各渠道都有结果后归入 sent / failed 等待批量写回"""
+        results = self._settling.get(task_id)
+        if results is None or channel not in results:
+            return
+        results[channel] = result
+        if any(value is None for value in results.values()):
+            return
+        del self._settling[task_id]
+        if any(value.get("success") for value in results.values()):
+            self._outcomes["sent"].append({"id": task_id, "push_response": {"success": True, "channels": results}})
+        else:
+            error = "; ".join(f"{name}: {value.get('error', 'Unknown error')}" for name, value in results.items())
+            self._outcomes["failed"].append({"id": task_id, "error_message": error[:1000]})
+            logger.error(f"Push task {task_id} failed on all channels: {error}")
+        if len(self._outcomes["sent"]) + len(self._outcomes["failed"]) >= self.flush_size:
+            self._flush_requested.set()
+
+    def _append_log(self, task_id: int, reminder_id: int, user_id: int, channel: str, result: Dict[str, Any]) -> None:
+        success = bool(result.get("success"))
+        self._buffer.append({
+            "task_id": task_id,
+            "reminder_id": reminder_id,
+            "user_id": user_id,
+            "channel": channel,
+            "status": LOG_STATUS_SUCCESS if success else LOG_STATUS_FAILED,
+            "error_message": None if success else str(result.get("error", "Unknown error"))[:1000],
+        })
+        if len(self._buffer) >= self.flush_size:
+            self._flush_requested.set()
+
+    async def submit(self, db: AsyncSession, tasks: Sequence[PushTask], settle: Collection[int] = ()) -> int:
+        """
+        把任务的非 app 渠道提交到各渠道协程池（不等待发送完成）
+
+        settle 中的任务状态由管道写回：各渠道都有结果后写为已发送或失败，在此之前任务保持租用；
+        仍在等待渠道结果的任务（租约过期后被重新认领）不重复提交。
+
+        Args:
+            db: 数据库会话（批量查询短信渠道的手机号）
+            tasks: 要推送其他渠道的任务（调度器不等 app 推送结果即提交）
+            settle: 由管道写回状态的任务ID（不经 app 推送的任务）
+
+        Returns:
+            提交的渠道推送数
+        """
+        wanted = []
+        for task in tasks:
+            if task.id in self._settling:
+                continue
+            channels = fanout_channels(task)
+            if task.id in settle and channels:
+                self._settling[task.id] = dict.fromkeys(channels)
+            wanted.extend((task, channel) for channel in channels)
+        if not wanted:
+            return 0
+        phones: Dict[int, str] = {}
+        if any(channel == CHANNEL_SMS and channel in self.pools for _, channel in wanted):
+            phones = await UserRepository(db).get_phones([task.user_id for task, channel in wanted if channel == CHANNEL_SMS])
+
+        submitted = 0
+        used = set()
+        for task, channel in wanted:
+            delivery = {
+                "task_id": task.id,
+                "reminder_id": task.reminder_id,
+                "user_id": task.user_id,
+                "channel": channel,
+                "priority": task.priority,
+                "scheduled_at": task.scheduled_at,
+                "title": task.title,
+                "content": task.content or "",
+                "recipient": phones.get(task.user_id) if channel == CHANNEL_SMS else None,
+            }
+            pool = self.pools.get(channel)
+            if pool is None:
+                self.skipped += 1
+                self._record_delivery(
+                    delivery, {"success": False, "error": f"No provider for channel {channel}", "error_code": ERROR_NO_PROVIDER}
+                )
+                continue
+            used.add(channel)
+            submitted += pool.submit(delivery)
+        for channel in used:
+            self.metrics.observe(METRIC_QUEUE_DEPTH, self.pools[channel].queue.qsize(), channel=channel)
+        return submitted
+
+    async def flush(self) -> int:
+        """
+        把缓冲的任务结果批量写回、推送日志批量写入 push_logs
+
+        写入失败时丢弃本批并记录错误；未写回结果的任务租约过期后会被重新认领推送
+
+        Returns:
+            写入的推送日志数
+        """
+        rows, self._buffer = self._buffer, []
+        outcomes, self._outcomes = self._outcomes, {"sent": [], "failed": []}
+        self._flush_requested.clear()
+        settled = len(outcomes["sent"]) + len(outcomes["failed"])
+        if not rows and not settled:
+            return 0
+        written = 0
+        try:
+            async with self.session_maker() as db:
+                if settled:
+                    await PushTaskRepository(db).bulk_apply_outcomes(**outcomes)
+                if rows:
+                    written = await PushLogRepository(db).bulk_create(rows)
+        except Exception as e:
+            logger.error(f"Error writing {settled} push task outcomes and {len(rows)} push logs: {e}", exc_info=True)
+            return 0
+        self.tasks_settled += settled
+        self.logs_written += written
+        return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def drain(self) -> None:
+        """等待各渠道已提交的推送全部发完并写入日志和任务结果（压测和测试用）"""
+        for pool in self.pools.values():
+            await pool.queue.join()
+        await self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """监控指标"""
+        return {
+            "channels": [pool.snapshot() for pool in self.pools.values()],
+            "skipped": self.skipped,
+            "tasks_settling": len(self._settling),
+            "tasks_settled": self.tasks_settled,
+            "logs_pending": len(self._buffer),
+            "logs_written": self.logs_written,
+        }
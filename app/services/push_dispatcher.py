@@ -0,0 +1,311 @@
+"""
+Push Dispatcher - 推送分发引擎
+以有限并发把一批推送任务分发到推送服务，并统计每轮的吞吐与延迟
+
+分发前先合并: 同一用户到期时间相近的多条任务合并为一条摘要通知（节省推送配额、避免刷屏），
+其余任务中标题和内容完全相同的合并为一次多别名推送。
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import Sequence
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from app.core.config import settings
+from app.models.push_task import PushTask
+from app.services.jpush_service import (
+    AsyncJPushClient,
+    push_batch_notification_async,
+    push_digest_notification_async,
+    push_reminder_notification_async,
+)
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """最近秩法求百分位（ordered 需已排序）"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class DispatchStats:
+    """
+    单轮分发统计
+    记录本轮任务数、实际推送请求数、成功/失败数、摘要合并节省的通知数、总耗时以及单次请求延迟分布
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.requests = 0
+        self.sent = 0
+        self.failed = 0
+        self.digests = 0
+        self.pushes_saved = 0
+        self.latencies_ms: List[float] = []
+
+    def record(self, latency_ms: float, success: bool, tasks: int = 1) -> None:
+        """
+        记录一次推送请求的结果
+
+        Args:
+            latency_ms: 请求耗时（毫秒）
+            success: 是否成功
+            tasks: 该请求覆盖的任务数（合并推送时大于1）
+        """
+        self.requests += 1
+        self.latencies_ms.append(latency_ms)
+        if success:
+            self.sent += tasks
+        else:
+            self.failed += tasks
+
+    def record_digest(self, tasks: int) -> None:
+        """记录一条合并了 tasks 个任务的摘要通知"""
+        self.digests += 1
+        self.pushes_saved += tasks - 1
+
+    def finish(self) -> None:
+        """标记本轮结束"""
+        self.finished_at = time.perf_counter()
+
+    @property
+    def total(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return (end - self.started_at) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为日志/监控可用的字典"""
+        ordered = sorted(self.latencies_ms)
+        duration_ms = self.duration_ms
+        return {
+            "total": self.total,
+            "requests": self.requests,
+            "sent": self.sent,
+            "failed": self.failed,
+            "digests": self.digests,
+            "pushes_saved": self.pushes_saved,
+            "duration_ms": round(duration_ms, 2),
+            "throughput_per_sec": round(self.total / (duration_ms / 1000), 2) if duration_ms > 0 else 0,
+            "latency_ms": {
+                "avg": round(sum(ordered) / len(ordered), 2) if ordered else 0,
+                "p50": round(percentile(ordered, 50), 2),
+                "p95": round(percentile(ordered, 95), 2),
+                "max": round(ordered[-1], 2) if ordered else 0,
+            },
+        }
+
+
+class PushDispatcher:
+    """
+    推送分发引擎
+
+    推送通过共享连接池的异步客户端发出，不阻塞事件循环；
+    信号量限制同时在途的推送请求数，避免高峰期打满推送服务或连接池。
+    同一用户到期时间相差不超过 digest_window 的多条任务合并为一条摘要通知；
+    其余标题和内容完全相同的任务（如系统模板"交房租"）合并为一次多别名推送，
+    推送结果再逐个回填到每个任务。
+    """
+
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        batch_enabled: bool | None = None,
+        max_aliases: int | None = None,
+        digest_window: int | None = None,
+        digest_min_tasks: int | None = None
+    ):
+        """
+        初始化分发引擎
+
+        Args:
+            concurrency: 最大并发推送请求数，默认读取 PUSH_DISPATCH_CONCURRENCY
+            batch_enabled: 是否合并相同内容的任务，默认读取 PUSH_BATCH_ENABLED
+            max_aliases: 每次合并推送的别名上限，默认读取 PUSH_BATCH_MAX_ALIASES
+            digest_window: 摘要合并窗口（秒），0 表示不合并，默认读取 PUSH_DIGEST_WINDOW_SECONDS
+            digest_min_tasks: 至少几条任务才合并为摘要，默认读取 PUSH_DIGEST_MIN_TASKS
+        """
+        self.concurrency = max(1, concurrency or settings.PUSH_DISPATCH_CONCURRENCY)
+        self.batch_enabled = settings.PUSH_BATCH_ENABLED if batch_enabled is None else batch_enabled
+        self.max_aliases = min(
+            max_aliases or settings.PUSH_BATCH_MAX_ALIASES,
+            AsyncJPushClient.MAX_ALIASES_PER_PUSH
+        )
+        self.digest_window = timedelta(
+            seconds=settings.PUSH_DIGEST_WINDOW_SECONDS if digest_window is None else digest_window
+        )
+        self.digest_min_tasks = max(2, digest_min_tasks or settings.PUSH_DIGEST_MIN_TASKS)
+
+    async def dispatch(
+        self,
+        tasks: Sequence[PushTask]
+    ) -> Tuple[List[Tuple[PushTask, Dict[str, Any]]], DispatchStats]:
+        """
+        并发分发一批推送任务
+
+        推送请求按组内最早任务在输入中的位置依次发出；输入按到期时间排序时（调度器认领的块），
+        并发受限排队时先到期的任务先推送
+
+        Args:
+            tasks: 待推送任务
+
+        Returns:
+            (每个任务及其推送结果的列表，顺序与输入一致, 本轮统计)
+        """
+        stats = DispatchStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _run(send, batch: List[PushTask]) -> List[Tuple[PushTask, Dict[str, Any]]]:
+            async with semaphore:
+                return await send(batch, stats)
+
+        position = {id(task): index for index, task in enumerate(tasks)}
+        digests, singles = self._coalesce(tasks)
+        jobs = [(self._send_digest, digest) for digest in digests]
+        jobs += [(self._send_batch, batch) for batch in self._group_tasks(singles)]
+        jobs.sort(key=lambda job: min(position[id(task)] for task in job[1]))
+        grouped = await asyncio.gather(*(_run(send, batch) for send, batch in jobs))
+        stats.finish()
+
+        results = [pair for batch_results in grouped for pair in batch_results]
+        results.sort(key=lambda pair: position[id(pair[0])])
+        return results, stats
+
+    def _coalesce(self, tasks: Sequence[PushTask]) -> Tuple[List[List[PushTask]], List[PushTask]]:
+        """
+        按用户合并到期时间相近的任务
+
+        每个用户的任务按到期时间排序，从最早的一条起，到期时间相差不超过 digest_window 的归为一组；
+        不少于 digest_min_tasks 条的组合并为摘要
+
+        Returns:
+            (摘要任务组列表, 单独推送的任务列表)
+        """
+        if not self.digest_window:
+            return [], list(tasks)
+
+        by_user: Dict[int, List[PushTask]] = {}
+        for task in tasks:
+            by_user.setdefault(task.user_id, []).append(task)
+
+        digests: List[List[PushTask]] = []
+        singles: List[PushTask] = []
+        for user_tasks in by_user.values():
+            if len(user_tasks) < self.digest_min_tasks:
+                singles.extend(user_tasks)
+                continue
+            user_tasks.sort(key=lambda task: task.next_attempt_at)
+            group: List[PushTask] = []
+            for task in user_tasks + [None]:
+                if task is not None and (not group or task.next_attempt_at - group[0].next_attempt_at <= self.digest_window):
+                    group.append(task)
+                    continue
+                if len(group) >= self.digest_min_tasks:
+                    digests.append(group)
+                else:
+                    singles.extend(group)
+                group = [task]
+        return digests, singles
+
+    @staticmethod
+    def _render_digest(batch: List[PushTask]) -> Tuple[str, str]:
+        """摘要通知的标题和内容：列出前 PUSH_DIGEST_MAX_LINES 条提醒标题"""
+        lines = [f"· {task.title}" for task in batch[:settings.PUSH_DIGEST_MAX_LINES]]
+        if len(batch) > len(lines):
+            lines.append(f"……还有{len(batch) - len(lines)}条")
+        return f"你有{len(batch)}条提醒", "\n".join(lines)
+
+    def _group_tasks(self, tasks: Sequence[PushTask]) -> List[List[PushTask]]:
+        """按推送内容分组，每组不超过别名上限；未开启合并时每个任务单独一组"""
+        if not self.batch_enabled:
+            return [[task] for task in tasks]
+
+        groups: Dict[Tuple[str, str], List[PushTask]] = {}
+        for task in tasks:
+            groups.setdefault((task.title, task.content or ""), []).append(task)
+
+        batches: List[List[PushTask]] = []
+        for group in groups.values():
+            for start in range(0, len(group), self.max_aliases):
+                batches.append(group[start:start + self.max_aliases])
+        return batches
+
+    async def _send_batch(
+        self,
+        batch: List[PushTask],
+        stats: DispatchStats
+    ) -> List[Tuple[PushTask, Dict[str, Any]]]:
+        """执行一次推送请求（单任务或多别名合并），异常统一转换为失败结果"""
+        first = batch[0]
+        start = time.perf_counter()
+        try:
+            if len(batch) == 1:
+                result = await push_reminder_notification_async(
+                    user_id=first.user_id,
+                    reminder_id=first.reminder_id,
+                    title=first.title,
+                    content=first.content or ""
+                )
+            else:
+                user_ids = list(dict.fromkeys(task.user_id for task in batch))
+                result = await push_batch_notification_async(
+                    user_ids=user_ids,
+                    title=first.title,
+                    content=first.content or ""
+                )
+                result = {**result, "batch_size": len(batch)}
+        except Exception as e:
+            logger.error(f"Error dispatching push tasks {[task.id for task in batch]}: {e}", exc_info=True)
+            result = {
+                "success": False,
+                "error": str(e),
+                "error_code": "DISPATCH_ERROR"
+            }
+        stats.record((time.perf_counter() - start) * 1000, bool(result.get("success")), tasks=len(batch))
+        return [(task, result) for task in batch]
+
+    async def _send_digest(
+        self,
+        batch: List[PushTask],
+        stats: DispatchStats
+    ) -> List[Tuple[PushTask, Dict[str, Any]]]:
+        """
+        推送一条摘要通知，结果回填到组内每个任务
+
+        每个任务的结果带 digest 字段（摘要包含的全部任务ID及本任务的序号），写入 push_response
+        """
+        title, content = self._render_digest(batch)
+        start = time.perf_counter()
+        try:
+            result = await push_digest_notification_async(
+                user_id=batch[0].user_id,
+                reminder_ids=[task.reminder_id for task in batch],
+                title=title,
+                content=content
+            )
+        except Exception as e:
+            logger.error(f"Error dispatching push digest {[task.id for task in batch]}: {e}", exc_info=True)
+            result = {
+                "success": False,
+                "error": str(e),
+                "error_code": "DISPATCH_ERROR"
+            }
+        success = bool(result.get("success"))
+        stats.record((time.perf_counter() - start) * 1000, success, tasks=len(batch))
+        if success:
+            stats.record_digest(len(batch))
+        task_ids = [task.id for task in batch]
+        return [
+            (task, {**result, "digest": {"task_ids": task_ids, "position": position}})
+            for position, task in enumerate(batch)
+        ]
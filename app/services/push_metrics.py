@@ -0,0 +1,203 @@
+"""
+Push Metrics - 推送链路进程内指标
+按优先级和渠道记录推送触发延迟、队列深度、分发批次耗时和推送服务延迟的分布，供监控接口读取
+
+分布用 HDR 风格的对数分桶直方图记录：桶数固定、记录一次只是一次整数运算加一次计数，
+百分位的相对误差不超过 1/64，高峰期也可以一直开着。指标只在本进程内累计，
+多个 worker 时每个进程各自统计。
+"""
+
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from app.core.config import settings
+
+METRIC_FIRE_DELAY = "fire_delay_ms"
+METRIC_QUEUE_DEPTH = "queue_depth"
+METRIC_DISPATCH_BATCH = "dispatch_batch_ms"
+METRIC_PROVIDER_LATENCY = "provider_latency_ms"
+
+# 毫秒指标按微秒分桶，队列深度按个数分桶
+METRIC_SCALES = {
+    METRIC_FIRE_DELAY: 1000,
+    METRIC_QUEUE_DEPTH: 1,
+    METRIC_DISPATCH_BATCH: 1000,
+    METRIC_PROVIDER_LATENCY: 1000,
+}
+
+REPORTED_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LogHistogram:
+    """
+    对数分桶直方图（HDR Histogram 的简化实现）
+
+    小于 2^SUB_BUCKET_BITS 的值每个整数一个桶；更大的值按二进制位数分组，
+    每组 2^(SUB_BUCKET_BITS-1) 个等宽桶，所以桶宽始终不超过值的 1/64。
+    """
+
+    SUB_BUCKET_BITS = 7
+    _SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    _HALF = _SUB_BUCKETS >> 1
+
+    def __init__(self, scale: int = 1):
+        """
+        Args:
+            scale: 记录值乘以 scale 后取整分桶（毫秒值传 1000 即按微秒分桶）
+        """
+        self.scale = scale
+        self.counts: List[int] = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _index(cls, units: int) -> int:
+        if units < cls._SUB_BUCKETS:
+            return units
+        shift = units.bit_length() - cls.SUB_BUCKET_BITS
+        return cls._SUB_BUCKETS + (shift - 1) * cls._HALF + (units >> shift) - cls._HALF
+
+    @classmethod
+    def _upper_bound(cls, index: int) -> int:
+        """桶内最大的整数值"""
+        if index < cls._SUB_BUCKETS:
+            return index
+        shift, offset = divmod(index - cls._SUB_BUCKETS, cls._HALF)
+        shift += 1
+        return ((offset + cls._HALF + 1) << shift) - 1
+
+    def record(self, value: float) -> None:
+        """记录一个值（负数按 0 记）"""
+        value = max(0.0, value)
+        index = self._index(int(value * self.scale))
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float) -> float:
+        """第 pct 百分位（取所在桶的上界，且不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, self._upper_bound(index) / self.scale)
+        return self.max
+
+    def fraction_at_or_below(self, value: float) -> float:
+        """不超过 value 的记录占比（value 所在的桶整个计入）"""
+        if not self.count:
+            return 1.0
+        last = self._index(int(max(0.0, value) * self.scale))
+        return sum(self.counts[:last + 1]) / self.count
+
+    def snapshot(self) -> Dict[str, Any]:
+        """转换为监控可用的字典"""
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "avg": round(self.total / self.count, 2) if self.count else 0,
+        }
+        for pct in REPORTED_PERCENTILES:
+            result[f"p{pct:g}".replace(".", "")] = round(self.percentile(pct), 2)
+        result["max"] = round(self.max, 2)
+        return result
+
+
+class PushMetrics:
+    """
+    推送链路指标注册表
+
+    每个 (指标, 标签) 组合一个直方图；标签只用优先级和渠道，组合数很少。
+    """
+
+    def __init__(
+        self,
+        enabled: bool | None = None,
+        slo_ms: int | None = None,
+        slo_target: float | None = None
+    ):
+        """
+        Args:
+            enabled: 是否记录，默认读取 PUSH_METRICS_ENABLED
+            slo_ms: 触发延迟目标（毫秒），默认读取 PUSH_FIRE_DELAY_SLO_MS
+            slo_target: 触发延迟不超过目标的比例要求，默认读取 PUSH_FIRE_DELAY_SLO_TARGET
+        """
+        self.enabled = settings.PUSH_METRICS_ENABLED if enabled is None else enabled
+        self.slo_ms = settings.PUSH_FIRE_DELAY_SLO_MS if slo_ms is None else slo_ms
+        self.slo_target = settings.PUSH_FIRE_DELAY_SLO_TARGET if slo_target is None else slo_target
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], LogHistogram] = {}
+        self._since = time.time()
+
+    def observe(self, metric: str, value: float, **labels: Any) -> None:
+        """
+        记录一个观测值
+
+        Args:
+            metric: 指标名（METRIC_*）
+            value: 观测值（毫秒或个数）
+            labels: 标签，如 priority=3, channel="app"
+        """
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LogHistogram(METRIC_SCALES.get(metric, 1))
+        histogram.record(value)
+
+    def _slo(self, histogram: LogHistogram) -> Dict[str, Any]:
+        within = histogram.fraction_at_or_below(self.slo_ms)
+        return {
+            "objective_ms": self.slo_ms,
+            "target": self.slo_target,
+            "within_objective": round(within, 4),
+            "met": within >= self.slo_target,
+        }
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        监控指标：每个指标按标签列出分布，触发延迟附带 SLO 达成情况
+
+        Args:
+            reset: 读取后清空（按固定间隔采集时得到每个间隔的分布）
+
+        Returns:
+            {"since", "enabled", 指标名: [{"labels", "count", "avg", "p50", "p90", "p99", "p999", "max"}]}
+        """
+        histograms, since = self._histograms, self._since
+        if reset:
+            self._histograms, self._since = {}, time.time()
+
+        result: Dict[str, Any] = {
+            "since": datetime.fromtimestamp(since).isoformat(timespec="seconds"),
+            "enabled": self.enabled,
+        }
+        for metric in METRIC_SCALES:
+            result[metric] = []
+        for (metric, labels), histogram in sorted(histograms.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            entry = {"labels": dict(labels), **histogram.snapshot()}
+            if metric == METRIC_FIRE_DELAY:
+                entry["slo"] = self._slo(histogram)
+            result.setdefault(metric, []).append(entry)
+        return result
+
+
+# 全局指标实例
+_push_metrics: PushMetrics | None = None
+
+
+def get_push_metrics() -> PushMetrics:
+    """获取推送指标单例"""
+    global _push_metrics
+    if _push_metrics is None:
+        _push_metrics = PushMetrics()
+    return _push_metrics
@@ -0,0 +1,185 @@
+"""
+Push Retry - 推送失败重试策略
+按错误类型选择重试策略，指数退避加随机抖动计算下次尝试时间，次数用尽进入死信
+
+抖动让同一次服务抖动中失败的大批任务分散到不同时间重试，而不是在同一轮扫描里一起重发。
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from app.models.push_task import PushStatus, PushTask
+
+# 错误类型
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_SERVER = "server_error"
+ERROR_NETWORK = "network_error"
+ERROR_AUTH = "auth_error"
+ERROR_INVALID_AUDIENCE = "invalid_audience"
+ERROR_CLIENT = "client_error"
+ERROR_UNKNOWN = "unknown"
+
+# JPush 业务错误码 -> 错误类型（https://docs.jiguang.cn/jpush/server/push/rest_api_v3_push#调用返回）
+JPUSH_ERROR_CLASSES = {
+    1000: ERROR_SERVER,            # 系统内部错误
+    1030: ERROR_SERVER,            # 内部服务超时
+    2002: ERROR_RATE_LIMITED,      # API 调用频率超出限制
+    1004: ERROR_AUTH,              # 认证失败
+    1008: ERROR_AUTH,              # app_key 不合法
+    2003: ERROR_AUTH,              # 该应用未开通此 API
+    1011: ERROR_INVALID_AUDIENCE,  # 没有满足条件的推送目标
+    1002: ERROR_CLIENT,            # 缺少必需参数
+    1003: ERROR_CLIENT,            # 参数值不合法
+    1005: ERROR_CLIENT,            # 消息体太大
+}
+
+# 本地异常错误码 -> 错误类型
+LOCAL_ERROR_CLASSES = {
+    "NETWORK_ERROR": ERROR_NETWORK,
+    "DISPATCH_ERROR": ERROR_UNKNOWN,
+    "UNKNOWN_ERROR": ERROR_UNKNOWN,
+}
+
+
+def classify_error(result: Dict[str, Any]) -> str:
+    """
+    根据推送结果判断错误类型
+
+    Args:
+        result: 推送服务返回的失败结果
+
+    Returns:
+        错误类型
+    """
+    error_code = result.get("error_code")
+    if error_code in JPUSH_ERROR_CLASSES:
+        return JPUSH_ERROR_CLASSES[error_code]
+    if error_code in LOCAL_ERROR_CLASSES:
+        return LOCAL_ERROR_CLASSES[error_code]
+
+    status_code = result.get("status_code")
+    if status_code == 429:
+        return ERROR_RATE_LIMITED
+    if status_code in (401, 403):
+        return ERROR_AUTH
+    if isinstance(status_code, int) and status_code >= 500:
+        return ERROR_SERVER
+    if isinstance(status_code, int) and status_code >= 400:
+        return ERROR_CLIENT
+    return ERROR_UNKNOWN
+
+
+class RetryPolicy:
+    """
+    单个错误类型的重试策略
+
+    第 n 次重试的退避上限为 min(max_delay, base_delay * multiplier^(n-1))，
+    实际等待时间在 [base_delay, 上限] 内均匀随机（带下限的全抖动）。
+    """
+
+    def __init__(
+        self,
+        base_delay: float,
+        max_delay: float,
+        multiplier: float = 2.0,
+        max_attempts: int | None = None,
+        retryable: bool = True
+    ):
+        """
+        Args:
+            base_delay: 首次重试基础等待（秒）
+            max_delay: 单次等待上限（秒）
+            multiplier: 指数退避倍数
+            max_attempts: 该错误类型最多尝试次数（含首次），None 表示只受任务 max_retries 限制
+            retryable: 是否可重试，不可重试的错误直接标记失败
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.max_attempts = max_attempts
+        self.retryable = retryable
+
+    def backoff_seconds(self, retry_number: int, rng: random.Random) -> float:
+        """
+        计算第 retry_number 次重试前的等待时间
+
+        Args:
+            retry_number: 第几次重试（从1开始）
+            rng: 随机数生成器
+        """
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** (retry_number - 1))
+        return rng.uniform(self.base_delay, max(self.base_delay, cap))
+
+
+# 默认策略：限流和认证类错误等待更久，目标无效和参数错误不重试
+DEFAULT_POLICIES: Dict[str, RetryPolicy] = {
+    ERROR_RATE_LIMITED: RetryPolicy(base_delay=60, max_delay=1800),
+    ERROR_SERVER: RetryPolicy(base_delay=30, max_delay=3600),
+    ERROR_NETWORK: RetryPolicy(base_delay=15, max_delay=1800),
+    ERROR_AUTH: RetryPolicy(base_delay=600, max_delay=3600, max_attempts=2),
+    ERROR_INVALID_AUDIENCE: RetryPolicy(base_delay=0, max_delay=0, retryable=False),
+    ERROR_CLIENT: RetryPolicy(base_delay=0, max_delay=0, retryable=False),
+    ERROR_UNKNOWN: RetryPolicy(base_delay=60, max_delay=1800),
+}
+
+
+class PushRetryPlanner:
+    """
+    推送重试决策
+
+    decide() 返回三种结果之一：
+    - retry: 保持 PENDING，next_attempt_at 推迟到退避时间之后
+    - failed: 不可重试的错误，标记 FAILED
+    - dead_letter: 可重试但次数用尽，标记 DEAD_LETTER，可由运维重新入队
+    """
+
+    def __init__(self, policies: Dict[str, RetryPolicy] | None = None, rng: random.Random | None = None):
+        """
+        Args:
+            policies: 错误类型 -> 重试策略，未提供的类型使用默认策略
+            rng: 随机数生成器（测试时可固定种子）
+        """
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.rng = rng or random.Random()
+
+    def decide(self, task: PushTask, result: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """
+        根据失败结果决定任务下一步
+
+        Args:
+            task: 推送任务（使用 retry_count 和 max_retries）
+            result: 推送失败结果
+            now: 当前时间
+
+        Returns:
+            {"action", "status", "error_class", "attempt", "next_attempt_at", "delay_seconds"}
+        """
+        error_class = classify_error(result)
+        policy = self.policies.get(error_class, self.policies[ERROR_UNKNOWN])
+        attempt = (task.retry_count or 0) + 1  # 本次是第几次尝试
+
+        # max_retries 按总尝试次数计（默认3，与原有"总共3次"一致）
+        max_attempts = task.max_retries or 1
+        if policy.max_attempts is not None:
+            max_attempts = min(max_attempts, policy.max_attempts)
+
+        decision = {
+            "error_class": error_class,
+            "attempt": attempt,
+            "next_attempt_at": None,
+            "delay_seconds": None,
+        }
+        if not policy.retryable:
+            return {**decision, "action": "failed", "status": PushStatus.FAILED}
+        if attempt >= max_attempts:
+            return {**decision, "action": "dead_letter", "status": PushStatus.DEAD_LETTER}
+
+        delay = policy.backoff_seconds(attempt, self.rng)
+        return {
+            **decision,
+            "action": "retry",
+            "status": PushStatus.PENDING,
+            "next_attempt_at": now + timedelta(seconds=delay),
+            "delay_seconds": delay,
+        }
@@ -4,15 +4,36 @@ Push Scheduler - 推送任务调度器
 """
 
 import asyncio
+import os
+import socket
+import time
+from contextlib import aclosing
 from datetime import datetime, timedelta
-from typing import List
+from typing import Any, Dict, List
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import async_session_maker
-from app.models.push_task import PushStatus
-from app.models.reminder import Reminder
+from app.models.push_task import PushTask
 from app.repositories.push_task_repository import PushTaskRepository
-from app.services.jpush_service import push_reminder_notification
+from app.services.push_channels import CHANNEL_APP, ChannelPipeline, fanout_channels
+from app.services.provider_guard import (
+    ERROR_CIRCUIT_OPEN,
+    ERROR_PROVIDER_THROTTLED,
+    PROVIDER_JPUSH,
+    ProviderGuard,
+    get_provider_guard,
+)
+from app.services.push_dispatcher import DispatchStats, PushDispatcher, percentile
+from app.services.push_metrics import (
+    METRIC_DISPATCH_BATCH,
+    METRIC_FIRE_DELAY,
+    METRIC_PROVIDER_LATENCY,
+    METRIC_QUEUE_DEPTH,
+    PushMetrics,
+    get_push_metrics,
+)
+from app.services.push_retry import PushRetryPlanner
+from app.services.push_wakeup import PushWakeup, get_push_wakeup
 from app.core.config import settings
 import structlog
 
@@ -22,208 +43,332 @@ logger = structlog.get_logger(__name__)
 class PushScheduler:
     """
     推送任务调度器
+
+    可以同时运行多个实例（多个 uvicorn worker 或多台机器）：
+    每个实例按批认领任务并持有租约，已认领的任务不会被其他实例重复推送；
+    配置 PUSH_SHARD_COUNT 后各实例只扫描自己负责的 user_id 分片，进一步减少争抢。
+
+    任务按优先级分道认领：每块认领前先查更高优先级的道，道内最早到期优先，
+    普通任务大量积压时紧急任务（如健康类吃药提醒）不用排在整批积压之后。
+    
+    调度器不按固定间隔轮询：每轮扫描后预加载即将到期的时间，睡眠到最早的到期时间再醒来；
+    新建或改期的任务在事务提交时经数据库 NOTIFY（或 Redis 流）提前唤醒，PUSH_SCAN_INTERVAL 只作兜底。
+
+    任务首次认领时，app 以外的渠道（短信等）就交给多渠道管道在各自的协程池中推送，不受 app 推送结果、
+    重试和极光推送开关影响；只有渠道包含 app 的任务才经极光推送。各渠道结果批量写入 push_logs，
+    不经 app 推送的任务由多渠道管道按各渠道的实际结果写回状态。
+
+    极光推送熔断期间暂停认领，冷却结束后再继续；因熔断或本地限流未发出的任务只延后、不计重试次数。
+
+    各分道的队列深度、每块的分发耗时、极光推送请求延迟和推送成功任务的触发延迟记录到推送链路指标。
     """
     
-    def __init__(self, interval: int = 60):
+    def __init__(
+        self,
+        interval: int | None = None,
+        dispatcher: PushDispatcher | None = None,
+        worker_id: str | None = None,
+        shard_index: int | None = None,
+        shard_count: int | None = None,
+        wakeup: PushWakeup | None = None,
+        retry_planner: PushRetryPlanner | None = None,
+        provider_guard: ProviderGuard | None = None,
+        channels: ChannelPipeline | None = None,
+        metrics: PushMetrics | None = None
+    ):
         """
         初始化调度器
         
         Args:
-            interval: 扫描间隔（秒）
+            interval: 兜底扫描间隔（秒），默认读取 PUSH_SCAN_INTERVAL
+            dispatcher: 推送分发引擎，默认按 PUSH_DISPATCH_CONCURRENCY 创建
+            worker_id: 实例ID（租约持有者），默认读取 PUSH_WORKER_ID，未配置时为 主机名:进程号
+            shard_index: 本实例负责的分片序号，默认读取 PUSH_SHARD_INDEX
+            shard_count: 分片总数，默认读取 PUSH_SHARD_COUNT
+            wakeup: 唤醒器，默认使用全局单例
+            retry_planner: 失败重试策略，默认按错误类型指数退避加抖动
+            provider_guard: 极光推送限流熔断保护，默认使用全局实例
+            channels: 多渠道推送管道，默认按 PUSH_CHANNEL_PROVIDER / PUSH_CHANNEL_LIMITS 创建
+            metrics: 推送链路指标，默认使用全局实例
         """
-        self.interval = interval
+        self.interval = interval or settings.PUSH_SCAN_INTERVAL
+        self.dispatcher = dispatcher or PushDispatcher()
+        self.worker_id = worker_id or settings.PUSH_WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+        self.shard_count = max(1, shard_count or settings.PUSH_SHARD_COUNT)
+        self.shard_index = settings.PUSH_SHARD_INDEX if shard_index is None else shard_index
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"shard_index {self.shard_index} out of range for shard_count {self.shard_count}")
+        self.wakeup = wakeup or get_push_wakeup()
+        self.retry_planner = retry_planner or PushRetryPlanner()
+        self.provider_guard = provider_guard or get_provider_guard(PROVIDER_JPUSH)
+        self.metrics = metrics or get_push_metrics()
+        self.channels = channels or ChannelPipeline(metrics=self.metrics)
         self.running = False
+        self.last_tick_stats: Dict[str, Any] | None = None
+        self.lane_stats: Dict[int, Dict[str, Any]] = {}
+        self._loop_task: asyncio.Task | None = None
     
     async def start(self):
-        """启动调度器"""
+        """启动调度器（在后台任务中运行扫描循环，不阻塞调用方）"""
         if self.running:
             logger.warning("Push scheduler is already running")
             return
         
         self.running = True
+        self.wakeup.start_listener()
+        self.channels.start()
+        self._loop_task = asyncio.create_task(self._run_loop())
         logger.info("Push scheduler started")
-        
+    
+    async def _run_loop(self):
+        """扫描循环"""
         while self.running:
+            # 熔断期间不认领任务，等到冷却结束（半开探测）再继续
+            pause = self.provider_guard.retry_after()
+            if pause > 0:
+                logger.warning(f"JPush circuit open, pausing push scheduler for {pause:.1f} seconds")
+                await asyncio.sleep(min(pause, self.interval))
+                continue
+
+            self.wakeup.pop_due(datetime.now())
             try:
                 await self._scan_and_push()
+                await self._seed_wakeup()
             except Exception as e:
                 logger.error(f"Error in push scheduler: {e}", exc_info=True)
             
-            # 等待下一次扫描
-            await asyncio.sleep(self.interval)
+            # 睡眠到下一个到期时间（最长兜底间隔）
+            reason = await self.wakeup.wait(max_sleep=self.interval)
+            logger.debug(f"Push scheduler woke up: {reason}")
+    
+    async def _seed_wakeup(self):
+        """预加载本实例分片内即将到期的任务时间"""
+        until = datetime.now() + timedelta(seconds=max(self.interval, settings.PUSH_WAKEUP_HORIZON_SECONDS))
+        async with async_session_maker() as db:
+            repo = PushTaskRepository(db)
+            entries = await repo.get_upcoming_due_times(
+                until=until,
+                limit=settings.PUSH_WAKEUP_SEED_LIMIT,
+                shard_index=self.shard_index,
+                shard_count=self.shard_count
+            )
+        self.wakeup.seed(entries)
     
     async def stop(self):
         """停止调度器"""
         self.running = False
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        await self.wakeup.stop_listener()
+        await self.channels.stop()
         logger.info("Push scheduler stopped")
     
     async def _scan_and_push(self):
-        """扫描并推送待发送任务"""
+        """扫描并推送待发送任务（逐块认领，每块推送完成后再认领下一块，内存占用有上限）"""
         async with async_session_maker() as db:
+            repo = PushTaskRepository(db)
+            # 每块认领时取当前时间，推送积压期间新到期的高优先级任务在下一块即被认领
+            stream = repo.iter_claimed_lanes(
+                worker_id=self.worker_id,
+                chunk_size=settings.PUSH_CLAIM_BATCH_SIZE,
+                lease_seconds=settings.PUSH_LEASE_SECONDS,
+                shard_index=self.shard_index,
+                shard_count=self.shard_count
+            )
             try:
-                # 查找需要推送的任务
-                now = datetime.now()
-                pending_tasks = await PushTaskRepository.get_pending_tasks_static(
-                    db=db,
-                    before_time=now
-                )
-                
-                if not pending_tasks:
-                    logger.debug("No pending push tasks found")
-                    return
-                
-                logger.info(f"Found {len(pending_tasks)} pending push tasks")
-                
-                # 执行推送
-                for task in pending_tasks:
-                    await self._execute_push_task(db, task)
-                
-                await db.commit()
-                
+                depths = await repo.count_due_by_priority(datetime.now(), self.shard_index, self.shard_count)
+                for lane in set(self.lane_stats) | set(depths):
+                    self.lane_stats.setdefault(lane, {})["queue_depth"] = depths.get(lane, 0)
+                    self.metrics.observe(METRIC_QUEUE_DEPTH, depths.get(lane, 0), priority=lane)
+                async with aclosing(stream):
+                    async for pending_tasks in stream:
+                        await self._push_chunk(db, pending_tasks)
+                        if not self.running or not self.provider_guard.available:
+                            break
             except Exception as e:
                 await db.rollback()
                 logger.error(f"Error scanning push tasks: {e}", exc_info=True)
     
-    async def _execute_push_task(self, db: AsyncSession, task):
+    async def _push_chunk(self, db: AsyncSession, pending_tasks: List[PushTask]):
         """
-        执行单个推送任务
+        推送一块已认领的任务，结果分类后一次性批量写回
+
+        app 以外的渠道在首次认领时就提交到各渠道协程池，不等 app 推送结果，
+        app 重试或延后再次认领时也不重复提交；只有渠道包含 app 的任务才经极光推送。
+        不经 app 推送的任务（不含 app，或关闭极光推送时含其他渠道的首次认领任务）这里不写回，
+        保持租用直到多渠道管道按各渠道的实际结果写回已发送或失败；
+        关闭极光推送时只取消 app 推送，没有其他渠道可发的任务才取消。
         
         Args:
             db: 数据库会话
-            task: 推送任务对象
+            pending_tasks: 已认领的任务
         """
+        logger.info(f"Worker {self.worker_id} claimed {len(pending_tasks)} pending push tasks")
         repo = PushTaskRepository(db)
-        try:
-            logger.info(f"Executing push task {task.id} for user {task.user_id}")
-            
-            # 检查推送是否启用
-            if not settings.JPUSH_ENABLED:
-                logger.warning(f"JPush disabled, skipping task {task.id}")
-                await repo.update_status(
-                    task=task,
-                    status=PushStatus.CANCELLED,
-                    error_message="JPush is disabled"
-                )
-                return
-            
-            # 执行推送
-            result = push_reminder_notification(
-                user_id=task.user_id,
-                reminder_id=task.reminder_id,
-                title=task.title,
-                content=task.content or ""
-            )
-            
-            # 更新任务状态
-            if result.get("success"):
-                await repo.update_status(task=task, status=PushStatus.SENT, push_response=result)
-                logger.info(f"Push task {task.id} sent successfully")
+        outcomes: Dict[str, List[Dict[str, Any]]] = {
+            "sent": [], "failed": [], "retry": [], "dead_letter": [], "deferred": [], "cancelled": []
+        }
+
+        dispatched_at = time.time()
+        app_tasks, channel_tasks, settle = [], [], set()
+        for task in pending_tasks:
+            first_attempt = _is_first_attempt(task)
+            if _wants_app(task) and settings.JPUSH_ENABLED:
+                app_tasks.append(task)
+                if first_attempt:
+                    channel_tasks.append(task)
+            elif fanout_channels(task) and (first_attempt or not _wants_app(task)):
+                channel_tasks.append(task)
+                settle.add(task.id)
             else:
-                # 推送失败，检查是否需要重试
-                if task.retry_count >= 2:  # 已经重试2次，总共3次
-                    await repo.update_status(
-                        task=task,
-                        status=PushStatus.FAILED,
-                        error_message=result.get("error", "Unknown error")
-                    )
-                    logger.error(f"Push task {task.id} failed after {task.retry_count + 1} attempts")
-                else:
-                    # 延迟重试（保持PENDING状态，更新scheduled_time）
-                    retry_minutes = 5 * (task.retry_count + 1)
-                    task.scheduled_time = datetime.now() + timedelta(minutes=retry_minutes)
-                    task.error_message = f"Retry {task.retry_count + 1}: {result.get('error', 'Unknown error')}"
-                    task.push_response = result
-                    task.retry_count += 1
-                    await db.commit()
-                    await db.refresh(task)
-                    logger.warning(f"Push task {task.id} failed, will retry in {retry_minutes} minutes")
+                outcomes["cancelled"].append({"id": task.id, "error_message": "JPush is disabled"})
+        if outcomes["cancelled"]:
+            logger.warning(f"JPush disabled, cancelling app push of {len(outcomes['cancelled'])} tasks")
+        await self.channels.submit(db, channel_tasks, settle=settle)
+
+        # 并发推送，结果按类型汇总后批量写回
+        results: List[Any] = []
+        stats: DispatchStats | None = None
+        if app_tasks:
+            results, stats = await self.dispatcher.dispatch(app_tasks)
+            self._record_metrics(results, stats, time.time())
+            now = datetime.now()
+            for task, result in results:
+                self._collect_outcome(task, result, outcomes, now)
+        self._record_lane(pending_tasks, dispatched_at)
         
-        except Exception as e:
-            logger.error(f"Error executing push task {task.id}: {e}", exc_info=True)
-            
-            if task.retry_count >= 2:
-                await repo.update_status(task=task, status=PushStatus.FAILED, error_message=str(e))
-            else:
-                retry_minutes = 5 * (task.retry_count + 1)
-                task.scheduled_time = datetime.now() + timedelta(minutes=retry_minutes)
-                task.error_message = f"Exception retry {task.retry_count + 1}: {str(e)}"
-                task.retry_count += 1
-                await db.commit()
-                await db.refresh(task)
-
-
-async def create_push_task_for_reminder(
-    db: AsyncSession,
-    reminder_id: int,
-    user_id: int,
-    scheduled_time: datetime
-):
-    """
-    为提醒创建推送任务
-    
-    Args:
-        db: 数据库会话
-        reminder_id: 提醒ID
-        user_id: 用户ID
-        scheduled_time: 计划推送时间
+        await repo.bulk_apply_outcomes(**outcomes)
+
+        # app 推送结果写入推送日志
+        for task, result in results:
+            self.channels.record(task, CHANNEL_APP, result)
         
-    Returns:
-        创建的推送任务
-    """
-    # 获取提醒信息（使用SQLAlchemy 2.0语法）
-    from sqlalchemy import select
-    stmt = select(Reminder).where(Reminder.id == reminder_id)
-    result = await db.execute(stmt)
-    reminder = result.scalar_one_or_none()
-    
-    if not reminder:
-        raise ValueError(f"Reminder {reminder_id} not found")
-    
-    # 使用Repository创建推送任务
-    repo = PushTaskRepository(db)
-    push_task = await repo.create(
-        user_id=user_id,
-        reminder_id=reminder_id,
-        title=reminder.title,
-        content=reminder.description or f"提醒：{reminder.title}",
-        channels=reminder.remind_channels,
-        scheduled_time=scheduled_time
-    )
-    
-    logger.info(f"Created push task {push_task.id} for reminder {reminder_id}")
+        if stats is not None:
+            self.last_tick_stats = stats.to_dict()
+        logger.info(
+            "push_dispatch_tick",
+            worker_id=self.worker_id,
+            tasks=len(pending_tasks),
+            app=len(app_tasks),
+            retry=len(outcomes["retry"]),
+            dead_letter=len(outcomes["dead_letter"]),
+            deferred=len(outcomes["deferred"]),
+            **(stats.to_dict() if stats is not None else {})
+        )
     
-    return push_task
+    def _record_lane(self, tasks: List[PushTask], dispatched_at: float):
+        """
+        记录本块所在分道的触发延迟（开始分发时间 - 计划推送时间）
 
+        从计划推送时间（scheduled_at）算起，重试退避、熔断和限流延后造成的推迟都计入延迟。
 
-async def batch_create_push_tasks(
-    db: AsyncSession,
-    tasks_data: List[dict]
-) -> List:
-    """
-    批量创建推送任务
-    
-    Args:
-        db: 数据库会话
-        tasks_data: 任务数据列表，每项包含 reminder_id, user_id, scheduled_time
+        Args:
+            tasks: 本块任务（同一优先级）
+            dispatched_at: 开始分发的 UTC 时间戳
+        """
+        lane = tasks[0].priority
+        delays = sorted(max(0.0, (dispatched_at - task.scheduled_at) * 1000) for task in tasks)
+        stats = self.lane_stats.setdefault(lane, {})
+        stats["queue_depth"] = max(0, stats.get("queue_depth", 0) - len(tasks))
+        stats["dispatched"] = stats.get("dispatched", 0) + len(tasks)
+        stats["fire_delay_ms"] = {
+            "p50": round(percentile(delays, 50), 2),
+            "p95": round(percentile(delays, 95), 2),
+            "max": round(delays[-1], 2),
+        }
+
+    def _record_metrics(self, results: List[Any], stats: DispatchStats, finished_at: float):
+        """
+        记录本块的分发耗时、极光推送请求延迟和推送成功任务的触发延迟（推送完成时间 - 计划推送时间）
+
+        触发延迟从计划推送时间（scheduled_at）算起，重试退避、熔断和限流延后造成的推迟都计入。
+
+        Args:
+            results: [(任务, 推送结果)]
+            stats: 本块分发统计
+            finished_at: 分发完成的 UTC 时间戳（即写回的 sent_time）
+        """
+        if not results:
+            return
+        self.metrics.observe(METRIC_DISPATCH_BATCH, stats.duration_ms, priority=results[0][0].priority)
+        for latency_ms in stats.latencies_ms:
+            self.metrics.observe(METRIC_PROVIDER_LATENCY, latency_ms, channel=CHANNEL_APP)
+        for task, result in results:
+            if result.get("success"):
+                self.metrics.observe(
+                    METRIC_FIRE_DELAY, (finished_at - task.scheduled_at) * 1000, priority=task.priority, channel=CHANNEL_APP
+                )
+
+    def _collect_outcome(
+        self,
+        task: PushTask,
+        result: Dict[str, Any],
+        outcomes: Dict[str, List[Dict[str, Any]]],
+        now: datetime
+    ):
+        """
+        根据推送结果把任务归入 sent / retry / failed / dead_letter / deferred
         
-    Returns:
-        创建的推送任务列表
-    """
-    push_tasks = []
-    
-    for data in tasks_data:
-        try:
-            task = await create_push_task_for_reminder(
-                db=db,
-                reminder_id=data["reminder_id"],
-                user_id=data["user_id"],
-                scheduled_time=data["scheduled_time"]
+        Args:
+            task: 推送任务对象
+            result: 推送服务返回的结果
+            outcomes: 按结果类型汇总的待写回数据
+            now: 本批结果时间
+        """
+        if result.get("success"):
+            outcomes["sent"].append({"id": task.id, "push_response": result})
+            logger.debug(f"Push task {task.id} sent successfully")
+            return
+        
+        error = result.get("error", "Unknown error")
+        if result.get("error_code") in (ERROR_CIRCUIT_OPEN, ERROR_PROVIDER_THROTTLED):
+            # 请求没有发出，延后到熔断冷却结束，不消耗重试次数
+            next_attempt_at = now + timedelta(seconds=max(1.0, result.get("retry_after") or 0))
+            outcomes["deferred"].append({"id": task.id, "next_attempt_at": next_attempt_at, "error_message": error})
+            self.wakeup.schedule(task.id, next_attempt_at)
+            return
+
+        decision = self.retry_planner.decide(task, result, now)
+        action = decision["action"]
+        
+        if action == "retry":
+            outcomes["retry"].append({
+                "id": task.id,
+                "next_attempt_at": decision["next_attempt_at"],
+                "error_message": f"Retry {decision['attempt']} ({decision['error_class']}): {error}",
+                "push_response": result,
+            })
+            self.wakeup.schedule(task.id, decision["next_attempt_at"])
+            logger.warning(
+                f"Push task {task.id} failed ({decision['error_class']}), "
+                f"will retry in {decision['delay_seconds']:.0f} seconds"
             )
-            push_tasks.append(task)
-        except Exception as e:
-            logger.error(f"Failed to create push task: {e}")
-    
-    return push_tasks
+        elif action == "dead_letter":
+            outcomes["dead_letter"].append({"id": task.id, "error_message": f"{decision['error_class']}: {error}"})
+            logger.error(f"Push task {task.id} moved to dead letter after {decision['attempt']} attempts: {error}")
+        else:
+            outcomes["failed"].append({"id": task.id, "error_message": f"{decision['error_class']}: {error}"})
+            logger.error(f"Push task {task.id} failed permanently ({decision['error_class']}): {error}")
+
+
+def _wants_app(task: PushTask) -> bool:
+    """任务是否需要 app 推送（未指定渠道的旧任务按 app 推送）"""
+    return not task.channels or CHANNEL_APP in task.channels
+
+
+def _is_first_attempt(task: PushTask) -> bool:
+    """
+    任务是否首次认领：重试和延后都会把 due_at 推迟到计划推送时间（scheduled_at）之后
+
+    租约过期后被重新认领的任务仍视为首次，本实例仍在等待渠道结果的任务不重复提交；
+    被其他实例重新认领时其他渠道可能重复提交一次（至少一次语义，与 app 推送一致）。
+    """
+    return task.retry_count == 0 and task.due_at == task.scheduled_at
 
 
 # 全局调度器实例
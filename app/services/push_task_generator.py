@@ -0,0 +1,158 @@
+"""
+Push Task Generator - 推送任务预先生成
+后台任务为即将推送的提醒预先生成未来 PUSH_TASK_HORIZON_HOURS 小时内的推送任务，
+周期提醒即使一直没有被完成也会按时推送，不再依赖完成时创建下一条任务。
+提醒时间是用户时区的墙上时间，窗口按每个用户时区的当前时间计算。
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.recurrence import compile_rule
+from app.core.timezones import get_zone, to_epoch, to_wall_time
+from app.models.push_task import PushTask
+from app.models.reminder import Reminder
+from app.repositories.reminder_repository import ReminderRepository
+from app.repositories.user_repository import UserRepository
+from app.services.periodic_job import PeriodicJob
+from app.services.push_task_service import push_task_row, write_push_tasks
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def plan_push_tasks(
+    rows: Iterable[Any],
+    zones: Dict[int, ZoneInfo],
+    now: datetime,
+    horizon: timedelta
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    计算一批提醒需要新增的推送任务
+
+    每个提醒从已生成的截止时间（未生成或已过去时从用户时区的当前时间）生成到用户当前时间加 horizon，
+    只计算新增的部分；窗口按计划推送时间（触发时间减去提前量）计算，截止时间是用户时区的墙上时间。
+    配置错误的提醒记录日志后跳过，不推进截止时间。
+
+    Args:
+        rows: 提醒行（需要 push_task_row 用到的列以及 recurrence_type、recurrence_config、
+              next_remind_time、advance_minutes、push_tasks_until）
+        zones: {user_id: 用户时区}，缺失时按默认时区
+        now: 当前时刻（不带时区信息时按服务器本地时间解释）
+        horizon: 生成窗口长度
+
+    Returns:
+        (新增任务字段 [push_task_row], 截止时间 [{"id", "until"}])
+    """
+    tasks: List[Dict[str, Any]] = []
+    watermarks: List[Dict[str, Any]] = []
+    for row in rows:
+        zone = zones.get(row.user_id) or get_zone()
+        local_now = to_wall_time(now, zone)
+        window_start = max(row.push_tasks_until or local_now, local_now)
+        window_end = max(window_start, local_now + horizon)
+        advance = timedelta(minutes=row.advance_minutes or 0)
+        try:
+            rule = compile_rule(row.recurrence_type, row.recurrence_config or {})
+            times = rule.expand(row.next_remind_time, window_start + advance, window_end + advance)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skip generating push tasks for reminder {row.id} with config {row.recurrence_config}: {e}")
+            continue
+        # 一次性提醒只按窗口起点过滤，这里补上窗口终点
+        tasks.extend(push_task_row(row, t - advance, zone) for t in times if t < window_end + advance)
+        watermarks.append({"id": row.id, "until": window_end})
+    return tasks, watermarks
+
+
+async def generate_upcoming_push_tasks(
+    now: datetime | None = None,
+    horizon_hours: int | None = None,
+    batch_size: int | None = None
+) -> Dict[str, int]:
+    """
+    为所有即将推送的提醒生成到用户当前时间加 horizon_hours 的推送任务
+
+    生成截止时间不足半个窗口的提醒才继续生成，每个提醒大约每半个窗口写一次，而不是每轮都写；
+    按 id 键集分页逐块读取，每块一条多行 INSERT ... ON CONFLICT DO NOTHING 加一条
+    UPDATE ... FROM (VALUES ...) 推进截止时间，在同一个事务中提交。多个实例同时执行、
+    或与完成提醒时创建的任务重叠，都只保留一条待推送任务。
+
+    Args:
+        now: 当前时刻（默认现在；不带时区信息时按服务器本地时间解释）
+        horizon_hours: 生成窗口小时数（默认取配置）
+        batch_size: 每块提醒数（默认取配置）
+
+    Returns:
+        {"reminders": 生成的提醒数, "planned": 计算出的任务数, "created": 新建的任务数}
+    """
+    now = now or datetime.now().astimezone()
+    horizon = timedelta(hours=horizon_hours or settings.PUSH_TASK_HORIZON_HOURS)
+    stats = {"reminders": 0, "planned": 0, "created": 0}
+
+    async with async_session_maker() as db:
+        reminder_repo = ReminderRepository(db)
+        user_repo = UserRepository(db)
+        chunk_size = batch_size or settings.PUSH_TASK_GENERATE_BATCH_SIZE
+        async for rows in reminder_repo.iter_pending_reminders(
+            now=to_epoch(now), horizon=horizon, chunk_size=chunk_size
+        ):
+            zones = await user_repo.get_timezones([row.user_id for row in rows])
+            tasks, watermarks = plan_push_tasks(rows, zones, now, horizon)
+            await reminder_repo.advance_push_tasks_until(watermarks)
+            created = await write_push_tasks(db, tasks)
+            # 本块没有新任务时 write_push_tasks 不提交，这里提交截止时间
+            await db.commit()
+            stats["reminders"] += len(watermarks)
+            stats["planned"] += len(tasks)
+            stats["created"] += len(created)
+
+    if stats["reminders"]:
+        logger.info(
+            f"Generated upcoming push tasks: {stats['reminders']} reminders, "
+            f"{stats['planned']} planned, {stats['created']} created"
+        )
+    return stats
+
+
+async def regenerate_push_tasks(db: AsyncSession, reminder: Reminder, now: datetime | None = None) -> List[PushTask]:
+    """
+    提醒配置变更后立即为其重新生成推送任务，不等后台任务下一轮
+
+    Args:
+        db: 数据库会话
+        reminder: 提醒对象（push_tasks_until 已被清空）
+        now: 当前时刻（默认现在；不带时区信息时按服务器本地时间解释）
+
+    Returns:
+        新建的推送任务列表
+    """
+    if not reminder.is_active or reminder.is_completed:
+        return []
+    zones = await UserRepository(db).get_timezones([reminder.user_id])
+    tasks, watermarks = plan_push_tasks(
+        [reminder], zones, now or datetime.now().astimezone(), timedelta(hours=settings.PUSH_TASK_HORIZON_HOURS)
+    )
+    if not watermarks:
+        return []
+    reminder.push_tasks_until = watermarks[0]["until"]
+    created = await write_push_tasks(db, tasks)
+    await db.commit()
+    return created
+
+
+# 全局生成任务实例
+_generator_job: PeriodicJob | None = None
+
+
+def get_push_task_generator_job() -> PeriodicJob:
+    """获取推送任务生成任务单例"""
+    global _generator_job
+    if _generator_job is None:
+        _generator_job = PeriodicJob(
+            "Push task generator", settings.PUSH_TASK_GENERATE_INTERVAL, generate_upcoming_push_tasks
+        )
+    return _generator_job
@@ -1,58 +1,139 @@
 """
 PushTask Service
 推送任务服务 - 负责自动生成和管理推送任务
+
+推送任务只通过这里创建：按自然键 (reminder_id, scheduled_time) 幂等写入，
+重复提交或并发创建同一提醒同一时间的任务时只保留一条待推送任务。
 """
 
+from collections.abc import Sequence
+from typing import Any, Dict, List
+from zoneinfo import ZoneInfo
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from app.models.reminder import Reminder
-from app.models.push_task import PushTask, PushStatus
-from app.core.recurrence import calculate_next_occurrence
+from app.models.reminder import Reminder, ReminderCategory
+from app.models.push_task import PRIORITY_NORMAL, PRIORITY_URGENT, PushTask, PushStatus
+from app.core.recurrence import compile_rule
+from app.core.timezones import push_schedule
+from app.repositories.push_task_repository import PushTaskRepository
+from app.repositories.user_repository import UserRepository
+from app.repositories.reminder_occurrence_repository import ReminderOccurrenceRepository
+from app.services.push_wakeup import notify_push_task_scheduled
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def push_priority(reminder: Reminder) -> int:
+    """
+    推送任务的优先级：沿用提醒的优先级，健康类（如吃药）提醒一律按紧急处理
+
+    Args:
+        reminder: 提醒对象
+
+    Returns:
+        推送优先级（1=普通, 2=重要, 3=紧急）
+    """
+    if reminder.category == ReminderCategory.HEALTH:
+        return PRIORITY_URGENT
+    return reminder.priority or PRIORITY_NORMAL
+
+
+def push_task_row(reminder: Reminder, scheduled_time: datetime, zone: ZoneInfo) -> Dict[str, Any]:
+    """
+    提醒在指定时间的推送任务字段
+
+    Args:
+        reminder: 提醒对象
+        scheduled_time: 计划推送时间（用户时区的墙上时间，已扣除提前量）
+        zone: 用户时区
+
+    Returns:
+        PushTaskRepository.create_many 使用的一行
+    """
+    return {
+        "reminder_id": reminder.id,
+        "user_id": reminder.user_id,
+        "title": reminder.title,
+        "content": reminder.description,
+        "channels": reminder.remind_channels or ["app"],
+        **push_schedule(scheduled_time, zone),
+        "status": PushStatus.PENDING,
+        "retry_count": 0,
+        "max_retries": 3,
+        "priority": push_priority(reminder),
+    }
+
+
+async def write_push_tasks(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[PushTask]:
+    """
+    幂等写入推送任务并唤醒调度器
+
+    与数据库触发器一致，整批只通知最早到期的一条：调度器醒来后会重新预加载即将到期的任务。
+
+    Args:
+        db: 数据库会话
+        rows: push_task_row 生成的任务字段
+
+    Returns:
+        新创建的任务（同一提醒同一时间已有待推送任务的行被跳过）
+    """
+    if not rows:
+        return []
+    tasks = await PushTaskRepository(db).create_many(rows)
+    if len(tasks) < len(rows):
+        logger.info(f"Skipped {len(rows) - len(tasks)} duplicate push tasks")
+    if tasks:
+        earliest = min(tasks, key=lambda task: task.next_attempt_at)
+        await notify_push_task_scheduled(earliest.id, earliest.next_attempt_at)
+    return tasks
+
+
+async def create_push_task_at(db: AsyncSession, reminder: Reminder, scheduled_time: datetime) -> PushTask | None:
+    """
+    在指定时间为提醒创建推送任务（幂等）
+
+    Args:
+        db: 数据库会话
+        reminder: 提醒对象
+        scheduled_time: 计划推送时间（用户时区的墙上时间）
+
+    Returns:
+        新创建的任务；该时间已有待推送任务时返回已有任务
+    """
+    zone = await UserRepository(db).get_timezone(reminder.user_id)
+    row = push_task_row(reminder, scheduled_time, zone)
+    created = await write_push_tasks(db, [row])
+    if created:
+        return created[0]
+    return await PushTaskRepository(db).get_pending_by_key(reminder.id, row["scheduled_time"])
 
 
 async def create_push_task_for_reminder(db: AsyncSession, reminder: Reminder) -> PushTask | None:
     """
-    为提醒创建推送任务
+    为提醒的下次提醒时间创建推送任务（提前 advance_minutes 分钟，幂等）
+
+    完成提醒后调用：预先生成的、早于下次推送时间的待推送任务属于已完成的触发，一并取消。
     
     Args:
         db: 数据库会话
         reminder: 提醒对象
     
     Returns:
-        创建的推送任务对象，如果提醒未激活则返回None
+        推送任务对象（已存在时返回已有任务），如果提醒未激活则返回None
     """
     if not reminder.is_active:
         return None
     
-    # 计算推送时间（提前advance_minutes分钟）
-    scheduled_time = reminder.next_remind_time
-    if reminder.advance_minutes > 0:
-        scheduled_time = scheduled_time - timedelta(minutes=reminder.advance_minutes)
-    
-    # 创建推送任务
-    push_task = PushTask(
-        reminder_id=reminder.id,
-        user_id=reminder.user_id,
-        title=reminder.title,
-        content=reminder.description,
-        channels=reminder.remind_channels,
-        scheduled_time=scheduled_time,
-        status=PushStatus.PENDING,
-        retry_count=0,
-        max_retries=3,
-        priority=reminder.priority if hasattr(reminder, 'priority') else 1
-    )
-    
-    db.add(push_task)
-    await db.commit()
-    await db.refresh(push_task)
-    
-    return push_task
+    scheduled_time = reminder.next_remind_time - timedelta(minutes=reminder.advance_minutes or 0)
+    await PushTaskRepository(db).cancel_pending(reminder.id, before=scheduled_time, reason="Reminder completed")
+    return await create_push_task_at(db, reminder, scheduled_time)
 
 
 async def generate_next_push_tasks(db: AsyncSession, reminder: Reminder, count: int = 1) -> list[PushTask]:
     """
-    为周期性提醒生成接下来的N个推送任务
+    为周期性提醒生成接下来的N个推送任务（一条多行 INSERT，已存在的跳过）
     
     Args:
         db: 数据库会话
@@ -60,47 +141,48 @@ async def generate_next_push_tasks(db: AsyncSession, reminder: Reminder, count:
         count: 生成任务数量
     
     Returns:
-        生成的推送任务列表
+        新生成的推送任务列表
     """
     if not reminder.is_active:
         return []
     
-    tasks = []
-    current_time = reminder.next_remind_time
+    # 优先读取物化的触发时间（序列从 next_remind_time 开始）；
+    # 未物化、next_remind_time 早于物化窗口或窗口内不足 count 次时即时展开（一次性提醒只有一次）
+    occurrences = await ReminderOccurrenceRepository(db).get_upcoming(reminder.id, reminder.next_remind_time, count)
+    if len(occurrences) < count or occurrences[0] != reminder.next_remind_time:
+        rule = compile_rule(reminder.recurrence_type, reminder.recurrence_config)
+        occurrences = rule.expand(reminder.next_remind_time, reminder.next_remind_time, datetime.max, count)
+    
+    # 推送时间提前 advance_minutes 分钟，按用户时区换算到期时间戳
+    zone = await UserRepository(db).get_timezone(reminder.user_id)
+    advance = timedelta(minutes=reminder.advance_minutes or 0)
+    return await write_push_tasks(db, [push_task_row(reminder, occurs_at - advance, zone) for occurs_at in occurrences])
+
+
+async def batch_create_push_tasks(db: AsyncSession, tasks_data: Sequence[Dict[str, Any]]) -> List[PushTask]:
+    """
+    批量创建推送任务：一次查询提醒和用户时区，一条多行 INSERT 写入（已存在的跳过）
     
-    for _ in range(count):
-        # 计算推送时间
-        scheduled_time = current_time
-        if reminder.advance_minutes > 0:
-            scheduled_time = scheduled_time - timedelta(minutes=reminder.advance_minutes)
-        
-        # 创建推送任务
-        push_task = PushTask(
-            reminder_id=reminder.id,
-            user_id=reminder.user_id,
-            title=reminder.title,
-            content=reminder.description,
-            channels=reminder.remind_channels,
-            scheduled_time=scheduled_time,
-            status=PushStatus.PENDING,
-            retry_count=0,
-            max_retries=3,
-            priority=reminder.priority if hasattr(reminder, 'priority') else 1
-        )
-        
-        db.add(push_task)
-        tasks.append(push_task)
+    Args:
+        db: 数据库会话
+        tasks_data: 任务数据列表，每项包含 reminder_id, user_id, scheduled_time（用户时区的墙上时间）
         
-        # 计算下次提醒时间
-        current_time = calculate_next_occurrence(
-            current_time,
-            reminder.recurrence_type,
-            reminder.recurrence_config
-        )
-    
-    await db.commit()
-    
-    return tasks
+    Returns:
+        新创建的推送任务列表
+    """
+    reminder_ids = {data["reminder_id"] for data in tasks_data}
+    result = await db.execute(select(Reminder).where(Reminder.id.in_(reminder_ids)))
+    reminders = {reminder.id: reminder for reminder in result.scalars().all()}
+    zones = await UserRepository(db).get_timezones([reminder.user_id for reminder in reminders.values()])
+    
+    rows = []
+    for data in tasks_data:
+        reminder = reminders.get(data["reminder_id"])
+        if reminder is None or reminder.user_id != data["user_id"]:
+            logger.error(f"Failed to create push task: reminder {data['reminder_id']} not found for user {data['user_id']}")
+            continue
+        rows.append(push_task_row(reminder, data["scheduled_time"], zones[reminder.user_id]))
+    return await write_push_tasks(db, rows)
 
 
 async def update_push_task_status(
@@ -121,7 +203,6 @@ async def update_push_task_status(
     Returns:
         更新后的推送任务对象
     """
-    from sqlalchemy import select
     stmt = select(PushTask).where(PushTask.id == task_id)
     result = await db.execute(stmt)
     task = result.scalar_one_or_none()
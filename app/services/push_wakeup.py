@@ -0,0 +1,314 @@
+"""
+Push Wakeup - 推送调度器唤醒
+按下一个到期时间唤醒调度器，替代固定间隔轮询
+
+调度器扫描后从数据库预加载未来一段时间内的到期时间放入最小堆，
+睡眠到堆顶时间即醒来认领；新建或改期的任务通过 notify_push_task_scheduled 通知本进程。
+
+其他进程的调度器按 PUSH_WAKEUP_BACKEND 接收通知:
+- postgres: push_tasks 上的语句级触发器在事务提交时 pg_notify（事务性发件箱，回滚不通知，
+  任何写入路径包括批量 SQL 都覆盖），调度器在独立的 asyncpg 连接上 LISTEN；
+- redis: 没有 PostgreSQL 通知可用的本地环境，提交后写入 Redis 流，断线重连后从上次位置继续读取。
+"""
+
+import asyncio
+import heapq
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+import asyncpg
+import redis.asyncio as aioredis
+import structlog
+
+from app.core.config import settings
+from app.core.timezones import from_epoch, to_epoch
+
+logger = structlog.get_logger(__name__)
+
+WAKEUP_BACKEND_POSTGRES = "postgres"
+WAKEUP_BACKEND_REDIS = "redis"
+# 与迁移 add_push_task_notify_trigger 中触发器使用的频道一致
+PG_NOTIFY_CHANNEL = "push_task_scheduled"
+
+
+def _listener_dsn() -> str:
+    """asyncpg 直连使用的 DSN（去掉 SQLAlchemy 驱动后缀）"""
+    return settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+
+
+class DueTimeHeap:
+    """
+    到期时间最小堆
+
+    同一任务只保留最新的到期时间：改期后旧的堆元素在弹出时被丢弃（惰性删除）。
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due: Dict[int, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def push(self, task_id: int, due_time: datetime) -> bool:
+        """
+        加入或更新任务到期时间
+
+        Returns:
+            该时间是否早于原来的堆顶（调度器需要提前醒来）
+        """
+        if self._due.get(task_id) == due_time:
+            return False
+        earliest = self.peek()
+        self._due[task_id] = due_time
+        heapq.heappush(self._heap, (due_time, task_id))
+        return earliest is None or due_time < earliest
+
+    def peek(self) -> datetime | None:
+        """返回最早的到期时间，堆为空时返回 None"""
+        while self._heap:
+            due_time, task_id = self._heap[0]
+            if self._due.get(task_id) == due_time:
+                return due_time
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        """弹出所有已到期的任务ID"""
+        task_ids = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, task_id = heapq.heappop(self._heap)
+            if self._due.get(task_id) == due_time:
+                del self._due[task_id]
+                task_ids.append(task_id)
+        return task_ids
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._due.clear()
+
+
+class PushWakeup:
+    """
+    调度器唤醒器
+
+    wait() 睡眠到下一个到期时间或兜底间隔；期间收到更早的到期通知会提前醒来重新计算。
+    """
+
+    # Redis 发布失败后暂停发布的时长（秒），避免 Redis 不可用时每次建任务都等待连接超时
+    PUBLISH_COOLDOWN = 30
+
+    def __init__(self, channel: str | None = None, backend: str | None = None):
+        """
+        Args:
+            channel: Redis 后端使用的流名称，默认读取 PUSH_WAKEUP_CHANNEL
+            backend: 跨进程通知方式（postgres / redis / 空表示只通知本进程），默认读取 PUSH_WAKEUP_BACKEND
+        """
+        self.channel = channel or settings.PUSH_WAKEUP_CHANNEL
+        self.backend = settings.PUSH_WAKEUP_BACKEND if backend is None else backend
+        self.heap = DueTimeHeap()
+        self._scan_requested = False
+        self._event: asyncio.Event | None = None
+        self._redis: aioredis.Redis | None = None
+        self._redis_loop: asyncio.AbstractEventLoop | None = None
+        self._publish_disabled_until = 0.0
+        self._listener_task: asyncio.Task | None = None
+
+    def _get_event(self) -> asyncio.Event:
+        if self._event is None:
+            self._event = asyncio.Event()
+        return self._event
+
+    def schedule(self, task_id: int, due_time: datetime) -> None:
+        """
+        记录任务到期时间（本进程内通知）
+
+        Args:
+            task_id: 推送任务ID
+            due_time: 到期时间
+        """
+        if self.heap.push(task_id, due_time) and self._event is not None:
+            self._event.set()
+
+    def seed(self, entries: Iterable[Tuple[int, datetime]]) -> None:
+        """用数据库中即将到期的任务填充最小堆"""
+        for task_id, due_time in entries:
+            self.schedule(task_id, due_time)
+
+    def next_due(self) -> datetime | None:
+        return self.heap.peek()
+
+    def pop_due(self, now: datetime) -> List[int]:
+        return self.heap.pop_due(now)
+
+    async def wait(self, max_sleep: float) -> str:
+        """
+        睡眠到下一个到期时间，最长 max_sleep 秒
+
+        Args:
+            max_sleep: 兜底睡眠时长（秒）
+
+        Returns:
+            "due" 表示有任务到期，"scan" 表示被要求立即扫描，"idle" 表示到达兜底间隔
+        """
+        event = self._get_event()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_sleep
+        while True:
+            event.clear()
+            if self._scan_requested:
+                self._scan_requested = False
+                return "scan"
+            idle_delay = deadline - loop.time()
+            next_due = self.heap.peek()
+            due_delay = (next_due - datetime.now()).total_seconds() if next_due is not None else None
+
+            if due_delay is not None and due_delay <= 0:
+                return "due"
+            if idle_delay <= 0:
+                return "idle"
+
+            delay = idle_delay if due_delay is None else min(idle_delay, due_delay)
+            try:
+                await asyncio.wait_for(event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    # -----------------
+    # 跨进程通知
+    # -----------------
+    def request_scan(self) -> None:
+        """要求调度器立即扫描一轮（通知连接重建后，断线期间的通知可能已丢失）"""
+        self._scan_requested = True
+        self._get_event().set()
+
+    def _handle_message(self, data: str) -> None:
+        """处理其他进程的通知: {"task_id": 1, "due_at": UTC 时间戳}"""
+        try:
+            payload = json.loads(data)
+            self.schedule(int(payload["task_id"]), from_epoch(int(payload["due_at"])))
+        except (ValueError, KeyError, TypeError, OverflowError) as e:
+            logger.warning(f"Invalid push wakeup message {data!r}: {e}")
+
+    def _get_redis(self) -> aioredis.Redis:
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = aioredis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_connect_timeout=1,
+                socket_timeout=1
+            )
+            self._redis_loop = loop
+        return self._redis
+
+    async def publish(self, task_id: int, due_time: datetime) -> None:
+        """
+        Redis 后端：把任务到期时间写入 Redis 流，失败只记录日志
+
+        PostgreSQL 后端由数据库触发器在事务提交时发出通知，这里不做任何事。
+        """
+        if self.backend != WAKEUP_BACKEND_REDIS or time.monotonic() < self._publish_disabled_until:
+            return
+        message = json.dumps({"task_id": task_id, "due_at": to_epoch(due_time)})
+        try:
+            await self._get_redis().xadd(
+                self.channel, {"data": message}, maxlen=settings.PUSH_WAKEUP_STREAM_MAXLEN, approximate=True
+            )
+        except Exception as e:
+            self._publish_disabled_until = time.monotonic() + self.PUBLISH_COOLDOWN
+            logger.warning(f"Failed to publish push wakeup for task {task_id}: {e}")
+
+    async def _listen_postgres(self) -> None:
+        """在独立的 asyncpg 连接上 LISTEN，断线后每5秒重连"""
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(_listener_dsn())
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(PG_NOTIFY_CHANNEL, lambda _c, _pid, _ch, data: self._handle_message(data))
+                logger.info(f"Listening for push wakeups on PostgreSQL channel {PG_NOTIFY_CHANNEL}")
+                self.request_scan()
+                await lost.wait()
+                logger.warning("Push wakeup listener connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Push wakeup listener failed: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close(timeout=1)
+            await asyncio.sleep(5)
+
+    async def _listen_redis(self) -> None:
+        """阻塞读取 Redis 流，断线重连后从上次读到的位置继续，不丢通知"""
+        client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        last_id = "$"
+        try:
+            while True:
+                try:
+                    streams = await client.xread({self.channel: last_id}, block=5000)
+                    for _, entries in streams:
+                        for entry_id, fields in entries:
+                            last_id = entry_id
+                            self._handle_message(fields.get("data", ""))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Push wakeup stream read failed: {e}")
+                    await asyncio.sleep(5)
+        finally:
+            await client.aclose()
+
+    def start_listener(self) -> None:
+        """按 PUSH_WAKEUP_BACKEND 启动跨进程通知监听（未启用时不做任何事）"""
+        listeners = {WAKEUP_BACKEND_POSTGRES: self._listen_postgres, WAKEUP_BACKEND_REDIS: self._listen_redis}
+        if self.backend in listeners and self._listener_task is None:
+            self._listener_task = asyncio.create_task(listeners[self.backend]())
+
+    async def stop_listener(self) -> None:
+        """停止监听并关闭发布连接"""
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+            self._redis_loop = None
+
+
+# 全局唤醒器实例
+_wakeup: PushWakeup | None = None
+
+
+def get_push_wakeup() -> PushWakeup:
+    """获取唤醒器单例"""
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = PushWakeup()
+    return _wakeup
+
+
+async def notify_push_task_scheduled(task_id: int, due_time: datetime) -> None:
+    """
+    通知调度器有新的或改期的推送任务（在事务提交之后调用）
+
+    本进程的调度器立即更新最小堆；其他进程由提交时的数据库通知（postgres 后端）或 Redis 流（redis 后端）转发。
+
+    Args:
+        task_id: 推送任务ID
+        due_time: 到期时间（服务器本地时间，即 next_attempt_at）
+    """
+    wakeup = get_push_wakeup()
+    wakeup.schedule(task_id, due_time)
+    await wakeup.publish(task_id, due_time)
@@ -0,0 +1,112 @@
+"""
+Reminder Catch-up - 过期周期提醒追赶
+长期没有完成的周期提醒，next_remind_time 会一直停在过去；
+这里定期把它们直接推进到最近的一次触发，而不是逐期补算。
+next_remind_time 是用户时区的墙上时间，"过期"按每个用户时区的当前时间判断。
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.recurrence import compile_rule, next_after
+from app.core.timezones import get_zone, to_epoch, to_wall_time
+from app.repositories.reminder_repository import ReminderRepository
+from app.repositories.user_repository import UserRepository
+from app.services.periodic_job import PeriodicJob
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def plan_realignment(
+    rows: Iterable[Any],
+    zones: Dict[int, ZoneInfo],
+    cutoff: datetime
+) -> List[Dict[str, Any]]:
+    """
+    计算一批过期提醒推进后的下次提醒时间
+
+    每个提醒用编译好的规则从 next_remind_time 直接跳到第一个晚于 cutoff（换算为用户时区的墙上时间）的触发，
+    配置错误的提醒记录日志后跳过。
+
+    Args:
+        rows: 提醒行（需要 id、user_id、recurrence_type、recurrence_config、next_remind_time）
+        zones: {user_id: 用户时区}，缺失时按默认时区
+        cutoff: 推进后的下次提醒时间要晚于该时刻（不带时区信息时按服务器本地时间解释）
+
+    Returns:
+        [{"id", "previous", "next"}]，可直接交给 ReminderRepository.bulk_realign_next_remind_time
+    """
+    plan: List[Dict[str, Any]] = []
+    for row in rows:
+        try:
+            rule = compile_rule(row.recurrence_type, row.recurrence_config or {})
+            local_cutoff = to_wall_time(cutoff, zones.get(row.user_id) or get_zone())
+            next_time = next_after(rule, row.next_remind_time, local_cutoff)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skip catching up reminder {row.id} with config {row.recurrence_config}: {e}")
+            continue
+        if next_time is not None and next_time != row.next_remind_time:
+            plan.append({"id": row.id, "previous": row.next_remind_time, "next": next_time})
+    return plan
+
+
+async def catch_up_stale_reminders(
+    now: datetime | None = None,
+    grace_seconds: int | None = None,
+    batch_size: int | None = None
+) -> Dict[str, int]:
+    """
+    把所有过期的周期提醒推进到 now - grace_seconds 之后的第一次触发
+
+    按 id 键集分页逐块读取，每块在内存中计算后用一条 UPDATE ... FROM (VALUES ...) 写回；
+    写回时校验 next_remind_time 未被改动，与用户完成操作并发时以用户操作为准。
+    多个实例同时执行也是安全的。
+
+    Args:
+        now: 当前时刻（默认现在；不带时区信息时按服务器本地时间解释）
+        grace_seconds: 宽限秒数，过期不超过该时长的提醒保持不变（默认取配置）
+        batch_size: 每块提醒数（默认取配置）
+
+    Returns:
+        {"scanned": 读取的提醒数, "planned": 需要推进的提醒数, "updated": 实际更新的提醒数}
+    """
+    now = now or datetime.now().astimezone()
+    grace = settings.REMINDER_CATCHUP_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = now - timedelta(seconds=grace)
+    stats = {"scanned": 0, "planned": 0, "updated": 0}
+
+    async with async_session_maker() as db:
+        repo = ReminderRepository(db)
+        user_repo = UserRepository(db)
+        chunk_size = batch_size or settings.REMINDER_CATCHUP_BATCH_SIZE
+        async for rows in repo.iter_stale_recurring(before=to_epoch(cutoff), chunk_size=chunk_size):
+            zones = await user_repo.get_timezones([row.user_id for row in rows])
+            plan = plan_realignment(rows, zones, cutoff)
+            stats["scanned"] += len(rows)
+            stats["planned"] += len(plan)
+            stats["updated"] += await repo.bulk_realign_next_remind_time(plan)
+
+    if stats["scanned"]:
+        logger.info(
+            f"Caught up stale reminders: scanned {stats['scanned']}, "
+            f"planned {stats['planned']}, updated {stats['updated']}"
+        )
+    return stats
+
+
+# 全局追赶任务实例
+_catchup_job: PeriodicJob | None = None
+
+
+def get_catchup_job() -> PeriodicJob:
+    """获取追赶任务单例"""
+    global _catchup_job
+    if _catchup_job is None:
+        _catchup_job = PeriodicJob(
+            "Reminder catch-up job", settings.REMINDER_CATCHUP_INTERVAL, catch_up_stale_reminders
+        )
+    return _catchup_job
@@ -6,6 +6,7 @@ SmsService 抽象与 Aliyun 实现
 - 使用 Redis 存储验证码和值（5分钟过期），并实现简单的限频（每个手机号每用途60秒）
 - 抽象 SmsService，便于未来替换短信提供商
 - 记录所有短信到数据库用于审计和防刷
+- 阿里云调用经过 ProviderGuard 限流和熔断，服务降级时快速失败
 """
 from __future__ import annotations
 from typing import Tuple
@@ -15,6 +16,13 @@ from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.core.redis import get_redis
+from app.services.provider_guard import (
+    OUTCOME_FAILURE,
+    OUTCOME_SUCCESS,
+    OUTCOME_THROTTLED,
+    PROVIDER_ALIYUN_SMS,
+    get_provider_guard,
+)
 
 logger = structlog.get_logger(__name__)
 
@@ -40,7 +48,11 @@ class AliyunSmsService(SmsService):
     使用 alibabacloud_dypnsapi20170525 SDK（号码认证服务）
     """
 
+    # 阿里云接口级流控错误码（单手机号的业务限流 isv.BUSINESS_LIMIT_CONTROL 不算服务端限流）
+    THROTTLE_CODES = {"Throttling", "Throttling.User", "Throttling.Api"}
+
     def __init__(self):
+        self.guard = get_provider_guard(PROVIDER_ALIYUN_SMS)
         self.access_key_id = settings.ALIYUN_ACCESS_KEY_ID
         self.access_key_secret = settings.ALIYUN_ACCESS_KEY_SECRET
         # 延迟导入第三方SDK，避免未安装时启动失败
@@ -76,11 +88,16 @@ class AliyunSmsService(SmsService):
             logger.warning("Aliyun SMS not configured or SDK not installed - falling back to noop")
             return NoopSmsService().send_sms(phone_number, sign_name, template_code, template_param)
 
+        # 类型保护检查
+        if not self.models or not self.runtime_models or not self.client:
+            return False
+
+        rejection = self.guard.before_call_nowait()
+        if rejection is not None:
+            logger.warning(f"Aliyun SMS skipped: {rejection['error']} (retry after {rejection['retry_after']}s)")
+            return False
+
         try:
-            # 类型保护检查
-            if not self.models or not self.runtime_models or not self.client:
-                return False
-            
             # 使用个人测试模式的号码认证服务API
             request = self.models.SendSmsVerifyCodeRequest(
                 sign_name=sign_name,
@@ -97,7 +114,8 @@ class AliyunSmsService(SmsService):
             message = getattr(response.body, 'message', None)
             
             logger.info(f"Aliyun SMS response: Code={code}, Message={message}")
-            
+            self.guard.record(OUTCOME_THROTTLED if code in self.THROTTLE_CODES else OUTCOME_SUCCESS)
+
             if code == 'OK':
                 return True
             else:
@@ -105,6 +123,7 @@ class AliyunSmsService(SmsService):
                 return False
         except Exception as e:
             logger.exception(f"Aliyun SMS exception: {e}")
+            self.guard.record(OUTCOME_FAILURE)
             return False
 
 
@@ -13,6 +13,10 @@ from app.core.logging_config import setup_logging
 from app.api.v1 import (users, reminders, push_tasks, family, completions, templates, 
                         debug, notifications, monitoring, reminder_notifications)
 from app.services.push_scheduler import get_scheduler
+from app.services.reminder_catchup import get_catchup_job
+from app.services.occurrence_materializer import get_occurrence_job
+from app.services.push_task_generator import get_push_task_generator_job
+from app.services.jpush_service import close_jpush_clients
 from app.core.redis import get_redis, close_redis
 from app.services.session_manager import init_session_manager
 import structlog
@@ -42,16 +46,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"[WARN] Session management initialization failed: {e}")
     
-    # 启动推送调度器（如果启用）
-    if settings.JPUSH_ENABLED:
+    # 启动推送调度器和多渠道推送管道（关闭极光推送时只取消 app 推送，短信等渠道照常推送）
+    try:
+        scheduler = get_scheduler()
+        await scheduler.start()
+        logger.info("[OK] Push scheduler started successfully")
+        if not settings.JPUSH_ENABLED:
+            logger.info("[INFO] JPush disabled (JPUSH_ENABLED=false), app pushes will be cancelled")
+    except Exception as e:
+        logger.error(f"[ERROR] Failed to start push scheduler: {e}")
+    
+    # 启动过期周期提醒追赶任务、触发时间物化任务和推送任务预先生成任务
+    for job in (get_catchup_job(), get_occurrence_job(), get_push_task_generator_job()):
         try:
-            scheduler = get_scheduler()
-            await scheduler.start()
-            logger.info("[OK] Push scheduler started successfully")
+            await job.start()
         except Exception as e:
-            logger.error(f"[ERROR] Failed to start push scheduler: {e}")
-    else:
-        logger.info("[INFO] Push scheduler disabled (JPUSH_ENABLED=false)")
+            logger.error(f"[ERROR] Failed to start {job.name}: {e}")
     
     yield
     
@@ -65,14 +75,26 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"[ERROR] Failed to close Redis: {e}")
     
-    # 停止推送调度器
-    if settings.JPUSH_ENABLED:
+    # 停止过期周期提醒追赶任务、触发时间物化任务和推送任务预先生成任务
+    for job in (get_catchup_job(), get_occurrence_job(), get_push_task_generator_job()):
         try:
-            scheduler = get_scheduler()
-            await scheduler.stop()
-            logger.info("[OK] Push scheduler stopped successfully")
+            await job.stop()
         except Exception as e:
-            logger.error(f"[ERROR] Failed to stop push scheduler: {e}")
+            logger.error(f"[ERROR] Failed to stop {job.name}: {e}")
+    
+    # 停止推送调度器
+    try:
+        scheduler = get_scheduler()
+        await scheduler.stop()
+        logger.info("[OK] Push scheduler stopped successfully")
+    except Exception as e:
+        logger.error(f"[ERROR] Failed to stop push scheduler: {e}")
+    
+    # 关闭推送客户端连接池
+    try:
+        await close_jpush_clients()
+    except Exception as e:
+        logger.error(f"[ERROR] Failed to close JPush clients: {e}")
 
 
 # Create FastAPI application
@@ -0,0 +1,116 @@
+"""
+多渠道推送管道离线压测
+所有渠道使用本地 stub 服务，推送日志写入内存 SQLite（需要 aiosqlite），不依赖外部服务和 PostgreSQL
+
+可以把某个渠道设置得很慢，观察其他渠道的吞吐和触发延迟是否受影响，以及推送日志的批量写入速度。
+
+用法:
+    uv run python scripts/benchmark_channel_pipeline.py                   # 默认 1000 个任务
+    uv run python scripts/benchmark_channel_pipeline.py 20000 --sms-latency 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.config import settings
+from app.core.database import Base
+from app.models.push_log import PushLog
+from app.repositories.user_repository import UserRepository
+from app.services.push_channels import CHANNEL_APP, CHANNEL_SMS, ChannelPipeline, StubChannelProvider
+from app.services.push_metrics import METRIC_FIRE_DELAY, PushMetrics
+
+
+async def _fake_phones(self, user_ids):
+    """压测不查用户表，按 user_id 生成手机号"""
+    return {user_id: f"138{user_id % 10**8:08d}" for user_id in user_ids}
+
+
+async def run(count: int, sms_latency_ms: float, latency_ms: float, failure_rate: float):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    limits = settings.push_channel_limits
+    providers = {
+        channel: StubChannelProvider(
+            channel,
+            latency_ms=sms_latency_ms if channel == CHANNEL_SMS else latency_ms,
+            failure_rate=failure_rate
+        )
+        for channel in limits
+        if channel != CHANNEL_APP
+    }
+    metrics = PushMetrics(enabled=True)
+    pipeline = ChannelPipeline(providers=providers, limits=limits, session_maker=session_maker, metrics=metrics)
+    channel_names = list(providers)
+    tasks = [
+        SimpleNamespace(
+            id=i, reminder_id=i, user_id=i, title=f"压测提醒{i}", content=None, priority=1, scheduled_at=time.time(),
+            channels=[CHANNEL_APP, channel_names[i % len(channel_names)]]
+        )
+        for i in range(count)
+    ]
+
+    UserRepository.get_phones = _fake_phones
+    pipeline.start()
+    start = time.perf_counter()
+    for task in tasks:
+        pipeline.record(task, CHANNEL_APP, {"success": True})
+    submitted = await pipeline.submit(db=None, tasks=tasks)
+    print(f"提交 {submitted} 条渠道推送，用时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    finished = {}
+    await asyncio.gather(*(
+        _wait_channel(pipeline, channel, start, finished) for channel in pipeline.pools
+    ))
+    await pipeline.drain()
+    total = time.perf_counter() - start
+    await pipeline.stop()
+
+    async with session_maker() as db:
+        logs = (await db.execute(select(func.count()).select_from(PushLog))).scalar_one()
+    await engine.dispose()
+
+    for pool in pipeline.pools.values():
+        snapshot = pool.snapshot()
+        elapsed = finished[pool.channel]
+        print(
+            f"  {pool.channel:<8} 并发 {snapshot['concurrency']:<3} 速率 {snapshot['rate_per_sec']:>6}/s  "
+            f"成功 {snapshot['sent']:<6} 失败 {snapshot['failed']:<5} 丢弃 {snapshot['dropped']:<5} "
+            f"完成 {elapsed:.2f}s ({(snapshot['sent'] + snapshot['failed']) / elapsed:.0f}/s)"
+        )
+    print(f"总耗时 {total:.2f}s，写入推送日志 {logs} 条")
+    for entry in metrics.snapshot()[METRIC_FIRE_DELAY]:
+        print(
+            f"  触发延迟 {entry['labels']['channel']:<8} p50 {entry['p50']:.0f}ms  p99 {entry['p99']:.0f}ms  "
+            f"max {entry['max']:.0f}ms  SLO 内 {entry['slo']['within_objective']:.1%}"
+        )
+
+
+async def _wait_channel(pipeline: ChannelPipeline, channel: str, start: float, finished: dict):
+    await pipeline.pools[channel].queue.join()
+    finished[channel] = time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多渠道推送管道离线压测")
+    parser.add_argument("count", type=int, nargs="?", default=1000, help="任务数")
+    parser.add_argument("--sms-latency", type=float, default=200, help="短信渠道单次耗时（毫秒）")
+    parser.add_argument("--latency", type=float, default=5, help="其他渠道单次耗时（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="模拟失败比例")
+    args = parser.parse_args()
+    asyncio.run(run(args.count, args.sms_latency, args.latency, args.failure_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+推送结果写回压测
+对比逐条写回（update_status，每个任务一次 commit + refresh）与批量写回（bulk_apply_outcomes，每块一次 commit）
+
+需要可用的 PostgreSQL（读取 DATABASE_URL），脚本会创建临时用户、提醒和推送任务，结束后删除。
+
+用法:
+    uv run python scripts/benchmark_push_outcomes.py          # 默认 2000 个任务
+    uv run python scripts/benchmark_push_outcomes.py 10000 500
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete, select, update
+
+from app.core.database import async_session_maker, engine
+from app.models.push_task import PushTask, PushStatus
+from app.models.reminder import Reminder, RecurrenceType, ReminderCategory
+from app.models.user import User
+from app.repositories.push_task_repository import PushTaskRepository
+
+
+def _outcome_kind(index: int) -> str:
+    """模拟高峰期结果分布：85% 成功，10% 重试，5% 最终失败"""
+    bucket = index % 20
+    if bucket < 17:
+        return "sent"
+    if bucket < 19:
+        return "retry"
+    return "failed"
+
+
+async def _create_fixture(count: int):
+    """创建临时用户、提醒和待推送任务"""
+    async with async_session_maker() as db:
+        user = User(phone=f"bench{int(time.time())}"[:20], hashed_password="x")
+        db.add(user)
+        await db.flush()
+        now = datetime.now()
+        reminder = Reminder(
+            user_id=user.id,
+            title="压测提醒",
+            category=ReminderCategory.OTHER,
+            recurrence_type=RecurrenceType.ONCE,
+            first_remind_time=now,
+            next_remind_time=now,
+        )
+        db.add(reminder)
+        await db.flush()
+        db.add_all([
+            PushTask(
+                reminder_id=reminder.id,
+                user_id=user.id,
+                title="压测提醒",
+                content=f"任务{i}",
+                channels=["app"],
+                scheduled_time=now,
+                status=PushStatus.PENDING,
+            )
+            for i in range(count)
+        ])
+        await db.commit()
+        return user.id, reminder.id
+
+
+async def _reset_tasks(reminder_id: int):
+    async with async_session_maker() as db:
+        await db.execute(
+            update(PushTask)
+            .where(PushTask.reminder_id == reminder_id)
+            .values(status=PushStatus.PENDING, retry_count=0, error_message=None, push_response=None,
+                    next_attempt_at=PushTask.scheduled_time)
+        )
+        await db.commit()
+
+
+async def _load_tasks(db, reminder_id: int):
+    result = await db.execute(select(PushTask).where(PushTask.reminder_id == reminder_id).order_by(PushTask.id))
+    return list(result.scalars().all())
+
+
+async def bench_per_task(reminder_id: int):
+    """原路径：逐条 update_status / 直接修改 + commit + refresh"""
+    async with async_session_maker() as db:
+        tasks = await _load_tasks(db, reminder_id)
+        repo = PushTaskRepository(db)
+        commits = 0
+        start = time.perf_counter()
+        for index, task in enumerate(tasks):
+            kind = _outcome_kind(index)
+            if kind == "sent":
+                await repo.update_status(task=task, status=PushStatus.SENT, push_response={"msg_id": str(index)})
+            elif kind == "failed":
+                await repo.update_status(task=task, status=PushStatus.FAILED, error_message="invalid alias")
+            else:
+                task.next_attempt_at = datetime.now() + timedelta(minutes=5)
+                task.error_message = "Retry 1: timeout"
+                task.push_response = {"error": "timeout"}
+                task.retry_count += 1
+                await db.commit()
+                await db.refresh(task)
+            commits += 1
+        return len(tasks), commits, time.perf_counter() - start
+
+
+async def bench_bulk(reminder_id: int, chunk_size: int):
+    """新路径：每块结果汇总后 bulk_apply_outcomes 一次提交"""
+    async with async_session_maker() as db:
+        tasks = await _load_tasks(db, reminder_id)
+        repo = PushTaskRepository(db)
+        commits = 0
+        start = time.perf_counter()
+        for offset in range(0, len(tasks), chunk_size):
+            outcomes = {"sent": [], "failed": [], "retry": []}
+            for index, task in enumerate(tasks[offset:offset + chunk_size], start=offset):
+                kind = _outcome_kind(index)
+                if kind == "sent":
+                    outcomes["sent"].append({"id": task.id, "push_response": {"msg_id": str(index)}})
+                elif kind == "failed":
+                    outcomes["failed"].append({"id": task.id, "error_message": "invalid alias"})
+                else:
+                    outcomes["retry"].append({
+                        "id": task.id,
+                        "next_attempt_at": datetime.now() + timedelta(minutes=5),
+                        "error_message": "Retry 1: timeout",
+                        "push_response": {"error": "timeout"},
+                    })
+            await repo.bulk_apply_outcomes(**outcomes)
+            commits += 1
+        return len(tasks), commits, time.perf_counter() - start
+
+
+async def _cleanup(user_id: int, reminder_id: int):
+    async with async_session_maker() as db:
+        await db.execute(delete(PushTask).where(PushTask.reminder_id == reminder_id))
+        await db.execute(delete(Reminder).where(Reminder.id == reminder_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+def _report(name: str, count: int, commits: int, elapsed: float):
+    print(f"  {name:<28} {count:>6} 任务  {commits:>6} 次提交  {elapsed * 1000:>9.1f}ms"
+          f"  {count / elapsed:>9.1f} 任务/秒  {commits / elapsed:>8.1f} 提交/秒")
+
+
+async def main(count: int, chunk_size: int):
+    user_id, reminder_id = await _create_fixture(count)
+    try:
+        print(f"推送结果写回压测: {count} 个任务, 批量块大小 {chunk_size}")
+        before = await bench_per_task(reminder_id)
+        _report("逐条写回 update_status", *before)
+
+        await _reset_tasks(reminder_id)
+        after = await bench_bulk(reminder_id, chunk_size)
+        _report("批量写回 bulk_apply_outcomes", *after)
+
+        print(f"  吞吐提升 {(after[0] / after[2]) / (before[0] / before[2]):.1f} 倍")
+    finally:
+        await _cleanup(user_id, reminder_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    block = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    asyncio.run(main(task_count, block))
@@ -0,0 +1,89 @@
+"""
+周期展开压测
+对比逐次调用 RecurrenceEngine.calculate_next_time（每个提醒一个循环）与 RecurrenceEngine.expand 批量展开
+
+不依赖数据库，随机生成提醒；两种路径的结果会先做一致性校验。
+
+用法:
+    uv run python scripts/benchmark_recurrence_expand.py            # 默认 5000 个提醒，展开 90 天
+    uv run python scripts/benchmark_recurrence_expand.py 20000 365
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.reminder import RecurrenceType
+from app.services.recurrence_engine import RecurrenceEngine
+
+WINDOW_START = datetime(2026, 1, 1)
+
+
+def _build_reminders(count: int, rng: random.Random):
+    """模拟线上分布：每日和每月为主，起点分布在过去两年内"""
+    reminders = []
+    for i in range(count):
+        bucket = i % 10
+        if bucket < 4:
+            recurrence_type, config = RecurrenceType.DAILY, {"interval": rng.choice([1, 1, 1, 2, 7])}
+        elif bucket < 6:
+            recurrence_type, config = RecurrenceType.WEEKLY, {"weekdays": sorted(rng.sample(range(7), rng.randint(1, 5)))}
+        elif bucket < 8:
+            recurrence_type, config = RecurrenceType.MONTHLY, {"day_of_month": rng.choice([1, 5, 10, 15, 25, 31, -1])}
+        elif bucket < 9:
+            recurrence_type, config = RecurrenceType.YEARLY, {"month": rng.randint(1, 12), "day": rng.randint(1, 28)}
+        else:
+            recurrence_type, config = RecurrenceType.CUSTOM, {"days": rng.randint(2, 90)}
+        anchor = WINDOW_START - timedelta(days=rng.randint(0, 730), hours=rng.randint(0, 23))
+        reminders.append(SimpleNamespace(
+            id=i, recurrence_type=recurrence_type, recurrence_config=config, next_remind_time=anchor
+        ))
+    return reminders
+
+
+def bench_scalar(reminders, window_end):
+    """原路径：每个提醒从 next_remind_time 起逐次调用 calculate_next_time"""
+    start = time.perf_counter()
+    result = {}
+    for reminder in reminders:
+        current, occurrences = reminder.next_remind_time, []
+        while current < window_end:
+            if current >= WINDOW_START:
+                occurrences.append(current)
+            current = RecurrenceEngine.calculate_next_time(
+                reminder.recurrence_type, reminder.recurrence_config, current
+            )
+        result[reminder.id] = occurrences
+    return result, time.perf_counter() - start
+
+
+def bench_expand(reminders, window_end):
+    """新路径：expand 批量展开"""
+    start = time.perf_counter()
+    result = RecurrenceEngine.expand(reminders, WINDOW_START, window_end)
+    return result, time.perf_counter() - start
+
+
+def main(count: int, days: int):
+    reminders = _build_reminders(count, random.Random(42))
+    window_end = WINDOW_START + timedelta(days=days)
+    print(f"周期展开压测: {count} 个提醒, 窗口 {days} 天")
+
+    scalar, scalar_elapsed = bench_scalar(reminders, window_end)
+    expanded, expand_elapsed = bench_expand(reminders, window_end)
+    assert scalar == expanded, "两种路径结果不一致"
+
+    occurrences = sum(len(v) for v in expanded.values())
+    for name, elapsed in (("逐次 calculate_next_time", scalar_elapsed), ("批量 expand", expand_elapsed)):
+        print(f"  {name:<26} {elapsed * 1000:>9.1f}ms  {occurrences / elapsed:>12.0f} 次触发/秒")
+    print(f"  共 {occurrences} 次触发, 提升 {scalar_elapsed / expand_elapsed:.1f} 倍")
+
+
+if __name__ == "__main__":
+    reminder_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    window_days = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+    main(reminder_count, window_days)
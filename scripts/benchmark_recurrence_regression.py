@@ -0,0 +1,153 @@
+"""
+周期计算性能回归检查
+对每种典型配置测量 next_time / expand / next_after 的每秒调用次数，以及每次展开的内存分配（tracemalloc），
+与 scripts/benchmark_recurrence_baseline.json 中的基线比较，超过阈值时以非零状态退出
+
+基线与机器相关：换机器或有意改变性能特征后用 --update 重新生成并提交。
+正确性由 tests/test_recurrence_oracle.py 与逐日参照实现对比保证，这里只看性能。
+
+用法:
+    uv run python scripts/benchmark_recurrence_regression.py              # 与基线比较
+    uv run python scripts/benchmark_recurrence_regression.py --update     # 重新生成基线
+    uv run python scripts/benchmark_recurrence_regression.py --tolerance 0.4
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.recurrence import compile_rule
+from app.models.reminder import RecurrenceType
+
+BASELINE_PATH = Path(__file__).parent / "benchmark_recurrence_baseline.json"
+# 默认允许吞吐量下降 35%（共享机器上多次运行的波动约 30%）；分配量比较的是确定值，只允许 10% 加少量固定开销
+DEFAULT_TOLERANCE = 0.35
+ALLOCATION_TOLERANCE = 0.10
+ALLOCATION_SLACK_BYTES = 512
+
+ANCHOR = datetime(2024, 1, 31, 9, 0)
+WINDOW_START, WINDOW_END = datetime(2025, 1, 1), datetime(2025, 4, 1)
+MOMENT = datetime(2027, 6, 15, 12, 0)
+
+CASES = {
+    "daily": (RecurrenceType.DAILY, {"interval": 1}),
+    "daily_workdays": (RecurrenceType.DAILY, {"workdays_only": True, "time": "08:50"}),
+    "weekly": (RecurrenceType.WEEKLY, {"weekdays": [0, 2, 4]}),
+    "monthly_month_end": (RecurrenceType.MONTHLY, {"day_of_month": -1}),
+    "monthly_skip_weekend": (RecurrenceType.MONTHLY, {"day_of_month": 31, "skip_weekend": True}),
+    "monthly_unpinned": (RecurrenceType.MONTHLY, {}),
+    "yearly_leap_day": (RecurrenceType.YEARLY, {"month": 2, "day": 29}),
+    "custom_days": (RecurrenceType.CUSTOM, {"days": 45, "time": "08:30"}),
+    "custom_rrule": (RecurrenceType.CUSTOM, {"rrule": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"}),
+    "lunar_yearly": (RecurrenceType.LUNAR_YEARLY, {"lunar_month": 8, "lunar_day": 15}),
+}
+
+# 指标: (名称, 越大越好)
+METRICS = {
+    "next_time_per_sec": True,
+    "expand_per_sec": True,
+    "next_after_per_sec": True,
+    "expand_peak_bytes": False,
+    "expand_blocks": False,
+}
+
+
+def _per_sec(fn) -> float:
+    """自动确定每轮次数，取 3 轮中最快的一轮"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return number / min(timer.repeat(repeat=3, number=number))
+
+
+def _allocations(fn) -> tuple[int, int]:
+    """
+    单次调用的内存分配
+
+    Returns:
+        (峰值字节数, 调用结束后仍保留的内存块数)
+    """
+    fn()  # 预热缓存，只统计稳态下的分配
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1] - start_bytes
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+    return peak, blocks
+
+
+def measure() -> dict:
+    results = {}
+    for name, (recurrence_type, config) in CASES.items():
+        rule = compile_rule(recurrence_type, config)
+        expand = lambda: rule.expand(ANCHOR, WINDOW_START, WINDOW_END)
+        peak, blocks = _allocations(expand)
+        results[name] = {
+            "next_time_per_sec": round(_per_sec(lambda: rule.next_time(ANCHOR))),
+            "expand_per_sec": round(_per_sec(expand)),
+            "next_after_per_sec": round(_per_sec(lambda: rule.next_after(ANCHOR, MOMENT))),
+            "expand_peak_bytes": peak,
+            "expand_blocks": blocks,
+        }
+        print(f"  {name:<22} " + "  ".join(f"{metric}={value}" for metric, value in results[name].items()))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """返回超过阈值的回归项"""
+    regressions = []
+    for name, metrics in results.items():
+        expected = baseline["cases"].get(name)
+        if expected is None:
+            print(f"  {name}: 基线中没有该配置，跳过")
+            continue
+        for metric, higher_is_better in METRICS.items():
+            value, reference = metrics[metric], expected[metric]
+            if higher_is_better and value < reference * (1 - tolerance):
+                regressions.append(f"{name}.{metric}: {value} < 基线 {reference} 的 {1 - tolerance:.0%}")
+            elif not higher_is_better and value > reference * (1 + ALLOCATION_TOLERANCE) + ALLOCATION_SLACK_BYTES:
+                regressions.append(f"{name}.{metric}: {value} > 基线 {reference}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="周期计算性能回归检查")
+    parser.add_argument("--update", action="store_true", help="重新生成基线")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的吞吐量下降比例")
+    args = parser.parse_args()
+
+    environment = {"python": platform.python_version(), "machine": platform.machine()}
+    print(f"周期计算性能回归检查: Python {environment['python']} / {environment['machine']}")
+    results = measure()
+
+    if args.update or not BASELINE_PATH.exists():
+        BASELINE_PATH.write_text(
+            json.dumps({**environment, "cases": results}, indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
+        )
+        print(f"已写入基线 {BASELINE_PATH}")
+        return 0
+
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+    if (baseline.get("python"), baseline.get("machine")) != (environment["python"], environment["machine"]):
+        print(f"  注意: 基线来自 Python {baseline.get('python')} / {baseline.get('machine')}，吞吐量仅供参考")
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"  ✗ {regression}")
+    print("❌ 性能回归" if regressions else "✅ 未超过基线阈值")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+周期规则单次计算压测
+对比每次调用都解析 recurrence_config（RecurrenceRule.from_config）、
+经缓存取编译规则（calculate_next_occurrence / RecurrenceEngine / RecurrenceService 的实际路径）、
+以及直接复用编译好的规则三种方式的单次耗时
+
+用法:
+    uv run python scripts/benchmark_recurrence_rules.py          # 默认每种配置 100000 次
+    uv run python scripts/benchmark_recurrence_rules.py 500000
+"""
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.recurrence import RecurrenceRule, calculate_next_occurrence, compile_rule
+from app.models.reminder import RecurrenceType
+
+LAST_TIME = datetime(2026, 1, 31, 9, 0)
+
+CASES = [
+    (RecurrenceType.DAILY, {"interval": 1}),
+    (RecurrenceType.WEEKLY, {"weekdays": [0, 2, 4]}),
+    (RecurrenceType.MONTHLY, {"day_of_month": 31, "skip_weekend": True}),
+    (RecurrenceType.YEARLY, {"month": 2, "day": 29}),
+    (RecurrenceType.CUSTOM, {"days": 45, "time": "08:30"}),
+    (RecurrenceType.LUNAR_YEARLY, {"lunar_month": 8, "lunar_day": 15}),
+]
+
+
+def _per_call_us(fn, number: int) -> float:
+    """取 5 轮中最快的一轮，减少机器抖动"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main(number: int):
+    print(f"周期规则单次计算压测: 每种配置 {number} 次, 单位 微秒/次")
+    print(f"  {'类型':<10} {'每次解析':>10} {'缓存取规则':>10} {'复用规则':>10}")
+    for recurrence_type, config in CASES:
+        rule = compile_rule(recurrence_type, config)
+        parse = _per_call_us(lambda: RecurrenceRule.from_config(recurrence_type, config).next_time(LAST_TIME), number)
+        cached = _per_call_us(lambda: calculate_next_occurrence(LAST_TIME, recurrence_type, config), number)
+        compiled = _per_call_us(lambda: rule.next_time(LAST_TIME), number)
+        print(f"  {recurrence_type.value:<12} {parse:>10.2f} {cached:>12.2f} {compiled:>12.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
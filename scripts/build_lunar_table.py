@@ -0,0 +1,93 @@
+"""
+生成农历换算表 app/core/data/lunar_1900_2100.bin
+把通行的 1900-2100 年农历数据（每年一个 17 位编码）解码为每年的春节日序号、各月大小和闰月，
+按 app.core.lunar 的二进制格式写出；生成前用已知的春节日期和闰月校验
+
+用法:
+    uv run python scripts/build_lunar_table.py
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.lunar import FIRST_YEAR, HEADER, MAGIC, RECORD, TABLE_PATH
+
+# 每年一个编码: bit 16 闰月是否大月，bit 15..4 正月到腊月是否大月（30天），bit 3..0 闰几月（0=无闰月）
+LUNAR_INFO = [
+    0x04bd8, 0x04ae0, 0x0a570, 0x054d5, 0x0d260, 0x0d950, 0x16554, 0x056a0, 0x09ad0, 0x055d2,  # 1900
+    0x04ae0, 0x0a5b6, 0x0a4d0, 0x0d250, 0x1d255, 0x0b540, 0x0d6a0, 0x0ada2, 0x095b0, 0x14977,  # 1910
+    0x04970, 0x0a4b0, 0x0b4b5, 0x06a50, 0x06d40, 0x1ab54, 0x02b60, 0x09570, 0x052f2, 0x04970,  # 1920
+    0x06566, 0x0d4a0, 0x0ea50, 0x16a95, 0x05ad0, 0x02b60, 0x186e3, 0x092e0, 0x1c8d7, 0x0c950,  # 1930
+    0x0d4a0, 0x1d8a6, 0x0b550, 0x056a0, 0x1a5b4, 0x025d0, 0x092d0, 0x0d2b2, 0x0a950, 0x0b557,  # 1940
+    0x06ca0, 0x0b550, 0x15355, 0x04da0, 0x0a5b0, 0x14573, 0x052b0, 0x0a9a8, 0x0e950, 0x06aa0,  # 1950
+    0x0aea6, 0x0ab50, 0x04b60, 0x0aae4, 0x0a570, 0x05260, 0x0f263, 0x0d950, 0x05b57, 0x056a0,  # 1960
+    0x096d0, 0x04dd5, 0x04ad0, 0x0a4d0, 0x0d4d4, 0x0d250, 0x0d558, 0x0b540, 0x0b6a0, 0x195a6,  # 1970
+    0x095b0, 0x049b0, 0x0a974, 0x0a4b0, 0x0b27a, 0x06a50, 0x06d40, 0x0af46, 0x0ab60, 0x09570,  # 1980
+    0x04af5, 0x04970, 0x064b0, 0x074a3, 0x0ea50, 0x06b58, 0x05ac0, 0x0ab60, 0x096d5, 0x092e0,  # 1990
+    0x0c960, 0x0d954, 0x0d4a0, 0x0da50, 0x07552, 0x056a0, 0x0abb7, 0x025d0, 0x092d0, 0x0cab5,  # 2000
+    0x0a950, 0x0b4a0, 0x0baa4, 0x0ad50, 0x055d9, 0x04ba0, 0x0a5b0, 0x15176, 0x052b0, 0x0a930,  # 2010
+    0x07954, 0x06aa0, 0x0ad50, 0x05b52, 0x04b60, 0x0a6e6, 0x0a4e0, 0x0d260, 0x0ea65, 0x0d530,  # 2020
+    0x05aa0, 0x076a3, 0x096d0, 0x04afb, 0x04ad0, 0x0a4d0, 0x1d0b6, 0x0d250, 0x0d520, 0x0dd45,  # 2030
+    0x0b5a0, 0x056d0, 0x055b2, 0x049b0, 0x0a577, 0x0a4b0, 0x0aa50, 0x1b255, 0x06d20, 0x0ada0,  # 2040
+    0x14b63, 0x09370, 0x049f8, 0x04970, 0x064b0, 0x168a6, 0x0ea50, 0x06b20, 0x1a6c4, 0x0aae0,  # 2050
+    0x092e0, 0x0d2e3, 0x0c960, 0x0d557, 0x0d4a0, 0x0da50, 0x05d55, 0x056a0, 0x0a6d0, 0x055d4,  # 2060
+    0x052d0, 0x0a9b8, 0x0a950, 0x0b4a0, 0x0b6a6, 0x0ad50, 0x055a0, 0x0aba4, 0x0a5b0, 0x052b0,  # 2070
+    0x0b273, 0x06930, 0x07337, 0x06aa0, 0x0ad50, 0x14b55, 0x04b60, 0x0a570, 0x054e4, 0x0d160,  # 2080
+    0x0e968, 0x0d520, 0x0daa0, 0x16aa6, 0x056d0, 0x04ae0, 0x0a9d4, 0x0a2d0, 0x0d150, 0x0f252,  # 2090
+    0x0d520,  # 2100
+]
+
+# 1900 年正月初一
+FIRST_NEW_YEAR = date(1900, 1, 31)
+
+KNOWN_NEW_YEARS = {
+    1949: date(1949, 1, 29), 1990: date(1990, 1, 27), 2000: date(2000, 2, 5), 2008: date(2008, 2, 7),
+    2020: date(2020, 1, 25), 2023: date(2023, 1, 22), 2024: date(2024, 2, 10), 2025: date(2025, 1, 29),
+    2026: date(2026, 2, 17), 2027: date(2027, 2, 6), 2028: date(2028, 1, 26),
+}
+KNOWN_LEAP_MONTHS = {1995: 8, 2001: 4, 2004: 2, 2006: 7, 2012: 4, 2014: 9, 2017: 6, 2020: 4, 2023: 2, 2025: 6, 2028: 5}
+
+
+def decode(info: int) -> tuple:
+    """
+    解码一年的编码
+
+    Returns:
+        (各月大小位图（第 i 位对应当年第 i 个月，闰月按顺序排在对应月份之后）, 月数, 闰月)
+    """
+    leap_month = info & 0xF
+    bits, index = 0, 0
+    for month in range(1, 13):
+        if info & (0x10000 >> month):
+            bits |= 1 << index
+        index += 1
+        if month == leap_month:
+            if info & 0x10000:
+                bits |= 1 << index
+            index += 1
+    return bits, index, leap_month
+
+
+def build() -> bytes:
+    """按年解码并累计春节日序号，校验后返回表文件内容"""
+    records, years = [], {}
+    new_year = FIRST_NEW_YEAR.toordinal()
+    for offset, info in enumerate(LUNAR_INFO):
+        bits, months, leap_month = decode(info)
+        years[FIRST_YEAR + offset] = (date.fromordinal(new_year), leap_month)
+        records.append(RECORD.pack(new_year, bits, leap_month, 0))
+        new_year += 29 * months + bin(bits).count("1")
+
+    for year, expected in KNOWN_NEW_YEARS.items():
+        assert years[year][0] == expected, f"{year} 春节应为 {expected}，表中为 {years[year][0]}"
+    for year, expected in KNOWN_LEAP_MONTHS.items():
+        assert years[year][1] == expected, f"{year} 应闰{expected}月，表中为 {years[year][1]}"
+    return HEADER.pack(MAGIC, FIRST_YEAR, len(LUNAR_INFO)) + b"".join(records)
+
+
+if __name__ == "__main__":
+    content = build()
+    TABLE_PATH.write_bytes(content)
+    print(f"写入 {TABLE_PATH}（{len(LUNAR_INFO)} 年，{len(content)} 字节）")
@@ -0,0 +1,126 @@
+"""
+本地极光推送桩服务
+在本机随机端口上模拟 JPush v3 REST 接口，用于客户端测试和推送吞吐压测
+
+桩服务运行在独立线程的事件循环里，用 asyncio.sleep 模拟服务端耗时，
+单线程即可承载大量并发连接，避免线程版 HTTPServer 与被测客户端争抢 GIL 而拉低压测结果。
+
+用法:
+    with JPushStubServer(latency=0.005) as stub:
+        client = AsyncJPushClient("key", "secret", base_url=stub.base_url)
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 429: "Too Many Requests",
+           500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+class JPushStubServer:
+    """
+    JPush 桩服务
+
+    Attributes:
+        requests: 收到的请求列表，每项包含 path、payload、authorization
+        connections: 建立过的 TCP 连接数（用于验证 keep-alive 复用）
+    """
+
+    def __init__(self, latency: float = 0.0, status_code: int = 200, body: Dict[str, Any] | str | None = None):
+        """
+        Args:
+            latency: 每个请求的模拟处理耗时（秒）
+            status_code: 返回的 HTTP 状态码
+            body: 返回的响应体（字典按 JSON 返回，字符串原样返回），默认模拟推送成功
+        """
+        self.latency = latency
+        self.status_code = status_code
+        self.body = body
+        self.requests: List[Dict[str, Any]] = []
+        self.connections = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._thread: threading.Thread | None = None
+        self._port: int | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._port is not None, "stub server is not running"
+        return f"http://127.0.0.1:{self._port}/v3"
+
+    def _response_bytes(self) -> bytes:
+        body = self.body
+        if body is None:
+            sendno = len(self.requests)
+            body = {"sendno": str(sendno), "msg_id": str(100000 + sendno)}
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        head = (
+            f"HTTP/1.1 {self.status_code} {REASONS.get(self.status_code, 'Unknown')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: keep-alive\r\n\r\n"
+        )
+        return head.encode() + data
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                path = lines[0].split(" ")[1]
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                raw = await reader.readexactly(length) if length else b""
+                self.requests.append({
+                    "path": path,
+                    "payload": json.loads(raw) if raw else None,
+                    "authorization": headers.get("authorization"),
+                })
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(self._response_bytes())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _run(self, ready: threading.Event) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=1024)
+        )
+        self._port = self._server.sockets[0].getsockname()[1]
+        ready.set()
+        self._loop.run_forever()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def start(self) -> "JPushStubServer":
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+    def __enter__(self) -> "JPushStubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,215 @@
+"""
+测试极光推送客户端 - 基于本地桩服务
+覆盖异步连接池客户端、同步兼容客户端，以及推送吞吐对比（每次新建连接 vs 共享连接池）
+
+直接运行本文件可以用更大的请求量做压测:
+    python tests/test_jpush_client.py 2000
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import asyncio
+import time
+
+import requests
+
+from app.services import jpush_service
+from app.services.jpush_service import AsyncJPushClient, JPushClient, close_jpush_clients, get_async_jpush_client
+from jpush_stub_server import JPushStubServer
+
+
+def test_async_push_to_user():
+    """异步客户端按别名推送，携带 Basic 认证"""
+    async def run(stub):
+        client = AsyncJPushClient("app-key", "master-secret", base_url=stub.base_url)
+        try:
+            return await client.push_to_user("42", "交房租", "今天交房租", extras={"reminder_id": 7})
+        finally:
+            await client.aclose()
+
+    with JPushStubServer() as stub:
+        result = asyncio.run(run(stub))
+
+    assert result["success"] is True
+    assert result["msg_id"] == "100001"
+    request = stub.requests[0]
+    assert request["path"] == "/v3/push"
+    assert request["payload"]["audience"] == {"alias": ["42"]}
+    assert request["payload"]["notification"]["android"]["extras"] == {"reminder_id": 7}
+    assert request["authorization"].startswith("Basic ")
+
+
+def test_async_client_reuses_connection():
+    """顺序推送复用同一个 keep-alive 连接"""
+    async def run(stub):
+        client = AsyncJPushClient("app-key", "master-secret", base_url=stub.base_url)
+        try:
+            for i in range(20):
+                result = await client.push_to_user(str(i), "t", "c")
+                assert result["success"]
+        finally:
+            await client.aclose()
+
+    with JPushStubServer() as stub:
+        asyncio.run(run(stub))
+
+    assert len(stub.requests) == 20
+    assert stub.connections == 1, f"应只建立1个连接，实际{stub.connections}个"
+
+
+def test_client_per_event_loop_closed_on_shutdown():
+    """每个事件循环各用一个客户端，关闭时之前事件循环创建的客户端也一并关闭，不泄漏连接池"""
+    async def get_twice():
+        client = get_async_jpush_client()
+        assert get_async_jpush_client() is client, "同一事件循环复用"
+        return client
+
+    first = asyncio.run(get_twice())
+    second = asyncio.run(get_twice())
+    assert first is not second, "连接池绑定在事件循环上，换循环重新创建"
+
+    asyncio.run(close_jpush_clients())
+    assert first._http.is_closed and second._http.is_closed
+    assert jpush_service._async_jpush_clients == {}
+
+
+def test_error_responses():
+    """业务错误和非 JSON 网关错误都转换为失败结果"""
+    async def run(stub):
+        client = AsyncJPushClient("app-key", "master-secret", base_url=stub.base_url)
+        try:
+            return await client.push_to_user("1", "t", "c")
+        finally:
+            await client.aclose()
+
+    error_body = {"error": {"code": 1011, "message": "cannot find user by this audience"}}
+    with JPushStubServer(status_code=400, body=error_body) as stub:
+        result = asyncio.run(run(stub))
+    assert result["success"] is False
+    assert result["error_code"] == 1011
+    assert result["status_code"] == 400
+
+    with JPushStubServer(status_code=502, body="<html>Bad Gateway</html>") as stub:
+        result = asyncio.run(run(stub))
+    assert result["success"] is False
+    assert result["error"] == "Unknown error"
+    assert result["status_code"] == 502
+
+
+def test_network_error():
+    """连接失败返回 NETWORK_ERROR"""
+    async def run():
+        client = AsyncJPushClient("app-key", "master-secret", base_url="http://127.0.0.1:1/v3")
+        try:
+            return await client.push_to_user("1", "t", "c")
+        finally:
+            await client.aclose()
+
+    result = asyncio.run(run())
+    assert result["success"] is False
+    assert result["error_code"] == "NETWORK_ERROR"
+
+
+def test_push_to_aliases():
+    """多别名推送一次请求覆盖所有别名，超过上限直接拒绝"""
+    async def run(stub):
+        client = AsyncJPushClient("app-key", "master-secret", base_url=stub.base_url)
+        try:
+            result = await client.push_to_aliases(["1", "2", "3"], "交房租", "本月房租到期")
+            try:
+                await client.push_to_aliases([str(i) for i in range(1001)], "t", "c")
+            except ValueError:
+                rejected = True
+            else:
+                rejected = False
+            return result, rejected
+        finally:
+            await client.aclose()
+
+    with JPushStubServer() as stub:
+        result, rejected = asyncio.run(run(stub))
+
+    assert result["success"] is True
+    assert len(stub.requests) == 1
+    assert stub.requests[0]["payload"]["audience"] == {"alias": ["1", "2", "3"]}
+    assert rejected, "超过1000个别名应抛出 ValueError"
+
+
+def test_sync_client_shim():
+    """同步客户端保持原有接口"""
+    with JPushStubServer() as stub:
+        client = JPushClient("app-key", "master-secret", base_url=stub.base_url)
+        try:
+            result = client.push_to_tags(["vip"], "t", "c")
+            alias_result = client.set_alias("reg-1", "42")
+            valid = client.validate_credentials()
+        finally:
+            client.close()
+
+    assert result["success"] is True
+    assert stub.requests[0]["payload"]["audience"] == {"tag": ["vip"]}
+    assert alias_result == {"success": True}
+    assert stub.requests[1]["path"] == "/v3/devices/reg-1"
+    assert valid is True
+    assert stub.connections == 1
+
+
+def _bench_requests_per_call(base_url: str, count: int) -> float:
+    """旧实现：每次推送 requests.post 新建连接、串行执行"""
+    start = time.perf_counter()
+    for i in range(count):
+        requests.post(f"{base_url}/push", auth=("k", "s"), json={"audience": {"alias": [str(i)]}}, timeout=10)
+    return count / (time.perf_counter() - start)
+
+
+def _bench_async_pooled(base_url: str, count: int, concurrency: int) -> float:
+    """新实现：共享连接池 + 有限并发"""
+    async def run():
+        client = AsyncJPushClient("k", "s", base_url=base_url)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                return await client.push_to_user(str(i), "t", "c")
+
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(one(i) for i in range(count)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await client.aclose()
+        assert all(r["success"] for r in results)
+        return count / elapsed
+
+    return asyncio.run(run())
+
+
+def run_benchmark(count: int = 200, latency: float = 0.005, concurrency: int = 20):
+    """对比两种实现每秒推送数"""
+    with JPushStubServer(latency=latency) as stub:
+        before = _bench_requests_per_call(stub.base_url, count)
+        before_connections = stub.connections
+    with JPushStubServer(latency=latency) as stub:
+        after = _bench_async_pooled(stub.base_url, count, concurrency)
+        after_connections = stub.connections
+
+    print(f"\n    桩服务延迟 {latency * 1000:.0f}ms, {count} 次推送")
+    print(f"    requests.post 每次新建连接: {before:8.1f} 次/秒, 连接数 {before_connections}")
+    print(f"    AsyncJPushClient 并发{concurrency}:  {after:8.1f} 次/秒, 连接数 {after_connections}")
+    return before, after, before_connections, after_connections
+
+
+def test_benchmark_pushes_per_second():
+    """
+    压测对比（吞吐数值只打印不断言，受机器和 httpcore/anyio 版本影响较大）
+    断言连接复用：旧实现每次推送一个新连接，新实现连接数受并发上限约束
+    """
+    _, _, before_connections, after_connections = run_benchmark()
+    assert before_connections == 200
+    assert after_connections <= 20
+
+
+if __name__ == "__main__":
+    run_benchmark(count=int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,52 @@
+"""
+测试农历换算 - 已知日期、整表往返换算与范围边界
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date, timedelta
+
+from app.core.lunar import LunarDate, leap_month, lunar_to_solar, month_days, solar_to_lunar
+
+
+def test_known_dates():
+    """春节、中秋和闰月与官方日历一致"""
+    for year, new_year in [(1949, date(1949, 1, 29)), (2000, date(2000, 2, 5)), (2026, date(2026, 2, 17))]:
+        assert lunar_to_solar(year, 1, 1) == new_year
+        assert solar_to_lunar(new_year) == LunarDate(year, 1, 1)
+    assert lunar_to_solar(2026, 8, 15) == date(2026, 9, 25)
+    assert solar_to_lunar(date(2025, 8, 1)) == LunarDate(2025, 6, 8, True), "2025年闰六月"
+    assert solar_to_lunar(date(2026, 1, 1)) == LunarDate(2025, 11, 13), "春节前属于上一个农历年"
+    assert [leap_month(year) for year in (2020, 2023, 2024, 2025)] == [4, 2, 0, 6]
+    assert month_days(2026, 12) == 29 and month_days(2025, 6, leap=True) == 29
+
+
+def test_round_trip_whole_table():
+    """换算表覆盖的每一天公历转农历再转回公历不变，日期连续"""
+    day, end = date(1900, 1, 31), date(2101, 1, 29)
+    previous = None
+    while day < end:
+        lunar = solar_to_lunar(day)
+        assert lunar_to_solar(*lunar) == day, f"{day} -> {lunar}"
+        if previous is not None and lunar.day != 1:
+            assert lunar[:2] == previous[:2] and lunar.day == previous.day + 1
+        previous = lunar
+        day += timedelta(days=1)
+    print(f"\n    ✓ 往返换算 {(end - date(1900, 1, 31)).days} 天")
+
+
+def test_out_of_range():
+    """超出 1900-2100 农历年或日期不存在时报 ValueError"""
+    for call in (
+        lambda: solar_to_lunar(date(1900, 1, 30)),
+        lambda: solar_to_lunar(date(2101, 1, 29)),
+        lambda: lunar_to_solar(2101, 1, 1),
+        lambda: lunar_to_solar(2026, 12, 30),
+        lambda: lunar_to_solar(2026, 6, 1, leap=True),
+    ):
+        try:
+            call()
+            assert False, "应报错"
+        except ValueError:
+            pass
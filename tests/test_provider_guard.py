@@ -0,0 +1,179 @@
+"""
+测试外部服务调用保护 - 自适应令牌桶、半开熔断器、极光客户端和调度器的降级行为
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.services.jpush_service import AsyncJPushClient
+from app.services.provider_guard import (
+    OUTCOME_FAILURE,
+    OUTCOME_SUCCESS,
+    OUTCOME_THROTTLED,
+    AdaptiveTokenBucket,
+    CircuitBreaker,
+    ProviderGuard,
+)
+from app.services.push_scheduler import PushScheduler
+from app.services.push_wakeup import PushWakeup
+from jpush_stub_server import JPushStubServer
+
+NOW = datetime(2026, 1, 1, 8, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_aimd():
+    """被限流时速率减半（不低于下限），成功后线性恢复（不超过上限）"""
+    clock = FakeClock()
+    bucket = AdaptiveTokenBucket(rate=10, max_rate=10, min_rate=1, clock=clock)
+    assert sum(bucket.try_acquire() for _ in range(20)) == 10, "桶容量为 1 秒的令牌量"
+    assert abs(bucket.wait_time() - 0.1) < 1e-9
+
+    for expected in (5, 2.5, 1.25, 1, 1):
+        bucket.on_throttle()
+        assert bucket.rate == expected
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+    clock.advance(0.5)
+    assert sum(bucket.try_acquire() for _ in range(20)) == 5
+
+
+def test_circuit_breaker_half_open():
+    """连续失败熔断，冷却后只放行一个探测请求，探测结果决定恢复或重新熔断"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30, clock=clock)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED, "成功会清零连续失败次数"
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == 30
+
+    clock.advance(30)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request(), "半开状态只放行一个探测请求"
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.open_count == 2
+
+    clock.advance(30)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_guard_classifies_results():
+    """429 只降速不熔断；5xx 和网络错误计为故障；业务错误说明服务正常"""
+    classify = ProviderGuard.classify_push_result
+    assert classify({"success": True}) == OUTCOME_SUCCESS
+    assert classify({"success": False, "status_code": 429, "error_code": 2002}) == OUTCOME_THROTTLED
+    assert classify({"success": False, "status_code": 503}) == OUTCOME_FAILURE
+    assert classify({"success": False, "error_code": "NETWORK_ERROR"}) == OUTCOME_FAILURE
+    assert classify({"success": False, "status_code": 400, "error_code": 1011}) == OUTCOME_SUCCESS
+
+    clock = FakeClock()
+    guard = ProviderGuard("test", rate=10, max_rate=10, failure_threshold=2, clock=clock)
+    for _ in range(5):
+        guard.record(OUTCOME_THROTTLED)
+    snapshot = guard.snapshot()
+    assert snapshot["state"] == "closed"
+    assert snapshot["rate_per_sec"] == 1.0
+    assert snapshot["throttled"] == 5
+
+
+def test_guard_rejects_without_calling_provider():
+    """熔断时立即返回 CIRCUIT_OPEN，令牌耗尽时同步调用方立即返回 PROVIDER_THROTTLED"""
+    clock = FakeClock()
+    guard = ProviderGuard("test", rate=2, max_rate=2, failure_threshold=2, recovery_timeout=10, clock=clock)
+    assert guard.before_call_nowait() is None
+    assert guard.before_call_nowait() is None
+    throttled = guard.before_call_nowait()
+    assert throttled["error_code"] == "PROVIDER_THROTTLED" and throttled["retry_after"] > 0
+
+    guard.record(OUTCOME_FAILURE)
+    guard.record(OUTCOME_FAILURE)
+    assert not guard.available
+    rejection = guard.before_call_nowait()
+    assert rejection["error_code"] == "CIRCUIT_OPEN"
+    assert rejection["retry_after"] == 10
+
+    snapshot = guard.snapshot()
+    assert snapshot["calls"] == 2
+    assert snapshot["rejected_circuit_open"] == 1 and snapshot["rejected_throttled"] == 1
+
+
+def test_async_client_fails_fast_when_provider_down():
+    """服务端持续 503 时熔断，之后的推送不再发出请求、不再等待超时"""
+    guard = ProviderGuard("jpush", rate=100, max_rate=100, failure_threshold=3, recovery_timeout=60)
+
+    async def run(stub):
+        client = AsyncJPushClient("app-key", "master-secret", base_url=stub.base_url, guard=guard)
+        try:
+            return [await client.push_to_user(str(i), "t", "c") for i in range(10)]
+        finally:
+            await client.aclose()
+
+    with JPushStubServer(status_code=503, body={"error": {"code": 1000, "message": "busy"}}) as stub:
+        results = asyncio.run(run(stub))
+
+    assert len(stub.requests) == 3, f"熔断后不应再请求服务端，实际 {len(stub.requests)} 次"
+    assert [r["error_code"] for r in results[3:]] == ["CIRCUIT_OPEN"] * 7
+    assert guard.snapshot()["failure"] == 3
+
+
+def test_async_guard_waits_for_tokens():
+    """异步调用方在 max_wait 内等待令牌，超过则本地拒绝"""
+    guard = ProviderGuard("test", rate=20, max_rate=20, max_wait=0.2)
+
+    async def run():
+        return [await guard.before_call() for _ in range(25)]
+
+    results = asyncio.run(run())
+    assert results == [None] * 25, "令牌用完后短暂等待即可获得"
+
+    slow = ProviderGuard("slow", rate=1, max_rate=1, max_wait=0.2)
+    assert asyncio.run(slow.before_call()) is None
+    assert asyncio.run(slow.before_call())["error_code"] == "PROVIDER_THROTTLED"
+
+
+def test_scheduler_defers_rejected_tasks():
+    """熔断/本地限流的任务延后到冷却结束，不计入重试次数"""
+    clock = FakeClock()
+    guard = ProviderGuard("jpush", rate=10, max_rate=10, failure_threshold=1, recovery_timeout=30, clock=clock)
+    scheduler = PushScheduler(interval=1, wakeup=PushWakeup(channel="test"), provider_guard=guard)
+    outcomes = {"sent": [], "failed": [], "retry": [], "dead_letter": [], "deferred": []}
+    task = SimpleNamespace(id=5, retry_count=2, max_retries=3)
+
+    scheduler._collect_outcome(task, {"success": False, "error": "jpush circuit open",
+                                      "error_code": "CIRCUIT_OPEN", "retry_after": 30}, outcomes, NOW)
+    assert outcomes["deferred"] == [{"id": 5, "next_attempt_at": NOW + timedelta(seconds=30),
+                                     "error_message": "jpush circuit open"}]
+    assert outcomes["dead_letter"] == [], "未发出的请求不消耗重试次数"
+
+    guard.record(OUTCOME_FAILURE)
+    assert guard.retry_after() == 30, "调度器据此暂停认领"
+    clock.advance(30)
+    assert guard.retry_after() == 0 and guard.available
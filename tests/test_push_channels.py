@@ -0,0 +1,298 @@
+"""
+测试多渠道推送管道 - 渠道隔离、速率预算、队列满降级、推送日志批量写入与调度器按渠道分流
+渠道使用本地 stub 服务，推送日志写入内存 SQLite
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.config import settings
+from app.core.database import Base
+from app.repositories.push_log_repository import PushLogRepository
+from app.repositories.push_task_repository import PushTaskRepository
+from app.services import push_channels
+from app.services.push_channels import (
+    CHANNEL_APP,
+    ERROR_NOT_CONFIGURED,
+    ChannelPipeline,
+    SmsChannelProvider,
+    StubChannelProvider,
+)
+from app.services.push_dispatcher import DispatchStats
+from app.services.push_scheduler import PushScheduler
+from app.services.push_wakeup import PushWakeup
+
+
+def _tasks(count: int, channels):
+    return [
+        SimpleNamespace(id=i, reminder_id=100 + i, user_id=1000 + i, title=f"提醒{i}", content=None, channels=channels,
+                        priority=1 + i % 3, scheduled_at=time.time())
+        for i in range(count)
+    ]
+
+
+async def _session_maker():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def test_slow_channel_does_not_block_others(monkeypatch):
+    """短信渠道很慢时微信渠道照常发完；各渠道并发和速率各自受限；结果批量写入 push_logs"""
+    pytest.importorskip("aiosqlite")
+
+    async def run():
+        engine, session_maker = await _session_maker()
+        providers = {
+            "sms": StubChannelProvider("sms", latency_ms=100),
+            "wechat": StubChannelProvider("wechat", latency_ms=1, failure_rate=0.5, rng=random.Random(3)),
+        }
+        pipeline = ChannelPipeline(
+            providers=providers,
+            limits={"sms": (2, 1000.0), "wechat": (4, 1000.0)},
+            session_maker=session_maker,
+            flush_size=1000,
+            flush_interval=60
+        )
+        pipeline.start()
+        tasks = _tasks(10, ["app", "sms", "wechat", "call"])
+        for task in tasks:
+            pipeline.record(task, CHANNEL_APP, {"success": True})
+        start = time.perf_counter()
+        submitted = await pipeline.submit(db=None, tasks=tasks)
+        await pipeline.pools["wechat"].queue.join()
+        wechat_done = time.perf_counter() - start
+        await pipeline.drain()
+        sms_done = time.perf_counter() - start
+        snapshot = pipeline.snapshot()
+        await pipeline.stop()
+
+        async with session_maker() as db:
+            stats = {channel: await PushLogRepository(db).get_channel_stats(channel) for channel in ("app", "sms", "wechat")}
+        await engine.dispose()
+        return submitted, wechat_done, sms_done, snapshot, stats
+
+    async def fake_phones(self, user_ids):
+        return {user_id: f"138{user_id:08d}" for user_id in user_ids}
+
+    monkeypatch.setattr(push_channels.UserRepository, "get_phones", fake_phones)
+    submitted, wechat_done, sms_done, snapshot, stats = asyncio.run(run())
+
+    print(f"\n    wechat {wechat_done * 1000:.0f}ms / sms {sms_done * 1000:.0f}ms, {snapshot}")
+    assert submitted == 20, "call 渠道没有服务，跳过并记为失败"
+    assert snapshot["skipped"] == 10
+    assert wechat_done < 0.1, "微信渠道不应等待短信渠道"
+    # 短信并发 2、每条 100ms：10 条约 500ms
+    assert 0.45 < sms_done < 1.0
+    assert stats["app"]["total"] == 10 and stats["app"]["success"] == 10
+    assert stats["sms"]["success"] == 10
+    assert stats["wechat"]["total"] == 10 and 0 < stats["wechat"]["failed"] < 10
+    assert snapshot["logs_written"] == 40
+    assert snapshot["tasks_settled"] == 0, "含 app 的任务状态以 app 推送为准"
+
+
+def test_channel_rate_budget():
+    """每个渠道的发送速率不超过配置的预算"""
+    async def run():
+        pipeline = ChannelPipeline(
+            providers={"wechat": StubChannelProvider("wechat", latency_ms=0)},
+            limits={"wechat": (8, 20.0)},
+            session_maker=lambda: None,
+            flush_size=10000
+        )
+        pipeline.pools["wechat"].start()
+        start = time.perf_counter()
+        await pipeline.submit(db=None, tasks=_tasks(40, ["wechat"]))
+        await pipeline.pools["wechat"].queue.join()
+        elapsed = time.perf_counter() - start
+        await pipeline.pools["wechat"].stop()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    # 桶内初始 20 个令牌，其余 20 个按 20 次/秒发放
+    assert 0.9 < elapsed < 1.5, f"40 条按 20 次/秒应约 1 秒，实际 {elapsed:.2f}s"
+
+
+def test_queue_full_and_unconfigured_sms():
+    """队列满的推送直接记为失败；未配置提醒短信模板时短信渠道返回未配置"""
+    async def run():
+        pipeline = ChannelPipeline(
+            providers={"wechat": StubChannelProvider("wechat", latency_ms=0)},
+            limits={"wechat": (1, 100.0)},
+            session_maker=lambda: None,
+            flush_size=10000
+        )
+        pipeline.pools["wechat"].queue = asyncio.Queue(maxsize=2)
+        submitted = await pipeline.submit(db=None, tasks=_tasks(3, ["wechat"]))
+        sms = await SmsChannelProvider(service=object()).send({"task_id": 1, "recipient": "13800000000", "title": "吃药"})
+        return submitted, pipeline, sms
+
+    submitted, pipeline, sms = asyncio.run(run())
+    assert submitted == 2 and pipeline.pools["wechat"].dropped == 1
+    assert pipeline._buffer[0]["status"] == "failed"
+    assert pipeline._buffer[0]["error_message"] == "Channel queue full"
+    assert sms["error_code"] == ERROR_NOT_CONFIGURED
+
+
+class _FakeDispatcher:
+    """记录经极光推送的任务，全部返回成功"""
+
+    def __init__(self):
+        self.dispatched = []
+
+    async def dispatch(self, tasks):
+        self.dispatched.extend(task.id for task in tasks)
+        stats = DispatchStats()
+        stats.record(1.0, True, tasks=len(tasks))
+        stats.finish()
+        return [(task, {"success": True}) for task in tasks], stats
+
+
+class _NullSession:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _scheduler_chunk(monkeypatch, tasks, sms_failure_rate=0.0):
+    """
+    用 stub 短信渠道推送一块任务
+
+    Returns:
+        (经极光推送的任务ID, 短信渠道收到的任务ID, 调度器写回的结果, 多渠道管道写回的结果)
+    """
+    writes = []
+
+    async def fake_apply(self, **outcomes):
+        writes.append(outcomes)
+
+    async def fake_logs(self, rows):
+        return len(rows)
+
+    async def fake_phones(self, user_ids):
+        return {user_id: "13800000000" for user_id in user_ids}
+
+    monkeypatch.setattr(PushTaskRepository, "bulk_apply_outcomes", fake_apply)
+    monkeypatch.setattr(PushLogRepository, "bulk_create", fake_logs)
+    monkeypatch.setattr(push_channels.UserRepository, "get_phones", fake_phones)
+    sms = StubChannelProvider("sms", latency_ms=0, failure_rate=sms_failure_rate)
+    sent_by_sms = []
+    original_send = sms.send
+
+    async def send(delivery):
+        sent_by_sms.append(delivery["task_id"])
+        return await original_send(delivery)
+
+    sms.send = send
+
+    async def run():
+        pipeline = ChannelPipeline(
+            providers={"sms": sms}, limits={"sms": (2, 1000.0)}, session_maker=_NullSession, flush_size=10000
+        )
+        dispatcher = _FakeDispatcher()
+        scheduler = PushScheduler(interval=1, dispatcher=dispatcher, channels=pipeline, wakeup=PushWakeup(channel="test"))
+        pipeline.pools["sms"].start()
+        await scheduler._push_chunk(db=None, pending_tasks=tasks)
+        assert len(writes) == 1, "不经 app 推送的任务在渠道结果返回前不写回"
+        await pipeline.drain()
+        await pipeline.pools["sms"].stop()
+        return dispatcher.dispatched
+
+    dispatched = asyncio.run(run())
+    settled = writes[1] if len(writes) > 1 else {"sent": [], "failed": []}
+    return dispatched, sorted(sent_by_sms), writes[0], settled
+
+
+def _claimed(task_id, channels, retry_count=0, deferred=False):
+    due_at = int(time.time())
+    return SimpleNamespace(id=task_id, reminder_id=100 + task_id, user_id=1000 + task_id, title=f"提醒{task_id}",
+                           content=None, channels=channels, priority=1, retry_count=retry_count, max_retries=3,
+                           scheduled_at=due_at, due_at=due_at + 30 if deferred else due_at)
+
+
+def test_sms_only_task_skips_jpush(monkeypatch):
+    """只有渠道包含 app 的任务经极光推送；短信在首次认领时提交，app 重试或延后再次认领时不重复发送"""
+    monkeypatch.setattr(settings, "JPUSH_ENABLED", True)
+    tasks = [
+        _claimed(1, ["sms"]),
+        _claimed(2, ["app", "sms"]),
+        _claimed(3, ["app", "sms"], retry_count=1),
+        _claimed(4, ["app", "sms"], deferred=True),
+    ]
+    dispatched, sent_by_sms, written, settled = _scheduler_chunk(monkeypatch, tasks)
+    assert dispatched == [2, 3, 4], "短信提醒不发 app 推送"
+    assert sent_by_sms == [1, 2]
+    assert sorted(row["id"] for row in written["sent"]) == [2, 3, 4], "短信提醒不在提交时标记为已发送"
+    assert written["cancelled"] == []
+    assert [row["id"] for row in settled["sent"]] == [1]
+    assert settled["sent"][0]["push_response"]["channels"]["sms"]["success"] is True
+    assert settled["failed"] == []
+
+
+def test_channel_only_task_settled_from_channel_results(monkeypatch):
+    """不经 app 推送的任务按各渠道实际结果写回：全部失败（含没有推送服务的渠道）为失败，任一渠道成功为已发送"""
+    monkeypatch.setattr(settings, "JPUSH_ENABLED", True)
+    tasks = [_claimed(1, ["sms"]), _claimed(2, ["wechat"]), _claimed(3, ["sms", "call"])]
+    dispatched, sent_by_sms, written, settled = _scheduler_chunk(monkeypatch, tasks, sms_failure_rate=1.0)
+    assert dispatched == [] and sent_by_sms == [1, 3]
+    assert written["sent"] == [] and written["failed"] == []
+    assert settled["sent"] == []
+    failed = {row["id"]: row["error_message"] for row in settled["failed"]}
+    assert sorted(failed) == [1, 2, 3]
+    assert failed[1] == "sms: stub sms failure"
+    assert failed[2] == "wechat: No provider for channel wechat"
+    assert failed[3] == "sms: stub sms failure; call: No provider for channel call"
+
+    _, _, _, settled = _scheduler_chunk(monkeypatch, [_claimed(4, ["sms", "wechat"])])
+    assert [row["id"] for row in settled["sent"]] == [4], "短信成功、微信没有推送服务仍算已发送"
+
+
+def test_settling_task_not_resubmitted():
+    """仍在等待渠道结果的任务（租约过期后重新认领）不重复提交"""
+    async def run():
+        pipeline = ChannelPipeline(
+            providers={"wechat": StubChannelProvider("wechat", latency_ms=0)},
+            limits={"wechat": (1, 100.0)},
+            session_maker=lambda: None,
+            flush_size=10000
+        )
+        tasks = _tasks(2, ["wechat"])
+        first = await pipeline.submit(db=None, tasks=tasks, settle={0, 1})
+        again = await pipeline.submit(db=None, tasks=tasks, settle={0, 1})
+        return first, again, pipeline.snapshot()
+
+    first, again, snapshot = asyncio.run(run())
+    assert (first, again) == (2, 0)
+    assert snapshot["tasks_settling"] == 2
+
+
+def test_jpush_disabled_still_sends_sms(monkeypatch):
+    """关闭极光推送时只取消 app 推送：含其他渠道的首次认领任务按渠道结果写回，只有 app 可发的任务才取消"""
+    monkeypatch.setattr(settings, "JPUSH_ENABLED", False)
+    tasks = [
+        _claimed(1, ["sms"]),
+        _claimed(2, ["app", "sms"]),
+        _claimed(3, ["app"]),
+        _claimed(4, ["app", "sms"], retry_count=1),
+    ]
+    dispatched, sent_by_sms, written, settled = _scheduler_chunk(monkeypatch, tasks)
+    assert dispatched == []
+    assert sent_by_sms == [1, 2], "app 重试中的任务短信已发过，不重复发送"
+    assert written["cancelled"] == [
+        {"id": 3, "error_message": "JPush is disabled"},
+        {"id": 4, "error_message": "JPush is disabled"},
+    ]
+    assert written["sent"] == []
+    assert sorted(row["id"] for row in settled["sent"]) == [1, 2]
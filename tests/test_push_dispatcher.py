@@ -0,0 +1,223 @@
+"""
+测试推送分发引擎 - 并发上限与统计
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.services import push_dispatcher
+from app.services.push_dispatcher import PushDispatcher, DispatchStats
+
+
+def _make_tasks(count: int):
+    return [
+        SimpleNamespace(id=i, user_id=1000 + i, reminder_id=i, title=f"提醒{i}", content="内容")
+        for i in range(count)
+    ]
+
+
+def test_dispatch_respects_concurrency_limit(monkeypatch):
+    """并发数不超过配置上限，且所有任务都有结果"""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def fake_push(user_id, reminder_id, title, content):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.02)
+        state["in_flight"] -= 1
+        return {"success": True, "msg_id": str(reminder_id)}
+
+    monkeypatch.setattr(push_dispatcher, "push_reminder_notification_async", fake_push)
+
+    dispatcher = PushDispatcher(concurrency=4)
+    tasks = _make_tasks(20)
+    start = time.perf_counter()
+    results, stats = asyncio.run(dispatcher.dispatch(tasks))
+    elapsed = time.perf_counter() - start
+
+    print(f"\n    20 个任务 / 并发 4 耗时 {elapsed * 1000:.1f}ms, 统计: {stats.to_dict()}")
+    assert state["peak"] == 4, f"峰值并发应为4，实际为{state['peak']}"
+    assert [task.id for task, _ in results] == list(range(20)), "结果应与任务一一对应"
+    assert stats.sent == 20 and stats.failed == 0
+    # 串行需要 20 * 20ms = 400ms，并发 4 约 100ms
+    assert elapsed < 0.3, "并发分发应明显快于串行"
+
+
+def test_dispatch_converts_exceptions(monkeypatch):
+    """推送抛出异常时转换为失败结果，不影响其他任务"""
+    async def fake_push(user_id, reminder_id, title, content):
+        if reminder_id == 1:
+            raise RuntimeError("boom")
+        return {"success": reminder_id != 2, "error": "provider error"}
+
+    monkeypatch.setattr(push_dispatcher, "push_reminder_notification_async", fake_push)
+
+    dispatcher = PushDispatcher(concurrency=2)
+    results, stats = asyncio.run(dispatcher.dispatch(_make_tasks(3)))
+
+    by_id = {task.id: result for task, result in results}
+    assert by_id[0]["success"] is True
+    assert by_id[1]["error_code"] == "DISPATCH_ERROR"
+    assert by_id[2]["success"] is False
+    assert stats.sent == 1 and stats.failed == 2
+
+
+def test_dispatch_stats_percentiles():
+    """延迟百分位按最近秩法计算"""
+    stats = DispatchStats()
+    for latency in range(1, 101):
+        stats.record(float(latency), success=True)
+    stats.finish()
+    summary = stats.to_dict()
+    assert summary["total"] == 100
+    assert summary["latency_ms"]["p50"] == 50
+    assert summary["latency_ms"]["p95"] == 95
+    assert summary["latency_ms"]["max"] == 100
+
+
+def test_dispatch_batches_identical_payloads(monkeypatch):
+    """相同标题和内容的任务合并为多别名推送，结果回填到每个任务"""
+    single_calls = []
+    batch_calls = []
+
+    async def fake_single(user_id, reminder_id, title, content):
+        single_calls.append(user_id)
+        return {"success": True, "msg_id": f"single-{user_id}"}
+
+    async def fake_batch(user_ids, title, content):
+        batch_calls.append(list(user_ids))
+        return {"success": True, "msg_id": f"batch-{len(batch_calls)}"}
+
+    monkeypatch.setattr(push_dispatcher, "push_reminder_notification_async", fake_single)
+    monkeypatch.setattr(push_dispatcher, "push_batch_notification_async", fake_batch)
+
+    rent_tasks = [
+        SimpleNamespace(id=i, user_id=2000 + i, reminder_id=i, title="交房租", content="本月房租到期")
+        for i in range(5)
+    ]
+    other = SimpleNamespace(id=99, user_id=3000, reminder_id=99, title="吃药", content=None)
+    tasks = rent_tasks[:2] + [other] + rent_tasks[2:]
+
+    dispatcher = PushDispatcher(concurrency=4, batch_enabled=True, max_aliases=2)
+    results, stats = asyncio.run(dispatcher.dispatch(tasks))
+
+    assert [task.id for task, _ in results] == [task.id for task in tasks], "结果顺序应与输入一致"
+    assert batch_calls == [[2000, 2001], [2002, 2003]], "5个相同任务按上限2拆成2批+1个单发"
+    assert sorted(single_calls) == [2004, 3000]
+    assert stats.requests == 4 and stats.sent == 6
+    by_id = {task.id: result for task, result in results}
+    assert by_id[0]["msg_id"] == by_id[1]["msg_id"] == "batch-1"
+    assert by_id[0]["batch_size"] == 2
+    assert by_id[99]["msg_id"] == "single-3000"
+
+
+def test_dispatch_batch_disabled(monkeypatch):
+    """关闭合并时每个任务单独推送"""
+    calls = []
+
+    async def fake_single(user_id, reminder_id, title, content):
+        calls.append(user_id)
+        return {"success": False, "error": "down"}
+
+    monkeypatch.setattr(push_dispatcher, "push_reminder_notification_async", fake_single)
+
+    tasks = [SimpleNamespace(id=i, user_id=i, reminder_id=i, title="同一标题", content="同一内容") for i in range(3)]
+    dispatcher = PushDispatcher(concurrency=2, batch_enabled=False)
+    results, stats = asyncio.run(dispatcher.dispatch(tasks))
+
+    assert sorted(calls) == [0, 1, 2]
+    assert stats.requests == 3 and stats.failed == 3
+
+
+def test_dispatch_coalesces_user_digest(monkeypatch):
+    """同一用户窗口内的多条任务合并为一条摘要，窗口外和其他用户的任务照常推送"""
+    digest_calls = []
+    single_calls = []
+
+    async def fake_digest(user_id, reminder_ids, title, content):
+        digest_calls.append((user_id, list(reminder_ids), title, content))
+        return {"success": True, "msg_id": "digest-1"}
+
+    async def fake_single(user_id, reminder_id, title, content):
+        single_calls.append(reminder_id)
+        return {"success": True, "msg_id": f"single-{reminder_id}"}
+
+    monkeypatch.setattr(push_dispatcher, "push_digest_notification_async", fake_digest)
+    monkeypatch.setattr(push_dispatcher, "push_reminder_notification_async", fake_single)
+    monkeypatch.setattr(push_dispatcher.settings, "PUSH_DIGEST_MAX_LINES", 2)
+
+    base = datetime(2026, 10, 17, 9, 0)
+
+    def _task(task_id, user_id, minutes):
+        return SimpleNamespace(
+            id=task_id, user_id=user_id, reminder_id=task_id, title=f"提醒{task_id}",
+            content="内容", next_attempt_at=base + timedelta(minutes=minutes)
+        )
+
+    tasks = [_task(1, 7, 2), _task(2, 7, 0), _task(3, 7, 4), _task(4, 7, 30), _task(5, 8, 1)]
+    dispatcher = PushDispatcher(concurrency=4, digest_window=300, digest_min_tasks=2)
+    results, stats = asyncio.run(dispatcher.dispatch(tasks))
+
+    assert [task.id for task, _ in results] == [1, 2, 3, 4, 5], "结果顺序应与输入一致"
+    assert len(digest_calls) == 1
+    user_id, reminder_ids, title, content = digest_calls[0]
+    assert user_id == 7 and reminder_ids == [2, 1, 3], "摘要按到期时间排序"
+    assert title == "你有3条提醒"
+    assert content.splitlines() == ["· 提醒2", "· 提醒1", "……还有1条"]
+    assert sorted(single_calls) == [4, 5], "窗口外和其他用户的任务单独推送"
+
+    by_id = {task.id: result for task, result in results}
+    assert by_id[1]["digest"] == {"task_ids": [2, 1, 3], "position": 1}
+    assert "digest" not in by_id[4]
+    assert stats.requests == 3 and stats.sent == 5
+    assert stats.to_dict()["digests"] == 1 and stats.pushes_saved == 2
+
+
+def test_dispatch_digest_disabled(monkeypatch):
+    """窗口为 0 时不合并摘要"""
+    calls = []
+
+    async def fake_single(user_id, reminder_id, title, content):
+        calls.append(reminder_id)
+        return {"success": True}
+
+    monkeypatch.setattr(push_dispatcher, "push_reminder_notification_async", fake_single)
+
+    tasks = [SimpleNamespace(id=i, user_id=1, reminder_id=i, title=f"提醒{i}", content=None) for i in range(3)]
+    dispatcher = PushDispatcher(concurrency=2, digest_window=0)
+    results, stats = asyncio.run(dispatcher.dispatch(tasks))
+
+    assert sorted(calls) == [0, 1, 2]
+    assert stats.digests == 0 and stats.pushes_saved == 0
+
+
+def test_dispatch_sends_in_deadline_order(monkeypatch):
+    """并发受限时按任务在输入（按到期时间排序）中的先后依次推送，摘要不会插到更早的任务之前"""
+    order = []
+
+    async def fake_single(user_id, reminder_id, title, content):
+        order.append(f"single-{reminder_id}")
+        return {"success": True}
+
+    async def fake_digest(user_id, reminder_ids, title, content):
+        order.append(f"digest-{reminder_ids[0]}")
+        return {"success": True}
+
+    monkeypatch.setattr(push_dispatcher, "push_reminder_notification_async", fake_single)
+    monkeypatch.setattr(push_dispatcher, "push_digest_notification_async", fake_digest)
+
+    base = datetime(2026, 10, 17, 9, 0)
+    tasks = [
+        SimpleNamespace(id=i, user_id=user_id, reminder_id=i, title=f"提醒{i}", content=None,
+                        next_attempt_at=base + timedelta(seconds=i))
+        for i, user_id in enumerate([1, 2, 2, 3])
+    ]
+    dispatcher = PushDispatcher(concurrency=1, digest_window=300)
+    asyncio.run(dispatcher.dispatch(tasks))
+
+    assert order == ["single-0", "digest-1", "single-3"]
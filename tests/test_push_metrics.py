@@ -0,0 +1,169 @@
+"""
+测试推送链路指标 - 对数分桶直方图精度、SLO 统计，以及调度器和渠道管道的埋点
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from app.services.push_channels import ChannelPipeline, StubChannelProvider
+from app.services.push_dispatcher import DispatchStats, percentile
+from app.services.push_metrics import (
+    METRIC_DISPATCH_BATCH,
+    METRIC_FIRE_DELAY,
+    METRIC_PROVIDER_LATENCY,
+    METRIC_QUEUE_DEPTH,
+    LogHistogram,
+    PushMetrics,
+)
+from app.services.push_scheduler import PushScheduler
+
+
+def test_histogram_percentiles_within_relative_error():
+    """百分位与精确值的相对误差不超过 1/64，桶数与样本数无关"""
+    rng = random.Random(7)
+    values = [rng.lognormvariate(6, 1.5) for _ in range(50000)]
+    histogram = LogHistogram(scale=1000)
+    for value in values:
+        histogram.record(value)
+
+    ordered = sorted(values)
+    for pct in (50, 90, 99, 99.9):
+        exact = percentile(ordered, pct)
+        assert abs(histogram.percentile(pct) - exact) <= exact / 64 + 0.001, pct
+    assert histogram.count == len(values) and histogram.percentile(100) == ordered[-1]
+    print(f"\n    ✓ {len(values)} 个样本, {len(histogram.counts)} 个桶")
+    assert len(histogram.counts) < 2000
+
+
+def test_histogram_buckets_are_contiguous():
+    """相邻桶首尾相接，每个值落在上界不小于它的桶中"""
+    for index in range(1, 2000):
+        assert LogHistogram._index(LogHistogram._upper_bound(index - 1) + 1) == index
+    for units in (0, 1, 127, 128, 129, 255, 256, 10**6, 3 * 10**9):
+        upper = LogHistogram._upper_bound(LogHistogram._index(units))
+        assert units <= upper <= units + units // 64
+
+
+def test_slo_labels_and_reset():
+    """按标签分开统计，触发延迟附带 SLO 达成情况；reset 后重新累计；关闭时不记录"""
+    metrics = PushMetrics(enabled=True, slo_ms=1000, slo_target=0.9)
+    for delay in range(0, 2000, 100):
+        metrics.observe(METRIC_FIRE_DELAY, delay, priority=3, channel="app")
+    metrics.observe(METRIC_FIRE_DELAY, 50, priority=1, channel="sms")
+    metrics.observe(METRIC_QUEUE_DEPTH, 12, priority=1)
+
+    snapshot = metrics.snapshot(reset=True)
+    urgent, normal = sorted(snapshot[METRIC_FIRE_DELAY], key=lambda e: -e["labels"]["priority"])
+    assert urgent["labels"] == {"channel": "app", "priority": 3} and urgent["count"] == 20
+    assert urgent["slo"] == {"objective_ms": 1000, "target": 0.9, "within_objective": 0.55, "met": False}
+    assert normal["slo"]["met"] is True
+    assert snapshot[METRIC_QUEUE_DEPTH] == [
+        {"labels": {"priority": 1}, "count": 1, "avg": 12.0, "p50": 12, "p90": 12, "p99": 12, "p999": 12, "max": 12}
+    ]
+    assert snapshot[METRIC_DISPATCH_BATCH] == [] and snapshot[METRIC_PROVIDER_LATENCY] == []
+    assert metrics.snapshot()[METRIC_FIRE_DELAY] == [], "reset 后重新累计"
+
+    disabled = PushMetrics(enabled=False)
+    disabled.observe(METRIC_FIRE_DELAY, 10, priority=1, channel="app")
+    assert disabled.snapshot()[METRIC_FIRE_DELAY] == []
+
+
+def test_observe_is_cheap():
+    """单次记录只是一次字典查找和整数分桶"""
+    metrics = PushMetrics(enabled=True)
+    start = time.perf_counter()
+    for i in range(100000):
+        metrics.observe(METRIC_FIRE_DELAY, i % 5000, priority=1 + i % 3, channel="app")
+    per_call_us = (time.perf_counter() - start) * 1e6 / 100000
+    print(f"\n    observe {per_call_us:.2f}us/次")
+    assert per_call_us < 50
+
+
+def test_scheduler_records_dispatch_metrics():
+    """每块记录分发耗时、极光请求延迟，推送成功的任务记录触发延迟（从计划推送时间算起，含重试推迟）"""
+    metrics = PushMetrics(enabled=True)
+    scheduler = PushScheduler(interval=1, metrics=metrics, channels=ChannelPipeline(providers={}, metrics=metrics))
+    stats = DispatchStats()
+    stats.record(30.0, True, tasks=2)
+    stats.finish()
+    tasks = [
+        # 计划 1000 推送，重试退避后 due_at 改写为 1900，延迟仍从 1000 算起
+        SimpleNamespace(priority=2, scheduled_at=1000, due_at=1900, retry_count=2),
+        SimpleNamespace(priority=2, scheduled_at=1001, due_at=1001, retry_count=0),
+    ]
+    results = [(tasks[0], {"success": True}), (tasks[1], {"success": False})]
+    scheduler._record_metrics(results, stats, finished_at=1902.5)
+
+    snapshot = metrics.snapshot()
+    (fire_delay,) = snapshot[METRIC_FIRE_DELAY]
+    assert fire_delay["labels"] == {"channel": "app", "priority": 2} and fire_delay["count"] == 1
+    assert fire_delay["max"] == 902500.0, "重试造成的推迟计入触发延迟"
+    assert snapshot[METRIC_PROVIDER_LATENCY][0]["labels"] == {"channel": "app"}
+    assert snapshot[METRIC_DISPATCH_BATCH][0]["labels"] == {"priority": 2}
+
+
+def test_channel_pool_records_metrics():
+    """渠道推送记录推送服务延迟和触发延迟，提交时记录队列深度"""
+    metrics = PushMetrics(enabled=True)
+
+    async def run():
+        pipeline = ChannelPipeline(
+            providers={"wechat": StubChannelProvider("wechat", latency_ms=5)},
+            limits={"wechat": (2, 1000.0)},
+            session_maker=lambda: None,
+            flush_size=10000,
+            metrics=metrics
+        )
+        pipeline.pools["wechat"].start()
+        tasks = [
+            SimpleNamespace(id=i, reminder_id=i, user_id=i, title="交房租", content=None,
+                            channels=["app", "wechat"], priority=1, scheduled_at=time.time() - 2)
+            for i in range(4)
+        ]
+        await pipeline.submit(db=None, tasks=tasks)
+        await pipeline.pools["wechat"].queue.join()
+        await pipeline.pools["wechat"].stop()
+
+    asyncio.run(run())
+    snapshot = metrics.snapshot()
+    (fire_delay,) = snapshot[METRIC_FIRE_DELAY]
+    assert fire_delay["labels"] == {"channel": "wechat", "priority": 1} and fire_delay["count"] == 4
+    assert 2000 <= fire_delay["p50"] < 3000
+    (latency,) = snapshot[METRIC_PROVIDER_LATENCY]
+    assert latency["count"] == 4 and latency["p50"] >= 4
+    assert snapshot[METRIC_QUEUE_DEPTH][0] == {**snapshot[METRIC_QUEUE_DEPTH][0], "labels": {"channel": "wechat"}, "count": 1}
+
+
+def test_reset_requires_admin_post():
+    """GET 只读（带 reset 参数也不清空）；清空只能由管理员 POST"""
+    from fastapi.testclient import TestClient
+
+    from app.core.permissions import get_current_admin_user
+    from app.services import push_metrics
+    from main import app
+
+    metrics = push_metrics.get_push_metrics()
+    metrics.snapshot(reset=True)
+    metrics.observe(METRIC_FIRE_DELAY, 120, priority=1, channel="app")
+    client = TestClient(app)
+
+    for _ in range(2):
+        response = client.get("/api/v1/monitoring/metrics/push", params={"reset": "true"})
+        assert response.status_code == 200
+        assert response.json()["data"][METRIC_FIRE_DELAY][0]["count"] == 1, "GET 不改变状态"
+    assert client.post("/api/v1/monitoring/metrics/push/reset").status_code in (401, 403)
+    assert metrics.snapshot()[METRIC_FIRE_DELAY] != [], "未认证的请求不能清空"
+
+    app.dependency_overrides[get_current_admin_user] = lambda: SimpleNamespace(id=1)
+    try:
+        response = client.post("/api/v1/monitoring/metrics/push/reset")
+    finally:
+        app.dependency_overrides.pop(get_current_admin_user)
+    assert response.status_code == 200
+    assert response.json()["data"][METRIC_FIRE_DELAY][0]["count"] == 1
+    assert metrics.snapshot()[METRIC_FIRE_DELAY] == []
@@ -0,0 +1,103 @@
+"""
+测试推送结果批量写回 - UPDATE ... FROM (VALUES ...) 语句结构与结果分类
+只编译 SQL 检查语句结构，不依赖数据库；真实数据库上的对比压测见 scripts/benchmark_push_outcomes.py
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.repositories.push_task_repository import PushTaskRepository
+from app.services.push_retry import PushRetryPlanner
+from app.services.push_scheduler import PushScheduler
+from app.services.push_wakeup import PushWakeup
+
+NOW = datetime(2026, 1, 1, 8, 0)
+
+
+def _compile(stmt):
+    compiled = stmt.compile(dialect=asyncpg.dialect())
+    return str(compiled).replace("\n", " "), compiled.params
+
+
+def test_outcome_statements_one_per_kind():
+    """每种结果一条语句，值通过 VALUES 传入，状态按枚举类型绑定"""
+    repo = PushTaskRepository(db=None)
+    statements = repo._outcome_statements(
+        sent=[{"id": i, "push_response": {"msg_id": str(i)}} for i in range(3)],
+        failed=[{"id": 10, "error_message": "invalid alias"}],
+        retry=[{"id": 20, "next_attempt_at": NOW, "error_message": "Retry 1: timeout", "push_response": {}}],
+        cancelled=[],
+        now=NOW,
+        dead_letter=[{"id": 30, "error_message": "server_error: 502"}],
+    )
+    assert len(statements) == 4
+
+    sent_sql, sent_params = _compile(statements[0])
+    print(f"\n    {sent_sql}")
+    assert sent_sql.startswith("UPDATE push_tasks SET")
+    assert "FROM (VALUES ($6::INTEGER, $7::JSON), ($8::INTEGER, $9::JSON), ($10::INTEGER, $11::JSON)) AS outcome (id, push_response)" in sent_sql
+    assert "status=$2::pushstatus" in sent_sql
+    assert "lease_owner=" in sent_sql and "lease_expires_at=" in sent_sql, "写回结果时释放租约"
+
+    failed_sql, _ = _compile(statements[1])
+    assert "retry_count=(push_tasks.retry_count +" in failed_sql
+    assert "error_message=outcome.error_message" in failed_sql
+
+    retry_sql, _ = _compile(statements[2])
+    assert "status=" not in retry_sql, "重试任务保持 PENDING"
+    assert "next_attempt_at=outcome.next_attempt_at" in retry_sql
+    assert "due_at=outcome.due_at" in retry_sql, "重试时间同时写入调度器扫描的 UTC 时间戳"
+    assert "scheduled_time" not in retry_sql, "重试不改动原计划时间"
+
+    dead_sql, dead_params = _compile(statements[3])
+    assert dead_params["status"].name == "DEAD_LETTER"
+
+
+def test_deferred_outcome_keeps_retry_count():
+    """熔断延后只推迟 next_attempt_at，不改状态、不计重试次数"""
+    repo = PushTaskRepository(db=None)
+    statements = repo._outcome_statements(
+        sent=[], failed=[], retry=[], cancelled=[], now=NOW,
+        deferred=[{"id": 1, "next_attempt_at": NOW, "error_message": "jpush circuit open"}],
+    )
+    deferred_sql, _ = _compile(statements[0])
+    assert "next_attempt_at=outcome.next_attempt_at" in deferred_sql
+    assert "retry_count" not in deferred_sql and "status=" not in deferred_sql
+    assert "lease_owner=" in deferred_sql
+
+
+def test_outcome_statements_split_large_batches():
+    """超过单语句行数上限时拆成多条，避免超出 asyncpg 参数上限"""
+    repo = PushTaskRepository(db=None)
+    rows = [{"id": i, "push_response": {}} for i in range(PushTaskRepository.OUTCOME_ROWS_PER_STATEMENT * 2 + 1)]
+    statements = repo._outcome_statements(sent=rows, failed=[], retry=[], cancelled=[], now=NOW)
+    assert len(statements) == 3
+
+
+def test_collect_outcome_classification():
+    """成功、退避重试、不可重试失败、次数用尽进入死信"""
+    scheduler = PushScheduler(interval=1, wakeup=PushWakeup(channel="test"), retry_planner=PushRetryPlanner(rng=random.Random(7)))
+    outcomes = {"sent": [], "failed": [], "retry": [], "dead_letter": []}
+
+    def task(task_id, retry_count):
+        return SimpleNamespace(id=task_id, retry_count=retry_count, max_retries=3)
+
+    scheduler._collect_outcome(task(1, 0), {"success": True, "msg_id": "m"}, outcomes, NOW)
+    scheduler._collect_outcome(task(2, 1), {"success": False, "error": "timeout", "error_code": "NETWORK_ERROR"}, outcomes, NOW)
+    scheduler._collect_outcome(task(3, 0), {"success": False, "error": "no target", "error_code": 1011}, outcomes, NOW)
+    scheduler._collect_outcome(task(4, 2), {"success": False, "error": "bad gateway", "status_code": 502}, outcomes, NOW)
+
+    assert outcomes["sent"] == [{"id": 1, "push_response": {"success": True, "msg_id": "m"}}]
+    retry = outcomes["retry"][0]
+    assert retry["id"] == 2
+    assert NOW + timedelta(seconds=15) <= retry["next_attempt_at"] <= NOW + timedelta(seconds=30)
+    assert retry["error_message"] == "Retry 2 (network_error): timeout"
+    assert outcomes["failed"] == [{"id": 3, "error_message": "invalid_audience: no target"}]
+    assert outcomes["dead_letter"] == [{"id": 4, "error_message": "server_error: bad gateway"}]
+    assert scheduler.wakeup.next_due() == retry["next_attempt_at"], "重试时间加入唤醒堆"
@@ -0,0 +1,88 @@
+"""
+测试推送重试策略 - 错误分类、指数退避加抖动、死信
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.models.push_task import PushStatus
+from app.services.push_retry import PushRetryPlanner, RetryPolicy, classify_error
+
+NOW = datetime(2026, 1, 1, 8, 0)
+
+
+def _task(retry_count=0, max_retries=3):
+    return SimpleNamespace(id=1, retry_count=retry_count, max_retries=max_retries)
+
+
+def test_classify_error():
+    """JPush 错误码优先，其次本地错误码，最后按 HTTP 状态码"""
+    assert classify_error({"error_code": 2002, "status_code": 429}) == "rate_limited"
+    assert classify_error({"error_code": 1011, "status_code": 400}) == "invalid_audience"
+    assert classify_error({"error_code": 1004, "status_code": 401}) == "auth_error"
+    assert classify_error({"error_code": "NETWORK_ERROR"}) == "network_error"
+    assert classify_error({"status_code": 429}) == "rate_limited"
+    assert classify_error({"status_code": 503}) == "server_error"
+    assert classify_error({"status_code": 404}) == "client_error"
+    assert classify_error({"error": "boom"}) == "unknown"
+
+
+def test_backoff_grows_exponentially_within_bounds():
+    """退避上限按倍数增长并封顶，实际等待落在 [base, 上限] 内"""
+    policy = RetryPolicy(base_delay=10, max_delay=100)
+    rng = random.Random(1)
+    for retry_number, cap in [(1, 10), (2, 20), (3, 40), (4, 80), (5, 100), (9, 100)]:
+        delays = [policy.backoff_seconds(retry_number, rng) for _ in range(200)]
+        assert min(delays) >= 10
+        assert max(delays) <= cap
+        if cap > 10:
+            assert max(delays) > cap * 0.9, "抖动应覆盖到接近上限"
+
+
+def test_jitter_spreads_brownout_retries():
+    """同一时刻失败的大批任务分散到不同的扫描周期，而不是同一时刻一起重试"""
+    planner = PushRetryPlanner(rng=random.Random(42))
+    result = {"success": False, "status_code": 503}
+    due_times = [planner.decide(_task(retry_count=1), result, NOW)["next_attempt_at"] for _ in range(1000)]
+
+    # 第2次重试的等待在 [30s, 60s] 内，按秒统计分布
+    seconds = [(t - NOW).total_seconds() for t in due_times]
+    assert 30 <= min(seconds) and max(seconds) <= 60
+    buckets = {int(s) for s in seconds}
+    assert len(buckets) >= 25, f"应分散到大部分秒级时间点，实际 {len(buckets)}"
+    largest = max(sum(1 for s in seconds if int(s) == b) for b in buckets)
+    assert largest < 100, "任意一秒内的重试不应超过总数的 10%"
+
+
+def test_dead_letter_honors_max_retries():
+    """尝试次数达到任务 max_retries 后进入死信"""
+    planner = PushRetryPlanner(rng=random.Random(0))
+    result = {"success": False, "status_code": 500}
+
+    assert planner.decide(_task(retry_count=0, max_retries=3), result, NOW)["action"] == "retry"
+    assert planner.decide(_task(retry_count=1, max_retries=3), result, NOW)["action"] == "retry"
+    decision = planner.decide(_task(retry_count=2, max_retries=3), result, NOW)
+    assert decision["action"] == "dead_letter"
+    assert decision["status"] == PushStatus.DEAD_LETTER
+
+    # 自定义 max_retries 生效
+    assert planner.decide(_task(retry_count=2, max_retries=5), result, NOW)["action"] == "retry"
+    assert planner.decide(_task(retry_count=0, max_retries=1), result, NOW)["action"] == "dead_letter"
+
+
+def test_policy_per_error_class():
+    """目标无效不重试；认证错误最多2次；策略可覆盖"""
+    planner = PushRetryPlanner(rng=random.Random(0))
+    invalid = planner.decide(_task(), {"error_code": 1011}, NOW)
+    assert invalid["action"] == "failed" and invalid["status"] == PushStatus.FAILED
+
+    assert planner.decide(_task(retry_count=0), {"status_code": 401}, NOW)["action"] == "retry"
+    assert planner.decide(_task(retry_count=1), {"status_code": 401}, NOW)["action"] == "dead_letter"
+
+    custom = PushRetryPlanner(policies={"client_error": RetryPolicy(base_delay=5, max_delay=5)}, rng=random.Random(0))
+    decision = custom.decide(_task(), {"status_code": 404}, NOW)
+    assert decision["action"] == "retry" and decision["delay_seconds"] == 5
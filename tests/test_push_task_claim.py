@@ -0,0 +1,83 @@
+"""
+测试推送任务认领 - FOR UPDATE SKIP LOCKED、租约过期与 user_id 分片
+只编译 SQL 检查语句结构，不依赖数据库
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.repositories.push_task_repository import PushTaskRepository
+from app.models.reminder import ReminderCategory
+from app.services.push_scheduler import PushScheduler
+from app.services.push_task_service import push_priority
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect())).replace("\n", " ")
+
+
+def test_claim_statement_skips_locked_rows():
+    """认领语句按优先级排序、限量，并跳过其他实例锁定的行"""
+    now = datetime(2026, 1, 1, 8, 0)
+    repo = PushTaskRepository(db=None)
+    sql = _compile(repo._claimable_tasks_stmt(before_time=now, now=now, limit=100))
+    print(f"\n    {sql}")
+
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "push_tasks.lease_expires_at IS NULL OR push_tasks.lease_expires_at <" in sql, "租约过期的任务应可被重新认领"
+    assert "ORDER BY push_tasks.priority DESC, push_tasks.due_at, push_tasks.id" in sql
+    assert "LIMIT" in sql
+    assert "%" not in sql.replace("%(", ""), "未分片时不应带取模条件"
+
+
+def test_claim_statement_shard_filter():
+    """配置分片后只认领 user_id 取模命中的任务"""
+    now = datetime(2026, 1, 1, 8, 0)
+    repo = PushTaskRepository(db=None)
+    stmt = repo._claimable_tasks_stmt(before_time=now, now=now, limit=100, shard_index=1, shard_count=4)
+    sql = _compile(stmt)
+    params = stmt.compile(dialect=postgresql.dialect()).params
+
+    assert "push_tasks.user_id %% %(user_id_1)s" in sql
+    assert params["user_id_1"] == 4 and params["param_1"] == 1
+
+
+def test_scheduler_shard_config():
+    """分片序号必须落在分片数范围内；实例ID默认自动生成"""
+    scheduler = PushScheduler(interval=1, shard_index=2, shard_count=3)
+    assert scheduler.shard_index == 2 and scheduler.shard_count == 3
+    assert ":" in scheduler.worker_id
+
+    assert PushScheduler(interval=1, worker_id="worker-a").worker_id == "worker-a"
+
+    with pytest.raises(ValueError):
+        PushScheduler(interval=1, shard_index=3, shard_count=3)
+
+
+def test_health_reminders_use_urgent_lane():
+    """健康类提醒一律按紧急推送，其余沿用提醒优先级"""
+    assert push_priority(SimpleNamespace(category=ReminderCategory.HEALTH, priority=1)) == 3
+    assert push_priority(SimpleNamespace(category=ReminderCategory.FINANCE, priority=2)) == 2
+    assert push_priority(SimpleNamespace(category=ReminderCategory.OTHER, priority=None)) == 1
+
+
+def test_scheduler_records_lane_fire_delay():
+    """每块按所在优先级分道记录触发延迟（从计划推送时间算起，重试和延后的推迟也计入），并从队列深度中扣除"""
+    scheduler = PushScheduler(interval=1)
+    scheduler.lane_stats[3] = {"queue_depth": 5}
+    tasks = [
+        SimpleNamespace(priority=3, scheduled_at=1000, due_at=1000),
+        # 限流延后过一次：due_at 已推迟到 1004，延迟仍从计划时间 1002 算起
+        SimpleNamespace(priority=3, scheduled_at=1002, due_at=1004),
+    ]
+    scheduler._record_lane(tasks, dispatched_at=1004.5)
+
+    lane = scheduler.lane_stats[3]
+    assert lane["queue_depth"] == 3 and lane["dispatched"] == 2
+    assert lane["fire_delay_ms"] == {"p50": 2500.0, "p95": 4500.0, "max": 4500.0}
@@ -0,0 +1,113 @@
+"""
+测试推送任务幂等创建 - 自然键 (reminder_id, scheduled_time) 上只有一条待推送任务
+使用内存 SQLite（部分唯一索引与 ON CONFLICT 语义与 PostgreSQL 一致）
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.database import Base
+from app.core.timezones import to_epoch
+from app.models.push_task import PushStatus, PushTask
+from app.repositories.push_task_repository import PushTaskRepository
+
+NOW = datetime(2026, 1, 1, 8, 0)
+
+
+def _row(reminder_id: int, scheduled_time: datetime, **kwargs):
+    row = {
+        "reminder_id": reminder_id,
+        "user_id": 1,
+        "title": f"提醒{reminder_id}",
+        "content": None,
+        "channels": ["app"],
+        "scheduled_time": scheduled_time,
+        "next_attempt_at": scheduled_time,
+        "due_at": to_epoch(scheduled_time),
+        "scheduled_at": to_epoch(scheduled_time),
+        "status": PushStatus.PENDING,
+        "retry_count": 0,
+        "max_retries": 3,
+        "priority": 1,
+    }
+    row.update(kwargs)
+    return row
+
+
+async def _with_session(fn):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with session_maker() as db:
+            return await fn(db)
+    finally:
+        await engine.dispose()
+
+
+def test_insert_statement_targets_pending_natural_key():
+    """ON CONFLICT 的冲突目标是 PENDING 部分唯一索引，RETURNING 只返回新插入的行"""
+    bind = SimpleNamespace(dialect=postgresql.dialect())
+    repo = PushTaskRepository(SimpleNamespace(get_bind=lambda: bind))
+    sql = str(repo._insert_ignoring_duplicates([_row(1, NOW)]).compile(dialect=bind.dialect))
+    assert "ON CONFLICT (reminder_id, scheduled_time) WHERE status = 'PENDING' DO NOTHING" in sql
+    assert "RETURNING" in sql
+
+
+def test_create_many_skips_duplicates():
+    """重复提交和同批次重复只创建一条；已发送的同键任务不阻止新建"""
+    pytest.importorskip("aiosqlite")
+
+    async def run(db):
+        repo = PushTaskRepository(db)
+        db.add(PushTask(**_row(2, NOW, status=PushStatus.SENT)))
+        await db.commit()
+
+        first = await repo.create_many([_row(1, NOW), _row(1, NOW), _row(2, NOW)])
+        again = await repo.create_many([_row(1, NOW), _row(1, NOW + timedelta(days=1))])
+        existing = await repo.get_pending_by_key(1, NOW)
+        pending = await db.scalar(
+            select(func.count()).select_from(PushTask).where(PushTask.status == PushStatus.PENDING)
+        )
+        return first, again, existing, pending
+
+    first, again, existing, pending = asyncio.run(_with_session(run))
+    assert [(t.reminder_id, t.scheduled_time) for t in first] == [(1, NOW), (2, NOW)]
+    assert [t.scheduled_time for t in again] == [NOW + timedelta(days=1)]
+    assert existing.id == first[0].id
+    assert pending == 3
+
+
+def test_requeue_dead_letters_respects_natural_key():
+    """同键死信只重新入队一条；已有待推送任务的键不重新入队"""
+    pytest.importorskip("aiosqlite")
+
+    async def run(db):
+        repo = PushTaskRepository(db)
+        db.add_all([
+            PushTask(**_row(1, NOW, status=PushStatus.DEAD_LETTER)),
+            PushTask(**_row(1, NOW, status=PushStatus.DEAD_LETTER)),
+            PushTask(**_row(2, NOW, status=PushStatus.DEAD_LETTER)),
+            PushTask(**_row(2, NOW)),
+        ])
+        await db.commit()
+        requeued = await repo.requeue_dead_letters()
+        rows = await db.execute(select(PushTask.id, PushTask.status).order_by(PushTask.id))
+        return requeued, rows.all()
+
+    requeued, rows = asyncio.run(_with_session(run))
+    assert requeued == 1
+    assert [status for _, status in rows] == [
+        PushStatus.PENDING, PushStatus.DEAD_LETTER, PushStatus.DEAD_LETTER, PushStatus.PENDING
+    ]
@@ -0,0 +1,199 @@
+"""
+测试推送任务预先生成 - 增量窗口结果、扫描语句结构与配置变更后立即重新生成
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.database import Base
+from app.core.recurrence import compile_rule
+from app.core.timezones import get_zone, to_epoch
+from app.models.push_task import PushStatus, PushTask
+from app.models.reminder import ReminderCategory, RecurrenceType
+from app.repositories.reminder_repository import ReminderRepository
+from app.services import push_task_service
+from app.services.push_task_generator import plan_push_tasks, regenerate_push_tasks
+
+NOW = datetime(2026, 3, 1, 0, 0)
+SHANGHAI = ZoneInfo("Asia/Shanghai")
+NEW_YORK = ZoneInfo("America/New_York")
+# 默认时区墙上时间 NOW 对应的时刻
+NOW_AT = NOW.replace(tzinfo=get_zone())
+
+
+def _compile(stmt):
+    compiled = stmt.compile(dialect=asyncpg.dialect())
+    return str(compiled).replace("\n", " "), compiled.params
+
+
+def _reminder(reminder_id, recurrence_type, config, next_remind_time, advance_minutes=0, **kwargs):
+    fields = dict(
+        id=reminder_id, user_id=100 + reminder_id, title=f"提醒{reminder_id}", description=None,
+        category=ReminderCategory.OTHER, priority=1, remind_channels=["app"],
+        recurrence_type=recurrence_type, recurrence_config=config, next_remind_time=next_remind_time,
+        advance_minutes=advance_minutes, push_tasks_until=None, is_active=True, is_completed=False,
+    )
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+def test_incremental_generation_matches_full_expand():
+    """按半个窗口逐轮生成，累计任务与一次性展开（扣除提前量）完全一致，不重复也不遗漏"""
+    rng = random.Random(20260301)
+    configs = [
+        (RecurrenceType.DAILY, {"interval": 1, "time": "08:00"}),
+        (RecurrenceType.WEEKLY, {"weekdays": [0, 3]}),
+        (RecurrenceType.CUSTOM, {"days": 2, "time": "21:30"}),
+        (RecurrenceType.MONTHLY, {"day_of_month": 1}),
+        (RecurrenceType.ONCE, {}),
+    ]
+    rows = [
+        _reminder(i, recurrence_type, config,
+                  NOW + timedelta(hours=rng.randint(-30, 120), minutes=rng.choice([0, 15, 45])),
+                  advance_minutes=rng.choice([0, 10, 90]))
+        for i, (recurrence_type, config) in enumerate(configs * 10)
+    ]
+
+    generated = {row.id: [] for row in rows}
+    now = NOW_AT
+    for _ in range(10):
+        tasks, watermarks = plan_push_tasks(rows, {}, now, timedelta(hours=24))
+        for task in tasks:
+            generated[task["reminder_id"]].append(task["scheduled_time"])
+        until = {w["id"]: w["until"] for w in watermarks}
+        for row in rows:
+            row.push_tasks_until = until[row.id]
+        now += timedelta(hours=12)
+
+    end = NOW + timedelta(hours=12 * 9 + 24)
+    for row in rows:
+        advance = timedelta(minutes=row.advance_minutes)
+        expected = [
+            t - advance
+            for t in compile_rule(row.recurrence_type, row.recurrence_config).expand(
+                row.next_remind_time, NOW + advance, end + advance
+            )
+            if t < end + advance
+        ]
+        assert generated[row.id] == expected, f"{row.recurrence_type} {row.recurrence_config}"
+    print(f"\n    ✓ {len(rows)} 个提醒, {sum(len(v) for v in generated.values())} 条推送任务")
+
+
+def test_plan_fields_and_broken_config():
+    """任务按用户时区计算到期时间戳；一次性提醒超出窗口不生成；配置错误的提醒不推进截止时间"""
+    rows = [
+        _reminder(1, RecurrenceType.DAILY, {}, NOW + timedelta(hours=1), advance_minutes=30,
+                  category=ReminderCategory.HEALTH, remind_channels=["app", "sms"]),
+        _reminder(2, RecurrenceType.ONCE, {}, NOW + timedelta(days=3)),
+        _reminder(3, RecurrenceType.WEEKLY, {"weekdays": [9]}, NOW),
+    ]
+    tasks, watermarks = plan_push_tasks(rows, {101: SHANGHAI}, NOW_AT, timedelta(hours=48))
+    assert [(t["reminder_id"], t["scheduled_time"]) for t in tasks] == [
+        (1, NOW + timedelta(minutes=30)), (1, NOW + timedelta(days=1, minutes=30))
+    ]
+    assert tasks[0]["priority"] == 3 and tasks[0]["channels"] == ["app", "sms"]
+    assert tasks[0]["due_at"] == int((NOW + timedelta(minutes=30)).replace(tzinfo=SHANGHAI).timestamp())
+    assert tasks[0]["status"] == PushStatus.PENDING
+    assert watermarks == [{"id": 1, "until": NOW + timedelta(hours=48)}, {"id": 2, "until": NOW + timedelta(hours=48)}]
+
+
+def test_window_in_user_zone():
+    """窗口按用户时区的当前时间计算：时区落后于服务器的用户，马上到期的触发不会被跳过"""
+    # 服务器（上海）2026-10-17 10:00 时纽约当地为 10-16 22:00，10-16 23:00 的提醒一小时后到期
+    now = datetime(2026, 10, 17, 10, 0, tzinfo=SHANGHAI)
+    rows = [_reminder(1, RecurrenceType.DAILY, {"interval": 1}, datetime(2026, 10, 16, 23, 0))]
+
+    tasks, watermarks = plan_push_tasks(rows, {101: NEW_YORK}, now, timedelta(hours=24))
+    assert [t["scheduled_time"] for t in tasks] == [datetime(2026, 10, 16, 23, 0)]
+    assert tasks[0]["due_at"] == to_epoch(now) + 3600
+    assert watermarks == [{"id": 1, "until": datetime(2026, 10, 17, 22, 0)}], "截止时间是纽约当地时间"
+
+    # 下一轮（半个窗口后）接着生成，不重复也不遗漏
+    rows[0].push_tasks_until = watermarks[0]["until"]
+    tasks, _ = plan_push_tasks(rows, {101: NEW_YORK}, now + timedelta(hours=12), timedelta(hours=24))
+    assert [t["scheduled_time"] for t in tasks] == [datetime(2026, 10, 17, 23, 0)]
+
+
+class _RecordingSession:
+    """记录执行的语句并返回空结果，不连接数据库"""
+
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, statement):
+        self.executed.append(statement)
+        return SimpleNamespace(all=lambda: [])
+
+    async def commit(self):
+        pass
+
+
+def test_scan_and_watermark_statements():
+    """按下次推送时间和生成截止时间筛选，id 键集分页；截止时间用 UPDATE ... FROM (VALUES ...) 批量推进"""
+    db = _RecordingSession()
+    repo = ReminderRepository(db)
+
+    async def scan():
+        return [rows async for rows in repo.iter_pending_reminders(to_epoch(NOW_AT), timedelta(hours=24))]
+
+    assert asyncio.run(scan()) == []
+    sql, params = _compile(db.executed[0])
+    print(f"\n    {sql}")
+    # 下次推送时间和截止时间都与用户时区的当前时间比较
+    user_now = "timezone(coalesce(users.timezone, "
+    assert "JOIN users ON users.id = reminders.user_id" in sql
+    assert f"reminders.next_remind_time - reminders.advance_minutes * interval '1 minute' < {user_now}" in sql
+    assert f"reminders.push_tasks_until IS NULL OR reminders.push_tasks_until < {user_now}" in sql
+    assert to_epoch(NOW_AT) in params.values() and timedelta(hours=12) in params.values()
+    assert "reminders.id > " in sql and "ORDER BY reminders.id" in sql
+
+    (statement,) = repo._push_watermark_statements([{"id": i, "until": NOW} for i in range(3)])
+    watermark_sql, _ = _compile(statement)
+    assert watermark_sql.startswith("UPDATE reminders SET push_tasks_until=push_watermark.until")
+    assert len(repo._push_watermark_statements([{"id": i, "until": NOW} for i in range(1001)])) == 2
+
+
+def test_regenerate_after_change(monkeypatch):
+    """配置变更后立即重新生成窗口内的任务（已有的跳过），整批只唤醒一次调度器"""
+    pytest.importorskip("aiosqlite")
+    notified = []
+
+    async def fake_notify(task_id, due_time):
+        notified.append((task_id, due_time))
+
+    monkeypatch.setattr(push_task_service, "notify_push_task_scheduled", fake_notify)
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        reminder = _reminder(1, RecurrenceType.DAILY, {"interval": 1}, NOW + timedelta(hours=2))
+        try:
+            async with session_maker() as db:
+                first = await regenerate_push_tasks(db, reminder, now=NOW_AT)
+                reminder.push_tasks_until = None
+                again = await regenerate_push_tasks(db, reminder, now=NOW_AT + timedelta(hours=1))
+                rows = (await db.execute(select(PushTask.scheduled_time).order_by(PushTask.id))).scalars().all()
+            return first, again, rows, reminder
+        finally:
+            await engine.dispose()
+
+    first, again, rows, reminder = asyncio.run(run())
+    assert [t.scheduled_time for t in first] == [NOW + timedelta(hours=2)]
+    assert again == [], "窗口内的任务已存在"
+    assert rows == [NOW + timedelta(hours=2)]
+    assert reminder.push_tasks_until == NOW + timedelta(hours=25)
+    assert notified == [(first[0].id, first[0].next_attempt_at)]
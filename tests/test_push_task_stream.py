@@ -0,0 +1,147 @@
+"""
+测试推送任务分块读取 - (priority DESC, due_at, id) 键集分页
+使用内存 SQLite 验证分页边界：每个到期任务恰好出现一次、顺序正确、每块处理后移出会话
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.database import Base
+from app.core.timezones import to_epoch
+from app.models.push_task import PushTask, PushStatus
+from app.repositories.push_task_repository import PushTaskRepository
+
+NOW = datetime(2026, 1, 1, 8, 0)
+
+
+def _task(**kwargs):
+    """到期时间戳按服务器本地时间换算，与 before_time 的解释一致"""
+    return PushTask(due_at=to_epoch(kwargs["scheduled_time"]), **kwargs)
+
+
+def _build_tasks():
+    """优先级和尝试时间大量重复，覆盖游标落在相同 (priority, due_at) 中间的情况"""
+    tasks = []
+    for i in range(23):
+        tasks.append(_task(
+            reminder_id=100 + i,
+            user_id=100 + i % 5,
+            title=f"提醒{i}",
+            channels=["app"],
+            priority=1 + i % 3,
+            scheduled_time=NOW - timedelta(minutes=i % 4),
+            status=PushStatus.PENDING,
+        ))
+    # 未到期和非 PENDING 的任务不应被读到
+    tasks.append(_task(reminder_id=1, user_id=1, title="未到期", channels=["app"], priority=3,
+                       scheduled_time=NOW + timedelta(hours=1), status=PushStatus.PENDING))
+    tasks.append(_task(reminder_id=1, user_id=1, title="已发送", channels=["app"], priority=3,
+                       scheduled_time=NOW, status=PushStatus.SENT))
+    return tasks
+
+
+async def _with_session(fn):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as db:
+        db.add_all(_build_tasks())
+        await db.commit()
+        db.expunge_all()
+    try:
+        async with session_maker() as db:
+            return await fn(db)
+    finally:
+        await engine.dispose()
+
+
+def _expected_order(tasks):
+    due = [t for t in tasks if t.status == PushStatus.PENDING and t.due_at <= to_epoch(NOW)]
+    return [t.id for t in sorted(due, key=lambda t: (-t.priority, t.due_at, t.id))]
+
+
+def test_iter_pending_tasks_keyset():
+    """分块读取覆盖全部到期任务，顺序与全量排序一致，处理过的块移出会话"""
+    pytest.importorskip("aiosqlite")
+
+    async def run(db):
+        repo = PushTaskRepository(db)
+        chunks = []
+        async for chunk in repo.iter_pending_tasks(before_time=NOW, chunk_size=5):
+            chunks.append([(t.id, t.priority, t.next_attempt_at) for t in chunk])
+            assert len(db.identity_map) == len(chunk), "会话中只应保留当前块"
+        all_tasks = (await db.execute(PushTask.__table__.select())).all()
+        return chunks, all_tasks
+
+    chunks, rows = asyncio.run(_with_session(run))
+    assert [len(c) for c in chunks] == [5, 5, 5, 5, 3]
+    ids = [task_id for chunk in chunks for task_id, _, _ in chunk]
+    assert ids == _expected_order(rows)
+
+
+def test_iter_claimed_tasks_leases_every_chunk():
+    """逐块认领为每个任务写入租约，同一轮内不会重复认领"""
+    pytest.importorskip("aiosqlite")
+
+    async def run(db):
+        repo = PushTaskRepository(db)
+        claimed = []
+        async for chunk in repo.iter_claimed_tasks(worker_id="w1", before_time=NOW, chunk_size=4):
+            claimed.extend(t.id for t in chunk)
+        again = await repo.claim_pending_tasks(worker_id="w2", before_time=NOW)
+        leased = (await db.execute(
+            PushTask.__table__.select().where(PushTask.lease_owner == "w1")
+        )).all()
+        return claimed, again, leased
+
+    claimed, again, leased = asyncio.run(_with_session(run))
+    assert len(claimed) == 23 and len(set(claimed)) == 23
+    assert again == [], "租约有效期内其他实例不能认领"
+    assert len(leased) == 23
+
+
+def test_keyset_condition_sql():
+    """游标条件按优先级降序展开，不使用行值比较"""
+    cond = PushTaskRepository._keyset_after((2, to_epoch(NOW), 10))
+    sql = str(cond.compile(dialect=postgresql.dialect()))
+    assert "push_tasks.priority <" in sql
+    assert "push_tasks.due_at >" in sql
+    assert "push_tasks.id >" in sql
+
+
+def test_iter_claimed_lanes_strict_priority():
+    """分道认领：每块只含一个优先级，先推完高优先级；中途新到期的紧急任务在下一块即被认领"""
+    pytest.importorskip("aiosqlite")
+
+    async def run(db):
+        repo = PushTaskRepository(db)
+        depths = await repo.count_due_by_priority(NOW)
+        chunks = []
+        async for chunk in repo.iter_claimed_lanes(worker_id="w1", before_time=NOW, chunk_size=4):
+            chunks.append([(t.id, t.priority, t.due_at) for t in chunk])
+            if len(chunks) == 5:
+                # 普通任务推送中途新建一条到期时间更早的紧急任务
+                db.add(_task(reminder_id=1, user_id=1, title="吃药", channels=["app"], priority=3,
+                             scheduled_time=NOW - timedelta(hours=1), status=PushStatus.PENDING))
+                await db.commit()
+        return depths, chunks
+
+    depths, chunks = asyncio.run(_with_session(run))
+    assert depths == {1: 8, 2: 8, 3: 7}
+    lanes = [{priority for _, priority, _ in chunk} for chunk in chunks]
+    assert all(len(lane) == 1 for lane in lanes), "每块只含同一优先级"
+    assert [lane.pop() for lane in lanes] == [3, 3, 2, 2, 1, 3, 1]
+    assert [task_id for task_id, _, _ in chunks[5]] == [26], "新的紧急任务插队到下一块"
+    for chunk in chunks:
+        due = [(due_at, task_id) for task_id, _, due_at in chunk]
+        assert due == sorted(due), "道内按到期时间先后认领"
+    assert sum(len(chunk) for chunk in chunks) == 24
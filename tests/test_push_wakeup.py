@@ -0,0 +1,120 @@
+"""
+测试推送调度器唤醒 - 到期时间最小堆与按到期时间唤醒
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from app.core.timezones import to_epoch
+from app.services.push_wakeup import DueTimeHeap, PushWakeup
+
+
+def test_due_time_heap_order_and_reschedule():
+    """堆顶为最早到期时间；改期后旧时间失效"""
+    base = datetime(2026, 1, 1, 8, 0)
+    heap = DueTimeHeap()
+    assert heap.push(1, base + timedelta(minutes=10)) is True
+    assert heap.push(2, base + timedelta(minutes=5)) is True
+    assert heap.push(3, base + timedelta(minutes=20)) is False, "晚于堆顶的任务不需要提前唤醒"
+    assert heap.peek() == base + timedelta(minutes=5)
+
+    # 任务2改期到更晚，堆顶变为任务1
+    heap.push(2, base + timedelta(minutes=30))
+    assert heap.peek() == base + timedelta(minutes=10)
+    assert len(heap) == 3
+
+    assert heap.pop_due(base + timedelta(minutes=25)) == [1, 3]
+    assert heap.peek() == base + timedelta(minutes=30)
+    assert heap.pop_due(base + timedelta(hours=1)) == [2]
+    assert heap.peek() is None and len(heap) == 0
+
+
+def test_wait_wakes_at_due_time():
+    """睡眠到堆顶到期时间醒来，精度在亚秒级"""
+    async def run():
+        wakeup = PushWakeup(channel="test", backend="")
+        wakeup.schedule(1, datetime.now() + timedelta(milliseconds=200))
+        start = time.perf_counter()
+        reason = await wakeup.wait(max_sleep=5)
+        return reason, time.perf_counter() - start
+
+    reason, elapsed = asyncio.run(run())
+    print(f"\n    到期唤醒耗时 {elapsed * 1000:.1f}ms（目标 200ms）")
+    assert reason == "due"
+    assert 0.18 <= elapsed < 0.4
+
+
+def test_notify_wakes_earlier():
+    """睡眠期间收到更早到期的任务会提前醒来；更晚的任务不打断睡眠"""
+    async def run():
+        wakeup = PushWakeup(channel="test", backend="")
+        wakeup.schedule(1, datetime.now() + timedelta(hours=1))
+
+        async def notify_later():
+            await asyncio.sleep(0.05)
+            wakeup.schedule(2, datetime.now() + timedelta(hours=2))
+            await asyncio.sleep(0.05)
+            # 其他进程经数据库通知转发的任务（到期时间为 UTC 时间戳）
+            wakeup._handle_message(json.dumps({
+                "task_id": 3,
+                "due_at": to_epoch(datetime.now() + timedelta(seconds=1))
+            }))
+
+        start = time.perf_counter()
+        _, reason = await asyncio.gather(notify_later(), wakeup.wait(max_sleep=5))
+        return reason, time.perf_counter() - start, wakeup
+
+    reason, elapsed, wakeup = asyncio.run(run())
+    assert reason == "due"
+    # 时间戳精确到秒，新任务在 1~2 秒内到期
+    assert 0.1 <= elapsed < 2.2, f"应在新任务到期时醒来，实际 {elapsed:.3f}s"
+    assert wakeup.pop_due(datetime.now()) == [3]
+
+
+def test_wait_idle_without_due_tasks():
+    """没有到期任务时睡满兜底间隔"""
+    async def run():
+        wakeup = PushWakeup(channel="test", backend="")
+        start = time.perf_counter()
+        reason = await wakeup.wait(max_sleep=0.1)
+        return reason, time.perf_counter() - start
+
+    reason, elapsed = asyncio.run(run())
+    assert reason == "idle"
+    assert elapsed >= 0.09
+
+
+def test_request_scan_and_invalid_messages():
+    """通知连接重建后要求立即扫描；格式错误的通知被忽略"""
+    async def run():
+        wakeup = PushWakeup(channel="test", backend="")
+        wakeup.schedule(1, datetime.now() + timedelta(hours=1))
+        for bad in ("not json", json.dumps({"task_id": 2}), json.dumps({"task_id": "x", "due_at": 1})):
+            wakeup._handle_message(bad)
+
+        async def reconnect():
+            await asyncio.sleep(0.05)
+            wakeup.request_scan()
+
+        start = time.perf_counter()
+        _, reason = await asyncio.gather(reconnect(), wakeup.wait(max_sleep=5))
+        return reason, time.perf_counter() - start, wakeup
+
+    reason, elapsed, wakeup = asyncio.run(run())
+    assert reason == "scan" and elapsed < 0.5
+    assert len(wakeup.heap) == 1, "格式错误的通知不进入最小堆"
+
+
+def test_postgres_backend_does_not_publish():
+    """postgres 后端由触发器在提交时通知，notify 只更新本进程的最小堆，不连接 Redis"""
+    async def run():
+        wakeup = PushWakeup(channel="test", backend="postgres")
+        await wakeup.publish(1, datetime.now())
+        return wakeup
+
+    assert asyncio.run(run())._redis is None
@@ -5,8 +5,12 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from datetime import datetime
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from app.core.recurrence import RecurrenceRule, calculate_next_occurrence, compile_rule, next_after
 from app.services.recurrence_engine import RecurrenceEngine
+from app.services.recurrence_service import RecurrenceService
 from app.models.reminder import RecurrenceType
 
 
@@ -191,6 +195,251 @@ def test_daily_cross_month():
     print("    ✓ 通过: 正确跨年")
 
 
+RRULES = [
+    "FREQ=MONTHLY;BYDAY=2TU",
+    "RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR",
+    "FREQ=YEARLY;BYMONTH=5;BYDAY=2SU;BYHOUR=9;BYMINUTE=0",
+    "FREQ=DAILY;INTERVAL=5;BYHOUR=8,20",
+    "FREQ=MONTHLY;BYMONTHDAY=-1;UNTIL=20260630T000000",
+]
+
+
+def _random_reminder(rng, reminder_id):
+    """随机生成提醒（覆盖闭式计算和逐次计算两类配置）"""
+    recurrence_type = rng.choice(list(RecurrenceType))
+    if recurrence_type == RecurrenceType.DAILY:
+        config = rng.choice([
+            {"interval": rng.randint(1, 3)}, {"interval_days": 2, "time": "08:30"}, {"workdays_only": True},
+        ])
+    elif recurrence_type == RecurrenceType.WEEKLY:
+        config = {"weekdays": rng.sample(range(7), rng.randint(1, 7))} if rng.random() < 0.8 else {}
+        if rng.random() < 0.3:
+            config["interval"] = rng.randint(2, 3)
+        if rng.random() < 0.2:
+            config["workdays_only"] = True
+    elif recurrence_type == RecurrenceType.MONTHLY:
+        config = rng.choice([
+            {"day_of_month": rng.choice([1, 15, 28, 29, 30, 31, -1])},
+            {"day": rng.randint(1, 31), "interval": rng.randint(1, 3)},
+            {"day_of_month": rng.randint(1, 31), "skip_weekend": True},
+            {"day_of_month": rng.randint(1, 31), "workdays_only": True},
+            {},
+        ])
+    elif recurrence_type == RecurrenceType.YEARLY:
+        month = rng.randint(1, 12)
+        day = rng.randint(1, [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month - 1])
+        config = rng.choice([{"month": month, "day": day}, {"month": 2, "day": 29, "interval": 2}, {}])
+    elif recurrence_type == RecurrenceType.LUNAR_YEARLY:
+        config = rng.choice([
+            {"lunar_month": rng.randint(1, 12), "lunar_day": rng.randint(1, 30)},
+            {"lunar_month": rng.choice([2, 4, 6]), "lunar_day": 30, "leap": True, "interval": 2},
+            {},
+        ])
+    else:
+        config = rng.choice([
+            {"days": rng.randint(1, 60)}, {"weeks": 2}, {"months": rng.randint(1, 4)},
+            {"rrule": rng.choice(RRULES)},
+        ])
+    anchor = datetime(2024, 1, 1, rng.randint(0, 23), rng.choice([0, 30])) + timedelta(days=rng.randint(0, 900))
+    return SimpleNamespace(id=reminder_id, recurrence_type=recurrence_type, recurrence_config=config,
+                           next_remind_time=anchor)
+
+
+def _expand_by_scalar(reminder, window_start, window_end):
+    """参照实现：从 next_remind_time 起反复调用 calculate_next_time"""
+    current, occurrences = reminder.next_remind_time, []
+    while current < window_end:
+        if current >= window_start:
+            occurrences.append(current)
+        following = RecurrenceEngine.calculate_next_time(reminder.recurrence_type, reminder.recurrence_config, current)
+        if following == current:
+            break  # 一次性提醒或 RRULE 已到 UNTIL
+        current = following
+    return occurrences
+
+
+def test_expand_matches_scalar_path():
+    """批量展开与逐次调用 calculate_next_time 的结果完全一致"""
+    print("\n" + "="*60)
+    print("测试批量展开与逐次计算一致")
+    print("="*60)
+
+    rng = random.Random(20260101)
+    reminders = [_random_reminder(rng, i) for i in range(2000)]
+    window_start, window_end = datetime(2026, 1, 1), datetime(2027, 1, 1)
+
+    expanded = RecurrenceEngine.expand(reminders, window_start, window_end)
+    for reminder in reminders:
+        expected = _expand_by_scalar(reminder, window_start, window_end)
+        assert expanded[reminder.id] == expected, (
+            f"{reminder.recurrence_type} {reminder.recurrence_config} from {reminder.next_remind_time}"
+        )
+    print(f"    ✓ 通过: {len(reminders)} 个提醒, {sum(len(v) for v in expanded.values())} 次触发")
+
+
+def test_expand_window_and_limit():
+    """窗口左闭右开，起点远早于窗口时直接跳到窗口内，limit 截断每个提醒的次数"""
+    daily = SimpleNamespace(id=1, recurrence_type=RecurrenceType.DAILY, recurrence_config={"interval": 2},
+                            next_remind_time=datetime(2020, 1, 1, 9, 0))
+    once = SimpleNamespace(id=2, recurrence_type=RecurrenceType.ONCE, recurrence_config={},
+                           next_remind_time=datetime(2026, 1, 5, 9, 0))
+    broken = SimpleNamespace(id=3, recurrence_type=RecurrenceType.WEEKLY, recurrence_config={"weekdays": [9]},
+                             next_remind_time=datetime(2026, 1, 5, 9, 0))
+
+    result = RecurrenceEngine.expand([daily, once, broken], datetime(2026, 1, 1), datetime(2026, 1, 11, 9, 0))
+    assert result[1] == [datetime(2026, 1, d, 9, 0) for d in (1, 3, 5, 7, 9)], "2020-01-01 起每2天，结束时间不包含"
+    assert result[2] == [datetime(2026, 1, 5, 9, 0)], "一次性提醒只有一次"
+    assert result[3] == [], "配置错误的提醒返回空列表，不影响整批"
+
+    limited = RecurrenceEngine.expand([daily], datetime(2026, 1, 1), datetime(2027, 1, 1), limit_per_reminder=3)
+    assert len(limited[1]) == 3
+
+
+def test_all_callers_share_compiled_rule():
+    """三个入口使用同一个编译后的规则，按 (recurrence_type, config) 缓存"""
+    config = {"day_of_month": 31, "skip_weekend": True}
+    rule = compile_rule(RecurrenceType.MONTHLY, config)
+    assert compile_rule("monthly", {"skip_weekend": True, "day_of_month": 31}) is rule, "键顺序不影响缓存命中"
+    assert isinstance(rule, RecurrenceRule) and not hasattr(rule, "__dict__")
+    assert hash(rule) == hash(RecurrenceRule.from_config(RecurrenceType.MONTHLY, config))
+    try:
+        rule.day = 1
+        assert False, "规则应不可变"
+    except AttributeError:
+        pass
+
+    last_time = datetime(2025, 10, 31, 9, 0)
+    expected = datetime(2025, 12, 1, 9, 0)  # 11月30日是周日，顺延到12月1日
+    assert RecurrenceEngine.calculate_next_time(RecurrenceType.MONTHLY, config, last_time) == expected
+    assert RecurrenceService().calculate_next_time("monthly", config, last_time) == expected
+    assert calculate_next_occurrence(last_time, RecurrenceType.MONTHLY, config) == expected
+
+    # 原 app.core.recurrence 按 30/365 天近似，现在按日历月/年计算
+    assert calculate_next_occurrence(datetime(2025, 1, 31), "monthly", {}) == datetime(2025, 2, 28)
+    assert calculate_next_occurrence(datetime(2024, 2, 29), "yearly", {}) == datetime(2025, 2, 28)
+    # RecurrenceService 的配置键和固定时刻
+    assert RecurrenceService().calculate_next_time(
+        "daily", {"interval_days": 2, "time": "07:15"}, datetime(2025, 1, 1, 22, 0)
+    ) == datetime(2025, 1, 3, 7, 15)
+    assert RecurrenceService().calculate_next_time("once", {}, last_time) is None
+    assert calculate_next_occurrence(last_time, "once", {}) == last_time
+
+
+def test_next_after_matches_stepping():
+    """next_after 直接跳到参考时间之后，与从起点逐次推进的结果一致"""
+    rng = random.Random(20260102)
+    reminders = [_random_reminder(rng, i) for i in range(1500)]
+    moment = datetime(2027, 6, 15, 12, 0)
+
+    for reminder in reminders:
+        rule = compile_rule(reminder.recurrence_type, reminder.recurrence_config)
+        current = reminder.next_remind_time
+        while current is not None and current <= moment:
+            current = rule.next_time(current)
+        assert next_after(rule, reminder.next_remind_time, moment) == current, (
+            f"{reminder.recurrence_type} {reminder.recurrence_config} from {reminder.next_remind_time}"
+        )
+
+    # 起点在参考时间之后：返回起点本身；刚好等于参考时间：返回下一次
+    daily = compile_rule(RecurrenceType.DAILY, {})
+    assert next_after(daily, datetime(2030, 1, 1, 9, 0), moment) == datetime(2030, 1, 1, 9, 0)
+    assert next_after(daily, moment, moment) == moment + timedelta(days=1)
+    # 1月31日起的每月提醒回退到28日后不再变化
+    monthly = compile_rule(RecurrenceType.MONTHLY, {})
+    assert next_after(monthly, datetime(2025, 1, 31, 9, 0), moment) == datetime(2027, 6, 28, 9, 0)
+    assert next_after(compile_rule(RecurrenceType.ONCE, {}), datetime(2025, 1, 1), moment) is None
+
+
+def test_custom_defaults_to_daily():
+    """自定义周期未配置单位时每天（与原有计算器的 days 默认 1 一致），只有给出 weeks 才按周"""
+    start = datetime(2026, 1, 1, 9, 0)
+    for config, expected in [
+        ({}, datetime(2026, 1, 2, 9, 0)),
+        ({"interval": 3}, datetime(2026, 1, 2, 9, 0)),
+        ({"weeks": 2}, datetime(2026, 1, 15, 9, 0)),
+        ({"days": 3, "weeks": 2}, datetime(2026, 1, 4, 9, 0)),
+        ({"interval": 2, "unit": "weeks"}, datetime(2026, 1, 15, 9, 0)),
+    ]:
+        assert calculate_next_occurrence(start, RecurrenceType.CUSTOM, config) == expected, config
+
+
+def test_rrule_config():
+    """自定义周期支持 RFC 5545 RRULE，按规范化后的字符串缓存"""
+    rule = compile_rule(RecurrenceType.CUSTOM, {"rrule": "FREQ=MONTHLY;BYDAY=2TU"})
+    assert compile_rule("custom", {"rrule": "rrule:freq=monthly;byday=2tu"}).rrule == rule.rrule
+    anchor = datetime(2026, 1, 13, 9, 0)  # 1月第二个周二
+    assert rule.next_time(anchor) == datetime(2026, 2, 10, 9, 0)
+    assert rule.expand(anchor, datetime(2026, 3, 1), datetime(2026, 6, 1)) == [
+        datetime(2026, 3, 10, 9, 0), datetime(2026, 4, 14, 9, 0), datetime(2026, 5, 12, 9, 0)
+    ]
+    assert next_after(rule, anchor, datetime(2027, 1, 1)) == datetime(2027, 1, 12, 9, 0)
+
+    workdays = compile_rule(RecurrenceType.CUSTOM, {"rrule": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"})
+    assert workdays.next_time(datetime(2026, 1, 9, 18, 0)) == datetime(2026, 1, 12, 18, 0), "周五之后是周一"
+
+    until = compile_rule(RecurrenceType.CUSTOM, {"rrule": "FREQ=DAILY;UNTIL=20260103T235959"})
+    assert until.next_time(datetime(2026, 1, 3, 8, 0)) is None, "UNTIL 之后序列结束"
+    assert calculate_next_occurrence(datetime(2026, 1, 3, 8, 0), "custom", {"rrule": "FREQ=DAILY;UNTIL=20260103T235959"}) \
+        == datetime(2026, 1, 3, 8, 0)
+
+    # API 层的 {"interval", "unit"} 写法
+    assert compile_rule("custom", {"interval": 3, "unit": "weeks"}).step_days == 21
+    for bad in ("FREQ=DAILY;COUNT=3", "FREQ=SOMETIMES", "FREQ=DAILY\nEXDATE:20260102T000000"):
+        try:
+            compile_rule(RecurrenceType.CUSTOM, {"rrule": bad})
+            assert False, f"非法 RRULE 应报错: {bad}"
+        except ValueError:
+            pass
+
+
+def test_lunar_yearly_config():
+    """每年农历：闰月不存在时取平月，三十日在小月取二十九日，超出换算表后不再触发"""
+    mid_autumn = compile_rule(RecurrenceType.LUNAR_YEARLY, {"lunar_month": 8, "lunar_day": 15, "time": "20:00"})
+    anchor = datetime(2025, 10, 6, 20, 0)  # 2025年中秋
+    assert mid_autumn.next_time(anchor) == datetime(2026, 9, 25, 20, 0)
+    assert mid_autumn.expand(anchor, datetime(2030, 1, 1), datetime(2033, 1, 1)) == [
+        datetime(2030, 9, 12, 20, 0), datetime(2031, 10, 1, 20, 0), datetime(2032, 9, 19, 20, 0)
+    ]
+
+    # 2025年闰六月，2026年没有闰六月
+    leap = compile_rule("lunar_yearly", {"lunar_month": 6, "lunar_day": 1, "leap": True})
+    assert leap.next_time(datetime(2025, 7, 25, 8, 0)) == datetime(2026, 7, 14, 8, 0)
+    # 2026年腊月是小月，除夕在二十九
+    new_years_eve = compile_rule("lunar_yearly", {"lunar_month": 12, "lunar_day": 30})
+    assert new_years_eve.next_time(datetime(2026, 2, 16, 9, 0)) == datetime(2027, 2, 5, 9, 0)
+
+    # 未指定日期时沿用起点的农历日期
+    assert compile_rule("lunar_yearly", {}).next_time(datetime(2026, 2, 17, 9, 0)) == datetime(2027, 2, 6, 9, 0)
+    assert next_after(mid_autumn, anchor, datetime(2100, 12, 1)) is None, "2100年之后超出换算表"
+    for bad in ({"lunar_month": 13}, {"lunar_month": 1, "lunar_day": 31}):
+        try:
+            compile_rule(RecurrenceType.LUNAR_YEARLY, bad)
+            assert False, f"非法配置应报错: {bad}"
+        except ValueError:
+            pass
+
+
+def test_workday_calendar_rules():
+    """顺延和只在工作日触发都按工作日历处理法定节假日和调休"""
+    # 2026年10月1日-7日国庆假期，10月10日（周六）调休上班
+    rent = compile_rule(RecurrenceType.MONTHLY, {"day_of_month": 1, "skip_weekend": True})
+    assert rent.next_time(datetime(2026, 9, 1, 9, 0)) == datetime(2026, 10, 8, 9, 0), "顺延到节后第一个工作日"
+    assert rent.expand(datetime(2026, 9, 1, 9, 0), datetime(2026, 10, 1), datetime(2026, 12, 1)) == [
+        datetime(2026, 10, 8, 9, 0), datetime(2026, 11, 2, 9, 0)
+    ]
+
+    clock_in = compile_rule(RecurrenceType.DAILY, {"workdays_only": True, "time": "08:50"})
+    assert clock_in.next_time(datetime(2026, 9, 30, 8, 50)) == datetime(2026, 10, 8, 8, 50)
+    days = [t.day for t in clock_in.expand(datetime(2026, 10, 8, 8, 50), datetime(2026, 10, 8), datetime(2026, 10, 13))]
+    assert days == [8, 9, 10, 12], "周六调休上班照常提醒，周日跳过"
+
+    # 只在周末的规则在日历之外的年份没有工作日，跳过一定次数后结束，不会无限循环
+    weekend = compile_rule(RecurrenceType.WEEKLY, {"weekdays": [5], "workdays_only": True})
+    assert weekend.next_time(datetime(2026, 10, 10, 9, 0)) is None
+    assert weekend.expand(datetime(2026, 10, 10, 9, 0), datetime(2027, 1, 1), datetime.max, limit=1) == []
+    assert compile_rule(RecurrenceType.ONCE, {"workdays_only": True}).workdays_only is False
+
+
 def run_all_tests():
     """运行所有测试"""
     print("\n" + "="*60)
@@ -202,6 +451,13 @@ def run_all_tests():
         test_yearly_leap_year()
         test_weekly_cross_year()
         test_daily_cross_month()
+        test_expand_matches_scalar_path()
+        test_expand_window_and_limit()
+        test_all_callers_share_compiled_rule()
+        test_next_after_matches_stepping()
+        test_rrule_config()
+        test_lunar_yearly_config()
+        test_workday_calendar_rules()
         
         print("\n" + "="*60)
         print("✅ 所有测试通过！")
@@ -216,6 +472,12 @@ def run_all_tests():
         print("  ✓ 每周周期 - 跨年处理")
         print("  ✓ 每日周期 - 跨月处理")
         print("  ✓ 每日周期 - 跨年处理")
+        print("  ✓ 批量展开 - 与逐次计算一致")
+        print("  ✓ 编译规则 - 所有入口共用同一缓存")
+        print("  ✓ 跳跃计算 - 直接跳到参考时间之后")
+        print("  ✓ 自定义周期 - RFC 5545 RRULE")
+        print("  ✓ 每年农历 - 闰月与大小月")
+        print("  ✓ 工作日历 - 法定节假日顺延与调休")
         
         return True
         
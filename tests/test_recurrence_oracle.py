@@ -0,0 +1,412 @@
+"""
+测试周期计算 - 与逐日暴力参照实现差分对比
+
+参照实现不调用 app.core.recurrence 的任何计算，只按配置的语义从上一次触发的次日起逐日判断，
+找到第一个满足条件的日期；农历换算和工作日历只作为数据源使用（各自另有测试）。
+ENGINES 中登记的每一种计算路径都与参照实现逐项比较，新增的计算引擎登记到 ENGINES 即可纳入对比。
+
+随机起点集中在月末和闰年2月29日附近；可通过环境变量 RECURRENCE_ORACLE_SEED 指定种子复现失败。
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import calendar
+import os
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.lunar import LunarDate, leap_month, month_days, solar_to_lunar
+from app.core.recurrence import MAX_DAYS_OFF_SKIPPED, calculate_next_occurrence, compile_rule, next_after
+from app.core.workday import get_workday_calendar
+from app.models.reminder import RecurrenceType
+from app.services.recurrence_engine import RecurrenceEngine
+from app.services.recurrence_service import RecurrenceService
+
+SEEDS = [int(os.environ["RECURRENCE_ORACLE_SEED"])] if os.environ.get("RECURRENCE_ORACLE_SEED") else [2024, 2025, 2026]
+REMINDERS_PER_SEED = 300
+# 逐日查找的最远天数（最长间隔为每 3 年一次、且换到更晚月份的每年提醒）
+SCAN_DAYS = 4 * 366 + 31
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+# ---------------------------------------------------------------- 参照实现
+
+def _last_day(year, month):
+    return calendar.monthrange(year, month)[1]
+
+
+def _months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def _scan(start, matches, first_offset=1):
+    """从 start 之后第 first_offset 天起逐日查找第一个满足条件的日期"""
+    for offset in range(first_offset, SCAN_DAYS):
+        day = start + timedelta(days=offset)
+        if matches(day):
+            return day
+    return None
+
+
+def _lunar(day):
+    try:
+        return solar_to_lunar(day)
+    except ValueError:
+        return None
+
+
+def _oracle_nominal(kind, config, last):
+    """不考虑 workdays_only 的下一次触发"""
+    start = last.date()
+    if kind == RecurrenceType.DAILY:
+        interval = config.get("interval") or config.get("interval_days") or 1
+        day = _scan(start, lambda d: (d - start).days % interval == 0)
+    elif kind == RecurrenceType.WEEKLY:
+        weekdays = set(config.get("weekdays") or [start.weekday()])
+        interval = config.get("interval") or 1
+        start_week = start.toordinal() - start.weekday()
+        day = _scan(start, lambda d: d.weekday() in weekdays
+                    and (d.toordinal() - d.weekday() - start_week) // 7 % interval == 0)
+    elif kind == RecurrenceType.MONTHLY:
+        target = config.get("day_of_month") or config.get("day") or config.get("monthday") or start.day
+        interval = config.get("interval") or 1
+        day = _scan(start, lambda d: _months_between(start, d) == interval
+                    and d.day == (_last_day(d.year, d.month) if target == -1 else min(target, _last_day(d.year, d.month))))
+        if config.get("skip_weekend"):
+            day = _scan(day, get_workday_calendar().is_workday, first_offset=0)
+    elif kind == RecurrenceType.YEARLY:
+        month, target = config.get("month") or start.month, config.get("day") or start.day
+        interval = config.get("interval") or 1
+        day = _scan(start, lambda d: d.year - start.year == interval and d.month == month
+                    and d.day == min(target, _last_day(d.year, d.month)))
+    elif kind == RecurrenceType.LUNAR_YEARLY:
+        lunar = _lunar(start)
+        if config.get("lunar_month"):
+            month, leap = config["lunar_month"], bool(config.get("leap"))
+        else:
+            month, leap = lunar.month, lunar.leap
+        year = lunar.year + (config.get("interval") or 1)
+        try:
+            leap = leap and leap_month(year) == month
+            wanted = LunarDate(year, month, min(config.get("lunar_day") or lunar.day, month_days(year, month, leap)), leap)
+        except ValueError:
+            return None
+        day = _scan(start, lambda d: _lunar(d) == wanted)
+    elif kind == RecurrenceType.CUSTOM:
+        if config.get("rrule"):
+            return _oracle_rrule(config["rrule"], last)
+        # 文档语义: days > weeks > months > years；都未给出时每天（原有计算器的 days 默认 1），interval 只配合 unit
+        steps = {config["unit"]: config.get("interval") or 1} if config.get("unit") else config
+        if steps.get("days") or steps.get("weeks") or not (steps.get("months") or steps.get("years")):
+            if steps.get("days"):
+                step = steps["days"]
+            elif steps.get("weeks"):
+                step = 7 * steps["weeks"]
+            else:
+                step = 1
+            day = _scan(start, lambda d: (d - start).days == step)
+        else:
+            step = steps.get("months") or 12 * steps["years"]
+            day = _scan(start, lambda d: _months_between(start, d) == step
+                        and d.day == min(start.day, _last_day(d.year, d.month)))
+    else:
+        return None
+
+    if day is None:
+        return None
+    following = datetime.combine(day, last.time())
+    if config.get("time"):
+        hour, minute = map(int, config["time"].split(":"))
+        following = following.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return following
+
+
+def _oracle_rrule(text, dtstart):
+    """RRULE 参照实现（支持 FREQ、INTERVAL、BYDAY、BYMONTH、BYMONTHDAY、BYHOUR、BYMINUTE、UNTIL），起点为上一次触发"""
+    parts = dict(part.split("=") for part in text.upper().removeprefix("RRULE:").split(";"))
+    freq, interval = parts["FREQ"], int(parts.get("INTERVAL", 1))
+    by_month = {int(v) for v in parts["BYMONTH"].split(",")} if "BYMONTH" in parts else None
+    by_month_day = [int(v) for v in parts["BYMONTHDAY"].split(",")] if "BYMONTHDAY" in parts else None
+    by_day = [(int(v[:-2] or 0), WEEKDAY_CODES.index(v[-2:])) for v in parts["BYDAY"].split(",")] if "BYDAY" in parts else None
+    hours = sorted(int(v) for v in parts["BYHOUR"].split(",")) if "BYHOUR" in parts else [dtstart.hour]
+    minutes = sorted(int(v) for v in parts["BYMINUTE"].split(",")) if "BYMINUTE" in parts else [dtstart.minute]
+    until = datetime.strptime(parts["UNTIL"], "%Y%m%dT%H%M%S") if "UNTIL" in parts else None
+    start = dtstart.date()
+
+    def in_period(d):
+        if freq == "DAILY":
+            return (d - start).days % interval == 0
+        if freq == "WEEKLY":
+            return (d.toordinal() - d.weekday() - start.toordinal() + start.weekday()) // 7 % interval == 0
+        if freq == "MONTHLY":
+            return _months_between(start, d) % interval == 0
+        return (d.year - start.year) % interval == 0
+
+    def day_matches(d):
+        last = _last_day(d.year, d.month)
+        if by_month is not None and d.month not in by_month:
+            return False
+        if by_month_day is not None and not any(d.day == (v if v > 0 else last + v + 1) for v in by_month_day):
+            return False
+        if by_day is not None:
+            # 带序号的 BYDAY（如 2TU）在月内计数
+            return any(d.weekday() == weekday and (
+                nth == 0 or (nth > 0 and (d.day - 1) // 7 + 1 == nth) or (nth < 0 and (last - d.day) // 7 + 1 == -nth)
+            ) for nth, weekday in by_day)
+        if by_month_day is not None:
+            return True
+        # 未指定日期时沿用起点的星期几/日期/月份
+        if freq == "WEEKLY":
+            return d.weekday() == start.weekday()
+        if freq == "MONTHLY":
+            return d.day == start.day
+        if freq == "YEARLY":
+            return d.day == start.day and (by_month is not None or d.month == start.month)
+        return True
+
+    for offset in range(SCAN_DAYS):
+        d = start + timedelta(days=offset)
+        if until is not None and d > until.date():
+            return None
+        if not (in_period(d) and day_matches(d)):
+            continue
+        for hour in hours:
+            for minute in minutes:
+                candidate = datetime.combine(d, dtstart.time()).replace(hour=hour, minute=minute)
+                if candidate > dtstart:
+                    return candidate if until is None or candidate <= until else None
+    return None
+
+
+def oracle_next(kind, config, last):
+    """参照实现的下一次触发：workdays_only 时跳过落在休息日的触发，连续跳过过多次后结束"""
+    following = _oracle_nominal(kind, config, last)
+    if kind == RecurrenceType.ONCE or not config.get("workdays_only"):
+        return following
+    for _ in range(MAX_DAYS_OFF_SKIPPED):
+        if following is None or get_workday_calendar().is_workday(following.date()):
+            return following
+        following = _oracle_nominal(kind, config, following)
+    return None
+
+
+def oracle_expand(reminder, window_start, window_end, limit=None):
+    current, occurrences = reminder.next_remind_time, []
+    while current is not None and current < window_end and not (limit and len(occurrences) >= limit):
+        if current >= window_start:
+            occurrences.append(current)
+        current = oracle_next(reminder.recurrence_type, reminder.recurrence_config, current)
+    return occurrences
+
+
+# ---------------------------------------------------------------- 被测实现
+
+def _chained(next_time):
+    """由“下一次触发”函数逐次推进得到窗口内的触发（返回 None 或原时间表示结束）"""
+    def expand(reminder, window_start, window_end, limit):
+        current, occurrences = reminder.next_remind_time, []
+        while current is not None and current < window_end and not (limit and len(occurrences) >= limit):
+            if current >= window_start:
+                occurrences.append(current)
+            following = next_time(reminder, current)
+            current = following if following != current else None
+        return occurrences
+    return expand
+
+
+def _rule(reminder):
+    return compile_rule(reminder.recurrence_type, reminder.recurrence_config)
+
+
+def _jumping(reminder, window_start, window_end, limit):
+    """每一次都用 next_after 从起点直接跳过去"""
+    anchor, rule = reminder.next_remind_time, _rule(reminder)
+    current = anchor if anchor >= window_start else next_after(rule, anchor, window_start - timedelta(microseconds=1))
+    occurrences = []
+    while current is not None and current < window_end and not (limit and len(occurrences) >= limit):
+        occurrences.append(current)
+        current = next_after(rule, anchor, current)
+    return occurrences
+
+
+ENGINES = {
+    "RecurrenceRule.expand": lambda r, start, end, limit: _rule(r).expand(r.next_remind_time, start, end, limit),
+    "RecurrenceRule.next_time": _chained(lambda r, t: _rule(r).next_time(t)),
+    "RecurrenceRule.next_after": _jumping,
+    "RecurrenceEngine.expand": lambda r, start, end, limit: RecurrenceEngine.expand([r], start, end, limit)[r.id],
+    "RecurrenceEngine.calculate_next_time": _chained(
+        lambda r, t: RecurrenceEngine.calculate_next_time(r.recurrence_type, r.recurrence_config, t)
+    ),
+    "RecurrenceService.calculate_next_time": _chained(
+        lambda r, t: RecurrenceService().calculate_next_time(r.recurrence_type, r.recurrence_config, t)
+    ),
+    "calculate_next_occurrence": _chained(
+        lambda r, t: calculate_next_occurrence(t, r.recurrence_type, r.recurrence_config)
+    ),
+}
+# 每次都从起点跳跃的路径总耗时随次数平方增长（RRULE 由 dateutil 从起点迭代），只比较前几次
+ENGINE_LIMITS = {"RecurrenceRule.next_after": 10}
+
+
+# ---------------------------------------------------------------- 随机配置
+
+def _random_anchor(rng):
+    """一半落在月末（含闰年2月29日），其余在 2023-2029 年随机分布"""
+    year = rng.randint(2023, 2029)
+    if rng.random() < 0.5:
+        month = rng.choice([1, 2, 2, 3, 4, 6, 8, 9, 11, 12])
+        day = _last_day(year, month) - rng.choice([0, 0, 1, 2])
+    else:
+        month, day = rng.randint(1, 12), 1
+        day = rng.randint(1, _last_day(year, month))
+    return datetime(year, month, day, rng.randint(0, 23), rng.choice([0, 15, 30, 59]), rng.choice([0, 0, 0, 30]))
+
+
+def _random_rrule(rng):
+    freq = rng.choice(["DAILY", "WEEKLY", "MONTHLY", "YEARLY"])
+    parts = [f"FREQ={freq}"]
+    if rng.random() < 0.5:
+        parts.append(f"INTERVAL={rng.randint(2, 3)}")
+    weekdays = ",".join(rng.sample(WEEKDAY_CODES, rng.randint(1, 3)))
+    if freq in ("DAILY", "WEEKLY") and rng.random() < 0.6:
+        parts.append(f"BYDAY={weekdays}")
+    elif freq == "MONTHLY":
+        parts.append(rng.choice([
+            f"BYMONTHDAY={rng.choice([1, 15, 29, 30, 31, -1])}", f"BYDAY={rng.choice([1, 2, 4, -1])}{rng.choice(WEEKDAY_CODES)}",
+            f"BYDAY={weekdays}", "BYMONTHDAY=-1,1",
+        ]))
+    elif freq == "YEARLY" and rng.random() < 0.7:
+        parts.append(f"BYMONTH={rng.randint(1, 12)}")
+        parts.append(rng.choice([f"BYMONTHDAY={rng.randint(1, 28)}", f"BYDAY={rng.choice([1, 2, -1])}SU"]))
+    if rng.random() < 0.3:
+        parts.append(f"BYHOUR={','.join(str(h) for h in sorted(rng.sample(range(24), 2)))}")
+        if rng.random() < 0.5:
+            parts.append("BYMINUTE=0,45")
+    if rng.random() < 0.2:
+        parts.append(f"UNTIL={rng.randint(2025, 2030)}0{rng.randint(1, 9)}15T120000")
+    rng.shuffle(parts)
+    return ";".join(parts)
+
+
+def _random_config(rng, kind):
+    if kind == RecurrenceType.DAILY:
+        config = rng.choice([{}, {"interval": rng.randint(1, 10)}, {"interval_days": rng.randint(1, 3)}])
+    elif kind == RecurrenceType.WEEKLY:
+        config = {"weekdays": rng.sample(range(7), rng.randint(1, 7))} if rng.random() < 0.8 else {}
+        if rng.random() < 0.4:
+            config["interval"] = rng.randint(2, 4)
+    elif kind == RecurrenceType.MONTHLY:
+        config = rng.choice([
+            {}, {"day_of_month": rng.choice([1, 28, 29, 30, 31, -1])}, {"day": rng.randint(1, 31)},
+            {"monthday": rng.randint(1, 31), "interval": rng.randint(2, 5)},
+        ])
+        if rng.random() < 0.3:
+            config["skip_weekend"] = True
+    elif kind == RecurrenceType.YEARLY:
+        config = rng.choice([{}, {"month": 2, "day": 29}, {"month": rng.randint(1, 12), "day": rng.randint(1, 31)}])
+        if rng.random() < 0.3:
+            config["interval"] = rng.randint(2, 3)
+    elif kind == RecurrenceType.LUNAR_YEARLY:
+        config = rng.choice([
+            {}, {"lunar_month": rng.randint(1, 12), "lunar_day": rng.randint(1, 30)},
+            {"lunar_month": rng.choice([2, 4, 6]), "lunar_day": rng.choice([1, 29, 30]), "leap": True},
+        ])
+        if rng.random() < 0.3:
+            config["interval"] = rng.randint(2, 3)
+    elif kind == RecurrenceType.CUSTOM:
+        config = rng.choice([
+            {"days": rng.randint(1, 100)}, {"weeks": rng.randint(1, 6)}, {"months": rng.randint(1, 13)},
+            {"years": rng.randint(1, 2)}, {"interval": rng.randint(1, 4), "unit": rng.choice(["days", "weeks", "months"])},
+            {"rrule": _random_rrule(rng)}, {"rrule": _random_rrule(rng)}, {}, {"interval": rng.randint(2, 5)},
+        ])
+    else:
+        config = {}
+    if kind != RecurrenceType.CUSTOM or "rrule" not in config:
+        if rng.random() < 0.25:
+            config["time"] = f"{rng.randint(0, 23):02d}:{rng.choice([0, 30]):02d}"
+    if rng.random() < 0.15:
+        config["workdays_only"] = True
+    return config
+
+
+def _random_case(rng, reminder_id):
+    kind = rng.choice(list(RecurrenceType))
+    anchor = _random_anchor(rng)
+    reminder = SimpleNamespace(id=reminder_id, recurrence_type=kind, recurrence_config=_random_config(rng, kind),
+                               next_remind_time=anchor)
+    window_start = anchor + timedelta(days=rng.randint(-60, 1000), hours=rng.randint(0, 23))
+    window_end = window_start + timedelta(days=rng.randint(1, 500))
+    return reminder, window_start, window_end, rng.choice([None, None, 1, 5])
+
+
+# ---------------------------------------------------------------- 测试
+
+def test_oracle_known_cases():
+    """参照实现本身与手工核对的结果一致"""
+    assert oracle_next(RecurrenceType.MONTHLY, {}, datetime(2024, 1, 31, 9)) == datetime(2024, 2, 29, 9)
+    assert oracle_next(RecurrenceType.YEARLY, {"month": 2, "day": 29}, datetime(2024, 2, 29)) == datetime(2025, 2, 28)
+    assert oracle_next(RecurrenceType.WEEKLY, {"weekdays": [0], "interval": 2}, datetime(2026, 1, 5)) \
+        == datetime(2026, 1, 19)
+    assert oracle_next(RecurrenceType.MONTHLY, {"day_of_month": 1, "skip_weekend": True}, datetime(2026, 9, 1, 9)) \
+        == datetime(2026, 10, 8, 9), "国庆假期后第一个工作日"
+    assert oracle_next(RecurrenceType.LUNAR_YEARLY, {"lunar_month": 8, "lunar_day": 15}, datetime(2025, 10, 6, 20)) \
+        == datetime(2026, 9, 25, 20)
+    assert oracle_next(RecurrenceType.CUSTOM, {"rrule": "FREQ=MONTHLY;BYDAY=2TU"}, datetime(2026, 1, 13, 9)) \
+        == datetime(2026, 2, 10, 9)
+    assert oracle_next(RecurrenceType.CUSTOM, {"rrule": "FREQ=DAILY;UNTIL=20260103T235959"}, datetime(2026, 1, 3, 8)) \
+        is None
+    assert oracle_next(RecurrenceType.ONCE, {}, datetime(2026, 1, 1)) is None
+    # 自定义周期未给出单位时每天，interval 不带 unit 不改变步长
+    for config in ({}, {"interval": 3}):
+        assert oracle_next(RecurrenceType.CUSTOM, config, datetime(2026, 1, 1, 9)) == datetime(2026, 1, 2, 9), config
+    assert oracle_next(RecurrenceType.CUSTOM, {"weeks": 2}, datetime(2026, 1, 1, 9)) == datetime(2026, 1, 15, 9)
+
+
+def test_engines_match_oracle():
+    """每一种计算路径在随机配置、起点和窗口下都与逐日参照实现一致"""
+    print("\n" + "="*60)
+    print("测试周期计算与逐日参照实现一致")
+    print("="*60)
+
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        checked = occurrences = 0
+        for reminder_id in range(REMINDERS_PER_SEED):
+            reminder, window_start, window_end, limit = _random_case(rng, reminder_id)
+            expected = oracle_expand(reminder, window_start, window_end, limit)
+            for name, engine in ENGINES.items():
+                engine_limit = min(limit or ENGINE_LIMITS[name], ENGINE_LIMITS[name]) if name in ENGINE_LIMITS else limit
+                actual = engine(reminder, window_start, window_end, engine_limit)
+                assert actual == expected[:engine_limit], (
+                    f"seed={seed} {name}: {reminder.recurrence_type.value} {reminder.recurrence_config} "
+                    f"from {reminder.next_remind_time} in [{window_start}, {window_end}) limit={limit}\n"
+                    f"  expected {expected[:5]}...\n  actual   {actual[:5]}..."
+                )
+                checked += 1
+            occurrences += len(expected)
+        print(f"    ✓ seed={seed}: {checked} 次对比, {occurrences} 次触发")
+
+
+def test_month_end_and_leap_day_anchors():
+    """月末和2月29日起点逐个覆盖：每种按月/按年配置在 2023-2029 年的每个月末都与参照实现一致"""
+    configs = [
+        (RecurrenceType.MONTHLY, {}), (RecurrenceType.MONTHLY, {"day_of_month": -1}),
+        (RecurrenceType.MONTHLY, {"day_of_month": 30, "interval": 5}),
+        (RecurrenceType.MONTHLY, {"day_of_month": 31, "skip_weekend": True}),
+        (RecurrenceType.YEARLY, {}), (RecurrenceType.YEARLY, {"interval": 4}),
+        (RecurrenceType.CUSTOM, {"months": 1}), (RecurrenceType.CUSTOM, {"years": 1, "workdays_only": True}),
+        (RecurrenceType.CUSTOM, {}), (RecurrenceType.CUSTOM, {"interval": 4}),
+    ]
+    window_start, window_end = datetime(2028, 1, 1), datetime(2031, 1, 1)
+    for kind, config in configs:
+        for year in range(2023, 2030):
+            for month in range(1, 13):
+                reminder = SimpleNamespace(id=0, recurrence_type=kind, recurrence_config=config,
+                                           next_remind_time=datetime(year, month, _last_day(year, month), 9))
+                expected = oracle_expand(reminder, window_start, window_end)
+                assert ENGINES["RecurrenceRule.expand"](reminder, window_start, window_end, None) == expected, (
+                    f"{kind.value} {config} from {reminder.next_remind_time}"
+                )
+                assert _jumping(reminder, window_start, window_end, 3) == expected[:3]
@@ -0,0 +1,114 @@
+"""
+测试过期周期提醒追赶 - 跳跃计算与 UPDATE ... FROM (VALUES ...) 语句结构
+只编译 SQL 检查语句结构，不依赖数据库
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.core.timezones import get_zone
+from app.models.reminder import RecurrenceType
+from app.repositories.reminder_repository import ReminderRepository
+from app.services.reminder_catchup import plan_realignment
+
+CUTOFF = datetime(2026, 3, 10, 12, 0)
+NEW_YORK = get_zone("America/New_York")
+
+
+def _compile(stmt):
+    compiled = stmt.compile(dialect=asyncpg.dialect())
+    return str(compiled).replace("\n", " "), compiled.params
+
+
+def _row(reminder_id, recurrence_type, config, next_remind_time):
+    return SimpleNamespace(id=reminder_id, user_id=100 + reminder_id, recurrence_type=recurrence_type,
+                           recurrence_config=config, next_remind_time=next_remind_time)
+
+
+def test_plan_jumps_past_cutoff():
+    """每个过期提醒直接跳到 cutoff 之后的第一次触发，配置错误的提醒跳过"""
+    rows = [
+        _row(1, RecurrenceType.DAILY, {"interval": 1}, datetime(2024, 5, 1, 9, 0)),
+        _row(2, RecurrenceType.WEEKLY, {"weekdays": [0]}, datetime(2025, 1, 6, 8, 0)),
+        _row(3, RecurrenceType.MONTHLY, {"day_of_month": -1}, datetime(2025, 1, 31, 20, 0)),
+        _row(4, RecurrenceType.YEARLY, {"month": 2, "day": 29}, datetime(2020, 2, 29, 10, 0)),
+        _row(5, RecurrenceType.WEEKLY, {"weekdays": [9]}, datetime(2025, 1, 6, 8, 0)),
+        _row(6, RecurrenceType.CUSTOM, {"days": 10}, datetime(2026, 1, 1, 7, 0)),
+    ]
+    plan = {item["id"]: item for item in plan_realignment(rows, {}, CUTOFF.replace(tzinfo=get_zone()))}
+    print(f"\n    {plan}")
+
+    assert plan[1]["next"] == datetime(2026, 3, 11, 9, 0)
+    assert plan[2]["next"] == datetime(2026, 3, 16, 8, 0), "下一个周一"
+    assert plan[3]["next"] == datetime(2026, 3, 31, 20, 0), "月末提醒不会停在回退后的28日"
+    assert plan[4]["next"] == datetime(2027, 2, 28, 10, 0), "非闰年回退到2月28日"
+    assert plan[6]["next"] == datetime(2026, 3, 12, 7, 0)
+    assert 5 not in plan, "配置错误的提醒不影响整批"
+    assert plan[1]["previous"] == datetime(2024, 5, 1, 9, 0), "写回时用于乐观校验"
+
+
+def test_cutoff_in_user_zone():
+    """过期按用户时区的当前时间判断：服务器时间已过、用户当地尚未到的触发不会被跳过"""
+    # 纽约 2026-10-16 23:00 对应 UTC 10-17 03:00；服务器在 UTC 10-17 10:00 时纽约当地为 06:00
+    cutoff = datetime(2026, 10, 17, 10, 0, tzinfo=timezone.utc)
+    rows = [_row(1, RecurrenceType.DAILY, {"interval": 1, "time": "07:00"}, datetime(2026, 10, 10, 7, 0))]
+
+    (item,) = plan_realignment(rows, {101: NEW_YORK}, cutoff)
+    assert item["next"] == datetime(2026, 10, 17, 7, 0), "纽约当地 07:00 还没到"
+    (item,) = plan_realignment(rows, {}, cutoff)
+    assert item["next"] == datetime(2026, 10, 18, 7, 0), "默认时区（上海）当地已是 18:00"
+
+
+class _RecordingSession:
+    """记录执行的语句并返回空结果，不连接数据库"""
+
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, statement):
+        self.executed.append(statement)
+        return SimpleNamespace(all=lambda: [])
+
+    async def commit(self):
+        pass
+
+
+def test_stale_scan_compares_user_wall_time():
+    """扫描条件把 UTC 时间戳换算为每个用户时区的墙上时间再与 next_remind_time 比较"""
+    db = _RecordingSession()
+    repo = ReminderRepository(db)
+
+    async def scan():
+        return [rows async for rows in repo.iter_stale_recurring(before=1_700_000_000)]
+
+    assert asyncio.run(scan()) == []
+    sql, params = _compile(db.executed[0])
+    print(f"\n    {sql}")
+    assert "JOIN users ON users.id = reminders.user_id" in sql
+    assert "reminders.next_remind_time < timezone(coalesce(users.timezone, " in sql
+    assert "to_timestamp(" in sql and 1_700_000_000 in params.values()
+
+
+def test_realign_statement_structure():
+    """一条语句写回一块，只更新 next_remind_time 仍等于读取时值的提醒"""
+    repo = ReminderRepository(db=None)
+    rows = [{"id": i, "previous": datetime(2025, 1, 1), "next": CUTOFF} for i in range(3)]
+    statements = repo._realign_statements(rows)
+    assert len(statements) == 1
+
+    sql, _ = _compile(statements[0])
+    print(f"\n    {sql}")
+    assert sql.startswith("UPDATE reminders SET next_remind_time=realign.next")
+    assert "AS realign (id, previous, next)" in sql
+    assert "reminders.id = realign.id AND reminders.next_remind_time = realign.previous" in sql
+
+    many = [{"id": i, "previous": datetime(2025, 1, 1), "next": CUTOFF}
+            for i in range(repo.REALIGN_ROWS_PER_STATEMENT * 2 + 1)]
+    assert len(repo._realign_statements(many)) == 3, "按块拆分，避免单条语句参数过多"
+    assert repo._realign_statements([]) == []
@@ -0,0 +1,191 @@
+"""
+测试提醒触发时间物化 - 增量扩展结果与语句结构
+只编译 SQL 检查语句结构，不依赖数据库
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.core.recurrence import compile_rule
+from app.core.timezones import get_zone, local_now
+from app.models.reminder import RecurrenceType, ReminderCategory
+from app.repositories.reminder_occurrence_repository import ReminderOccurrenceRepository
+from app.repositories.reminder_repository import ReminderRepository
+from app.services.occurrence_materializer import plan_extension
+
+NOW = datetime(2026, 3, 1, 0, 0)
+# 默认时区墙上时间 NOW 对应的时刻
+NOW_AT = NOW.replace(tzinfo=get_zone())
+
+
+def _compile(stmt):
+    compiled = stmt.compile(dialect=asyncpg.dialect())
+    return str(compiled).replace("\n", " "), compiled.params
+
+
+def _row(reminder_id, recurrence_type, config, next_remind_time, occurrences_until=None):
+    return SimpleNamespace(id=reminder_id, user_id=100 + reminder_id, recurrence_type=recurrence_type,
+                           recurrence_config=config, next_remind_time=next_remind_time,
+                           occurrences_until=occurrences_until)
+
+
+def test_incremental_extension_matches_full_expand():
+    """分多轮逐步扩展窗口，累计结果与一次性展开完全一致，不重复也不遗漏"""
+    rng = random.Random(20260301)
+    configs = [
+        (RecurrenceType.DAILY, {"interval": 2}),
+        (RecurrenceType.WEEKLY, {"weekdays": [0, 3]}),
+        (RecurrenceType.MONTHLY, {"day_of_month": 31, "skip_weekend": True}),
+        (RecurrenceType.MONTHLY, {}),
+        (RecurrenceType.YEARLY, {"month": 2, "day": 29}),
+        (RecurrenceType.CUSTOM, {"days": 9, "time": "07:30"}),
+        (RecurrenceType.ONCE, {}),
+    ]
+    rows = [
+        _row(i, recurrence_type, config, NOW + timedelta(days=rng.randint(-40, 40), hours=rng.randint(0, 23)))
+        for i, (recurrence_type, config) in enumerate(configs * 20)
+    ]
+
+    materialized = {row.id: [] for row in rows}
+    now = NOW_AT
+    for _ in range(12):
+        occurrences, watermarks = plan_extension(rows, {}, now, timedelta(days=30))
+        for item in occurrences:
+            materialized[item["reminder_id"]].append(item["occurs_at"])
+        until = {w["id"]: w["until"] for w in watermarks}
+        for row in rows:
+            row.occurrences_until = until[row.id]
+        now += timedelta(days=17)
+
+    for row in rows:
+        expected = compile_rule(row.recurrence_type, row.recurrence_config).expand(
+            row.next_remind_time, NOW, NOW + timedelta(days=17 * 11 + 30)
+        )
+        assert materialized[row.id] == expected, f"{row.recurrence_type} {row.recurrence_config}"
+    print(f"\n    ✓ {len(rows)} 个提醒, {sum(len(v) for v in materialized.values())} 次触发")
+
+
+def test_broken_config_keeps_watermark():
+    """配置错误的提醒不推进截止时间，不影响整批"""
+    rows = [
+        _row(1, RecurrenceType.DAILY, {}, NOW),
+        _row(2, RecurrenceType.WEEKLY, {"weekdays": [9]}, NOW),
+    ]
+    occurrences, watermarks = plan_extension(rows, {}, NOW_AT, timedelta(days=3))
+    assert [item["occurs_at"] for item in occurrences] == [NOW + timedelta(days=d) for d in range(3)]
+    assert occurrences[0]["user_id"] == 101
+    assert watermarks == [{"id": 1, "until": NOW + timedelta(days=3)}]
+
+
+def test_window_starts_at_user_wall_time():
+    """首次物化从用户时区的当前时间开始：服务器时间已过、用户当地尚未到的触发不会漏掉"""
+    # UTC 2026-10-17 10:00 时纽约当地为 06:00，上海当地为 18:00
+    now = datetime(2026, 10, 17, 10, 0).replace(tzinfo=get_zone("UTC"))
+    rows = [_row(1, RecurrenceType.DAILY, {"interval": 1, "time": "07:00"}, datetime(2026, 10, 1, 7, 0))]
+
+    occurrences, watermarks = plan_extension(rows, {101: get_zone("America/New_York")}, now, timedelta(days=2))
+    assert [item["occurs_at"] for item in occurrences] == [datetime(2026, 10, 17, 7, 0), datetime(2026, 10, 18, 7, 0)]
+    assert watermarks == [{"id": 1, "until": datetime(2026, 10, 19, 6, 0)}]
+    occurrences, _ = plan_extension(rows, {}, now, timedelta(days=2))
+    assert occurrences[0]["occurs_at"] == datetime(2026, 10, 18, 7, 0)
+
+
+def test_statement_structure():
+    """插入按唯一键跳过已存在记录，截止时间用 UPDATE ... FROM (VALUES ...) 批量推进"""
+    repo = ReminderOccurrenceRepository(db=None)
+    occurrences = [{"reminder_id": i, "user_id": 1, "occurs_at": NOW} for i in range(3)]
+    (insert_stmt,) = repo._insert_statements(occurrences)
+    insert_sql, _ = _compile(insert_stmt)
+    print(f"\n    {insert_sql}")
+    assert insert_sql.startswith("INSERT INTO reminder_occurrences (reminder_id, user_id, occurs_at) VALUES")
+    assert insert_sql.endswith("ON CONFLICT (reminder_id, occurs_at) DO NOTHING")
+
+    (watermark_stmt,) = repo._watermark_statements([{"id": i, "until": NOW} for i in range(3)])
+    watermark_sql, _ = _compile(watermark_stmt)
+    print(f"    {watermark_sql}")
+    assert watermark_sql.startswith("UPDATE reminders SET occurrences_until=watermark.until")
+    assert "AS watermark (id, until) WHERE reminders.id = watermark.id" in watermark_sql
+
+    many = [{"reminder_id": i, "user_id": 1, "occurs_at": NOW} for i in range(repo.ROWS_PER_STATEMENT + 1)]
+    assert len(repo._insert_statements(many)) == 2
+    assert repo._insert_statements([]) == []
+
+
+class _RecordingSession:
+    """记录执行的语句，不连接数据库"""
+
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, statement):
+        self.executed.append(statement)
+        return SimpleNamespace(scalar_one_or_none=lambda: None)
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+def test_recurrence_change_invalidates_occurrences():
+    """只有周期类型、周期配置或启用状态真正变化时才删除未来的物化记录并清空截止时间"""
+    db = _RecordingSession()
+    repo = ReminderRepository(db)
+    reminder = SimpleNamespace(id=7, user_id=1, title="还信用卡", description=None, remind_channels=["app"], priority=1,
+                               category=ReminderCategory.FINANCE, recurrence_type=RecurrenceType.MONTHLY,
+                               recurrence_config={"day_of_month": 5}, is_active=True, is_completed=False,
+                               advance_minutes=0, occurrences_until=NOW + timedelta(days=30),
+                               push_tasks_until=NOW + timedelta(hours=24))
+
+    asyncio.run(repo.update(reminder, title="还信用卡", recurrence_config={"day_of_month": 5}))
+    assert db.executed == [] and reminder.occurrences_until is not None, "配置未变不失效"
+
+    asyncio.run(repo.update(reminder, recurrence_config={"day_of_month": 10}))
+    zone_lookup, statement, cancel = db.executed
+    assert _compile(zone_lookup)[0].startswith("SELECT users.timezone "), "按用户时区取当前时间"
+    sql, params = _compile(statement)
+    print(f"\n    {sql}")
+    assert sql.startswith("DELETE FROM reminder_occurrences WHERE reminder_occurrences.reminder_id =")
+    assert "reminder_occurrences.occurs_at >=" in sql and params["reminder_id_1"] == 7
+    # 触发时间是用户时区的墙上时间，按用户时区的当前时间删除
+    assert abs(params["occurs_at_1"] - local_now(get_zone())) < timedelta(minutes=1)
+    assert reminder.occurrences_until is None, "后台任务下一轮按新配置重新展开"
+
+    # 预先生成的未来推送任务一并取消，生成截止时间清空
+    cancel_sql, cancel_params = _compile(cancel)
+    print(f"    {cancel_sql}")
+    assert cancel_sql.startswith("UPDATE push_tasks SET status=")
+    assert "push_tasks.scheduled_time >=" in cancel_sql and cancel_params["reminder_id_1"] == 7
+    assert reminder.push_tasks_until is None
+
+    db.executed.clear()
+    asyncio.run(repo.update(reminder, advance_minutes=30))
+    _, cancel = db.executed
+    assert _compile(cancel)[0].startswith("UPDATE push_tasks SET status="), "只改提前量不影响物化记录"
+
+    # 推送内容、渠道和优先级来自提醒，变更后未来的推送任务按新内容重新生成
+    for field, value in (("title", "还房贷"), ("description", "招商银行"), ("remind_channels", ["sms"]), ("priority", 3),
+                         ("category", ReminderCategory.HEALTH)):
+        db.executed.clear()
+        reminder.push_tasks_until = NOW + timedelta(hours=24)
+        asyncio.run(repo.update(reminder, **{field: value}))
+        _, cancel = db.executed
+        cancel_sql, _ = _compile(cancel)
+        assert cancel_sql.startswith("UPDATE push_tasks SET status=") and "push_tasks.scheduled_time >=" in cancel_sql, field
+        assert reminder.push_tasks_until is None, field
+
+    # 经 update 标记为已完成时取消全部待推送任务（含已到期未推送的）
+    db.executed.clear()
+    asyncio.run(repo.update(reminder, is_completed=True))
+    _, cancel = db.executed
+    cancel_sql, cancel_params = _compile(cancel)
+    assert cancel_sql.startswith("UPDATE push_tasks SET status=") and "scheduled_time" not in cancel_sql
+    assert "Reminder completed" in cancel_params.values()
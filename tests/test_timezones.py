@@ -0,0 +1,60 @@
+"""
+测试时区换算 - 墙上时间跨夏令时换算为 UTC 时间戳、推送任务调度字段与未知时区
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import datetime, timezone
+
+from app.core.recurrence import compile_rule
+from app.core.timezones import from_epoch, get_zone, push_schedule, to_epoch
+from app.models.reminder import RecurrenceType
+
+
+def _utc(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+
+def test_daily_rule_keeps_wall_clock_across_dst():
+    """纽约每天 09:00 的提醒在夏令时切换前后都按当地 09:00 触发，UTC 偏移随之变化"""
+    zone = get_zone("America/New_York")
+    rule = compile_rule(RecurrenceType.DAILY, {"interval": 1})
+    occurrences = rule.expand(datetime(2026, 3, 7, 9), datetime(2026, 3, 7), datetime(2026, 3, 10), 10)
+    assert [_utc(to_epoch(moment, zone)) for moment in occurrences] == [
+        datetime(2026, 3, 7, 14),  # EST, UTC-5
+        datetime(2026, 3, 8, 13),  # EDT, UTC-4
+        datetime(2026, 3, 9, 13),
+    ]
+    print(f"\n    ✓ 夏令时前后: {[str(_utc(to_epoch(m, zone))) for m in occurrences]}")
+
+
+def test_default_zone_and_dst_gaps():
+    """默认时区为 Asia/Shanghai；夏令时跳过和重复的时刻换算结果确定"""
+    assert get_zone() is get_zone("Asia/Shanghai")
+    assert _utc(to_epoch(datetime(2026, 10, 1, 8), get_zone())) == datetime(2026, 10, 1)
+    zone = get_zone("America/New_York")
+    # 02:30 不存在（向前跳过），按切换前的偏移换算
+    assert _utc(to_epoch(datetime(2026, 3, 8, 2, 30), zone)) == datetime(2026, 3, 8, 7, 30)
+    # 01:30 出现两次（回拨），取第一次
+    assert _utc(to_epoch(datetime(2026, 11, 1, 1, 30), zone)) == datetime(2026, 11, 1, 5, 30)
+
+
+def test_push_schedule():
+    """推送任务保留墙上时间，到期时间戳按用户时区换算，next_attempt_at 与时间戳一致"""
+    scheduled_time = datetime(2026, 7, 1, 9)
+    fields = push_schedule(scheduled_time, get_zone("Europe/London"))
+    assert fields["scheduled_time"] == scheduled_time
+    assert _utc(fields["due_at"]) == datetime(2026, 7, 1, 8) and fields["scheduled_at"] == fields["due_at"]
+    assert fields["next_attempt_at"] == from_epoch(fields["due_at"])
+    assert to_epoch(fields["next_attempt_at"]) == fields["due_at"]
+
+
+def test_unknown_zone():
+    """未知时区报 ValueError"""
+    for name in ("Mars/Olympus_Mons", "../etc/passwd"):
+        try:
+            get_zone(name)
+            assert False, "应报错"
+        except ValueError:
+            pass
@@ -0,0 +1,51 @@
+"""
+测试工作日历 - 法定节假日、调休与位图查找
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import tempfile
+from datetime import date, timedelta
+
+from app.core.workday import WorkdayCalendar, get_workday_calendar
+
+
+def test_holidays_and_adjusted_workdays():
+    """法定节假日不是工作日，调休上班的周末是工作日，未收录的年份只排除周末"""
+    workdays = get_workday_calendar()
+    assert not workdays.is_workday(date(2026, 2, 16)), "春节"
+    assert workdays.is_workday(date(2026, 2, 14)), "周六调休上班"
+    assert not workdays.is_workday(date(2026, 2, 21)), "春节假期内的周六"
+    assert workdays.is_workday(date(2030, 1, 1)) and not workdays.is_workday(date(2030, 1, 5)), "未收录年份"
+    assert workdays.longest_break == 9, "2026年春节连休9天"
+
+
+def test_next_workday_matches_day_by_day():
+    """位图查找与逐天判断的结果一致，包括跨年"""
+    workdays = get_workday_calendar()
+    day = date(2023, 12, 1)
+    while day < date(2027, 2, 1):
+        expected = day
+        while not workdays.is_workday(expected):
+            expected += timedelta(days=1)
+        assert workdays.next_workday(day) == expected, day
+        day += timedelta(days=1)
+
+
+def test_load_rejects_bad_file():
+    """格式版本不支持或日期不属于所在年份时拒绝加载"""
+    for data in (
+        {"format": 2, "version": "x", "years": {}},
+        {"format": 1, "version": "x", "years": {"2026": {"holidays": ["2025-12-31"]}}},
+    ):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(data, f)
+        try:
+            WorkdayCalendar.load(Path(f.name))
+            assert False, f"应拒绝: {data}"
+        except RuntimeError:
+            pass
+        finally:
+            Path(f.name).unlink()